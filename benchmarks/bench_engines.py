@@ -0,0 +1,176 @@
+"""
+bench_engines.py  —  the thread and asyncio download engines, side by side.
+
+Serves random files from a local HTTP/1.1 server with byte ranges and
+keep-alive, downloads several of them at once through DownloadManager
+with each engine, and reports wall time, throughput, CPU time and the
+peak number of OS threads in the process.
+
+The server can be slowed per 64 KB write (--delay) to look more like a
+real link; at 0 the numbers are mostly the engines' own overhead. The
+server runs in the same process, so its CPU time is in the totals for
+both engines alike.
+
+    python benchmarks/bench_engines.py
+    python benchmarks/bench_engines.py --files 8 --size-mb 32 --segments 8 --delay 0.005
+"""
+
+import argparse
+import http.server
+import logging
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from PyQt6.QtCore import QCoreApplication, QThreadPool, QTimer  # noqa: E402
+
+import aioengine  # noqa: E402
+from downloader import DownloadManager  # noqa: E402
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+CHUNK = 64 * 1024
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _headers(self):
+        body = self.server.body
+        start, end = 0, len(body) - 1
+        m = re.match(r"bytes=(\d+)-(\d*)$", self.headers.get("Range", ""))
+        if m:
+            start, end = int(m.group(1)), min(int(m.group(2) or end), end)
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(body)}")
+        else:
+            self.send_response(200)
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        return start, end
+
+    def do_HEAD(self):
+        self._headers()
+
+    def do_GET(self):
+        start, end = self._headers()
+        try:
+            for pos in range(start, end + 1, CHUNK):
+                if self.server.delay:
+                    time.sleep(self.server.delay)
+                self.wfile.write(self.server.body[pos:min(pos + CHUNK, end + 1)])
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def serve(body, delay):
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.daemon_threads = True
+    server.body = body
+    server.delay = delay
+    server.handle_error = lambda request, address: None     # clients drop split segments
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def os_threads():
+    if psutil is not None:
+        return psutil.Process().num_threads()
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("Threads:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return threading.active_count()
+
+
+def run(app, engine, url, body, args, workdir):
+    pool = QThreadPool.globalInstance()
+    pool.setMaxThreadCount(max(pool.maxThreadCount(), args.files * args.segments + 2))
+    managers, done, failed = [], [], []
+    peak = [os_threads()]
+
+    def sample():
+        peak[0] = max(peak[0], os_threads())
+
+    for i in range(args.files):
+        path = os.path.join(workdir, f"{engine}-{i}.bin")
+        manager = DownloadManager(f"{engine}-{i}", url, path, pool, args.segments, engine=engine)
+        manager.download_finished.connect(lambda *a: (done.append(a), finished()))
+        manager.error_occurred.connect(lambda *a: (failed.append(a), finished()))
+        managers.append(manager)
+
+    def finished():
+        if len(done) + len(failed) == args.files:
+            app.quit()
+
+    timer = QTimer()
+    timer.timeout.connect(sample)
+    timer.start(20)
+    cpu0, t0 = time.process_time(), time.perf_counter()
+    for manager in managers:
+        manager.start()
+    app.exec()
+    wall, cpu = time.perf_counter() - t0, time.process_time() - cpu0
+    timer.stop()
+    pool.waitForDone()
+
+    intact = sum(1 for m in managers if open(m.save_path, "rb").read() == body)
+    return {"engine": engine, "wall": wall, "cpu": cpu, "threads": peak[0],
+            "ok": intact, "errors": len(failed),
+            "mbps": args.files * len(body) / wall / 1e6}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=6, help="downloads at once")
+    parser.add_argument("--size-mb", type=int, default=16, help="size of each file")
+    parser.add_argument("--segments", type=int, default=8, help="segments per download")
+    parser.add_argument("--delay", type=float, default=0.0, help="server sleep per 64 KB write")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger("urllib3").setLevel(logging.ERROR)     # "pool is full" under load
+
+    engines = ["threads"] + (["asyncio"] if aioengine.available() else [])
+    if len(engines) == 1:
+        print("aiohttp is not installed; benchmarking the thread engine only.")
+
+    app = QCoreApplication([])
+    body = os.urandom(args.size_mb * 1024 * 1024)
+    server = serve(body, args.delay)
+    url = f"http://127.0.0.1:{server.server_address[1]}/file.bin"
+    workdir = tempfile.mkdtemp(prefix="bench-engines-")
+    print(f"{args.files} files x {args.size_mb} MB, {args.segments} segments, "
+          f"delay {args.delay}s per 64 KB, {args.rounds} rounds\n")
+    print(f"{'engine':<8} {'round':>5} {'wall s':>8} {'MB/s':>8} {'cpu s':>7} "
+          f"{'threads':>8} {'intact':>7}")
+    try:
+        for r in range(1, args.rounds + 1):
+            for engine in engines:
+                res = run(app, engine, url, body, args, workdir)
+                print(f"{engine:<8} {r:>5} {res['wall']:>8.2f} {res['mbps']:>8.1f} "
+                      f"{res['cpu']:>7.2f} {res['threads']:>8} "
+                      f"{res['ok']:>3}/{args.files}" + (f"  {res['errors']} errors" if res['errors'] else ""))
+    finally:
+        server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
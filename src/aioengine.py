@@ -0,0 +1,304 @@
+"""
+aioengine.py  —  many download segments on one event-loop thread.
+
+The thread engine runs each segment as a QRunnable on the global pool,
+blocking in its socket reads, and pauses by polling the manager's status
+every 100 ms. Ten downloads of eight segments is eighty OS threads, each
+with its own stack, and all of them wake ten times a second while paused.
+It also shares the pool with everything else the browser runs there.
+
+This engine runs every segment of every download as a coroutine on one
+dedicated thread with one asyncio loop and one aiohttp session:
+    • segments come from the same SegmentPlan, claimed and committed the
+      same way, and a finished segment's slot takes the back half of the
+      busiest one, as in the thread engine;
+    • pause and resume are an asyncio.Event: a paused segment waits on it
+      and costs nothing until it is set again;
+    • connections come from one aiohttp connector, kept alive and limited
+      per host, shared by all downloads;
+    • a failed request is retried from where the segment got to, with the
+      thread engine's backoff; anything else ends the download with the
+      error;
+    • with a MirrorSet each request goes to the mirror it picks, and a
+      failing or dropped mirror's segment carries on from another;
+    • with a ratelimit.Throttle each read's bytes are reserved from it and
+      the segment awaits the wait it returns; nothing else on the loop
+      waits with it.
+
+Writes go straight to the file from the loop thread, one pwrite per 64 KB
+read on a descriptor only the loop uses: a write into the page cache takes
+microseconds, far less than the network read before it. (The pooled,
+blocking buffers of diskio.SegmentWriter are for threads; a loop waiting
+on the pool would wait on itself.)
+
+Callbacks (on_bytes, on_done, on_error) are called on the loop thread;
+DownloadManager passes its worker signals' emit methods, so DownloadPanel
+sees exactly what the thread engine sends. on_data is the exception: it
+feeds the StreamHasher, which may read megabytes back from disk, so it
+runs on the loop's executor while only its segment waits for it.
+aiohttp is optional: without it available() is False and the manager
+keeps to threads.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import diskio
+
+try:
+    import aiohttp
+except ImportError:            # optional: the thread engine needs nothing extra
+    aiohttp = None
+
+READ_SIZE = 64 * 1024
+LIMIT_PER_HOST = 16
+CONNECT_TIMEOUT = 30
+READ_TIMEOUT = 30
+RETRIES = 5
+BACKOFF = 1.5
+RETRY_STATUS = frozenset({429, 500, 502, 503, 504})
+
+
+def available() -> bool:
+    return aiohttp is not None
+
+
+class RangeIgnored(IOError):
+    """The server answered a ranged request with the whole file."""
+
+
+class _Retryable(Exception):
+    pass
+
+
+class AsyncDownload:
+    """
+    One download's segments on the engine's loop. Control methods are safe
+    to call from any thread.
+    """
+
+    def __init__(self, engine, url, path, plan, headers, on_bytes, on_done, on_error, on_data=None,
+                 mirrors=None, throttle=None):
+        self.engine = engine
+        self.url = url
+        self.path = path
+        self.plan = plan
+        self.headers = dict(headers or {})
+        # Ranges of compressed content cannot be stitched together.
+        self.headers["Accept-Encoding"] = "identity"
+        self.on_bytes = on_bytes
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_data = on_data
+        self.mirrors = mirrors
+        self.throttle = throttle
+        self.stopped = False
+        self._resume = asyncio.Event()         # set: running; only touched on the loop
+        self._resume.set()
+        self._tasks = set()
+        self._fd = None
+        self._failed = False
+
+    # ── control (any thread) ─────────────────────────────────────────────
+
+    def pause(self):
+        self.engine.call(self._resume.clear)
+
+    def resume(self):
+        self.engine.call(self._resume.set)
+
+    def stop(self):
+        self.stopped = True
+        self.engine.call(self._cancel)
+
+    # ── loop thread ──────────────────────────────────────────────────────
+
+    def _cancel(self):
+        for task in list(self._tasks):
+            task.cancel()
+
+    async def run(self, segments):
+        try:
+            self._fd = diskio.open_for_write(self.path)
+        except OSError as e:
+            self.on_error(e)
+            return
+        try:
+            for segment in segments:
+                self._spawn(segment)
+            while self._tasks:
+                await asyncio.wait(set(self._tasks))
+        finally:
+            os.close(self._fd)
+        if not self.stopped and not self._failed:
+            self.on_done()
+
+    def _spawn(self, segment):
+        task = asyncio.get_running_loop().create_task(self._fetch(segment))
+        self._tasks.add(task)
+        task.add_done_callback(self._segment_ended)
+
+    def _segment_ended(self, task):
+        self._tasks.discard(task)
+        if self.stopped or self._failed or task.cancelled():
+            return
+        error = task.exception()
+        if error is not None:
+            self._failed = True
+            self._cancel()
+            self.on_error(error)
+            return
+        # The slot is free: take the back half of the busiest segment.
+        segment = self.plan.split_largest()
+        if segment is not None:
+            self._spawn(segment)
+
+    async def _fetch(self, segment):
+        try:
+            attempt = 0
+            while segment.remaining and not self.stopped:
+                mirror = self.mirrors.pick() if self.mirrors is not None else None
+                try:
+                    await self._read(segment, mirror)
+                    if mirror is None or not mirror.dropped:
+                        return
+                    # Dropped as too slow: the rest comes from another mirror.
+                except (_Retryable, aiohttp.ClientConnectionError,
+                        aiohttp.ClientPayloadError, asyncio.TimeoutError) as e:
+                    if self._move_on(mirror):
+                        continue
+                    attempt += 1
+                    if attempt > RETRIES:
+                        raise IOError(f"{e.__class__.__name__}: {e}") from e
+                    await asyncio.sleep(BACKOFF * 2 ** (attempt - 1))
+                except (aiohttp.ClientResponseError, RangeIgnored):
+                    if self._move_on(mirror):
+                        continue
+                    raise
+                finally:
+                    if mirror is not None:
+                        self.mirrors.release(mirror)
+        finally:
+            self.plan.retire(segment)
+
+    def _move_on(self, mirror) -> bool:
+        """After a failed request: True if another mirror should take the segment."""
+        return mirror is not None and (mirror.dropped or self.mirrors.fail(mirror))
+
+    async def _read(self, segment, mirror=None):
+        headers = dict(self.headers)
+        headers["Range"] = f"bytes={segment.pos}-{segment.end - 1}"
+        url = mirror.url if mirror is not None else self.url
+        host = urlsplit(url).hostname
+        size = self.throttle.read_size(host) if self.throttle is not None else READ_SIZE
+        mark = time.monotonic()
+        async with self.engine.session.get(url, headers=headers) as r:
+            if r.status in RETRY_STATUS:
+                raise _Retryable(f"HTTP {r.status}")
+            r.raise_for_status()
+            if segment.pos > 0 and r.status != 206:
+                raise RangeIgnored("Server ignored the byte range request.")
+            async for chunk in r.content.iter_chunked(size):
+                elapsed = time.monotonic() - mark
+                if not self._resume.is_set():
+                    await self._resume.wait()
+                if self.stopped:
+                    return
+                offset, count = self.plan.claim(segment, len(chunk))
+                if count:
+                    data = chunk if count == len(chunk) else chunk[:count]
+                    diskio.pwrite(self._fd, data, offset)
+                    if self.on_data is not None:
+                        # Awaited, so at most one read per segment waits to be hashed.
+                        await asyncio.get_running_loop().run_in_executor(
+                            None, self.on_data, offset, data)
+                    self.plan.commit(offset, count)
+                    self.on_bytes(count)
+                    if mirror is not None and not self.mirrors.report(mirror, offset, count, elapsed):
+                        return
+                delay = self.throttle.reserve(len(chunk), host) if self.throttle is not None else 0
+                if count < len(chunk) or not segment.remaining:
+                    return              # at our end, wherever a split put it
+                if delay:
+                    await asyncio.sleep(delay)
+                mark = time.monotonic()
+
+
+class AsyncEngine:
+    """The loop thread and the aiohttp session every download shares."""
+
+    def __init__(self, limit_per_host=LIMIT_PER_HOST):
+        if aiohttp is None:
+            raise RuntimeError("The asyncio download engine needs aiohttp.")
+        self.limit_per_host = limit_per_host
+        self.session = None
+        self.loop = asyncio.new_event_loop()
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(ready,),
+                                        name="download-loop", daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    def _run(self, ready):
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(ready.set)
+        self.loop.run_forever()
+
+    async def _ensure_session(self):
+        if self.session is None:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=0, limit_per_host=self.limit_per_host,
+                                               ssl=False),
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=CONNECT_TIMEOUT,
+                                              sock_read=READ_TIMEOUT),
+                auto_decompress=False)
+
+    def call(self, fn):
+        """Run `fn` on the loop thread."""
+        self.loop.call_soon_threadsafe(fn)
+
+    def start(self, url, path, plan, segments, headers=None,
+              on_bytes=None, on_done=None, on_error=None, on_data=None, mirrors=None, throttle=None):
+        """
+        Begin fetching `segments` of `plan` into `path`. Returns the
+        AsyncDownload. on_data(offset, data) runs on the loop's executor
+        after each write, and the segment waits for it. With `mirrors`
+        (a metalink.MirrorSet) `url` is not used, and a `throttle`
+        (ratelimit.Throttle) paces the reads.
+        """
+        job = AsyncDownload(self, url, path, plan, headers,
+                            on_bytes or (lambda n: None), on_done or (lambda: None),
+                            on_error or (lambda e: None), on_data, mirrors, throttle)
+
+        async def begin():
+            await self._ensure_session()
+            await job.run(segments)
+
+        asyncio.run_coroutine_threadsafe(begin(), self.loop)
+        return job
+
+    def close(self):
+        async def shutdown():
+            if self.session is not None:
+                await self.session.close()
+            await self.loop.shutdown_default_executor()
+
+        asyncio.run_coroutine_threadsafe(shutdown(), self.loop).result(timeout=5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_engine() -> AsyncEngine:
+    """The process-wide engine, started on first use."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = AsyncEngine()
+        return _shared
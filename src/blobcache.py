@@ -0,0 +1,223 @@
+"""
+blobcache.py  —  a small on-disk LRU of byte strings, with a memory tier.
+
+Favicons and speed-dial thumbnails are the same problem: many small images
+keyed by site, read far more often than written, worth keeping across
+restarts but never worth more than a few megabytes, and stale after a
+while. This is the store they share.
+
+    • Each value is one file, named by a hash of its key, so keys can be
+      anything (a host, a URL) without touching the filesystem's rules.
+    • index.json maps key → size, when it was stored and when it was last
+      used. It is written atomically after every put and remove; use
+      times alone only mark it dirty and go out with the next write or an
+      explicit flush(), so a burst of reads costs no disk writes.
+    • Bounds: total bytes and entry count, enforced on put by dropping the
+      least recently used; and an age, after which an entry reads as
+      missing and is deleted.
+    • A memory tier holds the most recently used values up to its own
+      byte budget, so a page showing the same dozen icons again is served
+      without opening a file.
+
+A value that cannot be read back reads as missing and is dropped: this is
+a cache, and the caller can always fetch the original again.
+
+Thread-safe: workers put while the UI thread gets.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from storage import read_json, write_json
+
+
+class BlobCache:
+    """Values under `root`; see the module docstring for the bounds."""
+
+    INDEX = "index.json"
+
+    def __init__(self, root, max_bytes, max_entries=None, max_age=None,
+                 memory_bytes=0, suffix=".bin"):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.memory_bytes = memory_bytes
+        self.suffix = suffix
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        raw = read_json(self.root / self.INDEX, {})
+        self._index = {}
+        if isinstance(raw, dict):
+            for key, meta in raw.items():
+                try:
+                    self._index[key] = {"size": int(meta["size"]),
+                                        "stored": float(meta["stored"]),
+                                        "used": float(meta["used"])}
+                except (TypeError, KeyError, ValueError):
+                    continue
+        self._memory = OrderedDict()          # key -> bytes, most recent last
+        self._memory_size = 0
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._index)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._index
+
+    @property
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(m["size"] for m in self._index.values())
+
+    def path_for(self, key) -> Path:
+        name = hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+        return self.root / (name + self.suffix)
+
+    # reading
+
+    def get(self, key, now=None):
+        """The bytes stored under `key`, or None (absent, expired or unreadable)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            meta = self._index.get(key)
+            if meta is None:
+                self.misses += 1
+                return None
+            if self.max_age is not None and now - meta["stored"] > self.max_age:
+                self._drop(key)
+                self._save_index()
+                self.misses += 1
+                return None
+            meta["used"] = now
+            self._dirty = True
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return data
+            try:
+                data = self.path_for(key).read_bytes()
+            except OSError:
+                data = None
+            if data is None or len(data) != meta["size"]:
+                self._drop(key)                    # missing or truncated on disk
+                self._save_index()
+                self.misses += 1
+                return None
+            self._remember(key, data)
+            self.hits += 1
+            return data
+
+    def stored_at(self, key):
+        """When `key` was last put, or None."""
+        with self._lock:
+            meta = self._index.get(key)
+            return None if meta is None else meta["stored"]
+
+    # writing
+
+    def put(self, key, data, now=None) -> bool:
+        """Store `data` under `key`, evicting what the bounds require."""
+        now = time.time() if now is None else now
+        data = bytes(data)
+        if len(data) > self.max_bytes:
+            return False
+        with self._lock:
+            if not self._write_file(self.path_for(key), data):
+                return False
+            self._forget(key)
+            self._index[key] = {"size": len(data), "stored": now, "used": now}
+            self._remember(key, data)
+            self._evict()
+            return self._save_index()
+
+    def remove(self, key) -> bool:
+        with self._lock:
+            if key not in self._index:
+                return False
+            self._drop(key)
+            self._save_index()
+            return True
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._index):
+                self._drop(key)
+            self._save_index()
+
+    def flush(self) -> bool:
+        """Write out use times gathered by get() since the last write."""
+        with self._lock:
+            return self._save_index() if self._dirty else True
+
+    # internals (lock held)
+
+    def _evict(self):
+        total = sum(m["size"] for m in self._index.values())
+        over_count = (len(self._index) - self.max_entries) if self.max_entries else 0
+        if total <= self.max_bytes and over_count <= 0:
+            return
+        for key in sorted(self._index, key=lambda k: self._index[k]["used"]):
+            if total <= self.max_bytes and over_count <= 0:
+                break
+            total -= self._index[key]["size"]
+            over_count -= 1
+            self._drop(key)
+            self.evicted += 1
+
+    def _drop(self, key):
+        self._index.pop(key, None)
+        self._forget(key)
+        try:
+            self.path_for(key).unlink()
+        except OSError:
+            pass
+
+    def _remember(self, key, data):
+        if len(data) > self.memory_bytes:
+            return
+        self._forget(key)
+        self._memory[key] = data
+        self._memory_size += len(data)
+        while self._memory_size > self.memory_bytes:
+            _, old = self._memory.popitem(last=False)
+            self._memory_size -= len(old)
+
+    def _forget(self, key):
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_size -= len(old)
+
+    def _write_file(self, path, data) -> bool:
+        tmp_name = None
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=str(self.root), suffix=".tmp")
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(data)
+            os.replace(tmp_name, path)
+            tmp_name = None
+            return True
+        except OSError:
+            return False
+        finally:
+            if tmp_name and os.path.exists(tmp_name):
+                try:
+                    os.unlink(tmp_name)
+                except OSError:
+                    pass
+
+    def _save_index(self) -> bool:
+        self._dirty = False
+        return write_json(self.root / self.INDEX, self._index, keep_backup=False)
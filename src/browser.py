@@ -14,14 +14,16 @@ New features vs original:
 
 import sys
 import json
+import logging
 import os
+import time
 import urllib.request
 from urllib.parse import urlparse, urlunparse
 from importlib import import_module
 from pathlib import Path
 
 from PyQt6.QtWidgets import (
-    QMainWindow, QToolBar, QLineEdit, QPushButton,
+    QMainWindow, QToolBar, QLineEdit, QPushButton, QCompleter,
     QTabWidget, QMenu, QStatusBar, QListWidget,
     QDockWidget, QFileDialog, QInputDialog, QLabel,
     QTableWidget, QTableWidgetItem, QMessageBox, QDialog, QVBoxLayout,
@@ -33,13 +35,24 @@ from PyQt6.QtWebEngineCore import (
     QWebEngineScript, QWebEngineSettings
 )
 from PyQt6.QtWebChannel import QWebChannel
-from PyQt6.QtCore import QUrl, Qt, QDateTime, QObject, pyqtSlot, pyqtSignal, QPoint
-from PyQt6.QtGui import QAction, QIcon, QKeySequence, QPalette, QColor, QFont
+from PyQt6.QtCore import (
+    QUrl, Qt, QDateTime, QObject, pyqtSlot, pyqtSignal, QPoint, QTimer,
+    QBuffer, QByteArray, QIODevice, QRunnable, QThreadPool,
+)
+from PyQt6.QtNetwork import QNetworkProxy
+from PyQt6.QtGui import (
+    QAction, QIcon, QImage, QImageWriter, QKeySequence, QPalette, QColor, QFont, QPixmap,
+    QStandardItem, QStandardItemModel,
+)
 
 from interceptors import (
     Plugin, ChainedInterceptor, AdBlockInterceptor, HttpsOnlyInterceptor,
 )
-from dialogs import HistoryDialog, DevToolsDialog, PasswordManagerDialog, BookmarksDialog, NoteSidebar
+from dialogs import (
+    HistoryDialog, DevToolsDialog, PasswordManagerDialog, BookmarksDialog, NoteSidebar,
+    TaskManagerPanel, BackgroundSavingsDialog, BuiltinScriptsDialog, CommandPalette,
+    ReadingListDialog, PageSearchDialog, HttpCacheDialog,
+)
 from vault import Vault, VAULT_FILE, UnlockResult
 from splash import VaultPasswordDialog
 from storage import (
@@ -52,90 +65,53 @@ from tls import (
 from cosmetic import build_injection_js, build_removal_js
 from privacy import (
     should_record_history, should_persist_tab, tab_label, privacy_summary,
+    is_internal_url,
 )
 from plugin_guard import (
     PluginGuard, PluginStatus, hash_file, resolve_plugin_dir,
 )
+from session import (
+    SessionEntry, parse_session, serialise_session, preload_order,
+    clamp_preload_budget, DEFAULT_PRELOAD_BUDGET,
+)
+from lifecycle import (
+    ACTIVE, FROZEN, DISCARDED, MemoryThresholds, Pressure, TabActivity,
+    TabCandidate, ThrottlePolicy, CpuSavingsLedger, memory_pressure,
+    plan_transitions, plan_throttle,
+)
+import procstats
+from viewpool import (
+    ViewPool, PaintTimings, DEFAULT, PRIVATE, DEFAULT_POOL_SIZE, clamp_pool_size,
+    timing_report,
+)
+from userscripts import (
+    UserScript, ScriptRegistry, ScriptTimings, parse_report, REPORT_JS,
+    DOCUMENT_CREATION, DOCUMENT_READY, DEFERRED, MAIN_WORLD, APPLICATION_WORLD,
+)
+from omnibox import OmniboxIndex, history_records
+from preconnect import (
+    Preconnector, preconnect_report, proxy_configured, OMNIBOX, SPEED_DIAL,
+)
+from palette import (
+    PaletteIndex, PaletteItem, TAB, ACTION, BOOKMARK, HISTORY, bookmark_items,
+    history_items,
+)
+from reader import ReaderTabs, ReadingList, extract_article, render_reader
+from fulltext import FullTextIndex
+from favicons import FaviconCache, icon_host
+from schemes import ICON_SCHEME, PAGE_SCHEME, FaviconSchemeHandler, InternalPageHandler
+from internal_pages import InternalPages, NEWTAB_HOST, NEWTAB_URL, is_newtab_url
+from thumbnails import (
+    CAPTURE_DELAY_MS, HOST as THUMB_HOST, THUMB_SIZE, WEBP_QUALITY, ThumbnailCache,
+    crop_for, pick_format, tile_urls,
+)
+from httpcache import (
+    DISK, NONE, PREWARM_IDLE_MS, PREWARM_TIMEOUT_MS, CachePolicy, Prewarmer,
+)
 from main_gui import DownloadPanel
 
+logger = logging.getLogger(__name__)
 
-# ─────────────────────────────────────────────────────────────────────────────
-# Reading mode JS  — strips a page down to its article text
-# ─────────────────────────────────────────────────────────────────────────────
-
-READER_JS = r"""
-(function() {
-    // Find the largest block of text content
-    const candidates = Array.from(document.querySelectorAll('article, main, [role="main"], .post-content, .article-body, .entry-content, #content, #main'));
-    let best = null;
-    let bestLen = 0;
-    candidates.forEach(el => {
-        const len = el.innerText.length;
-        if (len > bestLen) { bestLen = len; best = el; }
-    });
-    if (!best && document.body.innerText.length > 100) best = document.body;
-    if (!best) return;
-
-    const title = document.title || '';
-    const html = best.innerHTML;
-
-    document.open();
-    document.write(`<!DOCTYPE html><html><head>
-    <meta charset="utf-8">
-    <title>${title}</title>
-    <style>
-        body {
-            font-family: Georgia, 'Times New Roman', serif;
-            background: #0b0f14;
-            color: #cdd6df;
-            max-width: 720px;
-            margin: 64px auto;
-            padding: 0 24px 80px;
-            font-size: 19px;
-            line-height: 1.85;
-        }
-        h1,h2,h3,h4 { font-family: 'JetBrains Mono','Cascadia Mono',Consolas,monospace;
-                      color: #e6edf3; letter-spacing: -0.5px; }
-        h1 { font-size: 1.9em; margin-bottom: 0.3em; border-bottom: 1px solid #1c2733; padding-bottom: 0.3em; }
-        a { color: #2fd6c3; text-decoration: none; }
-        a:hover { text-decoration: underline; text-decoration-color: #ffb454; }
-        img { max-width: 100%; border: 1px solid #1c2733; }
-        pre, code { background: #0e141b; border: 1px solid #1c2733; padding: 2px 6px;
-                    font-family: 'JetBrains Mono','Cascadia Mono',Consolas,monospace; font-size: 0.85em;
-                    color: #4be08a; }
-        blockquote { border-left: 2px solid #2fd6c3; margin-left: 0; padding-left: 20px; color: #7d8b99; }
-        ::selection { background: #2fd6c3; color: #05201c; }
-        #reader-bar { position: fixed; top: 0; left: 0; right: 0; padding: 10px 24px;
-                      background: rgba(8,11,15,0.94); backdrop-filter: blur(8px);
-                      display: flex; align-items: center; gap: 14px; z-index: 9999;
-                      border-bottom: 1px solid #1c2733;
-                      font-family: 'JetBrains Mono','Cascadia Mono',Consolas,monospace; }
-        #reader-bar span { font-size: 12px; color: #7d8b99; flex: 1; letter-spacing: 1px;
-                           white-space: nowrap; overflow: hidden; text-overflow: ellipsis; }
-        #reader-bar .rtag { color: #ffb454; }
-        #exit-reader { font-family: inherit; font-size: 12px; padding: 5px 14px;
-                       background: #2fd6c3; color: #05201c; border: none; cursor: pointer; letter-spacing: 1px; }
-        #exit-reader:hover { background: #4be08a; }
-        #font-dec, #font-inc { font-family: inherit; font-size: 13px; padding: 4px 11px;
-                               background: #0e141b; border: 1px solid #253341;
-                               color: #7d8b99; cursor: pointer; }
-        #font-dec:hover, #font-inc:hover { border-color: #2fd6c3; color: #e6edf3; }
-    </style>
-    </head><body>
-    <div id="reader-bar">
-        <span><span class="rtag">// READER</span> &nbsp; ${title}</span>
-        <button id="font-dec" onclick="document.body.style.fontSize=Math.max(14,parseInt(getComputedStyle(document.body).fontSize)-2)+'px'">A−</button>
-        <button id="font-inc" onclick="document.body.style.fontSize=Math.min(28,parseInt(getComputedStyle(document.body).fontSize)+2)+'px'">A+</button>
-        <button id="exit-reader" onclick="history.back()">EXIT</button>
-    </div>
-    <div style="margin-top:60px">
-    <h1>${title}</h1>
-    ${html}
-    </div>
-    </body></html>`);
-    document.close();
-})();
-"""
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Dark mode stylesheet  (applied to the Qt chrome, not the web content)
@@ -326,10 +302,13 @@ LIGHT_QSS = ""   # Use Qt default light palette
 # ─────────────────────────────────────────────────────────────────────────────
 
 # ─────────────────────────────────────────────────────────────────────────────
-# Page enhancements injected on every load.
+# Page enhancements, installed once per profile as a built-in script
+# (see userscripts.py) and injected by Chromium at document ready.
 #   • YouTube Shorts wheel navigation — the embedded engine doesn't wire the
 #     wheel to Shorts nav, so translate wheel → next/prev (button click, with a
 #     synthetic arrow-key fallback).
+# A document that is hidden when the script runs (a background tab) waits for
+# its first visibilitychange to visible before doing anything.
 # (Picture-in-Picture is handled Qt-side via a floating window — native
 #  requestPictureInPicture() resolves but doesn't render in this engine build.)
 # ─────────────────────────────────────────────────────────────────────────────
@@ -339,60 +318,74 @@ PAGE_ENHANCE_JS = r"""
     if (window.__browserEnhanced) return;
     window.__browserEnhanced = true;
 
-    function reelItems() {
-        return Array.prototype.slice.call(
-            document.querySelectorAll('ytd-reel-video-renderer')
-        );
-    }
-
-    // Which reel is currently centered in the viewport
-    function activeIndex(items) {
-        var mid = window.innerHeight / 2;
-        for (var i = 0; i < items.length; i++) {
-            var r = items[i].getBoundingClientRect();
-            if (r.top <= mid && r.bottom >= mid) return i;
+    function enhance() {
+        function reelItems() {
+            return Array.prototype.slice.call(
+                document.querySelectorAll('ytd-reel-video-renderer')
+            );
         }
-        return 0;
-    }
 
-    var cooling = false;
-    window.addEventListener('wheel', function (e) {
-        if (location.pathname.indexOf('/shorts') !== 0) return;
-        e.preventDefault();
-        e.stopPropagation();
-        if (cooling) return;
-        cooling = true;
-        setTimeout(function () { cooling = false; }, 450);
-
-        var down = e.deltaY > 0;
-        var items = reelItems();
-
-        // Primary: scroll the adjacent reel into view (a real, trusted scroll)
-        if (items.length) {
-            var idx = activeIndex(items);
-            var target = items[idx + (down ? 1 : -1)];
-            if (target) {
-                target.scrollIntoView({ behavior: 'smooth', block: 'start' });
-                return;
+        // Which reel is currently centered in the viewport
+        function activeIndex(items) {
+            var mid = window.innerHeight / 2;
+            for (var i = 0; i < items.length; i++) {
+                var r = items[i].getBoundingClientRect();
+                if (r.top <= mid && r.bottom >= mid) return i;
             }
+            return 0;
         }
 
-        // Fallback 1: click YouTube's nav button if present
-        var btn = document.querySelector(
-            down ? '#navigation-button-down button, [aria-label="Next video"]'
-                 : '#navigation-button-up button, [aria-label="Previous video"]'
-        );
-        if (btn) { btn.click(); return; }
-
-        // Fallback 2: synthetic arrow key (last resort)
-        var key = down ? 'ArrowDown' : 'ArrowUp';
-        var kc = down ? 40 : 38;
-        ['keydown', 'keyup'].forEach(function (t) {
-            document.dispatchEvent(new KeyboardEvent(t, {
-                key: key, code: key, keyCode: kc, which: kc, bubbles: true, cancelable: true
-            }));
-        });
-    }, { passive: false, capture: true });
+        var cooling = false;
+        window.addEventListener('wheel', function (e) {
+            if (location.pathname.indexOf('/shorts') !== 0) return;
+            e.preventDefault();
+            e.stopPropagation();
+            if (cooling) return;
+            cooling = true;
+            setTimeout(function () { cooling = false; }, 450);
+
+            var down = e.deltaY > 0;
+            var items = reelItems();
+
+            // Primary: scroll the adjacent reel into view (a real, trusted scroll)
+            if (items.length) {
+                var idx = activeIndex(items);
+                var target = items[idx + (down ? 1 : -1)];
+                if (target) {
+                    target.scrollIntoView({ behavior: 'smooth', block: 'start' });
+                    return;
+                }
+            }
+
+            // Fallback 1: click YouTube's nav button if present
+            var btn = document.querySelector(
+                down ? '#navigation-button-down button, [aria-label="Next video"]'
+                     : '#navigation-button-up button, [aria-label="Previous video"]'
+            );
+            if (btn) { btn.click(); return; }
+
+            // Fallback 2: synthetic arrow key (last resort)
+            var key = down ? 'ArrowDown' : 'ArrowUp';
+            var kc = down ? 40 : 38;
+            ['keydown', 'keyup'].forEach(function (t) {
+                document.dispatchEvent(new KeyboardEvent(t, {
+                    key: key, code: key, keyCode: kc, which: kc, bubbles: true, cancelable: true
+                }));
+            });
+        }, { passive: false, capture: true });
+    }
+
+    // A tab loaded in the background is enhanced when it is first shown,
+    // as its host cosmetic filters are (_deferred_enhance).
+    if (document.visibilityState !== 'hidden') {
+        enhance();
+        return;
+    }
+    document.addEventListener('visibilitychange', function onShow() {
+        if (document.visibilityState === 'hidden') return;
+        document.removeEventListener('visibilitychange', onShow);
+        enhance();
+    });
 })();
 """
 
@@ -447,6 +440,31 @@ PIP_DETECT_JS = r"""
 """
 
 
+# Asked of a tab before the memory saver freezes or discards it. Discarding
+# reloads the page, so anything typed and not yet sent would be lost.
+FORM_INPUT_JS = r"""
+(function () {
+    var fields = document.querySelectorAll('input, textarea, select');
+    for (var i = 0; i < fields.length; i++) {
+        var f = fields[i];
+        var t = (f.type || '').toLowerCase();
+        if (t === 'hidden' || t === 'submit' || t === 'button') continue;
+        if (t === 'checkbox' || t === 'radio') {
+            if (f.checked !== f.defaultChecked) return true;
+        } else if (f.tagName === 'SELECT') {
+            for (var j = 0; j < f.options.length; j++) {
+                if (f.options[j].selected !== f.options[j].defaultSelected) return true;
+            }
+        } else if (f.value !== f.defaultValue) {
+            return true;
+        }
+    }
+    var a = document.activeElement;
+    return !!(a && a.isContentEditable && a.textContent.trim());
+})();
+"""
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # JS Bridge
 # ─────────────────────────────────────────────────────────────────────────────
@@ -459,6 +477,166 @@ class JsBridge(QObject):
         self.credentials_captured.emit(username, password)
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+# Omnibox workers  — index loads and queries stay off the UI thread
+# ─────────────────────────────────────────────────────────────────────────────
+
+class _OmniboxSignals(QObject):
+    results = pyqtSignal(int, object)     # generation, [Suggestion]
+
+
+class _OmniboxQuery(QRunnable):
+    def __init__(self, index, text, generation, signals):
+        super().__init__()
+        self.index = index
+        self.text = text
+        self.generation = generation
+        self.signals = signals
+
+    def run(self):
+        try:
+            results = self.index.query(self.text)
+        except Exception:                 # a bad query must not kill the pool thread
+            results = []
+        self.signals.results.emit(self.generation, results)
+
+
+class _OmniboxLoad(QRunnable):
+    def __init__(self, index, records):
+        super().__init__()
+        self.index = index
+        self.records = records
+
+    def run(self):
+        try:
+            self.index.bulk_load(self.records)
+        except Exception:                 # suggestions then start from this session's visits
+            logger.exception("Loading history into the address-bar index failed")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Reader worker  — parse, score and save an article off the UI thread
+# ─────────────────────────────────────────────────────────────────────────────
+
+class _ReaderSignals(QObject):
+    extracted = pyqtSignal(object, str, object)     # view, url, Article or None
+
+
+class _ReaderExtract(QRunnable):
+    def __init__(self, html, url, view, reading_list, signals):
+        super().__init__()
+        self.html = html
+        self.url = url
+        self.view = view
+        self.reading_list = reading_list    # None for private tabs
+        self.signals = signals
+
+    def run(self):
+        try:
+            article = extract_article(self.html, self.url)
+        except Exception:                   # a hostile page must not kill the pool thread
+            article = None
+        if article is not None and self.reading_list is not None:
+            self.reading_list.put(article)
+        self.signals.extracted.emit(self.view, self.url, article)
+
+
+class _FullTextAdd(QRunnable):
+    """Tokenise and index one page's text; the UI thread only fetched it."""
+
+    def __init__(self, index, url, title, text):
+        super().__init__()
+        self.index = index
+        self.url = url
+        self.title = title
+        self.text = text
+
+    def run(self):
+        try:
+            self.index.add(self.url, self.title, self.text)
+        except Exception:                   # the page goes unindexed; the pool thread lives
+            logger.exception("Indexing the text of %s failed", self.url)
+
+
+class _FullTextClear(QRunnable):
+    """Empty the page text index and VACUUM it, waiting out any page being added."""
+
+    def __init__(self, index):
+        super().__init__()
+        self.index = index
+
+    def run(self):
+        try:
+            self.index.clear()
+        except Exception:
+            logger.exception("Clearing the page text index failed")
+
+
+class _FaviconStore(QRunnable):
+    """PNG-encode a captured favicon and cache it, off the UI thread."""
+
+    def __init__(self, cache, url, image):
+        super().__init__()
+        self.cache = cache
+        self.url = url
+        self.image = image              # QImage: safe to use from a worker
+
+    def run(self):
+        data = QByteArray()
+        buf = QBuffer(data)
+        buf.open(QIODevice.OpenModeFlag.WriteOnly)
+        self.image.save(buf, "PNG")
+        buf.close()
+        self.cache.store(self.url, bytes(data))
+
+
+class _ThumbnailEncode(QRunnable):
+    """Crop, downscale and encode a tab grab for the speed dial, off the UI thread."""
+
+    def __init__(self, cache, host, image, fmt):
+        super().__init__()
+        self.cache = cache
+        self.host = host
+        self.image = image              # QImage: safe to use from a worker
+        self.fmt = fmt
+
+    def run(self):
+        data = None
+        try:
+            x, y, w, h = crop_for(self.image.width(), self.image.height())
+            if w and h:
+                scaled = self.image.copy(x, y, w, h).scaled(
+                    *THUMB_SIZE, Qt.AspectRatioMode.IgnoreAspectRatio,
+                    Qt.TransformationMode.SmoothTransformation)
+                out = QByteArray()
+                buf = QBuffer(out)
+                buf.open(QIODevice.OpenModeFlag.WriteOnly)
+                quality = WEBP_QUALITY if self.fmt == "webp" else -1
+                if scaled.save(buf, self.fmt.upper(), quality):
+                    data = bytes(out)
+                buf.close()
+        except Exception:
+            logger.exception("Encoding the speed-dial thumbnail for %s failed", self.host)
+        # Always, so a failed encode does not leave the host claimed;
+        # finish() releases the claim even when storing fails.
+        try:
+            self.cache.finish(self.host, data)
+        except Exception:
+            logger.exception("Storing the speed-dial thumbnail for %s failed", self.host)
+
+
+class _PreconnectWarm(QRunnable):
+    """One speculative DNS lookup; it blocks, so it is pooled."""
+
+    def __init__(self, preconnector, job):
+        super().__init__()
+        self.preconnector = preconnector
+        self.job = job
+
+    def run(self):
+        self.preconnector.run(self.job)
+
+
 QWEBCHANNEL_JS_CODE = """
 "use strict";
 class QWebChannel {
@@ -513,6 +691,54 @@ TABS_FILE     = data_path("tabs.json")
 SETTINGS_FILE = data_path("settings.json")
 CONSOLE_HIST  = data_path("console_history.json")
 BOOKMARKS_FILE = data_path("bookmarks_v2.json")
+READING_LIST_DIR = data_path("reading_list")
+FULLTEXT_FILE = data_path("fulltext.db")
+FAVICON_DIR = data_path("favicons")
+THUMBNAIL_DIR = data_path("thumbnails")
+HTTP_CACHE_DIR = data_path("http_cache")
+
+# How often the memory saver looks at system and browser memory.
+MEMORY_CHECK_MS = 15_000
+
+# Threads for the window's own background work (suggestions, page text,
+# icons).  Downloads fill the global pool with long-running segments, so
+# anything the user is waiting on gets a small pool of its own.
+UI_POOL_THREADS = 2
+
+_INJECTION_POINTS = {
+    DOCUMENT_CREATION: QWebEngineScript.InjectionPoint.DocumentCreation,
+    DOCUMENT_READY: QWebEngineScript.InjectionPoint.DocumentReady,
+    DEFERRED: QWebEngineScript.InjectionPoint.Deferred,
+}
+
+_SCRIPT_WORLDS = {
+    MAIN_WORLD: QWebEngineScript.ScriptWorldId.MainWorld,
+    APPLICATION_WORLD: QWebEngineScript.ScriptWorldId.ApplicationWorld,
+}
+
+# Pool refills wait this long after the last tab opened, then build one
+# view per tick, so a burst of opens is never slowed by its own refill.
+VIEW_POOL_IDLE_MS = 1000
+
+# The cursor has to rest on a tile or suggestion this long before it is
+# worth a warm-up; sweeping across the speed dial warms nothing.
+PRECONNECT_DWELL_MS = 120
+
+# Wall-clock time of the page's first paint, or null if it has not painted
+# (a tab loaded in the background never does until shown).
+FIRST_PAINT_JS = """
+(function () {
+  var e = performance.getEntriesByName('first-contentful-paint')[0]
+       || performance.getEntriesByName('first-paint')[0];
+  return e ? performance.timeOrigin + e.startTime : null;
+})();
+"""
+
+_LIFECYCLE_STATES = {
+    ACTIVE: QWebEnginePage.LifecycleState.Active,
+    FROZEN: QWebEnginePage.LifecycleState.Frozen,
+    DISCARDED: QWebEnginePage.LifecycleState.Discarded,
+}
 
 
 # Injected into the PiP mini-player when it shows a YouTube watch page — hides
@@ -646,6 +872,55 @@ class PipWindow(QWidget):
         super().closeEvent(event)
 
 
+def icon_to_b64(icon) -> str:
+    """A tab favicon as base64 PNG, small enough to live in tabs.json."""
+    if icon is None or icon.isNull():
+        return ""
+    data = QByteArray()
+    buf = QBuffer(data)
+    buf.open(QIODevice.OpenModeFlag.WriteOnly)
+    icon.pixmap(16, 16).save(buf, "PNG")
+    buf.close()
+    return bytes(data.toBase64()).decode("ascii")
+
+
+def icon_from_b64(text: str) -> QIcon:
+    if not text:
+        return QIcon()
+    pix = QPixmap()
+    if not pix.loadFromData(QByteArray.fromBase64(text.encode("ascii")), "PNG"):
+        return QIcon()
+    return QIcon(pix)
+
+
+class LazyTab(QWidget):
+    """Stand-in for a restored tab that has not been selected yet.
+
+    Holds the saved title, URL and favicon and nothing else — no page, no
+    renderer, no network. WebBrowser swaps it for a real view the first
+    time the tab is activated. Answers url() and title() so session save
+    and the URL bar treat it like any other tab.
+    """
+
+    def __init__(self, entry: SessionEntry, parent=None):
+        super().__init__(parent)
+        self.entry = entry
+        layout = QVBoxLayout(self)
+        hint = QLabel(entry.label)
+        hint.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        hint.setStyleSheet("color:#4d5b68;")
+        layout.addWidget(hint)
+
+    def url(self) -> QUrl:
+        return QUrl(self.entry.url)
+
+    def title(self) -> str:
+        return self.entry.title
+
+    def icon(self) -> QIcon:
+        return icon_from_b64(self.entry.icon)
+
+
 class WebBrowser(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -665,6 +940,93 @@ class WebBrowser(QMainWindow):
         self.autofill_enabled = True
         self.dark_mode   = True    # default dark
         self.reading_mode_active = False
+        self.restore_preload_budget = DEFAULT_PRELOAD_BUDGET
+        self._materializing = False   # swapping a LazyTab for its real view
+        self.ui_pool = QThreadPool(self)
+        self.ui_pool.setMaxThreadCount(UI_POOL_THREADS)
+
+        # ── Memory saver ───────────────────────────────────────────────────
+        self.memory_thresholds = MemoryThresholds()
+        self.tab_activity = TabActivity()
+        self._form_input_views = set()   # last probe found unsent input
+        self._last_current = None
+        self.throttle_policy = ThrottlePolicy()
+        self.cpu_savings = CpuSavingsLedger()
+        self._pinned_views = set()       # never frozen in the background
+        self._deferred_enhance = set()   # loaded while hidden; enhance on show
+        self._memory_timer = QTimer(self)
+        self._memory_timer.setInterval(MEMORY_CHECK_MS)
+        self._memory_timer.timeout.connect(self._check_tab_lifecycle)
+
+        # ── Built-in page scripts ──────────────────────────────────────────
+        self.user_scripts = ScriptRegistry()
+        self.user_scripts.register(UserScript(
+            "webchannel", QWEBCHANNEL_JS_CODE, DOCUMENT_CREATION, MAIN_WORLD,
+            description="QWebChannel client for the credentials bridge",
+            toggleable=False))
+        self.user_scripts.register(UserScript(
+            "page-enhance", PAGE_ENHANCE_JS, DOCUMENT_READY, APPLICATION_WORLD,
+            description="YouTube Shorts wheel navigation"))
+        self.script_timings = ScriptTimings()
+
+        # ── New-tab view pool ──────────────────────────────────────────────
+        self.view_pool = ViewPool(
+            lambda key: self._create_view(private=key == PRIVATE),
+            DEFAULT_POOL_SIZE, dispose=lambda view: view.deleteLater())
+        self.paint_timings = PaintTimings()
+        self._paint_pending = {}          # view -> (requested epoch ms, pooled)
+        self._pool_timer = QTimer(self)
+        self._pool_timer.setSingleShot(True)
+        self._pool_timer.setInterval(VIEW_POOL_IDLE_MS)
+        self._pool_timer.timeout.connect(self._top_up_view_pool)
+
+        # ── Predictive preconnect ──────────────────────────────────────────
+        self.preconnect = Preconnector()
+        self._preconnect_next = None      # (url, source) awaiting dwell
+        self._preconnect_timer = QTimer(self)
+        self._preconnect_timer.setSingleShot(True)
+        self._preconnect_timer.setInterval(PRECONNECT_DWELL_MS)
+        self._preconnect_timer.timeout.connect(self._start_preconnect)
+
+        # ── Command palette ────────────────────────────────────────────────
+        self.palette = PaletteIndex()
+
+        # ── Reading mode ───────────────────────────────────────────────────
+        self.reading_list = ReadingList(READING_LIST_DIR)
+        self._reader_tabs = ReaderTabs()
+        self._reader_signals = _ReaderSignals()
+        self._reader_signals.extracted.connect(self._on_article_extracted)
+
+        # ── Page text index (opt-in) ───────────────────────────────────────
+        self.fulltext = FullTextIndex(FULLTEXT_FILE)
+        self.fulltext_enabled = False
+
+        # ── Favicons (blackline-icon://host) ───────────────────────────────
+        self.favicons = FaviconCache(FAVICON_DIR)
+        self.favicon_handler = FaviconSchemeHandler(self.favicons, self)
+        self._favicon_icons = {}          # host -> QIcon, for the dialogs
+
+        # ── Internal pages (blackline://) ──────────────────────────────────
+        # Read once; every new tab after this is served from memory.
+        self.internal_pages = InternalPages()
+        self._newtab_ready = self.internal_pages.load_document(NEWTAB_HOST, NEW_TAB_HTML)
+        self.internal_handler = InternalPageHandler(self.internal_pages, self)
+        self._speed_dial_migrated = False
+
+        # ── Speed-dial thumbnails (blackline://thumbs/host) ────────────────
+        self.thumbnails = ThumbnailCache(THUMBNAIL_DIR)
+        self.internal_pages.mount(THUMB_HOST, self.thumbnails.page)
+        self._thumbnail_format = pick_format(QImageWriter.supportedImageFormats())
+        self._speed_dial_urls = []        # tile URLs in dial order, from the page
+
+        # ── HTTP cache (type, size, idle prewarm of speed-dial sites) ──────
+        self.cache_policy = CachePolicy()
+        self.prewarmer = Prewarmer()
+        self._prewarm_page = None
+        self._prewarm_timer = QTimer(self)
+        self._prewarm_timer.setSingleShot(True)
+        self._prewarm_timer.setInterval(PREWARM_IDLE_MS)
+        self._prewarm_timer.timeout.connect(self._prewarm_next)
 
         # ── Profile ────────────────────────────────────────────────────────
         self.USER_AGENTS = [
@@ -690,6 +1052,7 @@ class WebBrowser(QMainWindow):
         self.cert_exceptions = CertExceptionStore()
         self.dev_tools   = None
         self.download_panel = None
+        self.task_manager_dock = None
 
         # ── Toolbar ────────────────────────────────────────────────────────
         self._build_toolbar()
@@ -702,6 +1065,8 @@ class WebBrowser(QMainWindow):
         self.tabs.tabCloseRequested.connect(self.close_tab_by_index)
         self.tabs.tabBarDoubleClicked.connect(self.tab_open_doubleclick)
         self.tabs.currentChanged.connect(self.current_tab_changed)
+        self.tabs.tabBar().setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        self.tabs.tabBar().customContextMenuRequested.connect(self._tab_bar_menu)
         self.setCentralWidget(self.tabs)
 
         # ── Menus ──────────────────────────────────────────────────────────
@@ -747,6 +1112,8 @@ class WebBrowser(QMainWindow):
 
         self.load_settings()
         self.load_history()
+        self._load_omnibox()
+        self._migrate_speed_dial()
 
         # ── Open initial tab ───────────────────────────────────────────────
         self.add_new_tab(self._newtab_url(), "New Tab")
@@ -763,8 +1130,15 @@ class WebBrowser(QMainWindow):
         self._interceptor_chain = ChainedInterceptor(interceptors)
         self.profile.setUrlRequestInterceptor(self._interceptor_chain)
 
-        # ── Cosmetic filtering ─────────────────────────────────────────────
-        self._install_cosmetic_stylesheet()
+        # ── Built-in page scripts & cosmetic filtering ─────────────────────
+        self._register_cosmetic_stylesheet()
+        self._install_user_scripts(self.profile)
+
+        # ── Memory saver / background throttling ───────────────────────────
+        # Memory readings need psutil; without it only the grace-period
+        # freeze runs and the savings view has no CPU figures.
+        self._memory_timer.start()
+        self._pool_timer.start()
 
     # ─────────────────────────────────────────────────────────────────────
     # Theme
@@ -867,6 +1241,7 @@ class WebBrowser(QMainWindow):
         self.url_bar.setPlaceholderText("Search or enter URL…")
         self.url_bar.returnPressed.connect(self.navigate_to_url)
         self.url_bar.setMinimumWidth(300)
+        self._build_omnibox()
         self.toolbar.addWidget(self.url_bar)
 
         self.ssl_label = QLabel("🔒")
@@ -917,11 +1292,19 @@ class WebBrowser(QMainWindow):
         self._add_action(view_menu, "Developer Tools", self.toggle_dev_tools, "Ctrl+Shift+I")
         self._add_action(view_menu, "Show Downloads", self.show_download_manager, "Ctrl+J")
         self._add_action(view_menu, "Show Notes", self.toggle_notes, "Ctrl+Shift+N")
+        self._add_action(view_menu, "Task Manager", self.toggle_task_manager, "Shift+Esc")
+        self._add_action(view_menu, "Background Tab Savings", self.show_background_savings)
+        self._add_action(view_menu, "New Tab Timing", self.show_new_tab_timing)
+        self._add_action(view_menu, "Preconnect Statistics", self.show_preconnect_stats)
         view_menu.addSeparator()
         self._add_action(view_menu, "HTTPS-Only Mode", self.toggle_https_only)
+        self._add_action(view_menu, "Predictive Preconnect", self.toggle_preconnect)
+        self._add_action(view_menu, "Index Visited Page Text", self.toggle_fulltext)
         view_menu.addSeparator()
         self._add_action(view_menu, "Picture-in-Picture", self.toggle_pip, "Ctrl+Shift+P")
         self._add_action(view_menu, "Reading Mode", self.toggle_reading_mode, "Ctrl+Shift+R")
+        self._add_action(view_menu, "Reading List", self.show_reading_list)
+        self._add_action(view_menu, "Search Visited Pages", self.show_page_search, "Ctrl+Shift+F")
         self._add_action(view_menu, "Toggle Dark Mode", self.toggle_dark_mode, "Ctrl+Shift+D")
         view_menu.addSeparator()
         self._add_action(view_menu, "Zoom In", self.zoom_in, "Ctrl+=")
@@ -949,6 +1332,8 @@ class WebBrowser(QMainWindow):
 
         tools_menu.addSeparator()
         self._add_action(tools_menu, "Password Manager", self.show_password_manager)
+        self._add_action(tools_menu, "Built-in Scripts", self.show_builtin_scripts)
+        self._add_action(tools_menu, "HTTP Cache", self.show_http_cache)
 
     def _add_action(self, menu, label, slot, shortcut=None):
         action = QAction(label, self)
@@ -963,31 +1348,34 @@ class WebBrowser(QMainWindow):
     # ─────────────────────────────────────────────────────────────────────
 
     def _build_shortcuts(self):
+        # Labelled ones are offered by the command palette; the numbered
+        # tab switches and Escape would only be noise there.
         shortcuts = [
-            ("Alt+Left",    self.navigate_back),
-            ("Alt+Right",   self.navigate_forward),
-            ("F5",          self.reload_page),
-            ("Ctrl+R",      self.reload_page),
-            ("Ctrl+L",      self._focus_url_bar),
-            ("Alt+Home",    self.go_home),
-            ("Ctrl+Tab",    self.next_tab),
-            ("Ctrl+Shift+Tab", self.prev_tab),
-            ("Ctrl+1",      lambda: self._switch_tab(0)),
-            ("Ctrl+2",      lambda: self._switch_tab(1)),
-            ("Ctrl+3",      lambda: self._switch_tab(2)),
-            ("Ctrl+4",      lambda: self._switch_tab(3)),
-            ("Ctrl+5",      lambda: self._switch_tab(4)),
-            ("Ctrl+6",      lambda: self._switch_tab(5)),
-            ("Ctrl+7",      lambda: self._switch_tab(6)),
-            ("Ctrl+8",      lambda: self._switch_tab(7)),
-            ("Ctrl+9",      lambda: self._switch_tab(self.tabs.count() - 1)),
-            ("Escape",      self._cancel_load),
-            ("F11",         self.toggle_fullscreen),
-            ("Ctrl+P",      self.print_page),
-            ("Ctrl+F",      self.focus_find),
+            ("Alt+Left",    "Back",             self.navigate_back),
+            ("Alt+Right",   "Forward",          self.navigate_forward),
+            ("F5",          "Reload",           self.reload_page),
+            ("Ctrl+R",      "",                 self.reload_page),
+            ("Ctrl+L",      "Focus Address Bar", self._focus_url_bar),
+            ("Alt+Home",    "Home",             self.go_home),
+            ("Ctrl+Tab",    "Next Tab",         self.next_tab),
+            ("Ctrl+Shift+Tab", "Previous Tab",  self.prev_tab),
+            ("Ctrl+1",      "", lambda: self._switch_tab(0)),
+            ("Ctrl+2",      "", lambda: self._switch_tab(1)),
+            ("Ctrl+3",      "", lambda: self._switch_tab(2)),
+            ("Ctrl+4",      "", lambda: self._switch_tab(3)),
+            ("Ctrl+5",      "", lambda: self._switch_tab(4)),
+            ("Ctrl+6",      "", lambda: self._switch_tab(5)),
+            ("Ctrl+7",      "", lambda: self._switch_tab(6)),
+            ("Ctrl+8",      "", lambda: self._switch_tab(7)),
+            ("Ctrl+9",      "", lambda: self._switch_tab(self.tabs.count() - 1)),
+            ("Escape",      "",                 self._cancel_load),
+            ("F11",         "Full Screen",      self.toggle_fullscreen),
+            ("Ctrl+P",      "Print",            self.print_page),
+            ("Ctrl+F",      "Find in Page",     self.focus_find),
+            ("Ctrl+K",      "",                 self.show_command_palette),
         ]
-        for seq, slot in shortcuts:
-            action = QAction(self)
+        for seq, label, slot in shortcuts:
+            action = QAction(label, self)
             action.setShortcut(seq)
             action.triggered.connect(slot)
             self.addAction(action)
@@ -997,10 +1385,53 @@ class WebBrowser(QMainWindow):
     # ─────────────────────────────────────────────────────────────────────
 
     def _newtab_url(self):
-        if os.path.exists(NEW_TAB_HTML):
-            return QUrl.fromLocalFile(os.path.abspath(NEW_TAB_HTML))
+        if self._newtab_ready:
+            return QUrl(NEWTAB_URL)
         return QUrl(self.homepage if self.homepage != "newtab" else "https://duckduckgo.com")
 
+    def _migrate_speed_dial(self):
+        """
+        Copy the speed dial from the file:// origin the new tab page used to
+        have to blackline://newtab, once. localStorage is per origin, so
+        without this every tile a user had added would seem to vanish.
+        """
+        if self._speed_dial_migrated or not self._newtab_ready:
+            return
+        if not os.path.exists(NEW_TAB_HTML):
+            return
+        old = QWebEnginePage(self.profile, self)
+
+        def read_old(_ok):
+            old.runJavaScript("localStorage.getItem('speedDial')", copy_to_new)
+
+        def copy_to_new(value):
+            old.deleteLater()
+            if not isinstance(value, str) or not value:
+                self._finish_speed_dial_migration()
+                return
+            new = QWebEnginePage(self.profile, self)
+            # Never over a speed dial already edited on the new origin.
+            script = ("if (!localStorage.getItem('speedDial')) "
+                      f"localStorage.setItem('speedDial', {json.dumps(value)}); true")
+
+            def done(_result):
+                new.deleteLater()
+                self._finish_speed_dial_migration()
+                for i in range(self.tabs.count()):
+                    view = self.tabs.widget(i)
+                    if isinstance(view, QWebEngineView) and is_newtab_url(view.url().toString()):
+                        view.reload()
+
+            new.loadFinished.connect(lambda _ok: new.runJavaScript(script, done))
+            new.load(QUrl(NEWTAB_URL))
+
+        old.loadFinished.connect(read_old)
+        old.load(QUrl.fromLocalFile(os.path.abspath(NEW_TAB_HTML)))
+
+    def _finish_speed_dial_migration(self):
+        self._speed_dial_migrated = True
+        self.save_settings()
+
     def _new_tab_action(self):
         self.add_new_tab(self._newtab_url(), "New Tab")
 
@@ -1008,7 +1439,8 @@ class WebBrowser(QMainWindow):
     # Tab management
     # ─────────────────────────────────────────────────────────────────────
 
-    def add_new_tab(self, url, label="New Tab", private=False):
+    def _create_view(self, private=False):
+        """Build and wire a web view. Loads nothing and joins no tab bar."""
         browser = QWebEngineView()
         profile = self._get_private_profile() if private else self.profile
         page = QWebEnginePage(profile, browser)
@@ -1016,23 +1448,130 @@ class WebBrowser(QMainWindow):
         if private:
             self._private_views.add(browser)
         page.setWebChannel(self.channel)
-        page.runJavaScript(QWEBCHANNEL_JS_CODE)
         page.loadFinished.connect(lambda ok: self.on_load_finished(ok, browser))
         page.certificateError.connect(lambda error: self.handle_certificate_error(error, browser))
         # HTML5 fullscreen (YouTube etc.) — accept the page's request and go real fullscreen
         page.fullScreenRequested.connect(self._handle_fullscreen_request)
+        page.linkHovered.connect(lambda url, b=browser: self._on_link_hovered(b, url))
         # Handle "open in new tab / new window" from right-click menus
         page.createWindow = lambda _win_type, p=private: self._create_window(private=p)
         browser.urlChanged.connect(self.update_urlbar)
+        # Leaving a reader page by any route (EXIT, a link) ends reading mode.
+        browser.loadStarted.connect(lambda b=browser: self._reader_tabs.load_started(b))
+        browser.loadFinished.connect(lambda _ok, b=browser: self._reader_tabs.load_finished(b))
+        browser.urlChanged.connect(lambda url: self.preconnect.note_navigation(url.toString()))
         browser.titleChanged.connect(
             lambda title, b=browser: self.tabs.setTabText(
                 self.tabs.indexOf(b), tab_label(title, self.is_private_view(b))))
+        browser.titleChanged.connect(lambda _title, b=browser: self._palette_track_tab(b))
+        browser.urlChanged.connect(lambda _url, b=browser: self._palette_track_tab(b))
+        browser.iconChanged.connect(
+            lambda icon, b=browser: self.tabs.setTabIcon(self.tabs.indexOf(b), icon))
+        browser.iconChanged.connect(lambda icon, b=browser: self._capture_favicon(b, icon))
         browser.loadProgress.connect(lambda p: self._update_load_progress(p, browser))
+        return browser
+
+    def _take_view(self, private=False):
+        """A wired view from the pool (or freshly built), timed to first paint."""
+        now = time.monotonic()
+        browser, pooled = self.view_pool.take(PRIVATE if private else DEFAULT, now)
+        if private:
+            # A spare may have been pruned from the set while it waited.
+            self._private_views.add(browser)
+        self.tab_activity.touch(browser, now)
+        self._paint_pending[browser] = (time.time() * 1000, pooled)
+        self._pool_timer.start()          # restarts: refill once opening stops
+        return browser
+
+    def _top_up_view_pool(self):
+        """Build one spare view; re-arm until every profile in use is full."""
+        keys = [DEFAULT]
+        # Only while a private tab is open: spares must never keep the
+        # off-the-record profile alive.
+        if self.private_profile is not None and any(
+                self.tabs.indexOf(v) != -1 for v in self._private_views):
+            keys.append(PRIVATE)
+        for key in keys:
+            if self.view_pool.top_up(key, limit=1):
+                self._pool_timer.start()
+                return
+
+    def _record_first_paint(self, browser):
+        requested, pooled = self._paint_pending.pop(browser)
+
+        def record(painted):
+            if isinstance(painted, (int, float)):
+                self.paint_timings.record(painted - requested, pooled)
+
+        browser.page().runJavaScript(FIRST_PAINT_JS, record)
+
+    def show_new_tab_timing(self):
+        QMessageBox.information(self, "New Tab Timing",
+                                timing_report(self.view_pool, self.paint_timings))
+
+    def add_new_tab(self, url, label="New Tab", private=False):
+        browser = self._take_view(private)
         browser.load(url)
         index = self.tabs.addTab(browser, tab_label(label, private))
         self.tabs.setCurrentIndex(index)
         return browser
 
+    def add_lazy_tab(self, entry: SessionEntry):
+        """Add a restored tab as a placeholder; no renderer until selected."""
+        placeholder = LazyTab(entry)
+        return self.tabs.addTab(placeholder, placeholder.icon(),
+                                tab_label(entry.label, False))
+
+    def _materialize_tab(self, index):
+        """
+        Replace the placeholder at `index` with a real, loading view.
+
+        Returns the widget now at `index`. A no-op for tabs that are
+        already real, so it is safe to call on every activation.
+        """
+        placeholder = self.tabs.widget(index)
+        if not isinstance(placeholder, LazyTab):
+            return placeholder
+        entry = placeholder.entry
+        was_current = self.tabs.currentIndex() == index
+        browser = self._take_view(private=False)
+        browser.load(QUrl(entry.url))
+
+        # removeTab/insertTab move the current index around; none of those
+        # intermediate changes are real tab switches.
+        self._materializing = True
+        try:
+            self.tabs.removeTab(index)
+            self.tabs.insertTab(index, browser, placeholder.icon(),
+                                tab_label(entry.label, False))
+            if was_current:
+                self.tabs.setCurrentIndex(index)
+        finally:
+            self._materializing = False
+        placeholder.deleteLater()
+        return browser
+
+    def _preload_restored_tabs(self):
+        """Build a few placeholders in the background after a restore."""
+        candidates = [i for i in range(self.tabs.count())
+                      if isinstance(self.tabs.widget(i), LazyTab)]
+        order = preload_order(candidates, self.tabs.currentIndex(),
+                              self.restore_preload_budget)
+        for n, index in enumerate(order):
+            placeholder = self.tabs.widget(index)
+            # Staggered so the visible tab gets the first renderer to itself.
+            QTimer.singleShot(
+                1500 * (n + 1),
+                lambda p=placeholder: self._materialize_if_present(p))
+
+    def _materialize_if_present(self, placeholder):
+        try:
+            index = self.tabs.indexOf(placeholder)
+        except RuntimeError:          # already swapped out and deleted
+            return
+        if index != -1:
+            self._materialize_tab(index)
+
     def _create_window(self, private=False):
         """Called by QWebEnginePage.createWindow — opens a blank new tab and
         returns its page. Links opened from a private tab stay private."""
@@ -1044,6 +1583,18 @@ class WebBrowser(QMainWindow):
             widget = self.tabs.widget(index)
             self.tabs.removeTab(index)
             self._private_views.discard(widget)
+            self._form_input_views.discard(widget)
+            self._pinned_views.discard(widget)
+            self._deferred_enhance.discard(widget)
+            self._paint_pending.pop(widget, None)
+            self.script_timings.forget_source(widget)
+            self._omnibox_forget_tab(widget)
+            self.palette.remove(TAB, widget)
+            self._reader_tabs.forget(widget)
+            self.tab_activity.forget(widget)
+            self.cpu_savings.forget(widget, time.monotonic())
+            if self._last_current is widget:
+                self._last_current = None
             widget.deleteLater()
             self._release_private_profile_if_unused()
         else:
@@ -1052,21 +1603,48 @@ class WebBrowser(QMainWindow):
 
     def on_load_finished(self, ok, browser):
         self.update_ssl_indicator(ok, browser)
-        # Inject page-level enhancements (in-page PiP hotkey, Shorts wheel nav)
-        browser.page().runJavaScript(PAGE_ENHANCE_JS)
-        self._apply_cosmetic_filters(browser)
+        if browser in self._paint_pending:
+            self._record_first_paint(browser)
+        if browser is self.tabs.currentWidget():
+            self._enhance_page(browser)
+        else:
+            # Nobody is looking; do it when the tab is shown.
+            self._deferred_enhance.add(browser)
+        if should_record_history(browser.url().toString(), self.is_private_view(browser)):
+            self._omnibox_track_tab(browser, browser.url().toString())
+            if ok and self.fulltext_enabled and not self._in_reader(browser):
+                self._index_page_text(browser)
+        if ok:
+            self._schedule_thumbnail(browser)
+            if not self.is_private_view(browser):
+                self.prewarmer.mark(browser.url().toString())
+        self._restart_idle_prewarm()
         if browser == self.tabs.currentWidget():
             url_str = browser.url().toString()
             private = self.is_private_view(browser)
-            if should_record_history(url_str, private):
+            # The reader page carries the article's URL; it is not a new visit.
+            reader = self._reader_tabs.active(browser, url_str)
+            if should_record_history(url_str, private) and not reader:
                 ts = QDateTime.currentDateTime().toString("yyyy-MM-dd hh:mm")
                 self.history.append((ts, url_str))
                 self.save_history()
+                self.omnibox.record_visit(url_str, browser.title())
             # Notes are stored per domain, so a private tab must not set one.
             if hasattr(self, 'note_sidebar') and not private:
                 self.note_sidebar.set_current_url(url_str)
 
+    def _enhance_page(self, browser):
+        """
+        The per-load work still done from Python: host-specific cosmetic
+        filters, sent only to hosts that have any. Everything else is a
+        profile script (see _install_user_scripts); PAGE_ENHANCE_JS defers
+        itself in hidden tabs the same way.
+        """
+        self._deferred_enhance.discard(browser)
+        self._apply_cosmetic_filters(browser)
+
     def _update_load_progress(self, percent, browser):
+        self._restart_idle_prewarm()
         if browser == self.tabs.currentWidget():
             if percent < 100:
                 self.statusBar.showMessage(f"Loading… {percent}%")
@@ -1078,7 +1656,7 @@ class WebBrowser(QMainWindow):
         if not url:
             return
         # Smart URL detection
-        if url.startswith("http://") or url.startswith("https://") or url.startswith("file://"):
+        if url.startswith(("http://", "https://", "file://", "blackline://")):
             qurl = QUrl(url)
         elif "." in url and " " not in url:
             qurl = QUrl("https://" + url)
@@ -1112,14 +1690,215 @@ class WebBrowser(QMainWindow):
             self._new_tab_action()
 
     def current_tab_changed(self, index):
+        if self._materializing:
+            return
+        if index != -1:
+            self._materialize_tab(index)
+        self._note_tab_activation(self.tabs.currentWidget())
         if index != -1 and self.tabs.currentWidget():
             self.update_urlbar(self.tabs.currentWidget().url())
+            self.reader_btn.setChecked(self._in_reader(self.tabs.currentWidget()))
             if hasattr(self, 'note_sidebar'):
                 self.note_sidebar.set_current_url(self.tabs.currentWidget().url().toString())
 
     def close_current_tab(self):
         self.close_tab_by_index(self.tabs.currentIndex())
 
+    # ─────────────────────────────────────────────────────────────────────
+    # Memory saver & background throttling  (freeze / discard hidden tabs)
+    # ─────────────────────────────────────────────────────────────────────
+
+    def _note_tab_activation(self, widget):
+        """LRU bookkeeping, and wake the newly selected tab if needed."""
+        now = time.monotonic()
+        # The tab being left was in use until now, not since it was opened.
+        left = self._last_current
+        if left is not None and left is not widget:
+            self.tab_activity.touch(left, now)
+            if isinstance(left, QWebEngineView) and self._view_alive(left):
+                self.cpu_savings.mark_hidden(left, self._renderer_cpu_seconds(left), now)
+        self._last_current = widget
+        if not isinstance(widget, QWebEngineView):
+            return
+        self.tab_activity.touch(widget, now)
+        self.cpu_savings.mark_active(widget, now)
+        self._form_input_views.discard(widget)     # re-probed next time
+        page = widget.page()
+        if page.lifecycleState() != QWebEnginePage.LifecycleState.Active:
+            # A discarded page reloads here, transparently.
+            page.setLifecycleState(QWebEnginePage.LifecycleState.Active)
+            self.tabs.setTabToolTip(self.tabs.indexOf(widget), "")
+        if widget in self._deferred_enhance:
+            self._enhance_page(widget)
+
+    @staticmethod
+    def _lifecycle_name(page):
+        state = page.lifecycleState()
+        for name, value in _LIFECYCLE_STATES.items():
+            if value == state:
+                return name
+        return ACTIVE
+
+    def _lifecycle_candidates(self):
+        current = self.tabs.currentWidget()
+        candidates = []
+        for i in range(self.tabs.count()):
+            view = self.tabs.widget(i)
+            if not isinstance(view, QWebEngineView):
+                continue             # placeholders hold no renderer
+            page = view.page()
+            candidates.append(TabCandidate(
+                view,
+                state=self._lifecycle_name(page),
+                visible=view is current,
+                audible=page.recentlyAudible(),
+                pinned=view in self._pinned_views,
+                has_form_input=view in self._form_input_views,
+                devtools_open=page.devToolsPage() is not None,
+            ))
+        return candidates
+
+    def _check_tab_lifecycle(self):
+        self._check_memory_pressure()
+        self._check_background_tabs()
+
+    def _check_background_tabs(self):
+        """Freeze tabs that have sat hidden past the grace period."""
+        for view in plan_throttle(self._lifecycle_candidates(), self.tab_activity,
+                                  self.throttle_policy, time.monotonic()):
+            self._request_lifecycle(view, FROZEN)
+
+    def _check_memory_pressure(self):
+        system_percent, rss = procstats.memory_snapshot()
+        pressure = memory_pressure(system_percent, rss, self.memory_thresholds)
+        if pressure is Pressure.NONE:
+            return
+        plan = plan_transitions(self._lifecycle_candidates(), self.tab_activity,
+                                pressure, time.monotonic())
+        for view, target in plan:
+            self._request_lifecycle(view, target)
+
+    def _request_lifecycle(self, view, target):
+        """
+        Move a tab to `target`, unless it turns out to hold unsent input.
+
+        A live page is asked first. A frozen page cannot run script, but it
+        was asked on the way to being frozen and nothing can have been typed
+        into it since.
+        """
+        page = view.page()
+        if self._lifecycle_name(page) != ACTIVE:
+            self._set_lifecycle(view, target)
+            return
+
+        def apply(has_input, v=view, t=target):
+            if not self._view_alive(v) or v is self.tabs.currentWidget():
+                return
+            if has_input:
+                self._form_input_views.add(v)
+                return
+            self._set_lifecycle(v, t)
+
+        page.runJavaScript(FORM_INPUT_JS, apply)
+
+    def discard_tab(self, view) -> bool:
+        """Discard a background tab on request (task manager). False if refused."""
+        if not self._view_alive(view) or view is self.tabs.currentWidget():
+            return False
+        if not isinstance(view, QWebEngineView):
+            return False
+        if view.page().devToolsPage() is not None:
+            return False
+        self._set_lifecycle(view, DISCARDED)
+        return True
+
+    def tab_processes(self) -> dict:
+        """Renderer pid → [(view, title)] for every tab with a live renderer."""
+        out = {}
+        for i in range(self.tabs.count()):
+            view = self.tabs.widget(i)
+            if not isinstance(view, QWebEngineView):
+                continue
+            pid = view.page().renderProcessPid()
+            if pid > 0:
+                out.setdefault(pid, []).append((view, self.tabs.tabText(i)))
+        return out
+
+    def toggle_task_manager(self):
+        if self.task_manager_dock is None:
+            self.task_manager_dock = QDockWidget("Task Manager", self)
+            self.task_manager_dock.setWidget(TaskManagerPanel(self))
+            self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.task_manager_dock)
+            return
+        self.task_manager_dock.setVisible(self.task_manager_dock.isHidden())
+
+    def _renderer_cpu_seconds(self, view):
+        """This tab's share of its renderer's CPU time so far, or None."""
+        pid = view.page().renderProcessPid()
+        seconds = procstats.cpu_seconds(pid)
+        if seconds is None:
+            return None
+        sharing = len(self.tab_processes().get(pid, ())) or 1
+        return seconds / sharing
+
+    def _set_lifecycle(self, view, target):
+        # Read before freezing: a discarded tab has no renderer left to ask.
+        self.cpu_savings.mark_frozen(view, self._renderer_cpu_seconds(view),
+                                     time.monotonic())
+        view.page().setLifecycleState(_LIFECYCLE_STATES[target])
+        index = self.tabs.indexOf(view)
+        if target == DISCARDED:
+            self.tabs.setTabToolTip(index, "Discarded to save memory — reloads when selected")
+            self.statusBar.showMessage(
+                f"Memory saver: discarded \"{self.tabs.tabText(index)}\"", 4000)
+        elif target == FROZEN:
+            self.tabs.setTabToolTip(index, "Frozen in the background — resumes when selected")
+
+    def show_background_savings(self):
+        now = time.monotonic()
+        rows = []
+        for view, freezes, seconds, saved in self.cpu_savings.report(now):
+            index = self.tabs.indexOf(view)
+            if index != -1:
+                rows.append((self.tabs.tabText(index), freezes, seconds, saved))
+        BackgroundSavingsDialog(rows, self.cpu_savings.closed,
+                                self.cpu_savings.total_saved(now),
+                                procstats.available(), self).exec()
+
+    # ── Pinned tabs ──────────────────────────────────────────────────────
+
+    def is_pinned(self, view) -> bool:
+        return view in self._pinned_views
+
+    def set_pinned(self, view, pinned: bool):
+        """A pinned tab keeps running in the background (music, chat, dashboards)."""
+        index = self.tabs.indexOf(view)
+        if index == -1 or not isinstance(view, QWebEngineView):
+            return
+        if pinned:
+            self._pinned_views.add(view)
+            self.tabs.setTabToolTip(index, "Pinned — kept running in the background")
+            if self._lifecycle_name(view.page()) == FROZEN:
+                view.page().setLifecycleState(QWebEnginePage.LifecycleState.Active)
+                self.cpu_savings.mark_active(view, time.monotonic())
+        else:
+            self._pinned_views.discard(view)
+            self.tabs.setTabToolTip(index, "")
+
+    def _tab_bar_menu(self, pos):
+        index = self.tabs.tabBar().tabAt(pos)
+        if index == -1:
+            return
+        view = self.tabs.widget(index)
+        menu = QMenu(self)
+        pin = menu.addAction("Unpin Tab" if self.is_pinned(view) else "Pin Tab")
+        pin.setEnabled(isinstance(view, QWebEngineView))
+        pin.triggered.connect(lambda: self.set_pinned(view, not self.is_pinned(view)))
+        menu.addSeparator()
+        menu.addAction("Close Tab").triggered.connect(
+            lambda: self.close_tab_by_index(self.tabs.indexOf(view)))
+        menu.exec(self.tabs.tabBar().mapToGlobal(pos))
+
     def next_tab(self):
         self.tabs.setCurrentIndex((self.tabs.currentIndex() + 1) % self.tabs.count())
 
@@ -1156,12 +1935,68 @@ class WebBrowser(QMainWindow):
     # Reading mode
     # ─────────────────────────────────────────────────────────────────────
 
+    def _in_reader(self, view) -> bool:
+        return self._reader_tabs.active(view, view.url().toString())
+
     def toggle_reading_mode(self):
-        if self.tabs.count() == 0:
+        """
+        Show the current page as an article, or go back to the page.
+
+        A page already in the reading list opens from disk at once; anything
+        else has its HTML parsed and scored on the thread pool (see reader.py).
+        """
+        view = self.tabs.currentWidget()
+        if not isinstance(view, QWebEngineView):
+            return
+        url = view.url().toString()
+        if self._in_reader(view):
+            self._reader_tabs.forget(view)
+            self.reader_btn.setChecked(False)
+            view.load(QUrl(url))
+            return
+        private = self.is_private_view(view)
+        saved = None if private else self.reading_list.get(url)
+        if saved is not None:
+            self._show_article(view, saved)
+            self.statusBar.showMessage("Reading mode — saved copy", 3000)
             return
-        self.tabs.currentWidget().page().runJavaScript(READER_JS)
-        self.reader_btn.setChecked(not self.reader_btn.isChecked())
-        self.statusBar.showMessage("Reading mode activated", 3000)
+        self.reader_btn.setChecked(False)
+        self.statusBar.showMessage("Extracting article…", 3000)
+        # Private tabs are read, never saved.
+        store = None if private else self.reading_list
+        view.page().toHtml(lambda html, v=view, u=url: self.ui_pool.start(
+            _ReaderExtract(html, u, v, store, self._reader_signals)))
+
+    def _on_article_extracted(self, view, url, article):
+        # The tab may have closed or moved on while the worker ran.
+        if not self._view_alive(view) or view.url().toString() != url:
+            return
+        if article is None:
+            self.statusBar.showMessage("No article found on this page.", 4000)
+            return
+        self._show_article(view, article)
+        self.statusBar.showMessage("Reading mode activated — saved to the reading list"
+                                   if not self.is_private_view(view)
+                                   else "Reading mode activated", 3000)
+
+    def _show_article(self, view, article):
+        self._reader_tabs.show(view, article.url)
+        view.setHtml(render_reader(article), QUrl(article.url))
+        if view is self.tabs.currentWidget():
+            self.reader_btn.setChecked(True)
+
+    def show_reading_list(self):
+        dialog = ReadingListDialog(self.reading_list, self._open_saved_article, self)
+        dialog.exec()
+
+    def _open_saved_article(self, url):
+        article = self.reading_list.get(url)
+        if article is None:
+            QMessageBox.warning(self, "Reading List",
+                                "That article could not be read from disk.")
+            return
+        view = self.add_new_tab(QUrl("about:blank"), article.title)
+        self._show_article(view, article)
 
     # ─────────────────────────────────────────────────────────────────────
     # Picture-in-Picture
@@ -1295,6 +2130,305 @@ class WebBrowser(QMainWindow):
     # URL bar / misc shortcuts
     # ─────────────────────────────────────────────────────────────────────
 
+    # ─────────────────────────────────────────────────────────────────────
+    # Omnibox  (suggestions from history, bookmarks and open tabs)
+    # ─────────────────────────────────────────────────────────────────────
+
+    def _build_omnibox(self):
+        self.omnibox = OmniboxIndex()
+        self._omnibox_generation = 0
+        self._omnibox_tab_urls = {}       # view -> URL counted as an open tab
+        self._omnibox_signals = _OmniboxSignals()
+        self._omnibox_signals.results.connect(self._show_suggestions)
+        self._omnibox_model = QStandardItemModel(self)
+        completer = QCompleter(self._omnibox_model, self)
+        # The index has already filtered and ranked; show its order as-is.
+        completer.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        completer.setCompletionRole(Qt.ItemDataRole.UserRole)
+        completer.setMaxVisibleItems(8)
+        completer.activated[str].connect(self._open_suggestion)
+        completer.highlighted[str].connect(lambda url: self._predict_navigation(url, OMNIBOX))
+        self.url_bar.setCompleter(completer)
+        self.url_bar.textEdited.connect(self._query_omnibox)
+
+    def _build_omnibox_index(self):
+        """Start over from what is on record now (after history is cleared)."""
+        self.omnibox = OmniboxIndex()
+        for view, url in self._omnibox_tab_urls.items():
+            self.omnibox.tab_opened(url, view.title())
+        self._load_omnibox()
+
+    def _load_omnibox(self):
+        """Index history and bookmarks on the UI pool; typing never waits."""
+        self.omnibox.replace_bookmarks(self._bookmark_pairs())
+        self.ui_pool.start(
+            _OmniboxLoad(self.omnibox, history_records(self.history)))
+
+    def _bookmark_pairs(self):
+        return [(b.get("url"), b.get("title", "")) for b in self.bookmarks
+                if isinstance(b, dict) and b.get("url")]
+
+    def _query_omnibox(self, text):
+        # Every keystroke bumps the generation; a slower, older answer that
+        # arrives late is dropped rather than flashing stale suggestions.
+        self._omnibox_generation += 1
+        if not text.strip():
+            self.url_bar.completer().popup().hide()
+            self._predict_navigation(None, OMNIBOX)
+            return
+        self.ui_pool.start(_OmniboxQuery(
+            self.omnibox, text, self._omnibox_generation, self._omnibox_signals))
+
+    def _show_suggestions(self, generation, results):
+        if generation != self._omnibox_generation or not self.url_bar.hasFocus():
+            return
+        self._omnibox_model.clear()
+        for s in results:
+            marker = "★ " if s.bookmarked else ("⧉ " if s.open_tab else "")
+            label = f"{marker}{s.title}  —  {s.url}" if s.title else f"{marker}{s.url}"
+            item = QStandardItem(label)
+            item.setData(s.url, Qt.ItemDataRole.UserRole)
+            item.setToolTip(s.url)
+            self._omnibox_model.appendRow(item)
+        completer = self.url_bar.completer()
+        if results:
+            completer.complete()
+        else:
+            completer.popup().hide()
+        self._predict_navigation(results[0].url if results else None, OMNIBOX)
+
+    def _open_suggestion(self, url):
+        self.url_bar.setText(url)
+        self.navigate_to_url()
+
+    def _omnibox_track_tab(self, browser, url_str):
+        """Keep the open-tab boost on the URL each (non-private) tab shows now."""
+        old = self._omnibox_tab_urls.get(browser)
+        if old == url_str:
+            return
+        if old:
+            self.omnibox.tab_closed(old)
+        self._omnibox_tab_urls[browser] = url_str
+        self.omnibox.tab_opened(url_str, browser.title())
+
+    def _omnibox_forget_tab(self, browser):
+        old = self._omnibox_tab_urls.pop(browser, None)
+        if old:
+            self.omnibox.tab_closed(old)
+
+    # ─────────────────────────────────────────────────────────────────────
+    # Predictive preconnect  (top suggestion, hovered speed-dial tile)
+    # ─────────────────────────────────────────────────────────────────────
+
+    def _on_link_hovered(self, browser, url):
+        """Speed-dial tiles only: elsewhere a hovered link says too little."""
+        if not is_newtab_url(browser.url().toString()) or self.is_private_view(browser):
+            return
+        self._predict_navigation(url or None, SPEED_DIAL)     # "" = left the tile
+
+    def _predict_navigation(self, url, source):
+        """Warm `url` once the cursor has rested on it; None cancels."""
+        self._preconnect_timer.stop()
+        self._preconnect_next = None
+        # A lookup from here would bypass any proxy, and private tabs
+        # leave no trace — not even a resolver cache entry.
+        if not url or self._proxy_in_use() or self.current_tab_is_private():
+            self.preconnect.cancel(source)
+            return
+        self._preconnect_next = (url, source)
+        self._preconnect_timer.start()
+
+    def _proxy_in_use(self):
+        """Tor, a plugin's application proxy, or one from flags or the OS."""
+        return (self.tor_enabled
+                or QNetworkProxy.applicationProxy().type() != QNetworkProxy.ProxyType.NoProxy
+                or proxy_configured())
+
+    def _start_preconnect(self):
+        if self._preconnect_next is None:
+            return
+        url, source = self._preconnect_next
+        self._preconnect_next = None
+        # A lookup only: on tiles the page's <link rel=preconnect> has
+        # Chromium open the connection it will actually use.
+        job = self.preconnect.predict(url, source, https_only=self.https_only.enabled)
+        if job is not None:
+            self.ui_pool.start(_PreconnectWarm(self.preconnect, job))
+
+    def show_preconnect_stats(self):
+        QMessageBox.information(self, "Preconnect Statistics",
+                                preconnect_report(self.preconnect))
+
+    def toggle_preconnect(self, enabled=None):
+        """Enable or disable speculative DNS warm-up."""
+        if enabled is None:
+            enabled = not self.preconnect.enabled
+        self.preconnect.enabled = bool(enabled)
+        if not self.preconnect.enabled:
+            self.preconnect.cancel()
+        state = "enabled" if self.preconnect.enabled else "disabled"
+        self.statusBar.showMessage(f"Predictive preconnect {state}.", 4000)
+        self.save_settings()
+
+    # ─────────────────────────────────────────────────────────────────────
+    # Favicons  (captured from tabs, served as blackline-icon://host)
+    # ─────────────────────────────────────────────────────────────────────
+
+    def _capture_favicon(self, view, icon):
+        url = view.url().toString()
+        if icon.isNull() or not should_record_history(url, self.is_private_view(view)):
+            return
+        host = icon_host(url)
+        if not host:
+            return
+        self._favicon_icons.pop(host, None)
+        # toImage() is a cheap copy; the PNG encoding happens on the pool.
+        image = icon.pixmap(32, 32).toImage()
+        self.ui_pool.start(_FaviconStore(self.favicons, url, image))
+
+    def favicon_for(self, url) -> QIcon:
+        """The cached icon for `url`'s site, or a null QIcon."""
+        host = icon_host(url)
+        if not host:
+            return QIcon()
+        icon = self._favicon_icons.get(host)
+        if icon is None:
+            data = self.favicons.lookup(host)
+            image = QImage.fromData(data, "PNG") if data else QImage()
+            icon = QIcon(QPixmap.fromImage(image)) if not image.isNull() else QIcon()
+            self._favicon_icons[host] = icon
+        return icon
+
+    # ─────────────────────────────────────────────────────────────────────
+    # Speed-dial thumbnails  (grabbed after load, encoded on the pool)
+    # ─────────────────────────────────────────────────────────────────────
+
+    def _schedule_thumbnail(self, view):
+        url = view.url().toString()
+        private = self.is_private_view(view)
+        if is_newtab_url(url):
+            # The page knows its tiles; only they are ever captured.
+            if not private:
+                view.page().runJavaScript("JSON.stringify(loadSites())",
+                                          self._on_speed_dial_sites)
+            return
+        if self._in_reader(view) or not self.thumbnails.wants(url, private):
+            return
+        # Give late content a moment to paint before the grab.
+        QTimer.singleShot(CAPTURE_DELAY_MS,
+                          lambda v=view, u=url: self._capture_thumbnail(v, u))
+
+    def _on_speed_dial_sites(self, sites_json):
+        self.thumbnails.set_tiles(sites_json)
+        self._speed_dial_urls = tile_urls(sites_json)
+
+    def _capture_thumbnail(self, view, url):
+        # Only the visible tab has pixels to grab; a closed one is not current.
+        if view is not self.tabs.currentWidget() or view.url().toString() != url:
+            return
+        host = self.thumbnails.wants(url, self.is_private_view(view))
+        if not host or not self.thumbnails.begin(host):
+            return
+        # grab() is the only UI-thread work; scaling and encoding are pooled.
+        image = view.grab().toImage()
+        self.ui_pool.start(
+            _ThumbnailEncode(self.thumbnails, host, image, self._thumbnail_format))
+
+    # ─────────────────────────────────────────────────────────────────────
+    # Page text index  (opt-in search over what visited pages said)
+    # ─────────────────────────────────────────────────────────────────────
+
+    def _index_page_text(self, view):
+        url, title = view.url().toString(), view.title()
+
+        def got_text(text):
+            # Navigated away meanwhile: this text belongs to another URL.
+            if text and self._view_alive(view) and view.url().toString() == url:
+                self.ui_pool.start(
+                    _FullTextAdd(self.fulltext, url, title, text))
+
+        view.page().toPlainText(got_text)
+
+    def toggle_fulltext(self, enabled=None):
+        """Enable or disable indexing the text of visited pages."""
+        if enabled is None:
+            enabled = not self.fulltext_enabled
+        self.fulltext_enabled = bool(enabled)
+        state = "enabled" if self.fulltext_enabled else "disabled"
+        self.statusBar.showMessage(f"Visited page text indexing {state}.", 4000)
+        self.save_settings()
+
+    def show_page_search(self):
+        dialog = PageSearchDialog(
+            self.fulltext, lambda url: self.add_new_tab(QUrl(url), "Loading…"),
+            self.fulltext_enabled, self.ui_pool, self)
+        dialog.exec()
+
+    # ─────────────────────────────────────────────────────────────────────
+    # Command palette  (Ctrl+K over tabs, actions, bookmarks, history)
+    # ─────────────────────────────────────────────────────────────────────
+
+    def _palette_tab_item(self, widget):
+        if isinstance(widget, LazyTab):
+            title, url = widget.entry.label, widget.entry.url
+        else:
+            title, url = widget.title(), widget.url().toString()
+        label = tab_label(title or url, self.is_private_view(widget), limit=200)
+        return PaletteItem(TAB, widget, label, url, widget)
+
+    def _palette_track_tab(self, browser):
+        """Retitle a tab in place, even while the palette is open on it."""
+        if self.tabs.indexOf(browser) != -1:
+            self.palette.set_item(self._palette_tab_item(browser))
+
+    def _palette_actions(self):
+        """Menu actions and labelled shortcuts, enabled ones only."""
+        items = []
+        for top in self.menuBar().actions():
+            menu = top.menu()
+            if menu is None:
+                continue
+            where = top.text().replace("&", "")
+            for action in menu.actions():
+                if action.isSeparator() or not action.text() or not action.isEnabled():
+                    continue
+                items.append(self._palette_action_item(action, where))
+        for action in self.actions():
+            if action.text():
+                items.append(self._palette_action_item(action, ""))
+        return items
+
+    @staticmethod
+    def _palette_action_item(action, where):
+        label = action.text().replace("&", "")
+        shortcut = action.shortcut().toString(QKeySequence.SequenceFormat.NativeText)
+        detail = "  ".join(part for part in (where, shortcut) if part)
+        return PaletteItem(ACTION, id(action), label, detail, action)
+
+    def show_command_palette(self):
+        # Tabs move and close without telling the palette; a replace in
+        # tab order reuses every entry whose title has not changed.
+        self.palette.replace_kind(
+            TAB, [self._palette_tab_item(self.tabs.widget(i)) for i in range(self.tabs.count())])
+        self.palette.replace_kind(ACTION, self._palette_actions())
+        self.palette.replace_kind(BOOKMARK, bookmark_items(self.bookmarks))
+        self.palette.replace_kind(HISTORY, history_items(self.history))
+        dialog = CommandPalette(self.palette, self._open_palette_item, self)
+        dialog.move(self.geometry().center().x() - dialog.minimumWidth() // 2,
+                    self.geometry().top() + 80)
+        dialog.exec()
+
+    def _open_palette_item(self, item):
+        if item.kind == TAB:
+            index = self.tabs.indexOf(item.target)
+            if index != -1:
+                self.tabs.setCurrentIndex(index)
+        elif item.kind == ACTION:
+            item.target.trigger()
+        else:
+            self.url_bar.setText(item.target)
+            self.navigate_to_url()
+
     def _focus_url_bar(self):
         self.url_bar.setFocus()
         self.url_bar.selectAll()
@@ -1380,8 +2514,16 @@ class WebBrowser(QMainWindow):
     # ─────────────────────────────────────────────────────────────────────
 
     def show_history(self):
-        dialog = HistoryDialog(self.history, self)
+        dialog = HistoryDialog(self.history, self, icons=self.favicon_for)
         dialog.exec()
+        if not self.history:
+            # Cleared: what was typed-ahead from must go with it, and so
+            # must the text of the pages it visited.
+            self._build_omnibox_index()
+            self.ui_pool.start(_FullTextClear(self.fulltext))
+            self.favicons.clear()
+            self._favicon_icons.clear()
+            self.thumbnails.clear()
 
     def save_history(self):
         # Keep last 2000 entries. A failure here used to be swallowed
@@ -1411,16 +2553,17 @@ class WebBrowser(QMainWindow):
     # ─────────────────────────────────────────────────────────────────────
 
     def show_bookmarks(self):
-        dialog = BookmarksDialog(self.bookmarks, self)
+        dialog = BookmarksDialog(self.bookmarks, self, icons=self.favicon_for)
         dialog.exec()
         self.bookmarks = dialog.bookmarks   # sync back
+        self.omnibox.replace_bookmarks(self._bookmark_pairs())
 
     def add_bookmark(self):
         if self.tabs.count() == 0:
             return
         url = self.tabs.currentWidget().url().toString()
         title = self.tabs.currentWidget().title() or url
-        if not url or url.startswith("file://"):
+        if is_internal_url(url):
             return
         # Quick-add with default folder
         existing_urls = [b.get("url") if isinstance(b, dict) else b for b in self.bookmarks]
@@ -1433,6 +2576,7 @@ class WebBrowser(QMainWindow):
             if not ok:
                 folder = "Bookmarks"
             self.bookmarks.append({"title": title, "url": url, "folder": folder})
+            self.omnibox.set_bookmarked(url, title)
             # persist
             if not write_json(BOOKMARKS_FILE, self.bookmarks):
                 self.statusBar.showMessage("Could not save bookmark.", 5000)
@@ -1481,28 +2625,81 @@ class WebBrowser(QMainWindow):
     # Plugins
     # ─────────────────────────────────────────────────────────────────────
 
-    def _install_cosmetic_stylesheet(self):
+    def _register_cosmetic_stylesheet(self):
         """
-        Inject the generic element-hiding rules as a profile-wide user script.
+        Register the generic element-hiding rules as a built-in script.
 
-        Done once at document creation rather than per navigation: the
+        Injected at document creation rather than per navigation: the
         generic sheet is ~190 KB and rebuilding it on every load would be
         wasted work. Host-specific rules are applied separately on load.
         """
-        self._cosmetic_script = None
         if not getattr(self.ad_blocker, "cosmetics", None):
             return
         css = self.ad_blocker.cosmetics.generic_css()
         if not css:
             return
-        script = QWebEngineScript()
-        script.setName("blackline-cosmetic-generic")
-        script.setInjectionPoint(QWebEngineScript.InjectionPoint.DocumentCreation)
-        script.setWorldId(QWebEngineScript.ScriptWorldId.ApplicationWorld)
-        script.setRunsOnSubFrames(True)
-        script.setSourceCode(build_injection_js(css, "blackline-cosmetic-generic"))
-        self._cosmetic_script = script
-        self.profile.scripts().insert(script)
+        self.user_scripts.register(UserScript(
+            "cosmetic-generic", build_injection_js(css, "blackline-cosmetic-generic"),
+            DOCUMENT_CREATION, APPLICATION_WORLD, subframes=True,
+            description="Generic element hiding (ad blocker)"))
+
+    def _install_user_scripts(self, profile):
+        """
+        Bring a profile's script collection in line with the registry.
+
+        Unchanged scripts stay installed; a script whose source changed is
+        swapped by name, since the name carries its version. Applies to
+        documents created from now on.
+        """
+        collection = profile.scripts()
+        installed = {script.name(): script for script in collection.toList()}
+        skip = () if self.ad_blocker.enabled else ("cosmetic-generic",)
+        to_remove, to_insert = self.user_scripts.plan_install(installed, skip)
+        for name in to_remove:
+            collection.remove(installed[name])
+        for spec in to_insert:
+            script = QWebEngineScript()
+            script.setName(spec.installed_name)
+            script.setInjectionPoint(_INJECTION_POINTS[spec.injection])
+            script.setWorldId(_SCRIPT_WORLDS[spec.world])
+            script.setRunsOnSubFrames(spec.subframes)
+            script.setSourceCode(spec.compiled())
+            collection.insert(script)
+
+    def _reinstall_user_scripts(self):
+        for profile in (self.profile, self.private_profile):
+            if profile is not None:
+                self._install_user_scripts(profile)
+
+    def collect_script_timings(self, on_report=None):
+        """
+        Read the timing global from every live tab, in every world a
+        built-in script runs in. Only ever on request — never per load.
+        """
+        for i in range(self.tabs.count()):
+            view = self.tabs.widget(i)
+            if not isinstance(view, QWebEngineView):
+                continue
+            if self._lifecycle_name(view.page()) != ACTIVE:
+                continue                  # frozen pages cannot answer
+            for world in self.user_scripts.worlds():
+                view.page().runJavaScript(
+                    REPORT_JS, _SCRIPT_WORLDS[world],
+                    lambda text, v=view: self._on_script_report(v, text, on_report))
+
+    def _on_script_report(self, view, text, on_report):
+        self.script_timings.add_report(parse_report(text), source=view)
+        if on_report:
+            on_report()
+
+    def show_builtin_scripts(self):
+        dialog = BuiltinScriptsDialog(self, self)
+        if dialog.exec() != QDialog.DialogCode.Accepted:
+            return
+        for name, enabled in dialog.choices().items():
+            self.user_scripts.set_enabled(name, enabled)
+        self._reinstall_user_scripts()
+        self.save_settings()
 
     def _apply_cosmetic_filters(self, browser):
         """Apply host-scoped element hiding to a freshly loaded page."""
@@ -1535,14 +2732,85 @@ class WebBrowser(QMainWindow):
         s.setAttribute(QWebEngineSettings.WebAttribute.PluginsEnabled, True)
         s.setAttribute(QWebEngineSettings.WebAttribute.AutoLoadImages, True)
         s.setAttribute(QWebEngineSettings.WebAttribute.FullScreenSupportEnabled, True)
-        # new_tab.html is served from file:// — without these, every remote
-        # resource it requests (favicons, the JetBrains Mono webfont) is
-        # silently dropped by Chromium's local-content policy.
-        s.setAttribute(QWebEngineSettings.WebAttribute.LocalContentCanAccessRemoteUrls, True)
+        # The new tab page is blackline://newtab, a secure origin of its own,
+        # so its remote favicons and webfont load as on any https page. Local
+        # files no longer need to reach the network; Chromium's default again.
+        s.setAttribute(QWebEngineSettings.WebAttribute.LocalContentCanAccessRemoteUrls, False)
         s.setAttribute(QWebEngineSettings.WebAttribute.LocalContentCanAccessFileUrls, True)
+        # Read-only for private tabs too: showing a cached icon writes nothing.
+        profile.installUrlSchemeHandler(ICON_SCHEME.encode("ascii"), self.favicon_handler)
+        profile.installUrlSchemeHandler(PAGE_SCHEME.encode("ascii"), self.internal_handler)
         profile.downloadRequested.connect(self.handle_download)
+        self._apply_http_cache(profile)
         return profile
 
+    def _apply_http_cache(self, profile):
+        """Cache type, size and, on disk, location, from the cache policy."""
+        types = QWebEngineProfile.HttpCacheType
+        policy = self.cache_policy
+        if policy.cache_type == NONE:
+            profile.setHttpCacheType(types.NoCache)
+            return
+        if policy.cache_type == DISK and not profile.isOffTheRecord():
+            profile.setCachePath(HTTP_CACHE_DIR)
+            profile.setHttpCacheType(types.DiskHttpCache)
+        else:
+            # An off-the-record profile can only ever keep it in memory.
+            profile.setHttpCacheType(types.MemoryHttpCache)
+        profile.setHttpCacheMaximumSize(policy.max_bytes)
+
+    def _disk_cache_path(self):
+        """The directory the default profile caches in, or "" if none."""
+        if self.cache_policy.cache_type != DISK or self.profile.isOffTheRecord():
+            return ""
+        return self.profile.cachePath()
+
+    def show_http_cache(self):
+        dialog = HttpCacheDialog(self.cache_policy, self._disk_cache_path(),
+                                 self.profile.clearHttpCache, self.ui_pool, self)
+        if dialog.exec() != QDialog.DialogCode.Accepted:
+            return
+        self.cache_policy = dialog.policy()
+        for profile in (self.profile, self.private_profile):
+            if profile is not None:
+                self._apply_http_cache(profile)
+        self._restart_idle_prewarm()
+        self.save_settings()
+
+    def _restart_idle_prewarm(self):
+        """Any page activity restarts the wait; prewarming needs a quiet minute."""
+        if self.cache_policy.prewarm:
+            self._prewarm_timer.start()
+
+    def _prewarm_next(self):
+        """
+        Load one due speed-dial site in a hidden page, so its first visit
+        today is served from the cache. The next waits for the next idle.
+        """
+        if (not self.cache_policy.prewarm or self.cache_policy.cache_type == NONE
+                or self.tor_enabled or self._prewarm_page is not None):
+            return
+        due = self.prewarmer.plan(self._speed_dial_urls)
+        if not due:
+            return
+        url = due[0]
+        self.prewarmer.mark(url)
+        page = QWebEnginePage(self.profile, self)
+        page.setAudioMuted(True)
+        self._prewarm_page = page
+        page.loadFinished.connect(lambda _ok: self._end_prewarm(page))
+        QTimer.singleShot(PREWARM_TIMEOUT_MS, lambda: self._end_prewarm(page))
+        page.load(QUrl(url))
+
+    def _end_prewarm(self, page):
+        if self._prewarm_page is not page:
+            return                        # finished already, or timed out
+        self._prewarm_page = None
+        self.prewarmer.loads += 1
+        page.deleteLater()
+        self.save_settings()              # so a restart does not load it again today
+        self._restart_idle_prewarm()
+
     def _get_private_profile(self):
         """An off-the-record profile — constructed with no name, so nothing
         it holds is ever written to disk."""
@@ -1553,6 +2821,7 @@ class WebBrowser(QMainWindow):
             if chain:
                 profile.setUrlRequestInterceptor(chain)
             self.private_profile = profile
+            self._install_user_scripts(profile)
         return self.private_profile
 
     def is_private_view(self, browser) -> bool:
@@ -1574,6 +2843,8 @@ class WebBrowser(QMainWindow):
         self._private_views = {v for v in self._private_views
                                if self.tabs.indexOf(v) != -1}
         if not self._private_views and self.private_profile is not None:
+            # Spare private views hold pages on the profile; they go first.
+            self.view_pool.drain(PRIVATE)
             self.private_profile.deleteLater()
             self.private_profile = None
 
@@ -1649,14 +2920,18 @@ class WebBrowser(QMainWindow):
 
     def save_tabs(self):
         try:
-            urls = []
+            entries = []
             for i in range(self.tabs.count()):
                 widget = self.tabs.widget(i)
+                if isinstance(widget, LazyTab):
+                    entries.append(widget.entry)   # never loaded: keep as saved
+                    continue
                 url = widget.url().toString()
                 if should_persist_tab(url, self.is_private_view(widget)):
-                    urls.append(url)
-            if write_json(TABS_FILE, urls):
-                self.statusBar.showMessage(f"Session saved ({len(urls)} tabs)", 3000)
+                    entries.append(SessionEntry(
+                        url, widget.title(), icon_to_b64(widget.icon())))
+            if write_json(TABS_FILE, serialise_session(entries)):
+                self.statusBar.showMessage(f"Session saved ({len(entries)} tabs)", 3000)
             else:
                 self.statusBar.showMessage("Failed to save session.", 5000)
         except Exception as e:
@@ -1668,16 +2943,22 @@ class WebBrowser(QMainWindow):
             if recovered:
                 self.statusBar.showMessage(
                     "Session file was damaged — restored previous session.", 6000)
-            if tabs:
-                for url in tabs:
-                    if url:
-                        self.add_new_tab(QUrl(url), url[:40])
+            # Placeholders only: a renderer is started when a tab is first
+            # selected, so startup cost does not grow with the session.
+            entries = parse_session(tabs)
+            for entry in entries:
+                self.add_lazy_tab(entry)
+            if entries:
+                self._preload_restored_tabs()
         except Exception as e:
             self.statusBar.showMessage(f"Failed to restore session: {str(e)}", 5000)
 
     def closeEvent(self, event):
         """Auto-save session on close."""
         self.save_tabs()
+        self.save_settings()              # the prewarmer's record of today's visits
+        self.favicons.flush()
+        self.thumbnails.flush()
         super().closeEvent(event)
 
     # ─────────────────────────────────────────────────────────────────────
@@ -1693,6 +2974,16 @@ class WebBrowser(QMainWindow):
                 "autofill_enabled": self.autofill_enabled,
                 "dark_mode": self.dark_mode,
                 "https_only": self.https_only.enabled,
+                "restore_preload_budget": self.restore_preload_budget,
+                **self.memory_thresholds.to_settings(),
+                **self.throttle_policy.to_settings(),
+                **self.cache_policy.to_settings(),
+                **self.prewarmer.to_settings(),
+                "view_pool_size": self.view_pool.size,
+                "preconnect_enabled": self.preconnect.enabled,
+                "fulltext_enabled": self.fulltext_enabled,
+                "speed_dial_migrated": self._speed_dial_migrated,
+                "disabled_scripts": self.user_scripts.disabled_names(),
             }):
                 self.statusBar.showMessage("Failed to save settings.", 5000)
         except Exception as e:
@@ -1711,6 +3002,20 @@ class WebBrowser(QMainWindow):
                 self.autofill_enabled  = s.get("autofill_enabled", True)
                 self.dark_mode         = s.get("dark_mode", True)
                 self.https_only.enabled = s.get("https_only", False)
+                self.restore_preload_budget = clamp_preload_budget(
+                    s.get("restore_preload_budget", DEFAULT_PRELOAD_BUDGET))
+                self.memory_thresholds = MemoryThresholds.from_settings(s)
+                self.throttle_policy = ThrottlePolicy.from_settings(s)
+                self.cache_policy = CachePolicy.from_settings(s)
+                self.prewarmer = Prewarmer.from_settings(s)
+                self._apply_http_cache(self.profile)
+                self._restart_idle_prewarm()
+                self.user_scripts.apply_disabled(s.get("disabled_scripts", []))
+                self.view_pool.size = clamp_pool_size(
+                    s.get("view_pool_size", DEFAULT_POOL_SIZE))
+                self.preconnect.enabled = bool(s.get("preconnect_enabled", True))
+                self.fulltext_enabled = bool(s.get("fulltext_enabled", False))
+                self._speed_dial_migrated = bool(s.get("speed_dial_migrated", False))
                 self.toggle_ad_blocker_action.setChecked(self.ad_blocker.enabled)
                 self.toggle_autofill_action.setChecked(self.autofill_enabled)
                 self.theme_btn.setChecked(self.dark_mode)
@@ -1720,6 +3025,7 @@ class WebBrowser(QMainWindow):
 
     def toggle_ad_blocker(self):
         self.ad_blocker.enabled = self.toggle_ad_blocker_action.isChecked()
+        self._reinstall_user_scripts()
         self.save_settings()
 
     def toggle_autofill(self):
@@ -5,8 +5,16 @@ Additions vs original:
   • BookmarksDialog: replaces the old QListWidget popup with folders,
     drag-to-reorder, search, and proper open/edit/delete actions
   • DevToolsDialog / PasswordManagerDialog: unchanged from original
+  • TaskManagerPanel: per-tab renderer CPU / memory, sampled off the UI thread
+  • BackgroundSavingsDialog: CPU time saved by freezing hidden tabs
+  • BuiltinScriptsDialog: enable flags and timings for the profile scripts
+  • CommandPalette: Ctrl+K search over tabs, actions, bookmarks and history
+  • ReadingListDialog: articles saved by reading mode, readable offline
+  • PageSearchDialog: search over the text of visited pages
+  • HttpCacheDialog: HTTP cache type and size, disk use by site, eviction
 """
 
+import datetime
 import json
 import os
 from urllib.parse import urlparse
@@ -15,12 +23,21 @@ from PyQt6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem,
     QTextEdit, QTabWidget, QWidget, QPushButton, QLineEdit, QMessageBox,
     QHeaderView, QInputDialog, QTreeWidget, QTreeWidgetItem, QMenu,
-    QLabel, QSplitter, QFrame
+    QLabel, QSplitter, QFrame, QListWidget, QListWidgetItem, QCheckBox,
+    QComboBox, QSpinBox,
 )
 from PyQt6.QtWebEngineWidgets import QWebEngineView
-from PyQt6.QtCore import Qt, QUrl, QSortFilterProxyModel
+from PyQt6.QtCore import (
+    Qt, QUrl, QSortFilterProxyModel, QObject, QRunnable, QTimer,
+    pyqtSignal, pyqtSlot,
+)
 from PyQt6.QtGui import QColor, QIcon, QFont
 
+import httpcache
+import procstats
+from main_gui import format_size
+from palette import TAB, ACTION, BOOKMARK, HISTORY
+
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -28,11 +45,12 @@ from PyQt6.QtGui import QColor, QIcon, QFont
 # ─────────────────────────────────────────────────────────────────────────────
 
 class HistoryDialog(QDialog):
-    def __init__(self, history, parent=None):
+    def __init__(self, history, parent=None, icons=None):
         super().__init__(parent)
         self.setWindowTitle("Browsing History")
         self.setMinimumSize(740, 500)
         self.history = history          # list of (timestamp, url)
+        self.icons = icons              # url -> QIcon, from the local favicon cache
         self._build_ui()
         self._populate(history)
 
@@ -88,7 +106,10 @@ class HistoryDialog(QDialog):
             short_url = url if len(url) <= 70 else url[:67] + "…"
 
             self.table.setItem(row, 0, QTableWidgetItem(timestamp))
-            self.table.setItem(row, 1, QTableWidgetItem(site))
+            site_item = QTableWidgetItem(site)
+            if self.icons:
+                site_item.setIcon(self.icons(url))
+            self.table.setItem(row, 1, site_item)
             url_item = QTableWidgetItem(short_url)
             url_item.setData(Qt.ItemDataRole.UserRole, url)
             self.table.setItem(row, 2, url_item)
@@ -139,13 +160,15 @@ class BookmarksDialog(QDialog):
       • Persistent storage in bookmarks_v2.json
     """
 
-    def __init__(self, bookmarks_data, parent=None):
+    def __init__(self, bookmarks_data, parent=None, icons=None):
         """
         bookmarks_data is the browser's self.bookmarks — a list of dicts:
           [{"title": str, "url": str, "folder": str}, ...]
         Old-style plain string entries are migrated automatically.
+        icons, if given, maps a URL to its cached favicon.
         """
         super().__init__(parent)
+        self.icons = icons
         self.setWindowTitle("Bookmarks")
         self.setMinimumSize(820, 540)
         self.bookmarks = self._migrate(bookmarks_data)
@@ -270,7 +293,10 @@ class BookmarksDialog(QDialog):
         for bm in items:
             row = self.table.rowCount()
             self.table.insertRow(row)
-            self.table.setItem(row, 0, QTableWidgetItem(bm.get("title", "")))
+            title_item = QTableWidgetItem(bm.get("title", ""))
+            if self.icons:
+                title_item.setIcon(self.icons(bm.get("url", "")))
+            self.table.setItem(row, 0, title_item)
             url_item = QTableWidgetItem(bm.get("url", ""))
             url_item.setData(Qt.ItemDataRole.UserRole, bm)
             self.table.setItem(row, 1, url_item)
@@ -749,3 +775,746 @@ class PasswordManagerDialog(QDialog):
     def hide_api_key(self):
         for row in range(self.api_keys_table.rowCount()):
             self.api_keys_table.item(row, 1).setText("*" * 12)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Task Manager  (per-tab renderer CPU / memory)
+# ─────────────────────────────────────────────────────────────────────────────
+
+class _SampleSignals(QObject):
+    sampled = pyqtSignal(list)
+
+
+class _SampleTask(QRunnable):
+    """One psutil pass over the process tree, on the global thread pool."""
+
+    def __init__(self, sampler, tab_labels, signals):
+        super().__init__()
+        self.sampler = sampler
+        self.tab_labels = tab_labels
+        self.signals = signals
+
+    @pyqtSlot()
+    def run(self):
+        try:
+            samples = self.sampler.sample(self.tab_labels)
+        except Exception:
+            samples = []
+        self.signals.sampled.emit(samples)
+
+
+class _SortItem(QTableWidgetItem):
+    """Displays formatted text, sorts on the raw number behind it."""
+
+    def __init__(self, text, value):
+        super().__init__(text)
+        self.setData(Qt.ItemDataRole.UserRole, value)
+        self.setFlags(self.flags() & ~Qt.ItemFlag.ItemIsEditable)
+
+    def __lt__(self, other):
+        mine = self.data(Qt.ItemDataRole.UserRole)
+        theirs = other.data(Qt.ItemDataRole.UserRole)
+        try:
+            return mine < theirs
+        except TypeError:
+            return str(mine) < str(theirs)
+
+
+class TaskManagerPanel(QWidget):
+    """
+    Which tab is burning CPU.
+
+    Maps each tab's renderProcessPid() onto psutil readings for the whole
+    browser process tree, GPU and utility processes included. Sampling runs
+    on the thread pool; the UI thread only collects pids and fills the
+    table. The timer runs only while the panel is visible.
+    """
+
+    REFRESH_MS = 2000
+    COLUMNS = ("Task", "Type", "Memory", "CPU %", "Threads", "PID")
+
+    def __init__(self, browser, parent=None):
+        super().__init__(parent)
+        self.browser = browser
+        self.sampler = procstats.ProcessSampler()
+        self._busy = False
+        self._signals = _SampleSignals()
+        self._signals.sampled.connect(self._populate)
+        self._timer = QTimer(self)
+        self._timer.setInterval(self.REFRESH_MS)
+        self._timer.timeout.connect(self.refresh)
+        self._build_ui()
+
+    def _build_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(6, 6, 6, 6)
+
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.table.setSelectionMode(QTableWidget.SelectionMode.SingleSelection)
+        self.table.setSortingEnabled(True)
+        self.table.sortByColumn(3, Qt.SortOrder.DescendingOrder)
+        layout.addWidget(self.table, 1)
+
+        row = QHBoxLayout()
+        self.summary = QLabel("")
+        self.summary.setStyleSheet("color: #7d8b99; font-size: 11px;")
+        self.discard_btn = QPushButton("Discard Tab")
+        self.discard_btn.clicked.connect(self._discard_selected)
+        self.end_btn = QPushButton("End Process")
+        self.end_btn.clicked.connect(self._end_selected)
+        row.addWidget(self.summary)
+        row.addStretch()
+        row.addWidget(self.discard_btn)
+        row.addWidget(self.end_btn)
+        layout.addLayout(row)
+
+        if not procstats.available():
+            self.summary.setText("psutil is not installed — no process readings.")
+            self.discard_btn.setEnabled(False)
+            self.end_btn.setEnabled(False)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if procstats.available():
+            self.refresh()
+            self._timer.start()
+
+    def hideEvent(self, event):
+        self._timer.stop()
+        super().hideEvent(event)
+
+    def refresh(self):
+        if self._busy:
+            return        # previous sample still running; skip, don't queue
+        self._busy = True
+        labels = {pid: [title for _view, title in tabs]
+                  for pid, tabs in self.browser.tab_processes().items()}
+        self.browser.ui_pool.start(
+            _SampleTask(self.sampler, labels, self._signals))
+
+    def _populate(self, samples):
+        self._busy = False
+        selected = self._selected_pid()
+        self.table.setSortingEnabled(False)
+        self.table.setRowCount(len(samples))
+        total_rss = 0
+        for r, smp in enumerate(samples):
+            total_rss += smp.rss
+            cells = (
+                _SortItem(smp.label, smp.label.lower()),
+                _SortItem(smp.kind, smp.kind),
+                _SortItem(format_size(smp.rss), smp.rss),
+                _SortItem(f"{smp.cpu_percent:.1f}", smp.cpu_percent),
+                _SortItem(str(smp.threads), smp.threads),
+                _SortItem(str(smp.pid), smp.pid),
+            )
+            for c, item in enumerate(cells):
+                self.table.setItem(r, c, item)
+        self.table.setSortingEnabled(True)
+        self.summary.setText(f"{len(samples)} processes · {format_size(total_rss)}")
+        if selected is not None:
+            for r in range(self.table.rowCount()):
+                if self.table.item(r, 5).data(Qt.ItemDataRole.UserRole) == selected:
+                    self.table.selectRow(r)
+                    break
+
+    def _selected_pid(self):
+        rows = self.table.selectionModel().selectedRows() if self.table.selectionModel() else []
+        if not rows:
+            return None
+        item = self.table.item(rows[0].row(), 5)
+        return item.data(Qt.ItemDataRole.UserRole) if item else None
+
+    def _discard_selected(self):
+        pid = self._selected_pid()
+        tabs = self.browser.tab_processes().get(pid, []) if pid is not None else []
+        discarded = sum(1 for view, _title in tabs if self.browser.discard_tab(view))
+        if not discarded:
+            QMessageBox.information(
+                self, "Task Manager",
+                "Select a background tab's renderer. The visible tab cannot be discarded.")
+
+    def _end_selected(self):
+        pid = self._selected_pid()
+        if pid is None:
+            return
+        if not self.sampler.end_process(pid):
+            QMessageBox.information(
+                self, "Task Manager",
+                "That process cannot be ended from here. The browser process itself "
+                "is never terminated.")
+            return
+        self.refresh()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Background tab savings
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _format_duration(seconds):
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+
+
+class BackgroundSavingsDialog(QDialog):
+    """
+    What freezing hidden tabs has bought this session.
+
+    CPU figures are estimates: the rate a tab's renderer used while hidden,
+    before it was frozen, times how long it has stayed frozen.
+    """
+
+    COLUMNS = ("Tab", "Times frozen", "Time frozen", "CPU saved")
+
+    def __init__(self, rows, closed, total_saved, have_cpu=True, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Background Tab Savings")
+        self.setMinimumSize(560, 360)
+        layout = QVBoxLayout(self)
+
+        table = QTableWidget(len(rows), len(self.COLUMNS))
+        table.setHorizontalHeaderLabels(self.COLUMNS)
+        table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        table.verticalHeader().setVisible(False)
+        table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        for r, (title, freezes, seconds, saved) in enumerate(rows):
+            cells = (
+                _SortItem(title, title.lower()),
+                _SortItem(str(freezes), freezes),
+                _SortItem(_format_duration(seconds), seconds),
+                _SortItem(f"{saved:.1f} s", saved),
+            )
+            for c, item in enumerate(cells):
+                table.setItem(r, c, item)
+        table.setSortingEnabled(True)
+        layout.addWidget(table, 1)
+
+        if have_cpu:
+            text = f"Estimated CPU time saved: {total_saved:.1f} s"
+            if closed[0]:
+                text += f" (including {closed[2]:.1f} s from closed tabs)"
+        else:
+            text = "psutil is not installed — freeze times only, no CPU estimate."
+        summary = QLabel(text)
+        summary.setStyleSheet("color: #7d8b99; font-size: 11px;")
+        layout.addWidget(summary)
+
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(self.accept)
+        row = QHBoxLayout()
+        row.addStretch()
+        row.addWidget(close_btn)
+        layout.addLayout(row)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Built-in scripts
+# ─────────────────────────────────────────────────────────────────────────────
+
+class BuiltinScriptsDialog(QDialog):
+    """
+    The profile-wide page scripts: which run, where, and what they cost.
+
+    Timings are read from open tabs when the dialog opens or on Refresh.
+    Changes apply to pages loaded afterwards.
+    """
+
+    COLUMNS = ("Script", "World", "Injected", "Version", "Runs", "Started (ms)",
+               "Execute (ms)")
+
+    def __init__(self, browser, parent=None):
+        super().__init__(parent)
+        self.browser = browser
+        self.setWindowTitle("Built-in Scripts")
+        self.setMinimumSize(720, 320)
+        layout = QVBoxLayout(self)
+
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        layout.addWidget(self.table, 1)
+
+        note = QLabel("Unchecked scripts stop running on pages loaded from now on. "
+                      "Start time is measured from navigation; a failed run never finished.")
+        note.setWordWrap(True)
+        note.setStyleSheet("color: #7d8b99; font-size: 11px;")
+        layout.addWidget(note)
+
+        row = QHBoxLayout()
+        refresh_btn = QPushButton("Refresh Timings")
+        refresh_btn.clicked.connect(lambda: browser.collect_script_timings(self._populate))
+        ok_btn = QPushButton("Apply")
+        ok_btn.clicked.connect(self.accept)
+        cancel_btn = QPushButton("Cancel")
+        cancel_btn.clicked.connect(self.reject)
+        row.addWidget(refresh_btn)
+        row.addStretch()
+        row.addWidget(ok_btn)
+        row.addWidget(cancel_btn)
+        layout.addLayout(row)
+
+        self._populate()
+        browser.collect_script_timings(self._populate)
+
+    def _populate(self):
+        checked = self.choices() if self.table.rowCount() else {}
+        scripts = list(self.browser.user_scripts)
+        self.table.setRowCount(len(scripts))
+        for r, script in enumerate(scripts):
+            name = QTableWidgetItem(script.name)
+            name.setToolTip(script.description)
+            name.setData(Qt.ItemDataRole.UserRole, script.name)
+            if script.toggleable:
+                name.setFlags(name.flags() | Qt.ItemFlag.ItemIsUserCheckable)
+                on = checked.get(script.name, script.enabled)
+                name.setCheckState(Qt.CheckState.Checked if on else Qt.CheckState.Unchecked)
+            else:
+                name.setToolTip(f"{script.description} — always on")
+            stats = self.browser.script_timings.summary(script.name)
+            runs = str(stats["runs"])
+            if stats["failed"]:
+                runs += f" ({stats['failed']} failed)"
+            cells = (
+                name,
+                QTableWidgetItem(script.world),
+                QTableWidgetItem(script.injection),
+                QTableWidgetItem(script.version),
+                QTableWidgetItem(runs),
+                QTableWidgetItem("—" if stats["start_ms"] is None else f"{stats['start_ms']:.1f}"),
+                QTableWidgetItem("—" if stats["exec_ms"] is None else f"{stats['exec_ms']:.2f}"),
+            )
+            for c, item in enumerate(cells):
+                self.table.setItem(r, c, item)
+
+    def choices(self) -> dict:
+        """Script name → enabled, for the toggleable rows."""
+        out = {}
+        for r in range(self.table.rowCount()):
+            item = self.table.item(r, 0)
+            if item and item.flags() & Qt.ItemFlag.ItemIsUserCheckable:
+                out[item.data(Qt.ItemDataRole.UserRole)] = (
+                    item.checkState() == Qt.CheckState.Checked)
+        return out
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Command palette
+# ─────────────────────────────────────────────────────────────────────────────
+
+_PALETTE_MARKERS = {TAB: "⧉", ACTION: "▸", BOOKMARK: "★", HISTORY: "↺"}
+
+
+class CommandPalette(QDialog):
+    """
+    A search box over a PaletteIndex, re-ranked on every keystroke.
+
+    Up/Down move through the results without leaving the box; Enter hands
+    the chosen PaletteItem to `on_activate` and closes, Esc just closes.
+    """
+
+    def __init__(self, index, on_activate, parent=None):
+        super().__init__(parent)
+        self.index = index
+        self.on_activate = on_activate
+        self.setWindowTitle("Command Palette")
+        self.setWindowFlags(Qt.WindowType.Popup | Qt.WindowType.FramelessWindowHint)
+        self.setMinimumWidth(620)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(8, 8, 8, 8)
+
+        self.search_box = QLineEdit()
+        self.search_box.setPlaceholderText("Search tabs, actions, bookmarks and history…")
+        self.search_box.textChanged.connect(self._search)
+        self.search_box.returnPressed.connect(self._activate_current)
+        self.search_box.installEventFilter(self)
+        layout.addWidget(self.search_box)
+
+        self.results = QListWidget()
+        self.results.setMinimumHeight(320)
+        self.results.itemActivated.connect(lambda _item: self._activate_current())
+        layout.addWidget(self.results, 1)
+
+    def _search(self, text):
+        self.results.clear()
+        for _score, item in self.index.search(text):
+            marker = _PALETTE_MARKERS.get(item.kind, " ")
+            row = f"{marker}  {item.label}"
+            if item.detail and item.detail != item.label:
+                row += f"   —  {item.detail}"
+            entry = QListWidgetItem(row)
+            entry.setData(Qt.ItemDataRole.UserRole, item)
+            entry.setToolTip(item.detail or item.label)
+            self.results.addItem(entry)
+        if self.results.count():
+            self.results.setCurrentRow(0)
+
+    def eventFilter(self, obj, event):
+        if obj is self.search_box and event.type() == event.Type.KeyPress:
+            step = {Qt.Key.Key_Down: 1, Qt.Key.Key_Up: -1}.get(event.key())
+            if step and self.results.count():
+                row = (self.results.currentRow() + step) % self.results.count()
+                self.results.setCurrentRow(row)
+                return True
+        return super().eventFilter(obj, event)
+
+    def _activate_current(self):
+        entry = self.results.currentItem()
+        if entry is None:
+            return
+        item = entry.data(Qt.ItemDataRole.UserRole)
+        self.accept()
+        self.on_activate(item)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Reading list
+# ─────────────────────────────────────────────────────────────────────────────
+
+class ReadingListDialog(QDialog):
+    """Articles saved by reading mode; each opens from disk in a new tab."""
+
+    def __init__(self, reading_list, on_open, parent=None):
+        super().__init__(parent)
+        self.reading_list = reading_list
+        self.on_open = on_open
+        self.setWindowTitle("Reading List")
+        self.setMinimumSize(640, 400)
+        layout = QVBoxLayout(self)
+
+        self.table = QTableWidget(0, 3)
+        self.table.setHorizontalHeaderLabels(["Title", "Site", "Saved"])
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.table.doubleClicked.connect(self._open)
+        layout.addWidget(self.table, 1)
+
+        row = QHBoxLayout()
+        open_btn = QPushButton("Open")
+        open_btn.clicked.connect(self._open)
+        remove_btn = QPushButton("Remove")
+        remove_btn.clicked.connect(self._remove)
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(self.accept)
+        row.addWidget(open_btn)
+        row.addWidget(remove_btn)
+        row.addStretch()
+        row.addWidget(close_btn)
+        layout.addLayout(row)
+
+        self._populate()
+
+    def _populate(self):
+        entries = self.reading_list.entries()
+        self.table.setRowCount(len(entries))
+        for r, (url, title, site, saved) in enumerate(entries):
+            title_item = QTableWidgetItem(title or url)
+            title_item.setToolTip(url)
+            title_item.setData(Qt.ItemDataRole.UserRole, url)
+            when = datetime.datetime.fromtimestamp(saved).strftime("%Y-%m-%d %H:%M")
+            self.table.setItem(r, 0, title_item)
+            self.table.setItem(r, 1, QTableWidgetItem(site or urlparse(url).netloc))
+            self.table.setItem(r, 2, QTableWidgetItem(when))
+
+    def _selected_url(self):
+        row = self.table.currentRow()
+        item = self.table.item(row, 0) if row >= 0 else None
+        return item.data(Qt.ItemDataRole.UserRole) if item else None
+
+    def _open(self):
+        url = self._selected_url()
+        if url:
+            self.on_open(url)
+            self.accept()
+
+    def _remove(self):
+        url = self._selected_url()
+        if url:
+            self.reading_list.remove(url)
+            self._populate()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Visited page search
+# ─────────────────────────────────────────────────────────────────────────────
+
+class _PageSearchSignals(QObject):
+    counted = pyqtSignal(int, int)          # pages, bytes
+    found = pyqtSignal(int, object)         # generation, [Hit]
+
+
+class _PageSearchTask(QRunnable):
+    """Count the index (query None) or search it, on the global thread pool."""
+
+    def __init__(self, index, signals, generation=0, query=None):
+        super().__init__()
+        self.index = index
+        self.signals = signals
+        self.generation = generation
+        self.query = query
+
+    @pyqtSlot()
+    def run(self):
+        try:
+            if self.query is None:
+                self.signals.counted.emit(len(self.index), self.index.size_bytes())
+            else:
+                self.signals.found.emit(self.generation, self.index.search(self.query))
+        except Exception:
+            if self.query is not None:
+                self.signals.found.emit(self.generation, [])
+
+
+class PageSearchDialog(QDialog):
+    """
+    Search the local index of visited page text as you type.
+
+    Each keystroke searches on `pool` — the index may be busy adding a
+    page — and only the latest query's results are shown; nothing here
+    touches the network.
+    """
+
+    def __init__(self, index, on_open, enabled, pool, parent=None):
+        super().__init__(parent)
+        self.index = index
+        self.on_open = on_open
+        self.enabled = enabled
+        self.pool = pool
+        self._generation = 0
+        self._signals = _PageSearchSignals()
+        self._signals.counted.connect(self._show_count)
+        self._signals.found.connect(self._show_hits)
+        self.setWindowTitle("Search Visited Pages")
+        self.setMinimumSize(680, 460)
+        layout = QVBoxLayout(self)
+
+        self.search_box = QLineEdit()
+        self.search_box.setPlaceholderText(
+            "Words from the page…  add \"last week\", \"last month\", \"yesterday\"")
+        self.search_box.setClearButtonEnabled(True)
+        self.search_box.textChanged.connect(self._search)
+        self.search_box.returnPressed.connect(self._open)
+        layout.addWidget(self.search_box)
+
+        self.results = QListWidget()
+        self.results.setWordWrap(True)
+        self.results.itemActivated.connect(self._open)
+        layout.addWidget(self.results, 1)
+
+        self.status = QLabel()
+        self.status.setStyleSheet("color: #7d8b99; font-size: 11px;")
+        layout.addWidget(self.status)
+        self.pool.start(_PageSearchTask(index, self._signals))
+
+    def _show_count(self, count, size):
+        self.status.setText(
+            f"{count} pages indexed, {size / 1048576:.1f} MB."
+            + ("" if self.enabled else "  Indexing is off — turn it on under View."))
+
+    def _search(self, text):
+        self._generation += 1
+        self.pool.start(
+            _PageSearchTask(self.index, self._signals, self._generation, text))
+
+    def _show_hits(self, generation, hits):
+        if generation != self._generation:
+            return                          # typed on since: a newer search is coming
+        self.results.clear()
+        for hit in hits:
+            when = datetime.datetime.fromtimestamp(hit.visited).strftime("%Y-%m-%d")
+            item = QListWidgetItem(f"{hit.title or hit.url}\n{when}  {hit.url}\n{hit.snippet}")
+            item.setToolTip(hit.url)
+            item.setData(Qt.ItemDataRole.UserRole, hit.url)
+            self.results.addItem(item)
+        if self.results.count():
+            self.results.setCurrentRow(0)
+
+    def _open(self, *_):
+        item = self.results.currentItem()
+        if item is not None:
+            self.on_open(item.data(Qt.ItemDataRole.UserRole))
+            self.accept()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# HTTP cache
+# ─────────────────────────────────────────────────────────────────────────────
+
+class _CacheSignals(QObject):
+    done = pyqtSignal(object)
+
+
+class _CacheTask(QRunnable):
+    """Scan (or evict, then scan) the cache directory on the global thread pool."""
+
+    def __init__(self, root, signals, evict=None):
+        super().__init__()
+        self.root = root
+        self.signals = signals
+        self.evict = evict                  # (usage, site) or None
+
+    @pyqtSlot()
+    def run(self):
+        freed = left = 0
+        try:
+            if self.evict is not None:
+                freed, left = httpcache.evict_site(*self.evict)
+            usage = httpcache.scan_cache(self.root)
+        except Exception:
+            usage = None
+        self.signals.done.emit((usage, freed, left))
+
+
+class HttpCacheDialog(QDialog):
+    """
+    The HTTP cache: what kind, how large, and which sites fill it.
+
+    The cache directory is walked on `pool` when the dialog opens and
+    after each eviction. Type and size changes apply on Apply.
+    """
+
+    COLUMNS = ("Site", "Entries", "Size")
+    TYPES = (("Disk", httpcache.DISK), ("Memory only", httpcache.MEMORY),
+             ("None", httpcache.NONE))
+
+    def __init__(self, policy, cache_root, on_clear, pool, parent=None):
+        super().__init__(parent)
+        self.cache_root = cache_root
+        self.on_clear = on_clear
+        self.pool = pool
+        self.usage = None
+        self._busy = False
+        self._signals = _CacheSignals()
+        self._signals.done.connect(self._populate)
+        self.setWindowTitle("HTTP Cache")
+        self.setMinimumSize(560, 420)
+        layout = QVBoxLayout(self)
+
+        settings = QHBoxLayout()
+        self.type_box = QComboBox()
+        for label, value in self.TYPES:
+            self.type_box.addItem(label, value)
+        self.type_box.setCurrentIndex(self.type_box.findData(policy.cache_type))
+        self.size_box = QSpinBox()
+        self.size_box.setRange(httpcache.MIN_MB, httpcache.MAX_MB)
+        self.size_box.setSingleStep(64)
+        self.size_box.setSuffix(" MB")
+        self.size_box.setValue(policy.size_mb)
+        self.prewarm_box = QCheckBox("Prewarm top speed-dial sites when idle")
+        self.prewarm_box.setChecked(policy.prewarm)
+        self.prewarm_box.setToolTip("Loads each of the first speed-dial sites in the "
+                                    "background at most once a day. It is a real visit.")
+        settings.addWidget(QLabel("Type"))
+        settings.addWidget(self.type_box)
+        settings.addWidget(QLabel("Maximum"))
+        settings.addWidget(self.size_box)
+        settings.addStretch()
+        layout.addLayout(settings)
+        layout.addWidget(self.prewarm_box)
+
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.table.setSelectionMode(QTableWidget.SelectionMode.SingleSelection)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.setSortingEnabled(True)
+        layout.addWidget(self.table, 1)
+
+        self.summary = QLabel("Scanning…")
+        self.summary.setWordWrap(True)
+        self.summary.setStyleSheet("color: #7d8b99; font-size: 11px;")
+        layout.addWidget(self.summary)
+
+        row = QHBoxLayout()
+        self.evict_btn = QPushButton("Evict Site")
+        self.evict_btn.clicked.connect(self._evict)
+        clear_btn = QPushButton("Clear All")
+        clear_btn.clicked.connect(self._clear)
+        refresh_btn = QPushButton("Refresh")
+        refresh_btn.clicked.connect(lambda: self.refresh())
+        ok_btn = QPushButton("Apply")
+        ok_btn.clicked.connect(self.accept)
+        cancel_btn = QPushButton("Close")
+        cancel_btn.clicked.connect(self.reject)
+        for btn in (self.evict_btn, clear_btn, refresh_btn):
+            row.addWidget(btn)
+        row.addStretch()
+        row.addWidget(ok_btn)
+        row.addWidget(cancel_btn)
+        layout.addLayout(row)
+
+        self.refresh()
+
+    def refresh(self, evict=None):
+        if self._busy or not self.cache_root:
+            if not self.cache_root:
+                self.summary.setText("The cache is kept in memory; nothing on disk to show.")
+            return
+        self._busy = True
+        self.evict_btn.setEnabled(False)
+        self.pool.start(
+            _CacheTask(self.cache_root, self._signals, evict))
+
+    def _populate(self, result):
+        self._busy = False
+        self.evict_btn.setEnabled(True)
+        usage, freed, left = result
+        if usage is None:
+            self.summary.setText("The cache directory could not be read.")
+            return
+        self.usage = usage
+        sites = usage.sites()
+        self.table.setSortingEnabled(False)
+        self.table.setRowCount(len(sites))
+        for r, site in enumerate(sites):
+            cells = (
+                _SortItem(site.site, site.site),
+                _SortItem(str(site.entries), site.entries),
+                _SortItem(format_size(site.bytes), site.bytes),
+            )
+            for c, item in enumerate(cells):
+                self.table.setItem(r, c, item)
+        self.table.setSortingEnabled(True)
+        self.table.sortByColumn(2, Qt.SortOrder.DescendingOrder)
+        text = (f"{format_size(usage.total_bytes)} in {len(sites)} sites; "
+                f"{format_size(usage.unattributed_bytes)} not attributable to a site "
+                f"(index files, or the block-file cache format).")
+        if freed or left:
+            text = f"Freed {format_size(freed)}" + (
+                f", {left} files in use were left" if left else "") + ".  " + text
+        self.summary.setText(text)
+
+    def _evict(self):
+        row = self.table.currentRow()
+        if self.usage is None or row < 0:
+            return
+        site = self.table.item(row, 0).data(Qt.ItemDataRole.UserRole)
+        self.refresh(evict=(self.usage, site))
+
+    def _clear(self):
+        if QMessageBox.question(self, "Clear HTTP Cache",
+                                "Remove everything in the HTTP cache?") != \
+                QMessageBox.StandardButton.Yes:
+            return
+        self.on_clear()
+        # The engine clears asynchronously; look again once it has had a moment.
+        QTimer.singleShot(1500, lambda: self.refresh())
+
+    def policy(self):
+        """The settings as chosen in the dialog."""
+        return httpcache.CachePolicy(cache_type=self.type_box.currentData(),
+                                     size_mb=self.size_box.value(),
+                                     prewarm=self.prewarm_box.isChecked())
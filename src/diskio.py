@@ -0,0 +1,265 @@
+"""
+diskio.py  —  how segment workers put bytes on disk.
+
+DownloadWorker read the body 8 KB at a time and wrote each piece through
+a seek-positioned file object: a write syscall, a Python buffer copy and
+a progress signal per 8 KB, so a fast link spent more CPU in the write
+path than in the network. The file was "preallocated" by writing one
+zero byte at the end, which leaves it sparse and lets the filesystem
+fragment it as the segments fill in.
+
+Now:
+    • each worker reads larger pieces and gathers them in a reusable
+      buffer from a BufferPool; a full buffer (1 MB) goes to disk in one
+      os.pwrite at its absolute offset — no seek, no file-object buffer,
+      one syscall per megabyte. A buffer is also written when it has sat
+      for FLUSH_AFTER seconds, so progress on a slow link still moves;
+    • bytes are committed to the SegmentPlan — and reported — only once
+      they are written, exactly as before, just in bigger steps;
+    • the file's blocks are reserved up front with posix_fallocate where
+      the platform has it, and otherwise the file is extended to size;
+    • an fsync policy: "none" leaves it to the OS, "close" (the default)
+      syncs once when the download is complete, before its progress file
+      is removed, and "interval" also syncs every FSYNC_INTERVAL bytes.
+
+Backpressure: a worker writes its own buffers, synchronously, so while
+the disk is slower than the network the worker stops reading its socket
+and TCP flow control slows the sender; nothing piles up in memory. The
+pool caps how many buffers exist at once — across all downloads; a
+buffer goes back as soon as it is written, and a worker that finds the
+pool empty waits for one, ACQUIRE_WAIT at a time, for as long as it has
+not been told to stop. A stopped worker makes do with a buffer of its
+own, so it can write what it holds and return.
+
+Windows has no os.pwrite; there each worker's own descriptor is seeked
+and written, which is equivalent because no other thread shares it.
+
+No Qt imports: downloader.py owns the workers.
+"""
+
+import os
+import threading
+import time
+
+BUFFER_SIZE = 1024 * 1024
+READ_SIZE = 64 * 1024
+POOL_BUFFERS = 64
+FLUSH_AFTER = 0.5
+ACQUIRE_WAIT = 0.25
+FSYNC_INTERVAL = 64 * 1024 * 1024
+
+FSYNC_NONE = "none"
+FSYNC_CLOSE = "close"
+FSYNC_INTERVAL_POLICY = "interval"
+FSYNC_POLICIES = (FSYNC_NONE, FSYNC_CLOSE, FSYNC_INTERVAL_POLICY)
+
+
+def fsync_policy(value) -> str:
+    """`value` if it names a policy, else the default."""
+    value = str(value or "").strip().lower()
+    return value if value in FSYNC_POLICIES else FSYNC_CLOSE
+
+
+class BufferPool:
+    """
+    At most `count` bytearrays of `size` bytes, made on first need and
+    reused. acquire() blocks while all of them are out.
+    """
+
+    def __init__(self, size=BUFFER_SIZE, count=POOL_BUFFERS):
+        self.size = size
+        self.count = max(1, count)
+        self.made = 0
+        self.waits = 0                        # acquires that had to block
+        self._free = []
+        self._cond = threading.Condition()
+
+    def acquire(self, timeout=None):
+        """A buffer, or None if `timeout` passed with none free."""
+        with self._cond:
+            if not self._free and self.made >= self.count:
+                self.waits += 1
+                if not self._cond.wait_for(lambda: self._free, timeout):
+                    return None
+            if self._free:
+                return self._free.pop()
+            self.made += 1
+            return bytearray(self.size)
+
+    def release(self, buf):
+        with self._cond:
+            self._free.append(buf)
+            self._cond.notify()
+
+    @property
+    def in_use(self) -> int:
+        with self._cond:
+            return self.made - len(self._free)
+
+
+def open_for_write(path) -> int:
+    """A raw descriptor for writing into an existing file."""
+    return os.open(path, os.O_RDWR | getattr(os, "O_BINARY", 0))
+
+
+if hasattr(os, "pwrite"):
+    def pwrite(fd, data, offset):
+        """Write all of `data` at `offset`."""
+        view = memoryview(data)
+        while view:
+            n = os.pwrite(fd, view, offset)
+            view, offset = view[n:], offset + n
+else:                                           # Windows
+    def pwrite(fd, data, offset):
+        """Write all of `data` at `offset`. `fd` must not be shared between threads."""
+        os.lseek(fd, offset, os.SEEK_SET)
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+
+
+def preallocate(path, size) -> bool:
+    """
+    Create `path` at `size` bytes, truncating anything there. True when
+    the blocks were reserved (posix_fallocate), False when the file was
+    only extended and may be sparse.
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o644)
+    try:
+        if size > 0 and hasattr(os, "posix_fallocate"):
+            try:
+                os.posix_fallocate(fd, 0, size)
+                return True
+            except OSError:
+                pass                            # e.g. unsupported by the filesystem
+        os.ftruncate(fd, size)
+        return False
+    finally:
+        os.close(fd)
+
+
+def sync_file(path):
+    """Flush `path`'s data to the device."""
+    fd = open_for_write(path)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class SegmentWriter:
+    """
+    Gathers one worker's contiguous bytes and writes them a buffer at a
+    time. on_written(offset, count) runs after each write lands; on_data
+    (offset, data), if given, sees the bytes first, before the buffer goes
+    back to the pool. stopped(), if given, is the worker's stop flag: it
+    ends a wait for a pooled buffer.
+    """
+
+    def __init__(self, path, on_written, pool=None, fsync=FSYNC_CLOSE,
+                 flush_after=FLUSH_AFTER, fsync_interval=FSYNC_INTERVAL, clock=time.monotonic,
+                 on_data=None, stopped=None):
+        self.pool = pool or shared_pool()
+        self.on_written = on_written
+        self.on_data = on_data
+        self.stopped = stopped or (lambda: False)
+        self.fsync = fsync_policy(fsync)
+        self.flush_after = flush_after
+        self.fsync_interval = fsync_interval
+        self.clock = clock
+        self.fd = open_for_write(path)
+        self.writes = 0
+        self.unpooled = 0                       # buffers made outside the pool after a stop
+        self._buf = None
+        self._pooled = False
+        self._view = None
+        self._fill = 0
+        self._offset = 0                        # file offset of the buffer's first byte
+        self._since = 0.0                       # when the buffer got its first byte
+        self._unsynced = 0
+
+    def write(self, offset, data):
+        """Queue `data` for `offset`; a gap from the previous bytes writes those first."""
+        data = memoryview(data)
+        if self._fill and offset != self._offset + self._fill:
+            self.flush()
+        while data:
+            if self._buf is None:
+                self._buf, self._pooled = self._acquire()
+                self._view = memoryview(self._buf)
+            if not self._fill:
+                self._offset, self._since = offset, self.clock()
+            n = min(len(data), len(self._buf) - self._fill)
+            self._view[self._fill:self._fill + n] = data[:n]
+            self._fill += n
+            offset += n
+            data = data[n:]
+            if self._fill == len(self._buf):
+                self.flush()
+        if self._fill and self.clock() - self._since >= self.flush_after:
+            self.flush()
+
+    def flush(self):
+        """Write whatever is gathered and give the buffer back to the pool."""
+        if self._fill:
+            offset, count = self._offset, self._fill
+            try:
+                pwrite(self.fd, self._view[:count], offset)
+                if self.on_data is not None:
+                    with self._view[:count] as data:
+                        self.on_data(offset, data)
+            finally:
+                self._fill = 0
+                self._release()
+            self.writes += 1
+            self._unsynced += count
+            if self.fsync == FSYNC_INTERVAL_POLICY and self._unsynced >= self.fsync_interval:
+                os.fsync(self.fd)
+                self._unsynced = 0
+            self.on_written(offset, count)
+        self._release()
+
+    def _acquire(self):
+        """(buffer, pooled): from the pool, unless stopped while waiting."""
+        while not self.stopped():
+            buf = self.pool.acquire(ACQUIRE_WAIT)
+            if buf is not None:
+                return buf, True
+        self.unpooled += 1
+        return bytearray(self.pool.size), False
+
+    def _release(self):
+        if self._buf is not None:
+            self._view.release()
+            if self._pooled:
+                self.pool.release(self._buf)
+            self._buf = self._view = None
+
+    def close(self):
+        """Write the rest, return the buffer and close. Safe to call twice."""
+        try:
+            if self.fd is not None:
+                self.flush()
+        finally:
+            self._release()
+            if self.fd is not None:
+                os.close(self.fd)
+                self.fd = None
+
+    def discard(self):
+        """Close without writing what is gathered: it was never committed."""
+        self._fill = 0
+        self.close()
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_pool() -> BufferPool:
+    """The process-wide buffer pool every download draws from."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = BufferPool()
+        return _shared
@@ -8,12 +8,21 @@ from enum import Enum, auto
 from typing import Optional, Dict
 import collections
 import re
-from urllib.parse import urlparse, unquote
+import threading
+from urllib.parse import urlparse, unquote, urlsplit
 import urllib3
 
 from PyQt6.QtCore import QObject, pyqtSignal, QRunnable, pyqtSlot
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+
+import aioengine
+import diskio
+from hashing import StreamHasher
+from httppool import failover_pool, shared_pool
+from journal import SegmentJournal, read_journal
+from metalink import MirrorDropped, MirrorSet
+from progress import ByteCounter, Snapshot
+from ratelimit import priority_name, shared_shaper
+from segments import RangeSet, SegmentPlan
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
@@ -32,6 +41,16 @@ BROWSER_HEADERS = {
     'Connection': 'keep-alive',
 }
 
+# "threads": a QRunnable per segment. "asyncio": every segment on one
+# event-loop thread (aioengine.py), when aiohttp is installed.
+ENGINES = ("threads", "asyncio")
+DEFAULT_ENGINE = os.environ.get("BLACKLINE_DOWNLOAD_ENGINE", "threads")
+# When finished files are flushed to the device: "none", "close", "interval".
+DEFAULT_FSYNC = diskio.fsync_policy(os.environ.get("BLACKLINE_DOWNLOAD_FSYNC"))
+# How many times pieces that fail their hash are fetched again before the
+# download is reported as failed.
+MAX_REFETCH = 2
+
 class Status(Enum):
     PENDING = auto()
     STARTING = auto()
@@ -45,112 +64,209 @@ class Status(Enum):
 class WorkerSignals(QObject):
     finished = pyqtSignal()
     error = pyqtSignal(tuple)
-    chunk_downloaded = pyqtSignal(int)
+    mirror_failed = pyqtSignal(object, tuple)   # the worker, its error
     
+class CheckpointSignals(QObject):
+    finished = pyqtSignal()
+
 class ChecksumSignals(QObject):
-    finished = pyqtSignal(bool)
+    finished = pyqtSignal(bool, list)       # valid, byte ranges of bad pieces
     error = pyqtSignal(str)
 
 class CleanupWorker(QRunnable):
-    def __init__(self, progress_file):
+    def __init__(self, progress_files, sync_path=None):
         super().__init__()
-        self.progress_file = progress_file
+        self.progress_files = progress_files
+        self.sync_path = sync_path
 
     @pyqtSlot()
     def run(self):
         try:
-            if os.path.exists(self.progress_file):
-                os.remove(self.progress_file)
+            # The data reaches the device before the record of what is missing goes.
+            if self.sync_path:
+                diskio.sync_file(self.sync_path)
+            for progress_file in self.progress_files:
+                if os.path.exists(progress_file):
+                    os.remove(progress_file)
         except IOError as e:
             logger.error(f"Error during file cleanup: {e}")
 
+class CheckpointWorker(QRunnable):
+    """
+    Finishes a journal compaction begun by SegmentPlan.begin_checkpoint;
+    a whole file written and synced, so never inline.
+    """
+    def __init__(self, write):
+        super().__init__()
+        self.write = write
+        self.signals = CheckpointSignals()
+
+    @pyqtSlot()
+    def run(self):
+        try:
+            self.write()
+        except Exception as e:
+            logger.error(f"Journal compaction failed: {e}")
+        finally:
+            self.signals.finished.emit()
+
 class ChecksumWorker(QRunnable):
-    def __init__(self, file_path, expected_checksum):
+    """
+    Checks the finished file. With the download's StreamHasher most of the
+    hashing is already done and only the unhashed tail is read; without
+    one, the whole file is read back.
+    """
+    def __init__(self, file_path, expected_checksum, hasher=None):
         super().__init__()
         self.file_path = file_path
         self.expected_checksum = expected_checksum
+        self.hasher = hasher
         self.signals = ChecksumSignals()
 
     @pyqtSlot()
     def run(self):
         try:
-            with open(self.file_path, 'rb') as f:
-                file_hash = hashlib.sha256()
-                while chunk := f.read(8192):
-                    file_hash.update(chunk)
-                computed_checksum = file_hash.hexdigest()
-            is_valid = computed_checksum.lower() == self.expected_checksum.lower()
-            self.signals.finished.emit(is_valid)
+            bad_ranges = []
+            if self.hasher is not None:
+                computed_checksum = self.hasher.finish()
+                bad_ranges = self.hasher.bad_ranges()
+            else:
+                with open(self.file_path, 'rb') as f:
+                    file_hash = hashlib.sha256()
+                    while chunk := f.read(8192):
+                        file_hash.update(chunk)
+                    computed_checksum = file_hash.hexdigest()
+            is_valid = not bad_ranges and (
+                not self.expected_checksum or computed_checksum.lower() == self.expected_checksum.lower())
+            self.signals.finished.emit(is_valid, bad_ranges)
         except IOError as e:
             self.signals.error.emit(f"File error during checksum: {e}")
 
 class DownloadWorker(QRunnable):
-    def __init__(self, manager, url, file_path, start_byte, end_byte, headers):
+    """
+    Fetches one segment of the manager's SegmentPlan. The segment's end can
+    move closer while this runs — a split handed the rest to another
+    worker — so each chunk is claimed from the plan before it is written.
+    With a `mirror`, the segment comes from it and each write's timing is
+    reported to the manager's MirrorSet.
+    """
+    def __init__(self, manager, url, file_path, segment, headers, mirror=None):
         super().__init__()
         self.manager = manager
-        self.url = url
+        self.url = mirror.url if mirror is not None else url
         self.file_path = file_path
-        self.start_byte = start_byte
-        self.end_byte = end_byte
+        self.segment = segment
         self.headers = headers
+        self.mirror = mirror
         self.signals = WorkerSignals()
         self.is_stopped = False
+        self._mark = 0.0
+        self._wake = threading.Event()      # cuts a rate-limit wait short on stop
 
     @pyqtSlot()
     def run(self):
-        session = requests.Session()
-        retries = Retry(
-            total=5, read=5, connect=5,
-            backoff_factor=1.5,
-            status_forcelist=[429, 500, 502, 503, 504],
-        )
-        adapter = HTTPAdapter(max_retries=retries)
-        session.mount('http://', adapter)
-        session.mount('https://', adapter)
-        
-        current_pos = self.start_byte
-        if self.start_byte in self.manager.chunk_progress:
-            current_pos += self.manager.chunk_progress[self.start_byte]
-            
+        # Warm connections (and the retry policy) are shared per host. A
+        # mirror is not retried here: the manager moves its segment instead.
+        session = (failover_pool() if self.mirror is not None else shared_pool()).session()
+
+        plan = self.manager.plan
+        segment = self.segment
+        throttle = self.manager.throttle
+        host = urlsplit(self.url).hostname
+        out = None
+        self._mark = time.monotonic()
         try:
-            req_headers = {'Range': f'bytes={current_pos}-{self.end_byte}'}
-            req_headers.update(self.headers)
-            with session.get(self.url, headers=req_headers, stream=True, timeout=30, verify=False) as r:
-                r.raise_for_status()
-                with open(self.file_path, "r+b") as f:
-                    f.seek(current_pos)
-                    for chunk in r.iter_content(chunk_size=8192):
+            if segment.remaining:
+                req_headers = {'Range': f'bytes={segment.pos}-{segment.end - 1}'}
+                req_headers.update(self.headers)
+                with session.get(self.url, headers=req_headers, stream=True, timeout=30, verify=False) as r:
+                    r.raise_for_status()
+                    if segment.pos > 0 and r.status_code != 206:
+                        raise IOError("Server ignored the byte range request.")
+                    # Reads gather into pooled 1 MB buffers, each written with one
+                    # pwrite; bytes are committed and reported once written.
+                    hasher = self.manager.hasher
+                    out = diskio.SegmentWriter(self.file_path, self._written, fsync=self.manager.fsync,
+                                               on_data=hasher.written if hasher else None,
+                                               stopped=lambda: self.is_stopped)
+                    # Under a rate limit, reads shrink so each wait after one is short.
+                    for chunk in r.iter_content(chunk_size=throttle.read_size(host)):
                         if self.is_stopped or self.manager.status == Status.PAUSED:
+                            out.flush()
                             while self.manager.status == Status.PAUSED and not self.is_stopped:
                                 time.sleep(0.1)
-                            if self.is_stopped: return
-                        
-                        if chunk:
-                            f.write(chunk)
-                            self.signals.chunk_downloaded.emit(len(chunk))
-                            self.manager.chunk_progress[self.start_byte] = self.manager.chunk_progress.get(self.start_byte, 0) + len(chunk)
+                            if self.is_stopped:
+                                out.close()
+                                plan.retire(segment)
+                                return
+                            self._mark = time.monotonic()
+                        if self.mirror is not None and self.mirror.dropped:
+                            break
+
+                        if not chunk:
+                            continue
+                        offset, count = plan.claim(segment, len(chunk))
+                        if count:
+                            out.write(offset, chunk if count == len(chunk) else memoryview(chunk)[:count])
+                        delay = throttle.reserve(len(chunk), host)
+                        if count < len(chunk) or not segment.remaining:
+                            break           # at our end, wherever a split put it
+                        if delay:
+                            self._wake.wait(delay)
+                            self._mark += delay     # a mirror is not timed while we hold back
+                    out.close()
+                    if self.mirror is not None and self.mirror.dropped and segment.remaining:
+                        raise MirrorDropped("dropped as too slow")
+            # Retired before the signal, so the manager's next split skips it.
+            plan.retire(segment)
             self.signals.finished.emit()
         except (requests.RequestException, IOError) as e:
-            logger.error(f"Error in worker for chunk {self.start_byte}-{self.end_byte}: {e}")
-            self.signals.error.emit((type(e), e, e.__traceback__))
+            if out is not None:
+                try:
+                    out.close()             # keep what did arrive
+                except OSError:
+                    out.discard()
+            plan.retire(segment)
+            if not isinstance(e, MirrorDropped):
+                logger.error(f"Error in worker for segment {segment.start}-{segment.end - 1}: {e}")
+            if self.mirror is not None:
+                self.signals.mirror_failed.emit(self, (type(e), e, e.__traceback__))
+            else:
+                self.signals.error.emit((type(e), e, e.__traceback__))
+        finally:
+            if self.mirror is not None:
+                self.manager.mirrors.release(self.mirror)
+
+    def _written(self, offset, count):
+        # Counted, not signalled: the panel samples the counter on its own tick.
+        self.manager.plan.commit(offset, count)
+        self.manager.counter.add(count)
+        if self.mirror is not None:
+            now = time.monotonic()
+            self.manager.mirrors.report(self.mirror, offset, count, now - self._mark)
+            self._mark = now
 
     def stop(self):
         self.is_stopped = True
+        self._wake.set()
 
 class DownloadManager(QObject):
     progress_updated = pyqtSignal(str, int, int, float, str)
     download_finished = pyqtSignal(str, str)
     error_occurred = pyqtSignal(str, str)
 
-    def __init__(self, download_id: str, url: str, save_path: str, thread_pool, num_threads: int = 4, checksum: Optional[str] = None, headers: Optional[Dict] = None):
+    def __init__(self, download_id: str, url: str, save_path: str, thread_pool, num_threads: int = 4, checksum: Optional[str] = None, headers: Optional[Dict] = None, engine: Optional[str] = None, fsync: Optional[str] = None, pieces: Optional[tuple] = None, mirrors: Optional[list] = None, rate_limit: Optional[float] = None, priority: str = "normal"):
         super().__init__()
         self.download_id = download_id
         self.url = url
         self.save_path = save_path
         self.filename = os.path.basename(save_path)
         self.num_threads = num_threads
+        self.connections = num_threads      # what the scheduler granted this run
         self.thread_pool = thread_pool
         self.checksum = checksum
+        self.pieces = pieces                # (piece size, [SHA-256 hex per piece]), if known
+        self.mirror_urls = list(mirrors or [])  # more URLs for the same file
         self.headers = headers or BROWSER_HEADERS
         
         self.total_size = 0
@@ -161,12 +277,44 @@ class DownloadManager(QObject):
         self.downloaded_at_start = 0
         self.status = Status.PENDING
         self.traceback_info = ""
-        self.progress_file = f"{self.save_path}.progress"
-        self.last_save_time = 0
+        self.journal_file = f"{self.save_path}.journal"
+        self.progress_file = f"{self.save_path}.progress"     # JSON, before the journal
+        self.journal: Optional[SegmentJournal] = None
+        self.checkpointing = False          # a CheckpointWorker is running
+        self.close_after_checkpoint = False
         self.server_etag = None
         self.server_last_modified = None
         self.speed_history = collections.deque(maxlen=10)
-        self.chunk_progress: Dict[int, int] = {}
+        self.completed_ranges = RangeSet()
+        self.plan: Optional[SegmentPlan] = None
+        self.counter = ByteCounter()
+        engine = engine or DEFAULT_ENGINE
+        if engine == "asyncio" and not aioengine.available():
+            logger.warning("aiohttp is not installed; downloading with threads.")
+            engine = "threads"
+        self.engine = engine if engine in ENGINES else "threads"
+        self.job: Optional[aioengine.AsyncDownload] = None
+        self.fsync = diskio.fsync_policy(fsync) if fsync else DEFAULT_FSYNC
+        self.splittable = True
+        self.hasher: Optional[StreamHasher] = None
+        self.refetches = 0
+        self.mirrors: Optional[MirrorSet] = None
+        # Every worker of this download reads through the process-wide shaper.
+        self.throttle = shared_shaper().throttle(rate_limit, priority)
+
+    @property
+    def rate_limit(self) -> Optional[float]:
+        return self.throttle.rate
+
+    @property
+    def priority(self) -> str:
+        return priority_name(self.throttle.priority)
+
+    def set_rate_limit(self, rate: Optional[float]):
+        self.throttle.set_rate(rate)
+
+    def set_priority(self, priority: str):
+        self.throttle.set_priority(priority)
 
     def set_status(self, new_status: Status):
         if self.status != new_status:
@@ -175,6 +323,17 @@ class DownloadManager(QObject):
             self.update_progress()
 
     def load_progress(self):
+        state = read_journal(self.journal_file)
+        if state is not None:
+            meta = state.meta
+            if meta.get('url') != self.url or meta.get('save_path') != self.save_path: return False
+            if self.server_etag and meta.get('etag') != self.server_etag: return False
+            self.total_size = state.total_size
+            self.completed_ranges = state.ranges
+            self.downloaded_size = self.completed_ranges.total()
+            logger.info(f"Resuming download. Loaded progress: {self.downloaded_size} bytes"
+                        + (" (journal cut short; the rest is fetched again)" if state.torn else ""))
+            return True
         if os.path.exists(self.progress_file):
             try:
                 with open(self.progress_file, 'r') as f:
@@ -183,8 +342,12 @@ class DownloadManager(QObject):
                 if self.server_etag and data.get('etag') != self.server_etag: return False
                 
                 self.total_size = data.get('total_size', 0)
-                self.chunk_progress = {int(k): v for k, v in data.get('chunk_progress', {}).items()}
-                self.downloaded_size = sum(self.chunk_progress.values())
+                if 'ranges' in data:
+                    self.completed_ranges = RangeSet.from_list(data['ranges'])
+                else:
+                    # Written before dynamic segments: offsets of the fixed layout.
+                    self.completed_ranges = RangeSet.from_chunk_progress(data.get('chunk_progress'))
+                self.downloaded_size = self.completed_ranges.total()
                 
                 logger.info(f"Resuming download. Loaded progress: {self.downloaded_size} bytes")
                 return True
@@ -193,20 +356,65 @@ class DownloadManager(QObject):
         return False
 
     def save_progress(self):
+        # Every write is already journalled; this folds the records together.
         if self.status in [Status.DOWNLOADING, Status.PAUSED]:
-            try:
-                with open(self.progress_file, 'w') as f:
-                    json.dump({
-                        'url': self.url, 'save_path': self.save_path,
-                        'total_size': self.total_size, 'etag': self.server_etag,
-                        'last_modified': self.server_last_modified,
-                        'chunk_progress': self.chunk_progress
-                    }, f, indent=4)
-            except IOError as e:
-                logger.error(f"Failed to save progress: {e}")
-
-    def start(self):
+            self.checkpoint()
+
+    def checkpoint(self, close: bool = False):
+        """
+        Compact the journal on the pool, one compaction at a time; asked
+        for while one runs, it is left to that one. With `close`, the
+        journal is closed once the compaction is done.
+        """
+        if close:
+            self.close_after_checkpoint = True
+        if not self.checkpointing and self.plan is not None:
+            write = self.plan.begin_checkpoint()
+            if write is not None:
+                self.checkpointing = True
+                worker = CheckpointWorker(write)
+                worker.signals.finished.connect(self.on_checkpoint_finished)
+                self.thread_pool.start(worker)
+        if self.close_after_checkpoint and not self.checkpointing:
+            self.close_journal()
+
+    def on_checkpoint_finished(self):
+        self.checkpointing = False
+        if self.close_after_checkpoint:
+            self.close_journal()
+
+    def open_journal(self, ranges=None):
+        self.close_journal()
+        journal = SegmentJournal(self.journal_file, self.total_size, {
+            'url': self.url, 'save_path': self.save_path,
+            'etag': self.server_etag, 'last_modified': self.server_last_modified,
+        })
+        try:
+            journal.open(self.plan.done if ranges is None else ranges)
+        except OSError as e:
+            logger.error(f"Failed to start progress journal: {e}")
+            return
+        self.journal = journal
+        if self.plan is not None:
+            self.plan.journal = journal
+
+    def close_journal(self):
+        self.close_after_checkpoint = False
+        if self.journal is None:
+            return
+        if self.plan is not None:
+            self.plan.journal = None
+        self.journal.close()
+        if self.journal.error:
+            logger.error(f"Progress journal stopped recording: {self.journal.error}")
+        self.journal = None
+
+    def start(self, connections: Optional[int] = None):
+        # The panel's scheduler may grant fewer connections than num_threads asks for.
+        self.connections = max(1, min(connections or self.num_threads, self.num_threads))
         self.set_status(Status.STARTING)
+        # The URL probed for size and identity is the first mirror; segments go to all of them.
+        self.mirrors = MirrorSet([self.url] + self.mirror_urls) if self.mirror_urls else None
         fetcher_signals = MetadataFetcherSignals()
         fetcher = MetadataFetcher(self.url, self.headers, fetcher_signals)
         fetcher_signals.metadata_fetched.connect(self.handle_metadata_fetched)
@@ -221,20 +429,35 @@ class DownloadManager(QObject):
         if self.total_size <= 0:
             self.handle_metadata_error("Could not determine file size.")
             return
-        if accept_ranges != 'bytes':
-            self.num_threads = 1
+        self.splittable = accept_ranges == 'bytes'
+        if not self.splittable:
+            self.num_threads = self.connections = 1
 
         if not (os.path.exists(self.save_path) and self.load_progress()):
             self.downloaded_size = 0
-            self.chunk_progress = {}
+            self.completed_ranges = RangeSet()
             try:
-                with open(self.save_path, 'wb') as f:
-                    f.seek(self.total_size - 1)
-                    f.write(b'\0')
-            except (IOError, OSError):
+                diskio.preallocate(self.save_path, self.total_size)
+            except OSError:
                 with open(self.save_path, 'wb') as f: pass
-
-        if self.downloaded_size >= self.total_size:
+        self.begin_transfer()
+
+    def begin_transfer(self):
+        # Without range support there is only one request, from byte 0,
+        # and the plan forgets any earlier progress.
+        self.plan = SegmentPlan(self.total_size, self.completed_ranges, splittable=self.splittable)
+        segments = self.plan.initial(self.connections)
+        self.counter.drain()                # anything left from an earlier attempt
+        self.downloaded_size = self.plan.downloaded
+        self.open_journal()
+        self.hasher = None
+        if self.checksum or self.pieces:
+            # Hashed as it is written; what is already on disk is read back as the hash reaches it.
+            piece_size, expected = self.pieces or (None, None)
+            self.hasher = StreamHasher(self.save_path, self.total_size, RangeSet(self.plan.done),
+                                       piece_size, expected)
+
+        if self.plan.complete():
             self.finish_download()
             return
 
@@ -242,108 +465,151 @@ class DownloadManager(QObject):
         self.downloaded_at_start = self.downloaded_size
         self.set_status(Status.DOWNLOADING)
 
-        # --- FIX: Added detailed logging and a robust fail-safe ---
         logger.debug(f"[{self.filename}] Preparing workers. Total: {self.total_size}, Downloaded: {self.downloaded_size}")
-        logger.debug(f"[{self.filename}] Chunk progress map: {self.chunk_progress}")
+        logger.debug(f"[{self.filename}] Segments: {segments}")
 
         self.active_workers = 0
-        chunk_size = self.total_size // self.num_threads
-        for i in range(self.num_threads):
-            start = i * chunk_size
-            end = start + chunk_size - 1 if i < self.num_threads - 1 else self.total_size - 1
-            
-            chunk_total = end - start + 1
-            chunk_downloaded = self.chunk_progress.get(start, 0)
-            logger.debug(f"[{self.filename}] Checking chunk {i}: start={start}, size={chunk_total}, downloaded={chunk_downloaded}")
-
-            if chunk_downloaded < chunk_total:
-                logger.debug(f"[{self.filename}] Starting worker for chunk {i}.")
-                worker = DownloadWorker(self, self.url, self.save_path, start, end, self.headers)
-                worker.signals.chunk_downloaded.connect(self.on_chunk_downloaded)
-                worker.signals.finished.connect(self.on_worker_finished)
-                worker.signals.error.connect(self.on_worker_error)
-                self.workers.append(worker)
-                self.active_workers += 1
-                self.thread_pool.start(worker)
-            else:
-                logger.debug(f"[{self.filename}] Chunk {i} is already complete.")
-        
-        # FAIL-SAFE: If no workers were started but the download is incomplete, recover.
-        if self.active_workers == 0 and self.downloaded_size < self.total_size:
-            logger.warning(
-                f"[{self.filename}] No workers started but download is incomplete! "
-                f"Total: {self.total_size}, Downloaded: {self.downloaded_size}. "
-                "This can indicate a corrupted progress file. "
-                "FAIL-SAFE: Falling back to a fresh, single-threaded download."
-            )
-            # Nuke progress and restart cleanly
-            self.chunk_progress = {}
-            self.downloaded_size = 0
-            self.downloaded_at_start = 0
-            self.speed_history.clear()
-            try:
-                if os.path.exists(self.progress_file): os.remove(self.progress_file)
-                with open(self.save_path, 'wb') as f:
-                    if self.total_size > 0: f.seek(self.total_size - 1); f.write(b'\0')
-            except (IOError, OSError) as e:
-                logger.error(f"Fail-safe could not reset file: {e}")
-
-            # Start a single worker for the whole file
-            worker = DownloadWorker(self, self.url, self.save_path, 0, self.total_size - 1, self.headers)
-            worker.signals.chunk_downloaded.connect(self.on_chunk_downloaded)
-            worker.signals.finished.connect(self.on_worker_finished)
-            worker.signals.error.connect(self.on_worker_error)
-            self.workers.append(worker)
-            self.active_workers = 1
-            self.thread_pool.start(worker)
-        
-        elif self.active_workers == 0:
-            self.finish_download()
+        if self.engine == "asyncio":
+            self.start_job(segments)
+            return
+        for segment in segments:
+            self.start_worker(segment)
+
+    def start_job(self, segments):
+        # The whole download is one "worker" to the rest of the manager:
+        # the job splits segments itself and reports once, at the end.
+        signals = WorkerSignals()
+        signals.finished.connect(self.on_worker_finished)
+        signals.error.connect(self.on_worker_error)
+        self.job = aioengine.shared_engine().start(
+            self.url, self.save_path, self.plan, segments, self.headers,
+            on_bytes=self.counter.add,
+            on_data=self.hasher.written if self.hasher else None,
+            mirrors=self.mirrors,
+            throttle=self.throttle,
+            on_done=signals.finished.emit,
+            on_error=lambda e: signals.error.emit((type(e), e, e.__traceback__)))
+        self.job.signals = signals          # kept alive with the job
+        self.workers.append(self.job)
+        self.active_workers = 1
+
+    def start_worker(self, segment):
+        mirror = self.mirrors.pick() if self.mirrors is not None else None
+        worker = DownloadWorker(self, self.url, self.save_path, segment, self.headers, mirror)
+        worker.signals.finished.connect(self.on_worker_finished)
+        worker.signals.error.connect(self.on_worker_error)
+        worker.signals.mirror_failed.connect(self.on_mirror_failed)
+        self.workers.append(worker)
+        self.active_workers += 1
+        self.thread_pool.start(worker)
     
     def handle_metadata_error(self, error_message):
         self.traceback_info = error_message
         self.error_occurred.emit(self.download_id, f"Metadata Error: {error_message}")
         self.set_status(Status.ERROR)
 
-    def on_chunk_downloaded(self, size: int):
-        self.downloaded_size += size
-        current_time = time.time()
-        if current_time - self.last_save_time > 1.0:
-            self.save_progress()
-            self.last_save_time = current_time
-        self.update_progress()
+    def collect(self):
+        """Take in the bytes workers have written since the last call."""
+        self.downloaded_size += self.counter.drain()
+
+    def sample(self) -> Snapshot:
+        """Progress as of now; called on the panel's timer."""
+        self.collect()
+        if self.plan is not None and self.plan.checkpoint_due():
+            self.checkpoint()
+        return self.snapshot()
 
     def on_worker_finished(self):
         self.active_workers -= 1
+        if self.status == Status.DOWNLOADING and self.plan is not None:
+            # A connection is free: it takes the back half of the segment
+            # with the most left, so no range drags on alone.
+            segment = self.plan.split_largest()
+            if segment is not None:
+                logger.debug(f"[{self.filename}] Split off {segment} for a free worker.")
+                self.start_worker(segment)
+                return
         if self.active_workers <= 0 and self.status == Status.DOWNLOADING:
             self.finish_download()
 
+    def on_mirror_failed(self, worker, error_tuple):
+        # The rest of the segment goes to another mirror while any is left.
+        mirror = worker.mirror
+        if not mirror.dropped:
+            self.mirrors.fail(mirror)
+        if self.status != Status.DOWNLOADING or not self.mirrors.live:
+            self.on_worker_error(error_tuple)
+            return
+        logger.warning(f"[{self.filename}] {mirror.url}: {error_tuple[1]}; moving its segment to another mirror.")
+        rest = self.plan.handoff(worker.segment)
+        if rest is None:
+            self.on_worker_finished()
+            return
+        self.active_workers -= 1
+        self.start_worker(rest)
+
     def finish_download(self):
-        self.save_progress()
+        # No compaction: every write is on record, and a finished file's
+        # journal is deleted, or rewritten if pieces fail their hash.
+        self.close_journal()
+        if self.plan is not None:
+            self.counter.drain()
+            self.downloaded_size = self.plan.downloaded
         if self.downloaded_size < self.total_size:
             self.on_worker_error((RuntimeError, RuntimeError("Download finished with incomplete data."), None))
             return
 
-        if self.checksum:
+        if self.checksum or self.hasher is not None:
             self.set_status(Status.VERIFYING)
-            checksum_worker = ChecksumWorker(self.save_path, self.checksum)
+            checksum_worker = ChecksumWorker(self.save_path, self.checksum, self.hasher)
             checksum_worker.signals.finished.connect(self.on_verification_finished)
             checksum_worker.signals.error.connect(self.on_verification_error)
             self.thread_pool.start(checksum_worker)
         else:
             self.set_status(Status.COMPLETED)
             self.download_finished.emit(self.download_id, self.filename)
-            self.thread_pool.start(CleanupWorker(self.progress_file))
+            self.thread_pool.start(self.completed_cleanup())
 
-    def on_verification_finished(self, is_valid: bool):
+    def completed_cleanup(self):
+        sync_path = None if self.fsync == diskio.FSYNC_NONE else self.save_path
+        return CleanupWorker([self.journal_file, self.progress_file], sync_path)
+
+    def on_verification_finished(self, is_valid: bool, bad_ranges: list):
+        self.hasher = None
         if is_valid:
             self.set_status(Status.COMPLETED)
             self.download_finished.emit(self.download_id, self.filename)
-            self.thread_pool.start(CleanupWorker(self.progress_file))
+            self.thread_pool.start(self.completed_cleanup())
+            return
+        if bad_ranges:
+            # Only the pieces that failed are fetched again, here or on a retry.
+            self.forget_ranges(bad_ranges)
+            if self.mirrors is not None:
+                for mirror in self.mirrors.blame(bad_ranges):
+                    logger.warning(f"[{self.filename}] {mirror.url} sent data that failed its piece hash.")
+            if self.refetches < MAX_REFETCH and (self.mirrors is None or self.mirrors.live):
+                self.refetches += 1
+                logger.warning(f"[{self.filename}] {len(bad_ranges)} piece(s) failed their hash; "
+                               f"fetching them again ({self.refetches}/{MAX_REFETCH}).")
+                self.workers.clear()
+                self.active_workers = 0
+                self.job = None
+                self.begin_transfer()
+                return
+            self.traceback_info = f"Checksum verification failed: {len(bad_ranges)} piece(s) did not match."
         else:
             self.traceback_info = "Checksum verification failed."
-            self.error_occurred.emit(self.download_id, self.traceback_info)
-            self.set_status(Status.ERROR)
+        self.error_occurred.emit(self.download_id, self.traceback_info)
+        self.set_status(Status.ERROR)
+
+    def forget_ranges(self, ranges):
+        """Mark `ranges` as not downloaded, in memory and in the journal."""
+        self.completed_ranges = RangeSet(self.plan.done) if self.plan is not None else self.completed_ranges
+        for start, end in ranges:
+            self.completed_ranges.remove(start, end)
+        self.downloaded_size = self.completed_ranges.total()
+        self.open_journal(self.completed_ranges)
+        self.close_journal()
 
     def on_verification_error(self, error_message: str):
         self.traceback_info = error_message
@@ -356,8 +622,12 @@ class DownloadManager(QObject):
         self.error_occurred.emit(self.download_id, self.traceback_info)
         self.set_status(Status.ERROR)
         self.stop_all_workers()
+        self.checkpoint(close=True)         # what did arrive is kept for a retry
 
     def update_progress(self):
+        self.progress_updated.emit(*self.snapshot())
+
+    def snapshot(self) -> Snapshot:
         speed = 0
         if self.start_time and self.status == Status.DOWNLOADING:
             elapsed = time.time() - self.start_time
@@ -369,42 +639,52 @@ class DownloadManager(QObject):
             if self.speed_history:
                 speed = sum(self.speed_history) / len(self.speed_history)
         
-        self.progress_updated.emit(
+        return Snapshot(
             self.download_id, self.downloaded_size, self.total_size, speed, self.status.name.capitalize()
         )
 
     def pause(self):
         if self.status == Status.DOWNLOADING:
+            self.collect()
             self.set_status(Status.PAUSED)
+            if self.job is not None:
+                self.job.pause()
             self.save_progress()
 
     def resume(self):
         if self.status == Status.PAUSED:
+            self.collect()
             self.start_time = time.time()
             self.downloaded_at_start = self.downloaded_size
             self.speed_history.clear()
             self.set_status(Status.DOWNLOADING)
+            if self.job is not None:
+                self.job.resume()
 
     def stop(self):
         if self.status not in [Status.STOPPED, Status.COMPLETED, Status.ERROR]:
             self.set_status(Status.STOPPED)
             self.stop_all_workers()
-            self.thread_pool.start(CleanupWorker(self.progress_file))
+            self.close_journal()
+            self.thread_pool.start(CleanupWorker([self.journal_file, self.progress_file]))
     
     def stop_all_workers(self):
         for worker in self.workers:
             worker.stop()
 
-    def retry(self):
+    def retry(self, connections: Optional[int] = None):
         if self.status in [Status.ERROR, Status.STOPPED]:
             logger.info(f"Retrying download {self.download_id}")
             self.workers.clear()
             self.active_workers = 0
             self.traceback_info = ""
+            self.refetches = 0
             if self.status == Status.STOPPED:
                 self.downloaded_size = 0
-                self.chunk_progress = {}
-            self.start()
+                self.completed_ranges = RangeSet()
+            self.plan = None
+            self.job = None
+            self.start(connections)
 
 class MetadataFetcherSignals(QObject):
     metadata_fetched = pyqtSignal(int, str, str, str, str)
@@ -419,13 +699,9 @@ class MetadataFetcher(QRunnable):
 
     @pyqtSlot()
     def run(self):
-        session = requests.Session()
-        session.headers.update(self.headers)
-        retries = Retry(total=3, backoff_factor=1)
-        adapter = HTTPAdapter(max_retries=retries)
-        session.mount('http://', adapter)
-        session.mount('https://', adapter)
-        
+        # The probe's connection stays in the pool for the segments after it.
+        session = shared_pool().session(self.headers)
+
         try:
             response = session.head(self.url, allow_redirects=True, timeout=30, verify=False)
             response.raise_for_status()
@@ -0,0 +1,120 @@
+"""
+favicons.py  —  site icons kept locally, served as blackline-icon://<host>.
+
+The new-tab page asked DuckDuckGo, then Google, then the site itself for
+every tile's icon on every open: a round trip per tile before the grid
+looked finished, a third party told which sites are on the speed dial, and
+the reason file:// content had to be allowed to reach remote URLs at all.
+
+Icons are now captured where the browser already has them — a tab's
+iconChanged, after the page supplied one — and kept in a BlobCache keyed
+by host. The page and the history and bookmark dialogs ask for
+blackline-icon://github.com and get the PNG from memory or one small file.
+A host that has never been visited misses, and the page falls back to its
+remote chain and then its monogram, as before.
+
+Hosts are keyed without "www." so the icon seen on www.example.com serves
+example.com too. Icons expire after a month, so a site that changes its
+icon is picked up again; a capture identical to the stored one is not
+written again. Private tabs capture nothing; the caller checks.
+
+Only the browser and internal pages may load blackline-icon:// — a web
+page that could would learn which sites were visited — and only with GET;
+the scheme handler refuses anything else before looking in the cache.
+
+No Qt imports: browser.py encodes the icon and owns the scheme handler.
+"""
+
+import time
+from urllib.parse import urlsplit
+
+from blobcache import BlobCache
+
+SCHEME = "blackline-icon"
+
+MAX_ICON_BYTES = 32 * 1024        # a 32 px PNG is a few KB; more is not an icon
+MAX_ENTRIES = 2000
+MAX_BYTES = 4 * 1024 * 1024
+MAX_AGE = 30 * 86400
+MEMORY_BYTES = 512 * 1024
+REFRESH_AGE = 86400               # re-store an unchanged icon at most daily
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def icon_host(url) -> str:
+    """The cache key for an http(s) page URL or a bare host; "" if none."""
+    text = str(url or "").strip()
+    if "://" in text:
+        try:
+            parts = urlsplit(text)
+            if parts.scheme not in ("http", "https", SCHEME):
+                return ""
+            host = parts.hostname or ""
+        except ValueError:
+            return ""
+    elif ":" in text:
+        return ""                              # about:, javascript:, data: …
+    else:
+        host = text.split("/", 1)[0]
+    host = host.strip(".").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    # A host is letters, digits, dots and hyphens (IDNs arrive as punycode).
+    if not host or not all(c.isalnum() or c in ".-" for c in host) or not host.isascii():
+        return ""
+    return host
+
+
+def icon_url(page_url) -> str:
+    """blackline-icon://<host> for `page_url`, or "" when it has no host."""
+    host = icon_host(page_url)
+    return f"{SCHEME}://{host}" if host else ""
+
+
+def is_png(data) -> bool:
+    return bytes(data[:8]) == _PNG_SIGNATURE
+
+
+class FaviconCache:
+    """PNG icons by host, bounded in count, bytes and age."""
+
+    def __init__(self, root, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES,
+                 max_age=MAX_AGE, memory_bytes=MEMORY_BYTES):
+        self.blobs = BlobCache(root, max_bytes, max_entries, max_age, memory_bytes,
+                               suffix=".png")
+
+    def __len__(self):
+        return len(self.blobs)
+
+    def store(self, page_url, png, now=None) -> bool:
+        """
+        Keep `png` as the icon for `page_url`'s host. False if it was not
+        stored: no host, not a PNG, too large, or the disk refused.
+        """
+        host = icon_host(page_url)
+        png = bytes(png or b"")
+        if not host or not is_png(png) or len(png) > MAX_ICON_BYTES:
+            return False
+        now = time.time() if now is None else now
+        stored = self.blobs.stored_at(host)
+        if (stored is not None and now - stored < REFRESH_AGE
+                and self.blobs.get(host, now) == png):
+            return True                        # same icon, recently stored
+        # Storing again also restarts its month, for icons still in use.
+        return self.blobs.put(host, png, now)
+
+    def lookup(self, host_or_url, now=None):
+        """The PNG for a host (or a page or blackline-icon URL), or None."""
+        host = icon_host(host_or_url)
+        return self.blobs.get(host, now) if host else None
+
+    def remove(self, host_or_url) -> bool:
+        host = icon_host(host_or_url)
+        return self.blobs.remove(host) if host else False
+
+    def clear(self):
+        self.blobs.clear()
+
+    def flush(self):
+        self.blobs.flush()
@@ -0,0 +1,441 @@
+"""
+fulltext.py  —  an opt-in, on-disk full-text index of visited pages.
+
+History keeps a timestamp and a URL. Finding "that article about tidal
+power from last month" from that means guessing at titles, or going back
+to a search engine. With indexing switched on, the text of every page an
+ordinary tab finishes loading (page.toPlainText) is added to a local
+inverted index, and searching it never touches the network.
+
+Layout. One SQLite file, because the index has to change a page at a time:
+rewriting a JSON postings file on every load would cost more as it grew.
+    docs      one row per distinct page text: its SHA-256, its length in
+              terms, what it costs on disk, and the text itself, compressed,
+              for snippets;
+    pages     URL → doc, with title and last visit. Several URLs may share a
+              doc: the same text under a tracking parameter is stored and
+              tokenised once;
+    postings  (term, doc) → count, clustered by term, so a query reads only
+              the rows for its own terms.
+
+Adding a page hashes its text first. Text already in the index costs one
+row update; only new text is tokenised and written, on a worker thread,
+outside the lock. The whole index is kept under a byte budget: when a write
+takes it over, the docs least recently visited go first, with their pages
+and postings.
+
+Queries are ranked, not filtered: a page matching more of the terms always
+ranks above one matching fewer, then BM25 decides, then recency. Vague
+recall ("that article about …") still finds the page even though it never
+says "article". The last term also matches as a prefix, for typing. Time
+words — today, yesterday, this/last week, month, year — narrow by last
+visit instead of being searched for.
+
+Private tabs are never indexed; the caller applies should_record_history.
+
+No Qt imports: browser.py owns the worker threads.
+"""
+
+import hashlib
+import math
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+import zlib
+from collections import Counter
+from pathlib import Path
+
+DEFAULT_BUDGET = 64 * 1024 * 1024   # bytes on disk, all docs together
+MAX_TEXT_CHARS = 200_000            # of a page's text; the rest is boilerplate or a dump
+MAX_RESULTS = 20
+MIN_TERM, MAX_TERM = 2, 40
+PREFIX_TERMS = 50                   # terms a partial last word may expand to
+SNIPPET_CHARS = 160
+
+DAY = 86400.0
+
+# Bytes a posting row costs beyond its term, for the budget.
+_POSTING_OVERHEAD = 12
+
+# BM25 constants: the usual ones.
+_K1, _B = 1.2, 0.75
+
+_TOKEN = re.compile(r"\w+")
+
+_STOPWORDS = frozenset("""
+a an and are as at be but by for from had has have he her his i in is it its
+me my not of on or our she so that the their them then there these they this
+to was we were what when where which who will with you your about
+""".split())
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    id      INTEGER PRIMARY KEY,
+    digest  TEXT UNIQUE NOT NULL,
+    length  INTEGER NOT NULL,
+    bytes   INTEGER NOT NULL,
+    body    BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pages (
+    url     TEXT PRIMARY KEY,
+    doc     INTEGER NOT NULL,
+    title   TEXT NOT NULL,
+    visited REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_doc ON pages(doc);
+CREATE TABLE IF NOT EXISTS postings (
+    term    TEXT NOT NULL,
+    doc     INTEGER NOT NULL,
+    tf      INTEGER NOT NULL,
+    PRIMARY KEY (term, doc)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_doc ON postings(doc);
+"""
+
+
+# ── text ─────────────────────────────────────────────────────────────────
+
+def normalise(text) -> str:
+    """NFKC-normalised, case-folded text: full-width and ligature forms match plain ones."""
+    return unicodedata.normalize("NFKC", text or "").casefold()
+
+
+def terms_of(text):
+    """Indexable words of `text`, in order: folded, 2–40 chars, no stopwords."""
+    return [t for t in _TOKEN.findall(normalise(text))
+            if MIN_TERM <= len(t) <= MAX_TERM and t not in _STOPWORDS]
+
+
+def text_digest(text) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def parse_query(text, now=None):
+    """
+    (terms, since, prefix) for a search box entry.
+
+    Time words become `since`, a Unix time, or None when there are none.
+    `prefix` is the last term when the entry does not end in a space: it is
+    still being typed.
+    """
+    now = time.time() if now is None else now
+    words = _TOKEN.findall(normalise(text))
+    since = None
+    terms = []
+    typing = None                         # the last word, if it was kept as a term
+    i = 0
+    while i < len(words):
+        word = words[i]
+        nxt = words[i + 1] if i + 1 < len(words) else ""
+        typing = None
+        if word == "today":
+            since = _start_of_day(now)
+        elif word == "yesterday":
+            since = _start_of_day(now) - DAY
+        elif word in ("last", "past", "this") and nxt in _SPANS:
+            since = now - _SPANS[nxt]
+            i += 1
+        elif MIN_TERM <= len(word) <= MAX_TERM and word not in _STOPWORDS:
+            terms.append(word)
+            typing = word
+        i += 1
+    prefix = typing if typing and not text[-1].isspace() else None
+    return terms, since, prefix
+
+
+# "last month" looks back a month from now, not to the 1st.
+_SPANS = {"week": 7 * DAY, "month": 31 * DAY, "year": 366 * DAY}
+
+
+def _start_of_day(now):
+    t = time.localtime(now)
+    return time.mktime((t.tm_year, t.tm_mon, t.tm_mday, 0, 0, 0, 0, 0, -1))
+
+
+def snippet(text, terms, width=SNIPPET_CHARS) -> str:
+    """A window of `text` around the first of `terms` it contains."""
+    if not text:
+        return ""
+    folded = normalise(text)
+    at = -1
+    if len(folded) == len(text):          # folding kept offsets; search the folded text
+        for term in terms:
+            m = re.search(r"\b" + re.escape(term), folded)
+            if m and (at < 0 or m.start() < at):
+                at = m.start()
+    start = max(0, at - width // 3) if at >= 0 else 0
+    piece = " ".join(text[start:start + width].split())
+    if start > 0:
+        piece = "…" + piece
+    if start + width < len(text):
+        piece += "…"
+    return piece
+
+
+# ── index ────────────────────────────────────────────────────────────────
+
+class Hit:
+    """One search result: the page, when it was last seen, and why it matched."""
+    __slots__ = ("url", "title", "visited", "snippet", "score")
+
+    def __init__(self, url, title, visited, snippet="", score=0.0):
+        self.url = url
+        self.title = title
+        self.visited = visited
+        self.snippet = snippet
+        self.score = score
+
+    def __repr__(self):
+        return f"Hit({self.url!r}, {self.score:.2f})"
+
+
+class FullTextIndex:
+    """
+    The index in one SQLite file at `path`.
+
+    Workers add while the UI thread searches, so every public method holds
+    the lock around its use of the connection; tokenising happens outside
+    it. A file that is not a usable database is replaced by an empty one:
+    the index can always be rebuilt by browsing, history cannot.
+    """
+
+    def __init__(self, path, budget=DEFAULT_BUDGET):
+        self.path = Path(path)
+        self.budget = budget
+        self.evicted = 0
+        self._lock = threading.Lock()
+        self._db = None
+
+    # connection
+
+    def _conn(self):
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                self._db = self._open()
+            except sqlite3.DatabaseError:
+                for suffix in ("", "-wal", "-shm", "-journal"):
+                    try:
+                        Path(str(self.path) + suffix).unlink()
+                    except OSError:
+                        pass
+                self._db = self._open()
+        return self._db
+
+    def _open(self):
+        db = sqlite3.connect(str(self.path), check_same_thread=False)
+        try:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.executescript(_SCHEMA)
+        except sqlite3.DatabaseError:
+            db.close()
+            raise
+        return db
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    # writing
+
+    def add(self, url, title, text, visited=None) -> bool:
+        """
+        Index `text` as the content of `url`. False when nothing was stored:
+        no words, or the database could not be written.
+        """
+        text = (text or "")[:MAX_TEXT_CHARS]
+        title = title or ""
+        visited = time.time() if visited is None else visited
+        digest = text_digest(text)
+        try:
+            with self._lock:
+                db = self._conn()
+                row = db.execute("SELECT id FROM docs WHERE digest=?", (digest,)).fetchone()
+                if row is not None:                  # same text: just the page row
+                    with db:
+                        self._point(db, url, row[0], title, visited)
+                    return True
+            # New text: the expensive part runs without the lock.
+            counts = Counter(terms_of(title + "\n" + text))
+            if not counts:
+                return False
+            body = zlib.compress(text.encode("utf-8"), 6)
+            size = len(body) + sum(len(t) + _POSTING_OVERHEAD for t in counts)
+            with self._lock:
+                db = self._conn()
+                with db:
+                    row = db.execute("SELECT id FROM docs WHERE digest=?",
+                                     (digest,)).fetchone()
+                    if row is None:                  # nobody beat us to it
+                        doc = db.execute(
+                            "INSERT INTO docs (digest, length, bytes, body) VALUES (?, ?, ?, ?)",
+                            (digest, sum(counts.values()), size, body)).lastrowid
+                        db.executemany("INSERT INTO postings (term, doc, tf) VALUES (?, ?, ?)",
+                                       ((t, doc, n) for t, n in counts.items()))
+                    else:
+                        doc = row[0]
+                    self._point(db, url, doc, title, visited)
+                    self._enforce_budget(db)
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _point(self, db, url, doc, title, visited):
+        old = db.execute("SELECT doc FROM pages WHERE url=?", (url,)).fetchone()
+        db.execute("INSERT OR REPLACE INTO pages (url, doc, title, visited) VALUES (?, ?, ?, ?)",
+                   (url, doc, title, visited))
+        if old is not None and old[0] != doc:
+            self._drop_if_orphan(db, old[0])
+
+    def _drop_if_orphan(self, db, doc):
+        if db.execute("SELECT 1 FROM pages WHERE doc=? LIMIT 1", (doc,)).fetchone() is None:
+            db.execute("DELETE FROM postings WHERE doc=?", (doc,))
+            db.execute("DELETE FROM docs WHERE id=?", (doc,))
+
+    def _enforce_budget(self, db):
+        total = db.execute("SELECT COALESCE(SUM(bytes), 0) FROM docs").fetchone()[0]
+        if total <= self.budget:
+            return
+        # Evict down to 90% so the next few pages do not each trigger a pass.
+        target = self.budget * 0.9
+        rows = db.execute("""
+            SELECT docs.id, docs.bytes FROM docs
+            LEFT JOIN pages ON pages.doc = docs.id
+            GROUP BY docs.id ORDER BY COALESCE(MAX(pages.visited), 0), docs.id
+        """).fetchall()
+        for doc, size in rows:
+            if total <= target:
+                break
+            db.execute("DELETE FROM pages WHERE doc=?", (doc,))
+            db.execute("DELETE FROM postings WHERE doc=?", (doc,))
+            db.execute("DELETE FROM docs WHERE id=?", (doc,))
+            total -= size
+            self.evicted += 1
+
+    def remove(self, url) -> bool:
+        try:
+            with self._lock:
+                db = self._conn()
+                with db:
+                    row = db.execute("SELECT doc FROM pages WHERE url=?", (url,)).fetchone()
+                    if row is None:
+                        return False
+                    db.execute("DELETE FROM pages WHERE url=?", (url,))
+                    self._drop_if_orphan(db, row[0])
+                return True
+        except sqlite3.Error:
+            return False
+
+    def clear(self) -> bool:
+        try:
+            with self._lock:
+                db = self._conn()
+                with db:
+                    db.execute("DELETE FROM postings")
+                    db.execute("DELETE FROM pages")
+                    db.execute("DELETE FROM docs")
+                db.execute("VACUUM")
+                return True
+        except sqlite3.Error:
+            return False
+
+    # reading
+
+    def __len__(self):
+        """Pages indexed."""
+        try:
+            with self._lock:
+                return self._conn().execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+        except sqlite3.Error:
+            return 0
+
+    def size_bytes(self) -> int:
+        """What the budget counts: compressed text plus postings."""
+        try:
+            with self._lock:
+                return self._conn().execute(
+                    "SELECT COALESCE(SUM(bytes), 0) FROM docs").fetchone()[0]
+        except sqlite3.Error:
+            return 0
+
+    def search(self, query, limit=MAX_RESULTS, now=None):
+        """Pages for `query`, best first; see parse_query for the syntax."""
+        terms, since, prefix = parse_query(query, now)
+        if not terms:
+            return []
+        try:
+            with self._lock:
+                return self._search(self._conn(), terms, since, prefix, limit)
+        except sqlite3.Error:
+            return []
+
+    def _search(self, db, terms, since, prefix, limit):
+        n_docs = db.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+        if not n_docs:
+            return []
+        avg_len = db.execute("SELECT AVG(length) FROM docs").fetchone()[0] or 1.0
+
+        # doc -> [terms matched, bm25]
+        scores = {}
+        for i, term in enumerate(dict.fromkeys(terms)):
+            if term == prefix:
+                expansions = [row[0] for row in db.execute(
+                    "SELECT DISTINCT term FROM postings WHERE term >= ? AND term < ? LIMIT ?",
+                    (term, term + "\uffff", PREFIX_TERMS))]
+            else:
+                expansions = [term]
+            best = {}                              # per doc, the best expansion's weight
+            for word in expansions:
+                rows = db.execute(
+                    "SELECT postings.doc, postings.tf, docs.length FROM postings "
+                    "JOIN docs ON docs.id = postings.doc WHERE postings.term=?",
+                    (word,)).fetchall()
+                idf = math.log(1 + (n_docs - len(rows) + 0.5) / (len(rows) + 0.5))
+                for doc, tf, length in rows:
+                    w = idf * tf * (_K1 + 1) / (tf + _K1 * (1 - _B + _B * length / avg_len))
+                    if w > best.get(doc, 0.0):
+                        best[doc] = w
+            for doc, w in best.items():
+                entry = scores.setdefault(doc, [0, 0.0])
+                entry[0] += 1
+                entry[1] += w
+        if not scores:
+            return []
+
+        # Every URL showing a matching doc; a doc's newest visit dates it.
+        pages = {}
+        docs = list(scores)
+        for start in range(0, len(docs), 500):
+            chunk = docs[start:start + 500]
+            marks = ",".join("?" * len(chunk))
+            for url, doc, title, visited in db.execute(
+                    f"SELECT url, doc, title, visited FROM pages WHERE doc IN ({marks})", chunk):
+                pages.setdefault(doc, []).append((visited, url, title))
+
+        newest = max((max(p)[0] for p in pages.values()), default=0.0)
+        ranked = []
+        for doc, (matched, bm25) in scores.items():
+            if doc not in pages:
+                continue
+            visited, url, title = max(pages[doc])
+            if since is not None and visited < since:
+                continue
+            # A gentle lift for recent pages, within a month of the newest.
+            recency = 1.0 / (1.0 + max(0.0, newest - visited) / (30 * DAY))
+            ranked.append(((matched, bm25 + 0.5 * recency), doc, url, title, visited))
+        ranked.sort(key=lambda r: r[0], reverse=True)
+
+        hits = []
+        for (matched, score), doc, url, title, visited in ranked[:limit]:
+            body = db.execute("SELECT body FROM docs WHERE id=?", (doc,)).fetchone()[0]
+            try:
+                text = zlib.decompress(body).decode("utf-8")
+            except (zlib.error, UnicodeDecodeError):
+                text = ""
+            hits.append(Hit(url, title, visited, snippet(text, terms), matched + score))
+        return hits
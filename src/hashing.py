@@ -0,0 +1,150 @@
+"""
+hashing.py  —  a download's SHA-256, computed while it arrives.
+
+A download with a checksum ended with ChecksumWorker reading the whole
+file back in 8 KB blocks: on a multi-gigabyte file, as much disk I/O
+again as the download itself, with the file already complete and the
+user waiting. And a mismatch said only "wrong": the one way on was to
+start again from zero.
+
+StreamHasher keeps a running SHA-256 over the file's prefix:
+    • a write that lands exactly where the hash has got to is hashed from
+      the buffer it came in — no disk read at all. With dynamic segments
+      the first segment is almost always this one. A write just past
+      bytes already on disk reads those back first, then is hashed from
+      its buffer too;
+    • bytes written further on are remembered as ranges; once the prefix
+      reaches them they are read back from the file, where they are
+      usually still in the page cache. Each call reads back at most
+      LOOKBEHIND bytes, so no worker stalls long behind the hash;
+    • finish() reads back only what is still unhashed, which for a fresh
+      download is little or nothing, and returns the digest;
+    • with expected piece hashes (a piece size and one SHA-256 per piece,
+      as a metalink gives), every piece is also hashed as the stream
+      passes it, and bad_ranges() names the pieces that do not match, so
+      only those are fetched again.
+
+One thread hashes at a time; a call that finds the hash busy records
+its range and leaves, and the busy thread or a later call picks it up.
+
+No Qt imports: downloader.py feeds it from the workers.
+"""
+
+import hashlib
+import threading
+
+from segments import RangeSet
+
+LOOKBEHIND = 8 * 1024 * 1024
+READ_SIZE = 1024 * 1024
+
+
+class StreamHasher:
+    """SHA-256 of `path` (`total_size` bytes), fed as writes land."""
+
+    def __init__(self, path, total_size, done=None, piece_size=None, expected_pieces=None,
+                 lookbehind=LOOKBEHIND):
+        self.path = str(path)
+        self.total_size = total_size
+        self.lookbehind = lookbehind
+        self.piece_size = piece_size if expected_pieces and piece_size else None
+        self.expected_pieces = [p.lower() for p in expected_pieces or ()] if self.piece_size else []
+        self.piece_digests = []
+        self.fed_bytes = 0                  # hashed straight from the write buffers
+        self.reread_bytes = 0               # hashed after reading them back
+        self._sha = hashlib.sha256()
+        self._piece = hashlib.sha256() if self.piece_size else None
+        self._pos = 0
+        self._done = RangeSet(done or ())   # on disk: where the hash may read
+        self._busy = False
+        self._lock = threading.Lock()
+
+    @property
+    def position(self) -> int:
+        """Bytes hashed so far, all from the start of the file."""
+        return self._pos
+
+    def written(self, offset, data):
+        """`data` is now on disk at `offset`."""
+        end = offset + len(data)
+        with self._lock:
+            self._done.add(offset, end)
+            if self._busy:
+                return
+            self._busy = True
+        try:
+            if self._pos < offset:
+                # Read up to these bytes first, so they can still come from the buffer.
+                self._catch_up(self.lookbehind, offset)
+            if offset <= self._pos < end:
+                self.fed_bytes += end - self._pos
+                self._update(memoryview(data)[self._pos - offset:])
+            self._catch_up(self.lookbehind)
+        finally:
+            with self._lock:
+                self._busy = False
+
+    def finish(self) -> str:
+        """Hash whatever is left from disk; the file's hex digest."""
+        with self._lock:
+            self._done.add(0, self.total_size)     # the download is complete
+            self._busy = True
+        try:
+            self._catch_up(None)
+        finally:
+            with self._lock:
+                self._busy = False
+        return self._sha.hexdigest()
+
+    def bad_ranges(self):
+        """Byte ranges of the pieces whose hash is not the expected one."""
+        bad = []
+        for i, expected in enumerate(self.expected_pieces):
+            if i >= len(self.piece_digests) or self.piece_digests[i] != expected:
+                start = i * self.piece_size
+                bad.append((start, min(start + self.piece_size, self.total_size)))
+        return bad
+
+    # ── internals: only one thread at a time gets here ───────────────────
+
+    def _catch_up(self, budget, limit=None):
+        """Read back and hash what is on disk past the hash: `budget` bytes, not past `limit`."""
+        with self._lock:
+            frontier = self._frontier()
+        if budget is not None:
+            frontier = min(frontier, self._pos + budget)
+        if limit is not None:
+            frontier = min(frontier, limit)
+        if frontier <= self._pos:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._pos)
+            while self._pos < frontier:
+                chunk = f.read(min(READ_SIZE, frontier - self._pos))
+                if not chunk:
+                    raise IOError(f"{self.path} is shorter than the bytes written to it.")
+                self.reread_bytes += len(chunk)
+                self._update(chunk)
+
+    def _frontier(self) -> int:
+        for start, end in self._done:
+            if start <= self._pos < end:
+                return end
+            if start > self._pos:
+                break
+        return self._pos
+
+    def _update(self, data):
+        self._sha.update(data)
+        if self._piece is not None:
+            data = memoryview(data)
+            while data:
+                room = self.piece_size - self._pos % self.piece_size
+                self._piece.update(data[:room])
+                self._pos += min(room, len(data))
+                data = data[room:]
+                if self._pos % self.piece_size == 0 or self._pos == self.total_size:
+                    self.piece_digests.append(self._piece.hexdigest())
+                    self._piece = hashlib.sha256()
+        else:
+            self._pos += len(data)
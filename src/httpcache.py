@@ -0,0 +1,282 @@
+"""
+httpcache.py  —  the profile's HTTP cache: its settings, what is in it, by site.
+
+_configure_profile never said what kind of HTTP cache to keep or how big,
+so the engine picked for us: a disk cache sized by heuristics that suit a
+casual browser, not one that goes back to the same handful of sites all
+day. A full cache silently evicts what is reused most.
+
+CachePolicy holds the three choices, flat in settings.json like the rest:
+    http_cache_type      "disk", "memory" or "none"
+    http_cache_mb        the maximum size, MIN_MB … MAX_MB
+    http_cache_prewarm   load the top speed-dial sites in the background at
+                         idle, at most once per PREWARM_EVERY each (off by
+                         default: it is a real visit, cookies and all)
+    http_cache_prewarmed when each site was last loaded, kept by Prewarmer
+                         so the once-a-day limit holds across restarts
+
+scan_cache() says where the space went. Chromium's simple cache backend
+(Linux, macOS) keeps each entry as <hash>_0, <hash>_1 and <hash>_s files,
+and _0 starts with a header holding the entry's key — the URL, preceded
+by the top-frame site when the cache is split per site ("_dk_https://a.com
+https://a.com https://cdn.b/x.js"). Each entry is counted against the site
+that loaded it: the top-frame site if there is one, the URL's host if not.
+Files it cannot attribute — the index, or the block-file backend Windows
+builds use — are reported as unattributed, never guessed at.
+
+evict_site() deletes one site's entry files. The engine treats an entry
+whose files have gone as a miss and drops it from its index, so this is
+safe while the browser runs; a file the engine holds open (Windows) is
+left and reported as not freed.
+
+Scanning reads one small header per entry and runs on a worker; browser.py
+owns the profile, the timers and the hidden pages that prewarm.
+"""
+
+import os
+import re
+import struct
+import time
+from pathlib import Path
+
+from favicons import icon_host
+
+DISK, MEMORY, NONE = "disk", "memory", "none"
+CACHE_TYPES = (DISK, MEMORY, NONE)
+
+MIN_MB = 16
+MAX_MB = 8192
+
+PREWARM_SITES = 4                  # speed-dial tiles, in dial order
+PREWARM_EVERY = 20 * 3600          # per site: once a day, whenever the day starts
+PREWARM_IDLE_MS = 60_000           # no page loads for this long
+PREWARM_TIMEOUT_MS = 20_000        # a hidden load that takes longer is abandoned
+
+UNATTRIBUTED = ""
+
+# Chromium net/disk_cache/simple/simple_entry_format.h
+_SIMPLE_MAGIC = 0xfcfb6d1ba7725c30
+_SIMPLE_HEADER = struct.Struct("<QIII4x")          # magic, version, key length, key hash
+_MAX_KEY = 64 * 1024
+_ENTRY_FILE = re.compile(r"^([0-9a-f]{16})_(0|1|s)$")
+_KEY_URL = re.compile(r"https?://\S+")
+
+
+class CachePolicy:
+    """What HTTP cache the profiles keep. Bad settings fall back to defaults."""
+
+    __slots__ = ("cache_type", "size_mb", "prewarm")
+
+    DEFAULTS = {
+        "cache_type": DISK,
+        "size_mb": 512,
+        "prewarm": False,
+    }
+
+    # settings.json keys, flat like the rest of the file.
+    SETTINGS_KEYS = {
+        "cache_type": "http_cache_type",
+        "size_mb": "http_cache_mb",
+        "prewarm": "http_cache_prewarm",
+    }
+
+    def __init__(self, **values):
+        for name, default in self.DEFAULTS.items():
+            setattr(self, name, values.get(name, default))
+
+    @classmethod
+    def from_settings(cls, settings):
+        settings = settings if isinstance(settings, dict) else {}
+        values = {}
+        raw = settings.get(cls.SETTINGS_KEYS["cache_type"])
+        values["cache_type"] = raw if raw in CACHE_TYPES else cls.DEFAULTS["cache_type"]
+        values["size_mb"] = clamp_size_mb(settings.get(cls.SETTINGS_KEYS["size_mb"],
+                                                       cls.DEFAULTS["size_mb"]))
+        values["prewarm"] = bool(settings.get(cls.SETTINGS_KEYS["prewarm"],
+                                              cls.DEFAULTS["prewarm"]))
+        return cls(**values)
+
+    def to_settings(self) -> dict:
+        return {key: getattr(self, name) for name, key in self.SETTINGS_KEYS.items()}
+
+    @property
+    def max_bytes(self) -> int:
+        return self.size_mb * 1024 * 1024
+
+
+def clamp_size_mb(value) -> int:
+    try:
+        mb = int(value)
+    except (TypeError, ValueError):
+        return CachePolicy.DEFAULTS["size_mb"]
+    return min(max(mb, MIN_MB), MAX_MB)
+
+
+def site_of_key(key) -> str:
+    """
+    The site an HTTP cache key is charged to: the top-frame site of a
+    split key, else the resource's own host. "" if the key has no URL.
+    """
+    m = _KEY_URL.search(str(key or ""))
+    return icon_host(m.group(0)) if m else ""
+
+
+def read_entry_key(path):
+    """The key stored at the start of a simple-cache _0 file, or None."""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(_SIMPLE_HEADER.size)
+            if len(head) < _SIMPLE_HEADER.size:
+                return None
+            magic, _version, key_length, _key_hash = _SIMPLE_HEADER.unpack(head)
+            if magic != _SIMPLE_MAGIC or not 0 < key_length <= _MAX_KEY:
+                return None
+            key = f.read(key_length)
+    except OSError:
+        return None
+    if len(key) != key_length:
+        return None
+    return key.decode("utf-8", "replace")
+
+
+class SiteUsage:
+    __slots__ = ("site", "bytes", "entries", "paths")
+
+    def __init__(self, site):
+        self.site = site
+        self.bytes = 0
+        self.entries = 0
+        self.paths = []
+
+
+class CacheUsage:
+    """Disk use of one cache directory, by site. Built by scan_cache()."""
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.by_site = {}                  # site -> SiteUsage; "" is unattributed
+        self.total_bytes = 0
+        self.scanned_at = time.time()
+
+    def _add(self, site, size, path, entry):
+        usage = self.by_site.get(site)
+        if usage is None:
+            usage = self.by_site[site] = SiteUsage(site)
+        usage.bytes += size
+        usage.entries += entry
+        usage.paths.append(path)
+        self.total_bytes += size
+
+    @property
+    def unattributed_bytes(self) -> int:
+        usage = self.by_site.get(UNATTRIBUTED)
+        return usage.bytes if usage else 0
+
+    def sites(self):
+        """Attributed sites, largest first."""
+        return sorted((u for s, u in self.by_site.items() if s != UNATTRIBUTED),
+                      key=lambda u: (-u.bytes, u.site))
+
+    def get(self, site):
+        return self.by_site.get(icon_host(site) or site)
+
+
+def scan_cache(root) -> CacheUsage:
+    """Walk `root` and charge every file to a site. Worker thread."""
+    usage = CacheUsage(root)
+    entries = {}                           # hash -> [(path, size)]
+    for dirpath, _dirs, files in os.walk(root):
+        for name in files:
+            path = os.path.join(dirpath, name)
+            try:
+                size = os.stat(path).st_size
+            except OSError:
+                continue                   # evicted while we looked
+            m = _ENTRY_FILE.match(name)
+            if m:
+                entries.setdefault((dirpath, m.group(1)), []).append((path, size))
+            else:
+                usage._add(UNATTRIBUTED, size, path, 0)
+    for (dirpath, entry_hash), files in entries.items():
+        key = read_entry_key(os.path.join(dirpath, entry_hash + "_0"))
+        site = site_of_key(key) if key is not None else UNATTRIBUTED
+        for n, (path, size) in enumerate(files):
+            usage._add(site, size, path, 1 if n == 0 else 0)
+    return usage
+
+
+def evict_site(usage, site):
+    """
+    Delete `site`'s entry files found by the scan. (bytes freed, files
+    left behind) — a file the engine holds open cannot be removed.
+    """
+    found = usage.get(site)
+    if found is None or found.site == UNATTRIBUTED:
+        return 0, 0
+    freed = left = 0
+    for path in found.paths:
+        try:
+            size = os.stat(path).st_size
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+        except OSError:
+            left += 1
+            continue
+        freed += size
+    usage.by_site.pop(found.site, None)
+    usage.total_bytes -= found.bytes
+    return freed, left
+
+
+class Prewarmer:
+    """Which speed-dial sites to load at idle, so their first visit hits the cache."""
+
+    SETTINGS_KEY = "http_cache_prewarmed"
+
+    def __init__(self, limit=PREWARM_SITES, every=PREWARM_EVERY):
+        self.limit = limit
+        self.every = every
+        self._warmed = {}                  # site -> when it was last loaded
+        self.loads = 0
+
+    @classmethod
+    def from_settings(cls, settings, **kwargs):
+        warm = cls(**kwargs)
+        settings = settings if isinstance(settings, dict) else {}
+        saved = settings.get(cls.SETTINGS_KEY)
+        for site, when in (saved.items() if isinstance(saved, dict) else ()):
+            if isinstance(site, str) and isinstance(when, (int, float)):
+                warm._warmed[site] = float(when)
+        return warm
+
+    def to_settings(self, now=None) -> dict:
+        """Sites loaded within `every`; an older load is due again either way."""
+        now = time.time() if now is None else now
+        return {self.SETTINGS_KEY: {site: round(when) for site, when in self._warmed.items()
+                                    if now - when < self.every}}
+
+    def plan(self, urls, now=None):
+        """The first `limit` tile URLs not loaded within `every`, in order."""
+        now = time.time() if now is None else now
+        due, seen = [], set()
+        for url in urls or ():
+            site = icon_host(url)
+            if not site or site in seen or not str(url).startswith(("http://", "https://")):
+                continue
+            seen.add(site)
+            if len(seen) > self.limit:
+                break
+            last = self._warmed.get(site)
+            if last is None or now - last >= self.every:
+                due.append(url)
+        return due
+
+    def mark(self, url, now=None):
+        """Record a load of `url`'s site — by the prewarmer or by a visit."""
+        site = icon_host(url)
+        if site:
+            self._warmed[site] = time.time() if now is None else now
+
+    def warmed(self, url) -> bool:
+        return icon_host(url) in self._warmed
@@ -0,0 +1,171 @@
+"""
+httppool.py  —  one set of warm connections per host, shared by every download.
+
+Every DownloadWorker and MetadataFetcher built its own requests.Session
+with its own HTTPAdapter. Each segment therefore opened a new TCP
+connection and did a full TLS handshake before its first byte, a retry
+could not reuse the connection that had just worked, and the probe's
+connection was dropped moments before the segments asked the same server
+for the same file.
+
+ConnectionPool keeps one HTTPAdapter (one urllib3 connection pool) per
+scheme, host and port, for the whole process:
+    • sessions from session() route every request through it, redirects
+      to other hosts included, so probes, segments and retries all draw
+      on the same keep-alive connections;
+    • each host keeps up to `per_host` idle connections; more may be open
+      at once, and the extra ones are closed when returned rather than
+      queued;
+    • at most `max_hosts` hosts are kept; the least recently used is
+      closed. Closing drops only idle connections, so a transfer still
+      running on one is never cut off;
+    • closing a session closes nothing shared.
+
+What is reused is the connection itself: a request on a warm connection
+pays neither the TCP nor the TLS handshake. A new connection to the same
+host does a full handshake; urllib3 does not resume TLS sessions.
+
+Retries belong to the adapter, so every request to a host shares one
+policy (RETRY). Downloads spread over mirrors use failover_pool(), which
+does not retry: a mirror that fails is better left for another at once
+than waited on through a minute of backoff. A response that is closed
+before its body is read — a segment stopped at a split — takes its
+connection with it.
+
+Thread-safe. shared_pool() and failover_pool() are process-wide instances.
+"""
+
+import threading
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from urllib3.util.retry import Retry
+
+PER_HOST = 16
+MAX_HOSTS = 32
+
+RETRY = dict(total=5, read=5, connect=5, backoff_factor=1.5,
+             status_forcelist=[429, 500, 502, 503, 504])
+NO_RETRY = dict(total=0, read=0, connect=0, redirect=5, status_forcelist=[])
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def pool_key(url):
+    """(scheme, host, port) for `url`, or None if it is not http(s)."""
+    try:
+        parts = urlsplit(str(url or ""))
+        port = parts.port
+    except ValueError:
+        return None
+    scheme = parts.scheme.lower()
+    if scheme not in _DEFAULT_PORTS or not parts.hostname:
+        return None
+    return scheme, parts.hostname.lower(), port or _DEFAULT_PORTS[scheme]
+
+
+class _PoolRouter(BaseAdapter):
+    """Sends each request through the pool's adapter for its host."""
+
+    def __init__(self, pool):
+        super().__init__()
+        self.pool = pool
+
+    def send(self, request, **kwargs):
+        return self.pool.adapter_for(request.url).send(request, **kwargs)
+
+    def close(self):
+        pass                                  # the adapters belong to the pool
+
+
+class ConnectionPool:
+    """Per-host HTTPAdapters, created on first use and kept warm."""
+
+    def __init__(self, per_host=PER_HOST, max_hosts=MAX_HOSTS, retry=None):
+        self.per_host = per_host
+        self.max_hosts = max_hosts
+        self.retry = retry if retry is not None else RETRY
+        self._adapters = OrderedDict()        # pool_key -> HTTPAdapter, LRU first
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._adapters)
+
+    def adapter_for(self, url) -> HTTPAdapter:
+        key = pool_key(url)
+        if key is None:
+            raise requests.exceptions.InvalidSchema(f"No connection pool for {url!r}")
+        evicted = None
+        with self._lock:
+            adapter = self._adapters.get(key)
+            if adapter is None:
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.per_host,
+                                      max_retries=Retry(**self.retry))
+                self._adapters[key] = adapter
+                if len(self._adapters) > self.max_hosts:
+                    _, evicted = self._adapters.popitem(last=False)
+            else:
+                self._adapters.move_to_end(key)
+        if evicted is not None:
+            evicted.close()
+        return adapter
+
+    def session(self, headers=None) -> requests.Session:
+        """A session whose requests all go through the shared connections."""
+        session = requests.Session()
+        router = _PoolRouter(self)
+        session.mount("http://", router)
+        session.mount("https://", router)
+        if headers:
+            session.headers.update(headers)
+        return session
+
+    def stats(self):
+        """{(scheme, host, port): (connections opened, requests sent)}."""
+        with self._lock:
+            adapters = list(self._adapters.items())
+        out = {}
+        for key, adapter in adapters:
+            opened = sent = 0
+            pools = adapter.poolmanager.pools
+            for conn_key in list(pools.keys()):
+                conn_pool = pools.get(conn_key)
+                if conn_pool is None:
+                    continue
+                opened += conn_pool.num_connections
+                sent += conn_pool.num_requests
+            out[key] = (opened, sent)
+        return out
+
+    def close(self):
+        with self._lock:
+            adapters = list(self._adapters.values())
+            self._adapters.clear()
+        for adapter in adapters:
+            adapter.close()
+
+
+_shared = None
+_failover = None
+_shared_lock = threading.Lock()
+
+
+def shared_pool() -> ConnectionPool:
+    """The process-wide pool the download engine uses."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = ConnectionPool()
+        return _shared
+
+
+def failover_pool() -> ConnectionPool:
+    """The process-wide pool for mirrored downloads: errors come back at once."""
+    global _failover
+    with _shared_lock:
+        if _failover is None:
+            _failover = ConnectionPool(retry=NO_RETRY)
+        return _failover
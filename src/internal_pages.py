@@ -0,0 +1,168 @@
+"""
+internal_pages.py  —  blackline:// pages, prepared once and served from memory.
+
+Every new tab used to load new_tab.html from disk through file://. That
+was a file read per tab, a page whose origin was the local filesystem —
+the reason the profile let local content reach remote URLs, and why
+"is this the new tab page?" meant comparing file paths — and a document
+carrying its 40 KB logo inline as base64, decoded again on every open.
+
+Now the browser reads each internal page once at startup and serves it as
+blackline://<host>/ from memory:
+    • inline base64 images are split out into their own resources, named
+      by a hash of their bytes (blackline://newtab/img-<hash>.png). The
+      HTML shrinks to what it says, and an image is decoded once and
+      reused from the renderer's cache;
+    • caching headers follow from that: a hashed asset never changes, so
+      it is `immutable` for a year; a document is `no-cache` with an ETag,
+      so an updated page is never served stale;
+    • only the browser and its own pages may load them. A web page asking
+      for blackline:// (or blackline-icon://, which would tell it which
+      sites were visited) is refused, and so is a file:// page — any
+      downloaded HTML file opened from disk is one; see internal_initiator().
+
+A host can also be mounted: a callable answering for every path under it,
+for content that changes while the browser runs (speed-dial thumbnails).
+
+Reader pages are not here: each is one article, rendered once by reader.py
+and handed to the view with setHtml, so it never touched the disk either.
+
+No Qt imports: schemes.py adapts these to QWebEngineUrlRequestJob.
+"""
+
+import base64
+import binascii
+import hashlib
+import re
+from pathlib import Path
+from urllib.parse import urlsplit
+
+SCHEME = "blackline"
+NEWTAB_HOST = "newtab"
+NEWTAB_URL = f"{SCHEME}://{NEWTAB_HOST}/"
+
+DOCUMENT_CACHE = "no-cache"
+ASSET_CACHE = "public, max-age=31536000, immutable"
+
+_INLINE_IMAGE = re.compile(
+    r'''(["'])data:image/(png|jpeg|gif|webp|svg\+xml);base64,([A-Za-z0-9+/=\s]+)\1''')
+
+_EXTENSIONS = {"png": "png", "jpeg": "jpg", "gif": "gif", "webp": "webp", "svg+xml": "svg"}
+
+# Who may load internal resources: the browser itself (no initiator) and
+# pages that are already internal. Not file:, which any saved page has.
+_INTERNAL_ORIGINS = (f"{SCHEME}:",)
+
+
+def internal_initiator(origin) -> bool:
+    """True when a request from `origin` may see internal resources."""
+    text = str(origin or "").strip().lower()
+    return not text or text.startswith(_INTERNAL_ORIGINS)
+
+
+def is_newtab_url(url) -> bool:
+    try:
+        parts = urlsplit(str(url or ""))
+    except ValueError:
+        return False
+    return parts.scheme == SCHEME and parts.hostname == NEWTAB_HOST
+
+
+def etag_for(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+
+
+class InternalPage:
+    """One resource: its bytes, type and response headers, fixed at startup."""
+    __slots__ = ("path", "content_type", "body", "etag", "cache_control")
+
+    def __init__(self, path, content_type, body, cache_control=DOCUMENT_CACHE):
+        self.path = path
+        self.content_type = content_type
+        self.body = bytes(body)
+        self.etag = etag_for(self.body)
+        self.cache_control = cache_control
+
+    def headers(self):
+        return {
+            b"Cache-Control": self.cache_control.encode("ascii"),
+            b"ETag": self.etag.encode("ascii"),
+            b"X-Content-Type-Options": b"nosniff",
+        }
+
+
+def split_inline_images(html_text, host):
+    """
+    (html, [(path, content_type, bytes)]): each base64 image in `html_text`
+    replaced by a blackline://<host>/img-<hash>.<ext> URL. Images that do
+    not decode are left where they are.
+    """
+    assets = {}
+
+    def replace(m):
+        quote, kind, payload = m.groups()
+        try:
+            data = base64.b64decode("".join(payload.split()), validate=True)
+        except (binascii.Error, ValueError):
+            return m.group(0)
+        path = f"/img-{hashlib.sha256(data).hexdigest()[:16]}.{_EXTENSIONS[kind]}"
+        assets[path] = (f"image/{kind}", data)
+        return f"{quote}{SCHEME}://{host}{path}{quote}"
+
+    out = _INLINE_IMAGE.sub(replace, html_text)
+    return out, [(path, ctype, data) for path, (ctype, data) in assets.items()]
+
+
+class InternalPages:
+    """Everything served under blackline://, by host and path."""
+
+    def __init__(self):
+        self._pages = {}                    # (host, path) -> InternalPage
+        self._mounts = {}                   # host -> callable(path) -> InternalPage | None
+
+    def __contains__(self, host):
+        return host in self._mounts or any(h == host for h, _ in self._pages)
+
+    def __len__(self):
+        return len(self._pages)
+
+    def add(self, host, path, body, content_type, cache_control=DOCUMENT_CACHE):
+        page = InternalPage(path, content_type, body, cache_control)
+        self._pages[(host, path)] = page
+        return page
+
+    def add_document(self, host, html_text):
+        """Register an HTML page at blackline://<host>/ with its images split out."""
+        html_text, assets = split_inline_images(html_text, host)
+        for path, content_type, data in assets:
+            self.add(host, path, data, content_type, ASSET_CACHE)
+        return self.add(host, "/", html_text.encode("utf-8"), "text/html")
+
+    def mount(self, host, source):
+        """Answer every blackline://<host>/… with `source(path)`."""
+        self._mounts[host] = source
+
+    def load_document(self, host, file_path) -> bool:
+        """Read `file_path` once into memory as blackline://<host>/."""
+        try:
+            text = Path(file_path).read_text(encoding="utf-8")
+        except (OSError, UnicodeDecodeError):
+            return False
+        self.add_document(host, text)
+        return True
+
+    def lookup(self, url):
+        """The InternalPage for a blackline:// URL, or None."""
+        try:
+            parts = urlsplit(str(url or ""))
+        except ValueError:
+            return None
+        if parts.scheme != SCHEME or not parts.hostname:
+            return None
+        source = self._mounts.get(parts.hostname)
+        if source is not None:
+            return source(parts.path or "/")
+        return self._pages.get((parts.hostname, parts.path or "/"))
+
+    def total_bytes(self) -> int:
+        return sum(len(p.body) for p in self._pages.values())
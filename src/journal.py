@@ -0,0 +1,267 @@
+"""
+journal.py  —  crash-safe record of which bytes of a download are on disk.
+
+DownloadManager rewrote <file>.progress as indented JSON once a second,
+in place: open(..., "w") truncated it, then json.dump filled it in. A
+crash or kill inside that window left an empty or half-written file, the
+loader discarded it, and the download started again from nothing. Between
+rewrites, up to a second of completed work was not recorded at all.
+
+The journal (<file>.journal) is append-only binary:
+    • a header: magic, version, the file's total size and a small JSON
+      block of what identifies it (url, save path, ETag, Last-Modified),
+      with a CRC-32 over all of it;
+    • then one 20-byte record per write that lands — start, end and a
+      CRC-32 of the two — appended with a single os.write. Nothing is
+      rewritten, so a crash can only ever cut the last record short;
+    • reading stops at the first short or corrupt record and keeps
+      everything before it, so at most the writes in flight are lost;
+    • once COMPACT_AFTER records have piled up (see `due`), and on pause
+      or error, the journal is rewritten as one record per completed
+      range, into a temporary file that is fsynced and moved over the old
+      one (os.replace).
+
+The completed ranges live in memory in SegmentPlan.done, a RangeSet under
+the plan's lock; SegmentPlan.commit appends to the journal under the same
+lock, so the record order matches the set. Appending is all a commit
+does: compaction writes and fsyncs a whole file, so it runs on a worker
+thread and holds neither lock while it does. Records appended meanwhile
+are carried over into the new file before it replaces the old one. One
+compaction runs at a time, from snapshot() until its compact() returns.
+
+Records are not fsynced one by one: after a process crash or kill the OS
+still writes them out, with the data they describe. A power cut can lose
+unsynced data and records alike; the download's fsync policy decides that.
+
+No Qt imports: downloader.py owns the journal's lifetime.
+"""
+
+import json
+import os
+import struct
+import tempfile
+import threading
+import zlib
+
+from segments import RangeSet
+
+MAGIC = b"BLJ1"
+VERSION = 1
+COMPACT_AFTER = 1024
+MAX_META = 16 * 1024
+
+_HEADER = struct.Struct("<4sHHQI")          # magic, version, reserved, total size, meta length
+_CRC = struct.Struct("<I")
+_SPAN = struct.Struct("<QQ")                # start, end
+_RECORD = struct.Struct("<QQI")             # start, end, crc32(start, end)
+RECORD_SIZE = _RECORD.size
+
+
+def pack_header(total_size, meta) -> bytes:
+    raw = json.dumps(meta or {}, separators=(",", ":")).encode("utf-8")[:MAX_META]
+    head = _HEADER.pack(MAGIC, VERSION, 0, total_size, len(raw)) + raw
+    return head + _CRC.pack(zlib.crc32(head))
+
+
+def pack_record(start, end) -> bytes:
+    return _RECORD.pack(start, end, zlib.crc32(_SPAN.pack(start, end)))
+
+
+class JournalState:
+    """What a journal file says: total size, identifying meta, completed ranges."""
+
+    def __init__(self, total_size, meta, ranges, records, torn):
+        self.total_size = total_size
+        self.meta = meta
+        self.ranges = ranges
+        self.records = records              # good records read
+        self.torn = torn                    # True if reading stopped at damage
+
+
+def read_journal(path):
+    """The journal at `path`, or None if it is missing or its header is bad."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    if len(data) < _HEADER.size:
+        return None
+    magic, version, _, total_size, meta_len = _HEADER.unpack_from(data)
+    body = _HEADER.size + meta_len
+    if magic != MAGIC or version != VERSION or meta_len > MAX_META or len(data) < body + _CRC.size:
+        return None
+    (crc,) = _CRC.unpack_from(data, body)
+    if crc != zlib.crc32(data[:body]):
+        return None
+    try:
+        meta = json.loads(data[_HEADER.size:body].decode("utf-8"))
+    except (UnicodeDecodeError, ValueError):
+        return None
+    if not isinstance(meta, dict):
+        return None
+
+    ranges, records, torn = RangeSet(), 0, False
+    pos = body + _CRC.size
+    while pos < len(data):
+        if len(data) - pos < RECORD_SIZE:
+            torn = True
+            break
+        start, end, crc = _RECORD.unpack_from(data, pos)
+        if crc != zlib.crc32(data[pos:pos + _SPAN.size]) or not 0 <= start < end <= total_size:
+            torn = True
+            break
+        ranges.add(start, end)
+        records += 1
+        pos += RECORD_SIZE
+    return JournalState(total_size, meta, ranges, records, torn)
+
+
+class SegmentJournal:
+    """
+    The writer side: open() lays down a compacted journal, append() adds a
+    record, compact() folds the records into ranges. A write that fails
+    marks the journal broken (`error`) and later calls do nothing — losing
+    resume state must not fail a download.
+    """
+
+    def __init__(self, path, total_size, meta=None, compact_after=COMPACT_AFTER):
+        self.path = str(path)
+        self.total_size = total_size
+        self.meta = dict(meta or {})
+        self.compact_after = compact_after
+        self.records = 0                    # records since the last compaction
+        self.compactions = 0
+        self.error = None
+        self._fd = None
+        self._carry = None                  # records appended since a compaction's snapshot
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._fd is not None
+
+    @property
+    def due(self) -> bool:
+        """True when enough records have piled up to be worth a compaction
+        and none is under way."""
+        return self._fd is not None and self._carry is None and self.records >= self.compact_after
+
+    def open(self, ranges=()):
+        """Start the journal afresh with `ranges`. Raises OSError if it cannot."""
+        with self._lock:
+            self._rewrite(ranges)
+
+    def append(self, start, end):
+        """Record [start, end) as written: one os.write, never a compaction."""
+        with self._lock:
+            if self._fd is None:
+                return
+            try:
+                os.write(self._fd, pack_record(start, end))
+                self.records += 1
+                if self._carry is not None:
+                    self._carry.append((start, end))
+            except OSError as e:
+                self._fail(e)
+
+    def snapshot(self) -> bool:
+        """
+        Begin a compaction: the ranges passed to compact() are the ones
+        taken at this point, and records appended from here on are carried
+        over. Call it where no append can slip in between (SegmentPlan
+        holds its lock). False, with nothing to compact, if the journal is
+        closed or another compaction has not finished yet.
+        """
+        with self._lock:
+            if self._fd is None or self._carry is not None:
+                return False
+            self._carry = []
+            return True
+
+    def compact(self, ranges):
+        """
+        Finish the compaction snapshot() began: rewrite the journal as one
+        record per range in `ranges`, plus what was appended since. Appends
+        go on while the new file is written and synced.
+        """
+        with self._lock:
+            if self._carry is None:
+                return                          # no snapshot, nothing begun
+            if self._fd is None:
+                self._carry = None
+                return
+        try:
+            tmp = self._write_compacted(ranges)
+        except OSError as e:
+            with self._lock:
+                self._carry = None
+                self._fail(e)
+            return
+        with self._lock:
+            carry, self._carry = self._carry, None
+            try:
+                if self._fd is None:            # closed or broken meanwhile
+                    os.unlink(tmp)
+                    return
+                if carry:
+                    with open(tmp, "ab") as f:
+                        f.write(b"".join(pack_record(s, e) for s, e in carry))
+                self._install(tmp)
+                self.records = len(carry)
+            except OSError as e:
+                self._fail(e)
+
+    def close(self):
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    def _rewrite(self, ranges):
+        self._install(self._write_compacted(ranges))
+        self.records = 0
+
+    def _write_compacted(self, ranges):
+        """A synced temporary file holding the header and `ranges`; its path."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(pack_header(self.total_size, self.meta))
+                f.write(b"".join(pack_record(s, e) for s, e in ranges))
+                f.flush()
+                os.fsync(f.fileno())
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+        return tmp
+
+    def _install(self, tmp):
+        """Move `tmp` over the journal and append to it from now on. Under the lock."""
+        try:
+            if self._fd is not None:
+                os.close(self._fd)          # Windows will not replace an open file
+                self._fd = None
+            os.replace(tmp, self.path)
+            tmp = None
+        finally:
+            if tmp is not None:
+                try:
+                    os.unlink(tmp)
+                except OSError:
+                    pass
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | getattr(os, "O_BINARY", 0))
+        self.compactions += 1
+
+    def _fail(self, error):
+        self.error = error
+        if self._fd is not None:
+            try:
+                os.close(self._fd)
+            except OSError:
+                pass
+            self._fd = None
@@ -0,0 +1,334 @@
+"""
+lifecycle.py  —  which background tabs give their memory back, and when.
+
+Every open tab used to keep a live renderer forever, so a long session on
+an 8 GB machine ended in swap. QtWebEngine can freeze a hidden page (no
+script, no timers, memory kept) or discard it (renderer released, page
+reloaded on next activation). This module decides which tabs to move and
+how far; browser.py only applies the decisions.
+
+Policy:
+    • Nothing happens until memory crosses a threshold — either system
+      memory use or the browser's own RSS, whichever trips first.
+    • Past the soft threshold the least-recently-used background tab is
+      frozen. Past the hard threshold frozen tabs are discarded.
+    • Tabs that are visible, recently active, playing audio or holding
+      unsaved form input are never touched.
+    • A few tabs per check at most. Memory readings lag; discarding
+      everything on one bad sample is the failure mode to avoid.
+
+Separately from memory, a hidden tab is frozen once it has been out of
+sight for a grace period, so background timers, animations and polling
+stop costing CPU. CpuSavingsLedger estimates what that saves per tab.
+
+States use Qt's names (Active, Frozen, Discarded) as plain strings so this
+file stays free of Qt imports.
+"""
+
+from enum import IntEnum
+
+ACTIVE = "active"
+FROZEN = "frozen"
+DISCARDED = "discarded"
+
+# A tab the user just left is the one they are most likely to return to.
+DEFAULT_MIN_IDLE_SECONDS = 120.0
+
+# Tabs moved per check. Checks repeat, so pressure still gets relieved.
+DEFAULT_BATCH = 2
+
+_MB = 1024 * 1024
+
+
+class Pressure(IntEnum):
+    NONE = 0
+    ELEVATED = 1      # soft threshold crossed — freeze
+    CRITICAL = 2      # hard threshold crossed — discard
+
+
+class MemoryThresholds:
+    """
+    When the memory saver acts. A limit of 0 disables that check.
+
+    System limits are percentages of physical memory in use; browser
+    limits are the RSS of the browser and all its child processes, in MB.
+    """
+
+    __slots__ = ("enabled", "system_soft_percent", "system_hard_percent",
+                 "browser_soft_mb", "browser_hard_mb")
+
+    DEFAULTS = {
+        "enabled": True,
+        "system_soft_percent": 80,
+        "system_hard_percent": 90,
+        "browser_soft_mb": 0,
+        "browser_hard_mb": 0,
+    }
+
+    # settings.json keys, flat like the rest of the file.
+    SETTINGS_KEYS = {
+        "enabled": "memory_saver_enabled",
+        "system_soft_percent": "memory_soft_percent",
+        "system_hard_percent": "memory_hard_percent",
+        "browser_soft_mb": "browser_rss_soft_mb",
+        "browser_hard_mb": "browser_rss_hard_mb",
+    }
+
+    def __init__(self, **values):
+        for name, default in self.DEFAULTS.items():
+            setattr(self, name, values.get(name, default))
+
+    @classmethod
+    def from_settings(cls, settings):
+        """Read from a loaded settings dict; bad values fall back to defaults."""
+        settings = settings if isinstance(settings, dict) else {}
+        values = {}
+        for name, key in cls.SETTINGS_KEYS.items():
+            raw = settings.get(key, cls.DEFAULTS[name])
+            if name == "enabled":
+                values[name] = bool(raw)
+                continue
+            try:
+                number = float(raw)
+            except (TypeError, ValueError):
+                number = cls.DEFAULTS[name]
+            if name.startswith("system"):
+                number = min(max(number, 0), 100)
+            values[name] = max(number, 0)
+        return cls(**values)
+
+    def to_settings(self) -> dict:
+        return {key: getattr(self, name) for name, key in self.SETTINGS_KEYS.items()}
+
+
+def memory_pressure(system_percent, browser_rss, thresholds) -> Pressure:
+    """Grade the current readings. `browser_rss` is in bytes."""
+    if not thresholds.enabled:
+        return Pressure.NONE
+    rss_mb = (browser_rss or 0) / _MB
+
+    def crossed(value, limit):
+        return bool(limit) and value is not None and value >= limit
+
+    if (crossed(system_percent, thresholds.system_hard_percent)
+            or crossed(rss_mb, thresholds.browser_hard_mb)):
+        return Pressure.CRITICAL
+    if (crossed(system_percent, thresholds.system_soft_percent)
+            or crossed(rss_mb, thresholds.browser_soft_mb)):
+        return Pressure.ELEVATED
+    return Pressure.NONE
+
+
+class TabActivity:
+    """Last-active timestamps per tab, for the LRU order."""
+
+    def __init__(self):
+        self._last = {}
+
+    def touch(self, key, now: float):
+        self._last[key] = now
+
+    def forget(self, key):
+        self._last.pop(key, None)
+
+    def last_active(self, key, default: float = 0.0) -> float:
+        return self._last.get(key, default)
+
+    def idle_for(self, key, now: float) -> float:
+        """Seconds since `key` was last active. Unknown tabs count as idle
+        since the epoch — a tab never looked at is the oldest of all."""
+        return now - self._last.get(key, 0.0)
+
+    def lru(self, keys) -> list:
+        """`keys` ordered least recently active first."""
+        return sorted(keys, key=lambda k: self._last.get(k, 0.0))
+
+    def __len__(self):
+        return len(self._last)
+
+
+class TabCandidate:
+    """What the policy needs to know about one tab."""
+
+    __slots__ = ("key", "state", "visible", "audible", "pinned", "has_form_input",
+                 "devtools_open")
+
+    def __init__(self, key, state=ACTIVE, visible=False, audible=False,
+                 pinned=False, has_form_input=False, devtools_open=False):
+        self.key = key
+        self.state = state
+        self.visible = visible
+        self.audible = audible
+        self.pinned = pinned
+        self.has_form_input = has_form_input
+        self.devtools_open = devtools_open
+
+    @property
+    def protected(self) -> bool:
+        """
+        Never frozen or discarded.
+
+        Discarding reloads the page: audio stops, typed-but-unsent input is
+        lost, and Qt refuses outright for a page with an inspector attached.
+        A pinned tab is one the user asked to keep running.
+        """
+        return (self.visible or self.audible or self.pinned
+                or self.has_form_input or self.devtools_open)
+
+
+def plan_transitions(candidates, activity, pressure, now,
+                     min_idle=DEFAULT_MIN_IDLE_SECONDS, batch=DEFAULT_BATCH) -> list:
+    """
+    Lifecycle moves for this check, as (key, target_state) pairs.
+
+    ELEVATED freezes active background tabs. CRITICAL discards, frozen
+    tabs first (they have already proven idle), then active ones. Either
+    way the least recently used eligible tab goes first.
+    """
+    if pressure is Pressure.NONE or batch <= 0:
+        return []
+
+    eligible = [c for c in candidates
+                if not c.protected
+                and c.state != DISCARDED
+                and activity.idle_for(c.key, now) >= min_idle]
+    by_key = {c.key: c for c in eligible}
+    ordered = [by_key[k] for k in activity.lru(by_key)]
+
+    if pressure is Pressure.ELEVATED:
+        return [(c.key, FROZEN) for c in ordered if c.state == ACTIVE][:batch]
+
+    frozen_first = ([c for c in ordered if c.state == FROZEN]
+                    + [c for c in ordered if c.state == ACTIVE])
+    return [(c.key, DISCARDED) for c in frozen_first][:batch]
+
+
+# ── background throttling ────────────────────────────────────────────────
+
+DEFAULT_GRACE_SECONDS = 300.0
+
+# Short enough to be useful, long enough that flicking between two tabs
+# never freezes either of them.
+MIN_GRACE_SECONDS = 30.0
+
+
+class ThrottlePolicy:
+    """Freeze hidden tabs once they have been out of sight for `grace` seconds."""
+
+    __slots__ = ("enabled", "grace_seconds")
+
+    SETTINGS_KEYS = {
+        "enabled": "background_freeze_enabled",
+        "grace_seconds": "background_freeze_grace_seconds",
+    }
+
+    def __init__(self, enabled=True, grace_seconds=DEFAULT_GRACE_SECONDS):
+        self.enabled = enabled
+        self.grace_seconds = grace_seconds
+
+    @classmethod
+    def from_settings(cls, settings):
+        settings = settings if isinstance(settings, dict) else {}
+        enabled = bool(settings.get(cls.SETTINGS_KEYS["enabled"], True))
+        try:
+            grace = float(settings.get(cls.SETTINGS_KEYS["grace_seconds"],
+                                       DEFAULT_GRACE_SECONDS))
+        except (TypeError, ValueError):
+            grace = DEFAULT_GRACE_SECONDS
+        return cls(enabled, max(grace, MIN_GRACE_SECONDS))
+
+    def to_settings(self) -> dict:
+        return {key: getattr(self, name) for name, key in self.SETTINGS_KEYS.items()}
+
+
+def plan_throttle(candidates, activity, policy, now) -> list:
+    """Keys of hidden, unprotected, still-active tabs past the grace period."""
+    if not policy.enabled:
+        return []
+    due = [c.key for c in candidates
+           if not c.protected
+           and c.state == ACTIVE
+           and activity.idle_for(c.key, now) >= policy.grace_seconds]
+    return activity.lru(due)
+
+
+class CpuSavingsLedger:
+    """
+    Estimated renderer CPU time saved by freezing, per tab.
+
+    When a tab is hidden its renderer's CPU time is noted; when it is
+    frozen the rate it burned while hidden is worked out from the second
+    reading. Every second it then stays frozen (or discarded) is credited
+    at that rate. It is an estimate — a frozen tab's rate cannot be
+    measured, only the rate it had just before — but it is the number
+    the policy has to justify.
+
+    Renderers can be shared between tabs; the caller divides readings by
+    the number of tabs sharing one, or accepts the over-count.
+    """
+
+    def __init__(self):
+        self._hidden = {}      # key -> (cpu_seconds, wall)
+        self._frozen = {}      # key -> (rate, since)
+        self._totals = {}      # key -> [freezes, frozen_seconds, saved_cpu]
+        self.closed = [0, 0.0, 0.0]
+
+    def mark_hidden(self, key, cpu_seconds, now):
+        if cpu_seconds is not None:
+            self._hidden[key] = (cpu_seconds, now)
+
+    def mark_frozen(self, key, cpu_seconds, now):
+        """Start crediting. Idempotent while the tab stays frozen."""
+        if key in self._frozen:
+            return
+        rate = 0.0
+        start = self._hidden.pop(key, None)
+        if start is not None and cpu_seconds is not None:
+            cpu0, wall0 = start
+            elapsed = now - wall0
+            if elapsed > 0:
+                rate = max(0.0, (cpu_seconds - cpu0) / elapsed)
+        self._frozen[key] = (rate, now)
+        self._totals.setdefault(key, [0, 0.0, 0.0])[0] += 1
+
+    def mark_active(self, key, now):
+        """Stop crediting; the tab is in use again."""
+        self._hidden.pop(key, None)
+        frozen = self._frozen.pop(key, None)
+        if frozen is None:
+            return
+        rate, since = frozen
+        duration = max(0.0, now - since)
+        totals = self._totals.setdefault(key, [0, 0.0, 0.0])
+        totals[1] += duration
+        totals[2] += rate * duration
+
+    def forget(self, key, now):
+        """A closed tab: fold its numbers into the closed-tabs total."""
+        self.mark_active(key, now)
+        totals = self._totals.pop(key, None)
+        if totals:
+            for i in range(3):
+                self.closed[i] += totals[i]
+
+    def is_frozen(self, key) -> bool:
+        return key in self._frozen
+
+    def report(self, now) -> list:
+        """
+        (key, freezes, frozen_seconds, saved_cpu_seconds) per tab,
+        open intervals counted up to `now`, biggest saving first.
+        """
+        rows = []
+        for key, (freezes, seconds, saved) in self._totals.items():
+            if key in self._frozen:
+                rate, since = self._frozen[key]
+                extra = max(0.0, now - since)
+                seconds += extra
+                saved += rate * extra
+            rows.append((key, freezes, seconds, saved))
+        rows.sort(key=lambda r: r[3], reverse=True)
+        return rows
+
+    def total_saved(self, now) -> float:
+        return self.closed[2] + sum(r[3] for r in self.report(now))
@@ -7,6 +7,7 @@ from PyQt6.QtGui import QIcon
 from PyQt6.QtWidgets import QApplication
 from browser import WebBrowser
 from splash import BlacklineSplash, asset
+from schemes import register_schemes
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -75,6 +76,7 @@ def main():
         )
 
     os.environ['QTWEBENGINE_CHROMIUM_FLAGS'] = build_chromium_flags(widevine_path)
+    register_schemes()              # Chromium must know them before the app exists
 
     app = QApplication(sys.argv)
     app.setApplicationName("Blackline Browser")
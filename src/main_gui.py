@@ -3,19 +3,22 @@ import os
 import subprocess
 import uuid
 import json
-from collections import deque
 import logging
 
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QLineEdit, QListWidget, QProgressBar, QLabel,
     QFileDialog, QDialog, QDialogButtonBox, QListWidgetItem,
-    QSpinBox, QMenu, QFormLayout, QStatusBar
+    QSpinBox, QMenu, QFormLayout, QStatusBar, QInputDialog
 )
-from PyQt6.QtCore import QThreadPool, pyqtSlot, Qt, pyqtSignal
+from PyQt6.QtCore import QThreadPool, QTimer, pyqtSlot, Qt, pyqtSignal
 from PyQt6.QtGui import QAction, QColor, QPalette
 
 from downloader import DownloadManager, Status, MetadataFetcher, MetadataFetcherSignals
+import metalink
+from ratelimit import PRIORITIES, shared_shaper
+from progress import TICK_MS, ProgressBoard, Snapshot
+import scheduler
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -137,6 +140,10 @@ class AddDownloadDialog(QDialog):
             self.info_label.setText("File Info: Enter a URL")
             return
         
+        if metalink.is_metalink(url) and os.path.isfile(url):
+            self.show_metalink(url)
+            return
+
         self.info_label.setText("File Info: Fetching...")
         self.fetcher_signals = MetadataFetcherSignals()
         fetcher = MetadataFetcher(url, signals=self.fetcher_signals)
@@ -149,6 +156,17 @@ class AddDownloadDialog(QDialog):
         if filename and not self.path_input.text():
             self.path_input.setText(os.path.join(os.getcwd(), filename))
 
+    def show_metalink(self, path):
+        try:
+            files = metalink.load(path)
+        except (OSError, ValueError) as e:
+            self.info_label.setText(f"File Info: Error - {e}")
+            return
+        mirrors = max((len(f.urls) for f in files), default=0)
+        self.info_label.setText(f"File Info: Metalink | {len(files)} file(s), up to {mirrors} mirror(s)")
+        if len(files) == 1 and files[0].name and not self.path_input.text():
+            self.path_input.setText(os.path.join(os.getcwd(), files[0].name))
+
     def on_fetch_error(self, error):
         self.info_label.setText(f"File Info: Error - {error}")
       
@@ -173,8 +191,17 @@ class DownloadPanel(QWidget):
         self.thread_pool = QThreadPool.globalInstance()
         self.downloads = {}
         self.session_file = os.path.join(os.getcwd(), 'downloads_session.json')
-        self.download_queue = deque()
-        self.active_downloads = 0
+        # Queued downloads start by priority and queue order, within
+        # connection budgets that count segments, not downloads.
+        self.scheduler = scheduler.from_environment()
+        self.rows = {}                      # download_id -> DownloadItemWidget
+        self.progress_board = ProgressBoard()
+
+        # Byte progress is sampled here, TICK_MS apart, rather than
+        # signalled per chunk; idle, the timer stops.
+        self.progress_timer = QTimer(self)
+        self.progress_timer.setInterval(TICK_MS)
+        self.progress_timer.timeout.connect(self.sample_progress)
         
         layout = QVBoxLayout(self)
         controls_layout = QHBoxLayout()
@@ -184,13 +211,33 @@ class DownloadPanel(QWidget):
         
         self.concurrency_spinbox = QSpinBox()
         self.concurrency_spinbox.setRange(1, 10)
-        self.concurrency_spinbox.setValue(3)
+        self.concurrency_spinbox.setValue(self.scheduler.max_active)
         self.concurrency_spinbox.setToolTip("Max simultaneous downloads")
+        self.concurrency_spinbox.valueChanged.connect(self.set_max_active)
+
+        self.host_connections_spinbox = QSpinBox()
+        self.host_connections_spinbox.setRange(1, 64)
+        self.host_connections_spinbox.setValue(self.scheduler.per_host)
+        self.host_connections_spinbox.setToolTip("Max connections to one server, over all its downloads")
+        self.host_connections_spinbox.valueChanged.connect(self.set_host_connections)
+
+        self.speed_limit_spinbox = QSpinBox()
+        self.speed_limit_spinbox.setRange(0, 1024 * 1024)
+        self.speed_limit_spinbox.setSingleStep(100)
+        self.speed_limit_spinbox.setSuffix(" KB/s")
+        self.speed_limit_spinbox.setSpecialValueText("Unlimited")
+        self.speed_limit_spinbox.setToolTip("Total speed of all downloads (0 = unlimited)")
+        self.speed_limit_spinbox.setValue(int((shared_shaper().configured_rate or 0) // 1024))
+        self.speed_limit_spinbox.valueChanged.connect(self.set_speed_limit)
 
         controls_layout.addWidget(add_button)
         controls_layout.addStretch()
+        controls_layout.addWidget(QLabel("Speed Limit:"))
+        controls_layout.addWidget(self.speed_limit_spinbox)
         controls_layout.addWidget(QLabel("Concurrent Downloads:"))
         controls_layout.addWidget(self.concurrency_spinbox)
+        controls_layout.addWidget(QLabel("Connections per Host:"))
+        controls_layout.addWidget(self.host_connections_spinbox)
         layout.addLayout(controls_layout)
 
         self.download_list = QListWidget()
@@ -217,6 +264,33 @@ class DownloadPanel(QWidget):
         self.open_action.triggered.connect(self.open_file)
         self.open_location_action = QAction("Open Folder", self)
         self.open_location_action.triggered.connect(self.open_file_location)
+        self.priority_actions = {}
+        for name in PRIORITIES:
+            action = QAction(name.capitalize(), self)
+            action.setCheckable(True)
+            action.triggered.connect(lambda _, name=name: self.set_selected_priority(name))
+            self.priority_actions[name] = action
+        self.speed_limit_action = QAction("Speed Limit...", self)
+        self.speed_limit_action.triggered.connect(self.limit_selected_download)
+        self.move_up_action = QAction("Move Up", self)
+        self.move_up_action.triggered.connect(lambda: self.move_selected_download(-1))
+        self.move_down_action = QAction("Move Down", self)
+        self.move_down_action.triggered.connect(lambda: self.move_selected_download(1))
+        self.pin_action = QAction("Pin to Front", self)
+        self.pin_action.setCheckable(True)
+        self.pin_action.triggered.connect(self.pin_selected_download)
+
+    def set_speed_limit(self, kb_per_second):
+        shared_shaper().set_rate(kb_per_second * 1024 if kb_per_second else None)
+
+    def set_max_active(self, count):
+        self.scheduler.max_active = count
+        self.process_queue()
+
+    def set_host_connections(self, count):
+        # Running downloads keep their grants; the new budget applies as they end.
+        self.scheduler.per_host = count
+        self.process_queue()
     
     def show_context_menu(self, position):
         item = self.download_list.itemAt(position)
@@ -244,12 +318,26 @@ class DownloadPanel(QWidget):
             else:
                  menu.addAction(self.retry_action)
 
+        if status not in [Status.COMPLETED, Status.ERROR, Status.STOPPED]:
+            priority_menu = menu.addMenu("Priority")
+            for name, action in self.priority_actions.items():
+                action.setChecked(name == manager.priority)
+                priority_menu.addAction(action)
+            menu.addAction(self.speed_limit_action)
+
+        if self.scheduler.is_queued(download_id):
+            menu.addAction(self.move_up_action)
+            menu.addAction(self.move_down_action)
+            self.pin_action.setChecked(self.scheduler.is_pinned(download_id))
+            menu.addAction(self.pin_action)
+
         if status != Status.PENDING:
             menu.addSeparator()
         menu.addAction(self.remove_action)
         menu.exec(self.download_list.mapToGlobal(position))
 
-    def add_download(self, url, save_path, checksum=None, num_threads=4, start_immediately=True, headers=None):
+    def add_download(self, url, save_path, checksum=None, num_threads=4, start_immediately=True, headers=None,
+                     mirrors=None, pieces=None, rate_limit=None, priority="normal", pinned=False):
         if not (url and save_path): return None, None
 
         download_id = str(uuid.uuid4())
@@ -260,17 +348,21 @@ class DownloadPanel(QWidget):
 
         self.download_list.addItem(list_item)
         self.download_list.setItemWidget(list_item, item_widget)
+        self.rows[download_id] = item_widget
 
-        manager = DownloadManager(download_id, url, save_path, self.thread_pool, num_threads, checksum, headers=headers)
+        manager = DownloadManager(download_id, url, save_path, self.thread_pool, num_threads, checksum, headers=headers,
+                                  mirrors=mirrors, pieces=pieces, rate_limit=rate_limit, priority=priority)
         self.downloads[download_id] = manager
         
         manager.progress_updated.connect(self.update_download_progress)
         manager.download_finished.connect(self.on_download_finished)
         manager.error_occurred.connect(self.on_download_error)
         
-        self.download_queue.append(manager)
+        self.scheduler.add(download_id, url, num_threads, priority, pinned)
         if start_immediately:
             self.process_queue()
+        else:
+            self.show_queue()
         
         return manager, item_widget
 
@@ -278,22 +370,74 @@ class DownloadPanel(QWidget):
         dialog = AddDownloadDialog(self)
         if dialog.exec():
             url, save_path, checksum, num_threads = dialog.get_data()
-            self.add_download(url, save_path, checksum, num_threads)
+            if metalink.is_metalink(url) and os.path.isfile(url):
+                self.add_metalink(url, save_path, num_threads)
+            else:
+                self.add_download(url, save_path, checksum, num_threads)
+
+    def add_metalink(self, path, save_path, num_threads=4):
+        """A download per file in the Metalink at `path`, each from all its mirrors."""
+        try:
+            files = [f for f in metalink.load(path) if f.urls and f.name]
+        except (OSError, ValueError) as e:
+            self.status_update_requested.emit(f"Could not read Metalink: {e}", 5000)
+            return
+        if len(files) == 1 and save_path and not os.path.isdir(save_path):
+            targets = [save_path]
+        else:
+            directory = save_path if os.path.isdir(save_path or "") else os.path.dirname(save_path or "") or os.getcwd()
+            targets = [os.path.join(directory, f.name) for f in files]
+        for f, target in zip(files, targets):
+            pieces = (f.piece_size, f.pieces) if f.piece_size and f.pieces else None
+            self.add_download(f.urls[0], target, f.sha256, num_threads, mirrors=f.urls[1:], pieces=pieces)
 
     def process_queue(self):
-        """Starts downloads from the queue if slots are available."""
-        max_active = self.concurrency_spinbox.value()
-        while self.active_downloads < max_active and self.download_queue:
-            manager = self.download_queue.popleft()
+        """Starts what the scheduler lets start, each with the connections it was granted."""
+        for grant in self.scheduler.ready():
+            manager = self.downloads.get(grant.key)
+            if manager is None:
+                self.scheduler.finished(grant.key)
+                continue
             if manager.status == Status.PENDING:
-                self.active_downloads += 1
-                manager.start()
+                manager.start(grant.connections)
+            else:
+                manager.retry(grant.connections)
+            if manager.status != Status.STARTING:
+                self.scheduler.finished(grant.key)      # nothing to retry
+                continue
+            self.progress_timer.start()
+        self.show_queue()
+
+    def show_queue(self):
+        """Queued rows show their place in the queue."""
+        snapshots = []
+        for position, download_id in enumerate(self.scheduler.queue(), 1):
+            manager = self.downloads.get(download_id)
+            if manager:
+                snapshots.append(Snapshot(download_id, manager.downloaded_size, manager.total_size,
+                                          0.0, f"Queued #{position}"))
+        self.show_progress(snapshots)
 
     @pyqtSlot(str, int, int, float, str)
     def update_download_progress(self, download_id, downloaded, total, speed, status):
-        widget = self.find_widget(download_id)
-        if widget:
-            widget.update_progress(downloaded, total, speed, status)
+        # Status changes arrive as signals; bytes come from sample_progress.
+        self.show_progress([Snapshot(download_id, downloaded, total, speed, status)])
+        if status in ("Starting", "Downloading"):
+            self.progress_timer.start()
+
+    def sample_progress(self):
+        """One tick: snapshot every running download, repaint the rows that moved."""
+        running = [m for m in self.downloads.values()
+                   if m.status in (Status.STARTING, Status.DOWNLOADING, Status.PAUSED)]
+        if all(m.status == Status.PAUSED for m in running):
+            self.progress_timer.stop()
+        self.show_progress([m.sample() for m in running])
+
+    def show_progress(self, snapshots):
+        for snap in self.progress_board.changed(snapshots):
+            widget = self.rows.get(snap.download_id)
+            if widget:
+                widget.update_progress(snap.downloaded, snap.total, snap.speed, snap.status)
 
     def on_download_finished(self, download_id, filename):
         # --- FIX: Added safety check for manager ---
@@ -322,7 +466,7 @@ class DownloadPanel(QWidget):
     def finish_download_slot(self, download_id):
         """Handles post-download logic for success or failure."""
         if download_id in self.downloads:
-            self.active_downloads = max(0, self.active_downloads - 1)
+            self.scheduler.finished(download_id)
             self.process_queue()
 
     def get_selected_download_id(self):
@@ -330,11 +474,35 @@ class DownloadPanel(QWidget):
         return selected_items[0].data(Qt.ItemDataRole.UserRole) if selected_items else None
 
     def find_widget(self, download_id):
-        for i in range(self.download_list.count()):
-            item = self.download_list.item(i)
-            if item.data(Qt.ItemDataRole.UserRole) == download_id:
-                return self.download_list.itemWidget(item)
-        return None
+        return self.rows.get(download_id)
+
+    def set_selected_priority(self, priority):
+        download_id = self.get_selected_download_id()
+        if download_id and download_id in self.downloads:
+            self.downloads[download_id].set_priority(priority)
+            self.scheduler.set_priority(download_id, priority)
+            self.process_queue()
+
+    def limit_selected_download(self):
+        manager = self.downloads.get(self.get_selected_download_id())
+        if manager is None: return
+        kb_per_second, ok = QInputDialog.getInt(
+            self, "Speed Limit", f"Speed limit for {manager.filename} in KB/s (0 = unlimited):",
+            int((manager.rate_limit or 0) // 1024), 0, 1024 * 1024, 100)
+        if ok:
+            # The total limit above still applies on top of this one.
+            manager.set_rate_limit(kb_per_second * 1024 if kb_per_second else None)
+
+    def move_selected_download(self, steps):
+        download_id = self.get_selected_download_id()
+        if download_id and self.scheduler.move(download_id, steps):
+            self.show_queue()
+
+    def pin_selected_download(self, pinned):
+        download_id = self.get_selected_download_id()
+        if download_id and download_id in self.downloads:
+            self.scheduler.pin(download_id, pinned)
+            self.process_queue()
 
     def pause_selected_download(self):
         download_id = self.get_selected_download_id()
@@ -361,9 +529,9 @@ class DownloadPanel(QWidget):
         if download_id and download_id in self.downloads:
             manager = self.downloads[download_id]
             if manager.status in [Status.ERROR, Status.STOPPED, Status.COMPLETED]:
-                self.download_queue.append(manager)
+                # Back through the queue, so the retry counts against the budgets too.
+                self.scheduler.add(download_id, manager.url, manager.num_threads, manager.priority)
                 self.process_queue()
-                manager.retry()
 
     def remove_selected_download(self):
         selected_items = self.download_list.selectedItems()
@@ -377,11 +545,13 @@ class DownloadPanel(QWidget):
             if manager.status in [Status.DOWNLOADING, Status.PAUSED, Status.STARTING]:
                 manager.stop()
                 self.finish_download_slot(download_id)
-            if manager in self.download_queue:
-                self.download_queue.remove(manager)
+            self.scheduler.remove(download_id)
             del self.downloads[download_id]
+        self.rows.pop(download_id, None)
+        self.progress_board.forget(download_id)
         
         self.download_list.takeItem(self.download_list.row(item))
+        self.show_queue()
 
     def open_file(self):
         download_id = self.get_selected_download_id()
@@ -409,16 +579,21 @@ class DownloadPanel(QWidget):
     
     def save_downloads(self):
         session_data = []
-        all_downloads = list(self.downloads.values()) + list(self.download_queue)
-        for manager in {m.download_id: m for m in all_downloads}.values():
+        # Queued downloads first, in queue order, so they come back in it.
+        order = {download_id: i for i, download_id in enumerate(self.scheduler.queue())}
+        for manager in sorted(self.downloads.values(), key=lambda m: order.get(m.download_id, len(order))):
             if manager.status not in [Status.DOWNLOADING, Status.PAUSED]:
                 session_data.append({
                     "url": manager.url, "save_path": manager.save_path,
                     "checksum": manager.checksum, "num_threads": manager.num_threads,
-                    "headers": manager.headers
+                    "headers": manager.headers, "mirrors": manager.mirror_urls,
+                    "pieces": list(manager.pieces) if manager.pieces else None,
+                    "rate_limit": manager.rate_limit, "priority": manager.priority,
+                    "pinned": self.scheduler.is_pinned(manager.download_id),
                 })
+        session = {"speed_limit": shared_shaper().configured_rate, "downloads": session_data}
         try:
-            with open(self.session_file, 'w') as f: json.dump(session_data, f, indent=4)
+            with open(self.session_file, 'w') as f: json.dump(session, f, indent=4)
         except IOError as e:
             logger.error(f"Failed to save session: {e}")
 
@@ -430,11 +605,20 @@ class DownloadPanel(QWidget):
             logger.error(f"Failed to load session: {e}")
             return
 
+        # Older sessions are a bare list of downloads.
+        if isinstance(session_data, dict):
+            if "speed_limit" in session_data:
+                rate = session_data["speed_limit"]
+                self.speed_limit_spinbox.setValue(int(rate // 1024) if isinstance(rate, (int, float)) else 0)
+            session_data = session_data.get("downloads", [])
         for data in session_data:
             self.add_download(
                 url=data['url'], save_path=data['save_path'],
                 checksum=data.get('checksum'), num_threads=data.get('num_threads', 4),
-                headers=data.get('headers'), start_immediately=False
+                headers=data.get('headers'), start_immediately=False,
+                mirrors=data.get('mirrors'), pieces=tuple(data['pieces']) if data.get('pieces') else None,
+                rate_limit=data.get('rate_limit'), priority=data.get('priority', 'normal'),
+                pinned=data.get('pinned', False),
             )
         self.process_queue()
 
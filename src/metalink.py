@@ -0,0 +1,241 @@
+"""
+metalink.py  —  Metalink files and the mirrors one download is spread over.
+
+DownloadManager fetched every segment from its one URL. Large files — ISOs,
+datasets — are usually published on many mirrors, listed in a Metalink
+(RFC 5854 .meta4, or the older 3.0 .metalink) with the file's size, its
+SHA-256 and a SHA-256 per fixed-size piece. One CDN edge caps what a
+download can reach however many connections it opens.
+
+Now:
+    • parse() reads both Metalink versions into MetalinkFile records: the
+      HTTP(S) URLs best first, the file's SHA-256 and the piece hashes,
+      which DownloadManager hands to its StreamHasher;
+    • MirrorSet picks the mirror for each new segment. Mirrors not yet
+      measured are tried first; after that a segment goes to the mirror
+      with the fewest segments per byte/s of measured throughput, so a
+      mirror twice as fast carries about twice the segments;
+    • a mirror whose throughput falls below SLOW_RATIO of the best is
+      dropped (never the last one), and so is one that fails MAX_FAILURES
+      times in a row. Workers on a dropped mirror hand the rest of their
+      segment to another;
+    • each mirror remembers which bytes it served, so pieces that fail
+      their hash count as failures against the mirrors that sent them.
+
+No Qt imports: downloader.py and aioengine.py report to a MirrorSet from
+their workers; main_gui.py turns a .meta4 file into downloads.
+"""
+
+import threading
+import xml.etree.ElementTree as ET
+from typing import List, NamedTuple, Optional
+
+from segments import RangeSet
+
+METALINK4_NS = "urn:ietf:params:xml:ns:metalink"
+METALINK3_NS = "http://www.metalinker.org/"
+SHA256_NAMES = frozenset({"sha-256", "sha256"})
+EXTENSIONS = (".meta4", ".metalink")
+
+MIN_SAMPLE = 1024 * 1024        # bytes a mirror serves before it is judged
+SLOW_RATIO = 0.25
+MAX_FAILURES = 3
+
+
+class MetalinkFile(NamedTuple):
+    name: str
+    size: Optional[int]
+    urls: List[str]                 # HTTP(S) only, best first
+    sha256: Optional[str]
+    piece_size: Optional[int]
+    pieces: List[str]               # SHA-256 hex per piece; empty if not published
+
+
+def is_metalink(path) -> bool:
+    return str(path).lower().endswith(EXTENSIONS)
+
+
+def load(path) -> List[MetalinkFile]:
+    with open(path, "rb") as f:
+        return parse(f.read())
+
+
+def parse(data) -> List[MetalinkFile]:
+    """The files a Metalink 4 or 3 document describes. Raises ValueError if it is neither."""
+    try:
+        root = ET.fromstring(data)
+    except ET.ParseError as e:
+        raise ValueError(f"Not a Metalink document: {e}") from e
+    if root.tag == f"{{{METALINK4_NS}}}metalink":
+        return [_file4(f) for f in root.findall(f"{{{METALINK4_NS}}}file")]
+    if root.tag == f"{{{METALINK3_NS}}}metalink":
+        return [_file3(f) for f in root.iter(f"{{{METALINK3_NS}}}file")]
+    raise ValueError("Not a Metalink document.")
+
+
+def _safe_name(name) -> str:
+    # A Metalink names the file, not where it goes: no directories.
+    name = (name or "").replace("\\", "/").rsplit("/", 1)[-1]
+    return "" if name in (".", "..") else name
+
+
+def _int(text) -> Optional[int]:
+    try:
+        value = int((text or "").strip())
+    except ValueError:
+        return None
+    return value if value > 0 else None
+
+
+def _is_http(url) -> bool:
+    return url.lower().startswith(("http://", "https://"))
+
+
+def _pieces(element, hash_tag):
+    if element is None or (element.get("type") or "").lower() not in SHA256_NAMES:
+        return None, []
+    return _int(element.get("length")), [(h.text or "").strip().lower() for h in element.findall(hash_tag)]
+
+
+def _file4(element) -> MetalinkFile:
+    ns = f"{{{METALINK4_NS}}}"
+    ranked = []
+    for i, url in enumerate(element.findall(f"{ns}url")):
+        text = (url.text or "").strip()
+        if _is_http(text):
+            # RFC 5854: priority 1 is the most preferred; unranked come last.
+            ranked.append((_int(url.get("priority")) or 999999, i, text))
+    sha256 = next((h.text.strip().lower() for h in element.findall(f"{ns}hash")
+                   if (h.get("type") or "").lower() in SHA256_NAMES and h.text), None)
+    piece_size, pieces = _pieces(element.find(f"{ns}pieces"), f"{ns}hash")
+    return MetalinkFile(_safe_name(element.get("name")), _int(element.findtext(f"{ns}size")),
+                        [url for _, _, url in sorted(ranked)], sha256, piece_size, pieces)
+
+
+def _file3(element) -> MetalinkFile:
+    ns = f"{{{METALINK3_NS}}}"
+    ranked = []
+    for i, url in enumerate(element.iter(f"{ns}url")):
+        text = (url.text or "").strip()
+        if _is_http(text):
+            # 3.0: preference 100 is the most preferred.
+            ranked.append((-(_int(url.get("preference")) or 0), i, text))
+    sha256 = None
+    for h in element.iter(f"{ns}hash"):
+        if (h.get("type") or "").lower() in SHA256_NAMES and h.text:
+            sha256 = h.text.strip().lower()
+            break
+    pieces_el = element.find(f"{ns}verification/{ns}pieces")
+    piece_size, pieces = _pieces(pieces_el, f"{ns}hash")
+    return MetalinkFile(_safe_name(element.get("name")), _int(element.findtext(f"{ns}size")),
+                        [url for _, _, url in sorted(ranked)], sha256, piece_size, pieces)
+
+
+class MirrorDropped(IOError):
+    """The worker's mirror was dropped under it; the rest goes to another."""
+
+
+class Mirror:
+    """One URL of a MirrorSet, with what it has done so far."""
+
+    def __init__(self, url, rank, min_sample=MIN_SAMPLE):
+        self.url = url
+        self.rank = rank                    # position in the published order
+        self.min_sample = min_sample
+        self.bytes = 0
+        self.seconds = 0.0
+        self.active = 0                     # segments being fetched from it now
+        self.failures = 0                   # in a row
+        self.dropped = False
+        self.served = RangeSet()
+
+    @property
+    def throughput(self) -> Optional[float]:
+        """Bytes per second per connection, once `min_sample` bytes have been timed."""
+        if self.bytes < self.min_sample or self.seconds <= 0:
+            return None
+        return self.bytes / self.seconds
+
+    def __repr__(self):
+        return f"Mirror({self.url!r}, {self.bytes} B, dropped={self.dropped})"
+
+
+class MirrorSet:
+    """The mirrors of one download. Every method is safe from any thread."""
+
+    def __init__(self, urls, slow_ratio=SLOW_RATIO, max_failures=MAX_FAILURES, min_sample=MIN_SAMPLE):
+        seen = []
+        for url in urls:
+            if url and url not in seen:
+                seen.append(url)
+        self.mirrors = [Mirror(url, i, min_sample) for i, url in enumerate(seen)]
+        self.slow_ratio = slow_ratio
+        self.max_failures = max_failures
+        self._lock = threading.Lock()
+
+    @property
+    def live(self) -> List[Mirror]:
+        with self._lock:
+            return [m for m in self.mirrors if not m.dropped]
+
+    def pick(self) -> Optional[Mirror]:
+        """The mirror for a new segment, counted as busy until release(); None if all are dropped."""
+        with self._lock:
+            live = [m for m in self.mirrors if not m.dropped]
+            if not live:
+                return None
+            untried = [m for m in live if m.throughput is None and not m.active]
+            if untried:
+                mirror = min(untried, key=lambda m: m.rank)
+            else:
+                known = [m.throughput for m in live if m.throughput is not None]
+                best = max(known) if known else 1.0
+                mirror = min(live, key=lambda m: ((m.active + 1) / (m.throughput or best), m.rank))
+            mirror.active += 1
+            return mirror
+
+    def release(self, mirror):
+        with self._lock:
+            mirror.active = max(0, mirror.active - 1)
+
+    def report(self, mirror, offset, count, seconds) -> bool:
+        """
+        `count` bytes at `offset` took `seconds` from `mirror`. False if the
+        mirror is (now) dropped: the caller should move to another.
+        """
+        with self._lock:
+            mirror.bytes += count
+            mirror.seconds += max(seconds, 0.0)
+            mirror.failures = 0
+            mirror.served.add(offset, offset + count)
+            if not mirror.dropped and mirror.throughput is not None:
+                live = [m for m in self.mirrors if not m.dropped]
+                best = max((m.throughput for m in live if m.throughput is not None), default=0)
+                if len(live) > 1 and mirror.throughput < self.slow_ratio * best:
+                    mirror.dropped = True
+            return not mirror.dropped
+
+    def fail(self, mirror) -> bool:
+        """A request to `mirror` failed. False once no mirror is left to use."""
+        with self._lock:
+            mirror.failures += 1
+            if mirror.failures >= self.max_failures:
+                mirror.dropped = True
+            return any(not m.dropped for m in self.mirrors)
+
+    def blame(self, ranges) -> List[Mirror]:
+        """Count a failure against each mirror that served bytes in `ranges` (bad pieces)."""
+        with self._lock:
+            culprits = [m for m in self.mirrors
+                        if any(_overlaps(m.served, s, e) for s, e in ranges)]
+            for mirror in culprits:
+                for start, end in ranges:
+                    mirror.served.remove(start, end)    # fetched again, maybe elsewhere
+        for mirror in culprits:
+            self.fail(mirror)
+        return culprits
+
+
+def _overlaps(ranges, start, end) -> bool:
+    return any(s < end and start < e for s, e in ranges)
+
@@ -0,0 +1,415 @@
+"""
+omnibox.py  —  address-bar suggestions from history, bookmarks and open tabs.
+
+navigate_to_url only ever decided "URL or search?"; nothing was suggested
+while typing. This is the index behind the completer.
+
+Ranking is frecency: how often a page was visited, decayed by how long ago.
+weight × 2^(−age / half_life) changes with the clock, but its order does
+not — log2(weight) + last_visit / half_life ranks pages identically at any
+fixed "now". That key is stored per page and only ever changes when the
+page does, so a query never recomputes decay for 500k entries.
+
+Three structures, all updated as visits happen:
+    • a sorted token list (bisect) for prefix matches — the URL without
+      scheme or "www.", its host labels, path words and title words;
+    • trigram postings over the host, so "hub" still finds github.com;
+    • every page in rank order. One or two typed letters match a large
+      share of everything, so those queries walk pages best-first and stop
+      at the first `limit` that match instead of scoring them all.
+Postings only grow; a page whose title changed is re-checked against its
+current text before it is returned, so stale postings cost a little time
+but never a wrong suggestion.
+
+Startup goes through bulk_load, which builds everything aside and sorts
+once rather than inserting half a million tokens one at a time.
+
+Thread safety: queries run on a worker thread while the UI thread records
+visits, so every public method takes the index lock. Holding it is
+microseconds for an update and bounded by MAX_CANDIDATES for a query.
+"""
+
+import heapq
+import math
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from datetime import datetime
+
+DEFAULT_HALF_LIFE_DAYS = 14.0
+
+# A bookmark or an open tab counts as this many visits.
+BOOKMARK_WEIGHT = 10.0
+OPEN_TAB_WEIGHT = 3.0
+
+# Match quality, added in the same log2 space as frecency: a URL that
+# starts with what was typed is worth four times a substring hit.
+URL_PREFIX_BONUS = 2.0
+TOKEN_PREFIX_BONUS = 1.0
+
+# Terms this short are answered by walking pages in rank order.
+SHORT_TERM = 2
+
+# Pages walked for a short term before falling back to the token index
+# (a rare two-letter prefix may match nothing near the top).
+MAX_RANK_WALK = 3000
+
+# Candidates gathered from the indexes for a longer term; past this the
+# query is not selective enough to be worth finishing exactly.
+MAX_CANDIDATES = 8000
+
+MAX_SUGGESTIONS = 8
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def strip_url(url: str) -> str:
+    """'https://www.example.com/a' → 'example.com/a', lowercased."""
+    u = (url or "").strip().lower()
+    for scheme in ("https://", "http://"):
+        if u.startswith(scheme):
+            u = u[len(scheme):]
+            break
+    if u.startswith("www."):
+        u = u[4:]
+    return u.rstrip("/")
+
+
+def url_tokens(bare: str) -> set:
+    """What a prefix may match in a stripped URL: all of it, host labels, path words."""
+    if not bare:
+        return set()
+    host, _, path = bare.partition("/")
+    out = {bare}
+    out.update(label for label in host.split(".") if label)
+    out.update(_WORD_RE.findall(path))
+    return out
+
+
+def title_tokens(title: str) -> set:
+    return set(_WORD_RE.findall((title or "").lower()))
+
+
+def tokens_for(url: str, title: str) -> set:
+    return url_tokens(strip_url(url)) | title_tokens(title)
+
+
+def trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def parse_history_time(stamp) -> float:
+    """The history file's "yyyy-MM-dd hh:mm" as epoch seconds; 0 if unreadable."""
+    try:
+        return datetime.strptime(str(stamp), "%Y-%m-%d %H:%M").timestamp()
+    except ValueError:
+        return 0.0
+
+
+def history_records(history) -> list:
+    """
+    The history file's (timestamp, url) list as bulk_load records: one per
+    URL with its visit count and latest visit. The file has no titles;
+    those arrive as pages are visited again.
+    """
+    seen = {}
+    for item in history or ():
+        try:
+            stamp, url = item
+        except (TypeError, ValueError):
+            continue
+        if not isinstance(url, str) or not url:
+            continue
+        count, last = seen.get(url, (0, 0.0))
+        seen[url] = (count + 1, max(last, parse_history_time(stamp)))
+    return [(url, "", count, last) for url, (count, last) in seen.items()]
+
+
+class Suggestion:
+    __slots__ = ("url", "title", "score", "bookmarked", "open_tab")
+
+    def __init__(self, url, title, score, bookmarked=False, open_tab=False):
+        self.url = url
+        self.title = title
+        self.score = score
+        self.bookmarked = bookmarked
+        self.open_tab = open_tab
+
+    def __repr__(self):
+        return f"Suggestion({self.url!r}, {self.score:.2f})"
+
+
+class _Page:
+    __slots__ = ("id", "url", "title", "bare", "haystack", "words", "visits", "last",
+                 "bookmarked", "open_tabs", "rank")
+
+    def __init__(self, pid, url):
+        self.id = pid
+        self.url = url
+        self.title = ""
+        self.bare = strip_url(url)
+        self.haystack = self.bare
+        self.words = ""            # " tok tok …", for prefix tests
+        self.visits = 0
+        self.last = 0.0
+        self.bookmarked = False
+        self.open_tabs = 0
+        self.rank = -math.inf
+
+
+class OmniboxIndex:
+
+    def __init__(self, half_life_days=DEFAULT_HALF_LIFE_DAYS):
+        self._half_life = half_life_days * 86400.0
+        self._lock = threading.Lock()
+        self._pages = []           # id -> _Page
+        self._by_url = {}
+        self._tokens = []          # sorted, unique
+        self._postings = {}        # token -> set of ids
+        self._trigrams = {}        # trigram -> set of ids
+        self._by_rank = []         # (-rank, id), ascending = best first
+
+    def __len__(self):
+        with self._lock:
+            return len(self._pages)
+
+    # ── updates ──────────────────────────────────────────────────────────
+
+    def _page(self, url, sort_tokens=True):
+        page = self._by_url.get(url)
+        if page is None:
+            page = _Page(len(self._pages), url)
+            self._pages.append(page)
+            self._by_url[url] = page
+            tokens = url_tokens(page.bare)
+            page.words = " " + " ".join(tokens)
+            self._index(page, tokens, sort_tokens)
+            for gram in trigrams(page.bare.partition("/")[0]):
+                self._trigrams.setdefault(gram, set()).add(page.id)
+        return page
+
+    def _index(self, page, tokens, sort_tokens=True):
+        for token in tokens:
+            ids = self._postings.get(token)
+            if ids is None:
+                ids = self._postings[token] = set()
+                if sort_tokens:
+                    insort(self._tokens, token)
+                else:
+                    self._tokens.append(token)
+            ids.add(page.id)
+
+    def _retitle(self, page, title, sort_tokens=True):
+        title = (title or "").strip()
+        if not title or title == page.title:
+            return
+        page.title = title
+        page.haystack = f"{page.bare} {title.lower()}"
+        tokens = title_tokens(title)
+        page.words = " " + " ".join(url_tokens(page.bare) | tokens)
+        self._index(page, tokens, sort_tokens)
+
+    def _weighted_rank(self, page):
+        weight = (page.visits
+                  + (BOOKMARK_WEIGHT if page.bookmarked else 0.0)
+                  + (OPEN_TAB_WEIGHT if page.open_tabs else 0.0))
+        return (math.log2(weight) + page.last / self._half_life
+                if weight > 0 else -math.inf)
+
+    def _rerank(self, page):
+        rank = self._weighted_rank(page)
+        if rank == page.rank:
+            return
+        if page.rank != -math.inf:
+            i = bisect_left(self._by_rank, (-page.rank, page.id))
+            if i < len(self._by_rank) and self._by_rank[i][1] == page.id:
+                del self._by_rank[i]
+        page.rank = rank
+        if rank != -math.inf:
+            insort(self._by_rank, (-rank, page.id))
+
+    def bulk_load(self, records):
+        """
+        Load (url, title, visits, last_visit) records, e.g. all of history.
+
+        Built into a private index with no lock held, then swapped in; any
+        pages recorded meanwhile are replayed on top. Meant for a worker
+        thread at startup, so the UI thread never waits on the load.
+        """
+        staged = OmniboxIndex(self._half_life / 86400.0)
+        for url, title, visits, last in records:
+            if not url:
+                continue
+            page = staged._page(url, sort_tokens=False)
+            page.visits += visits
+            page.last = max(page.last, last)
+            staged._retitle(page, title, sort_tokens=False)
+        staged._tokens.sort()
+        for page in staged._pages:
+            page.rank = staged._weighted_rank(page)
+        staged._by_rank = sorted((-p.rank, p.id) for p in staged._pages
+                                 if p.rank != -math.inf)
+        with self._lock:
+            recent = self._pages
+            (self._pages, self._by_url, self._tokens, self._postings,
+             self._trigrams, self._by_rank) = (
+                staged._pages, staged._by_url, staged._tokens, staged._postings,
+                staged._trigrams, staged._by_rank)
+            for old in recent:
+                page = self._page(old.url)
+                page.visits += old.visits
+                page.last = max(page.last, old.last)
+                page.bookmarked = page.bookmarked or old.bookmarked
+                page.open_tabs += old.open_tabs
+                self._retitle(page, old.title)
+                self._rerank(page)
+
+    def record_visit(self, url, title="", when=None, count=1):
+        if not url:
+            return
+        when = time.time() if when is None else when
+        with self._lock:
+            page = self._page(url)
+            page.visits += count
+            page.last = max(page.last, when)
+            self._retitle(page, title)
+            self._rerank(page)
+
+    def set_bookmarked(self, url, title="", bookmarked=True, when=None):
+        if not url:
+            return
+        with self._lock:
+            page = self._page(url)
+            page.bookmarked = bookmarked
+            if bookmarked:
+                page.last = max(page.last, time.time() if when is None else when)
+            self._retitle(page, title)
+            self._rerank(page)
+
+    def replace_bookmarks(self, bookmarks, when=None):
+        """Sync to the full bookmark list: (url, title) pairs."""
+        wanted = {url: title for url, title in bookmarks if url}
+        with self._lock:
+            stale = [p for p in self._pages if p.bookmarked and p.url not in wanted]
+            for page in stale:
+                page.bookmarked = False
+                self._rerank(page)
+        for url, title in wanted.items():
+            self.set_bookmarked(url, title, True, when)
+
+    def tab_opened(self, url, title=""):
+        if not url:
+            return
+        with self._lock:
+            page = self._page(url)
+            page.open_tabs += 1
+            self._retitle(page, title)
+            self._rerank(page)
+
+    def tab_closed(self, url):
+        with self._lock:
+            page = self._by_url.get(url)
+            if page is not None and page.open_tabs:
+                page.open_tabs -= 1
+                self._rerank(page)
+
+    # ── queries ──────────────────────────────────────────────────────────
+
+    def _prefix_ids(self, term):
+        out = set()
+        i = bisect_left(self._tokens, term)
+        tokens = self._tokens
+        while i < len(tokens) and tokens[i].startswith(term):
+            out |= self._postings[tokens[i]]
+            if len(out) >= MAX_CANDIDATES:
+                break
+            i += 1
+        return out
+
+    def _substring_ids(self, term):
+        sets = [self._trigrams.get(g) for g in trigrams(term)]
+        if not sets or any(s is None for s in sets):
+            return set()
+        sets.sort(key=len)
+        out = set(sets[0])
+        for s in sets[1:]:
+            out &= s
+            if not out:
+                break
+        return out
+
+    def _candidates(self, term):
+        ids = self._prefix_ids(term)
+        if len(term) >= 3 and len(ids) < MAX_CANDIDATES:
+            ids |= self._substring_ids(term)
+        return ids
+
+    @staticmethod
+    def _match_bonus(page, terms):
+        """None if some term is absent, else the bonus for how the first matched."""
+        for term in terms:
+            if term not in page.haystack:
+                return None
+        first = terms[0]
+        if page.bare.startswith(first):
+            return URL_PREFIX_BONUS
+        if " " + first in page.words:
+            return TOKEN_PREFIX_BONUS
+        if len(first) <= SHORT_TERM:
+            return None        # one or two letters mid-word is noise
+        return 0.0
+
+    def _walk_by_rank(self, terms, limit):
+        """Best-first scan for short queries. None if it ran out of budget."""
+        scored = []
+        for n, (neg_rank, pid) in enumerate(self._by_rank):
+            if n >= MAX_RANK_WALK:
+                return None
+            bonus = self._match_bonus(self._pages[pid], terms)
+            if bonus is None:
+                continue
+            scored.append((-neg_rank + bonus, pid))
+            # The first `limit` matches by frecency; bonuses only order
+            # them. Two letters say too little to justify digging deeper.
+            if len(scored) >= limit:
+                break
+        return scored
+
+    def query(self, text, limit=MAX_SUGGESTIONS) -> list:
+        """Best `limit` pages for what has been typed, best first."""
+        terms = [t for t in (text or "").lower().split() if t]
+        if not terms:
+            return []
+        # A typed scheme or www. is not part of what pages are indexed by.
+        terms[0] = strip_url(terms[0]) or terms[0]
+        with self._lock:
+            scored = None
+            if max(len(t) for t in terms) <= SHORT_TERM:
+                scored = self._walk_by_rank(terms, limit)
+            if scored is None:
+                scored = self._score_candidates(terms)
+            top = heapq.nlargest(limit, scored)
+            return [Suggestion(self._pages[pid].url, self._pages[pid].title, score,
+                               self._pages[pid].bookmarked,
+                               bool(self._pages[pid].open_tabs))
+                    for score, pid in top]
+
+    def _score_candidates(self, terms):
+        # The rarest term narrows the search most.
+        best_ids = None
+        for term in sorted(terms, key=len, reverse=True):
+            ids = self._candidates(term)
+            if best_ids is None or len(ids) < len(best_ids):
+                best_ids = ids
+            if len(best_ids) < 64:
+                break
+        scored = []
+        for pid in best_ids or ():
+            page = self._pages[pid]
+            if page.rank == -math.inf:
+                continue
+            bonus = self._match_bonus(page, terms)
+            if bonus is not None:
+                scored.append((page.rank + bonus, pid))
+        return scored
@@ -0,0 +1,542 @@
+"""
+palette.py  —  the fuzzy-match index behind the Ctrl+K command palette.
+
+With a few hundred tabs, Ctrl+Tab one at a time is no way to find one, and
+the menus hold dozens of actions with no search at all. The palette takes a
+few typed letters and ranks every tab, menu action, bookmark and recent
+history entry against them.
+
+Each space-separated term must match, and how it matches sets its tier:
+
+    0  the label starts with it           "git"  → "GitHub"
+    1  a word in the label starts with it  "iss"  → "GitHub Issues"
+    2  the label's initials start with it  "ghi"  → "GitHub Issues"
+    3  a word in the URL starts with it
+    4  it appears anywhere, label or URL
+    5  its letters appear in order in the label   "gthb" → "GitHub"
+
+Better tiers rank first. Within the fuzzy tier, tighter matches (runs of
+letters, letters on word starts) beat scattered ones. Then tabs come before
+actions, bookmarks and history, and within a kind the order the caller
+gave (tab order, most recent history first). Fuzzy matching stays out of
+URLs: a long path holds most of the alphabet and would match anything.
+
+The palette is searched on every keystroke on the UI thread, so the target
+is 5 ms for 10k items. What keeps it there:
+    • every entry is prepared once, and each kind's entries are joined, in
+      rank order, into newline-separated blobs per field. The exact tiers
+      are str.find loops in C that visit matches only, best tier first,
+      and stop at a full page;
+    • the fuzzy tier is pre-filtered by bitmask. Per symbol there is a
+      bitset of the labels holding it, and per label a pair mask with a
+      bit for every letter pair (a, b) with some a before some b. A term
+      needs all its letters and each adjacent pair in order, so a few ANDs
+      rule out nearly every label that cannot match. Only the rest are
+      scored letter by letter, and at most FUZZY_SCAN of them;
+    • several terms narrow: the longest term's lines are found as above
+      and the shorter terms are checked against those only. When a query
+      extends the previous one, only the previous matches are looked at
+      again;
+    • a change rebuilds only its own kind: a tab retitled while the
+      palette is open does not re-prepare thousands of history entries.
+
+Tabs are updated in place as they change title or URL; bookmarks, history
+and actions are replaced wholesale, reusing unchanged entries.
+
+No Qt imports: `target` is whatever the caller needs to act on an entry.
+"""
+
+import heapq
+import re
+from bisect import bisect_right
+from itertools import compress
+
+from omnibox import strip_url
+
+# Kinds, in the order they win a tie.
+TAB = "tab"
+ACTION = "action"
+BOOKMARK = "bookmark"
+HISTORY = "history"
+KIND_ORDER = {TAB: 0, ACTION: 1, BOOKMARK: 2, HISTORY: 3}
+
+MAX_RESULTS = 20
+RECENT_HISTORY = 1000     # history entries offered, most recent first
+
+# Tiers (see the module docstring).
+LABEL_PREFIX, LABEL_WORD, INITIALS, DETAIL_WORD, SUBSTRING, FUZZY = range(6)
+
+# Fuzzy-tier scoring: higher is a tighter match.
+SCORE_MATCH = 16
+BONUS_BOUNDARY = 10       # letter starts a word
+BONUS_CONSECUTIVE = 6
+PENALTY_GAP = 1           # per skipped character
+MAX_GAP_PENALTY = 8       # per gap
+_TIER_WEIGHT = 1000       # keeps tiers apart from fuzzy scores
+
+# Candidates the fuzzy tier scores at most, best kinds first. Only reached
+# when fewer than a page of entries match exactly; past this many, loose
+# matches in a long history are noise, and scoring them costs the budget.
+FUZZY_SCAN = 400
+
+_SEPARATORS = " /.-_:?=&#›|—()[],'\"@+"
+_SPLIT = re.compile("[" + re.escape(_SEPARATORS) + "]+")
+_CAMEL = re.compile(r"(?<=[a-z])(?=[A-Z])|(?<=[A-Za-z])(?=[0-9])|(?<=[0-9])(?=[A-Za-z])")
+_NOT_SEP = "[^" + re.escape(_SEPARATORS) + "]"
+_WORD_START = re.compile(f"(?<!{_NOT_SEP}){_NOT_SEP}|(?<=[a-z])[A-Z]")
+
+# Mask symbols: a-z, 0-9, and one shared by everything else but spaces.
+_SYMBOLS = "abcdefghijklmnopqrstuvwxyz0123456789~"
+_SYMBOL_INDEX = {ch: i for i, ch in enumerate(_SYMBOLS)}
+_SYMBOL_BIT = {ch: 1 << i for ch, i in _SYMBOL_INDEX.items()}
+_ROW_SHIFT = {ch: i * len(_SYMBOLS) for ch, i in _SYMBOL_INDEX.items()}
+_OTHER = re.compile(r"[^a-z0-9 ]")
+
+
+def _symbols(text) -> str:
+    """Lower-cased text reduced to mask symbols; spaces dropped."""
+    return _OTHER.sub("~", text.lower()).replace(" ", "")
+
+
+def char_mask(text) -> int:
+    """Bit per symbol present in `text`."""
+    mask = 0
+    for ch in set(_symbols(text)):
+        mask |= 1 << _SYMBOL_INDEX[ch]
+    return mask
+
+
+def pair_mask(text) -> int:
+    """
+    Bit b*37+a for every symbol pair with some a before some b in `text`.
+
+    Row b is what had been seen before b's last occurrence, so one pass
+    that keeps overwriting each symbol's row is enough.
+    """
+    rows = {}
+    seen = 0
+    for ch in _symbols(text):
+        rows[ch] = seen
+        seen |= _SYMBOL_BIT[ch]
+    mask = 0
+    for ch, row in rows.items():
+        if row:
+            mask |= row << _ROW_SHIFT[ch]
+    return mask
+
+
+def term_pairs(term) -> int:
+    """The pair bits a term needs: each adjacent pair of its symbols."""
+    sym = _symbols(term)
+    mask = 0
+    for a, b in zip(sym, sym[1:]):
+        mask |= _SYMBOL_BIT[a] << _ROW_SHIFT[b]
+    return mask
+
+
+def words_of(text) -> str:
+    """' word word …' — lower-cased, split on separators and inner capitals."""
+    return " " + " ".join(w for w in _SPLIT.split(_CAMEL.sub(" ", text)) if w).lower()
+
+
+def word_starts(text):
+    """Indices in `text` that begin a word (after a separator, or a capital)."""
+    return [m.start() for m in _WORD_START.finditer(text)]
+
+
+class PaletteItem:
+    """One thing the palette can offer."""
+
+    __slots__ = ("kind", "key", "label", "detail", "target")
+
+    def __init__(self, kind, key, label, detail="", target=None):
+        self.kind = kind
+        self.key = key
+        self.label = label or ""
+        self.detail = detail or ""
+        self.target = target
+
+    def __repr__(self):
+        return f"PaletteItem({self.kind!r}, {self.label!r})"
+
+
+class _Entry:
+    __slots__ = ("item", "rank", "text", "label", "label_words", "detail_words",
+                 "initials", "pairs", "starts", "start_set", "start_chars")
+
+    def __init__(self, item, seq):
+        self.item = item
+        self.rank = (KIND_ORDER.get(item.kind, len(KIND_ORDER)), seq)
+        self.label = item.label.lower()
+        self.text = f"{self.label} {item.detail.lower()}" if item.detail else self.label
+        self.label_words = words_of(item.label)
+        self.detail_words = words_of(item.detail) if item.detail else ""
+        self.initials = "".join(w[0] for w in self.label_words.split())
+        self.pairs = pair_mask(self.label)
+        # Case folding can change the length ("İ"); then word starts come
+        # from the folded label and inner capitals are not seen.
+        raw = item.label if len(item.label) == len(self.label) else self.label
+        self.starts = word_starts(raw)
+        self.start_set = frozenset(self.starts)
+        self.start_chars = "".join(self.label[i] for i in self.starts)
+
+    def same_as(self, item) -> bool:
+        return self.item.label == item.label and self.item.detail == item.detail
+
+
+def bookmark_items(bookmarks):
+    """PaletteItems for bookmark dicts ({"title", "url", "folder"})."""
+    items = []
+    for b in bookmarks:
+        if isinstance(b, dict) and b.get("url"):
+            items.append(PaletteItem(BOOKMARK, b["url"], b.get("title") or strip_url(b["url"]),
+                                     b["url"], b["url"]))
+    return items
+
+
+def history_items(history, limit=RECENT_HISTORY):
+    """
+    PaletteItems for the `limit` most recently visited distinct URLs.
+
+    `history` is the browser's list of (timestamp, url), oldest first. It
+    holds no titles, so the label is the URL without scheme and "www.".
+    """
+    items = []
+    seen = set()
+    for record in reversed(history):
+        if len(items) >= limit:
+            break
+        try:
+            stamp, url = record
+        except (TypeError, ValueError):
+            continue
+        if not isinstance(url, str) or not url or url in seen:
+            continue
+        seen.add(url)
+        items.append(PaletteItem(HISTORY, url, strip_url(url), url, url))
+    return items
+
+
+def split_query(text):
+    return (text or "").lower().split()
+
+
+def fuzzy_score(term, entry):
+    """How tightly `term`'s letters fall in order in the label, or None."""
+    label = entry.label
+    find = label.find
+    starts = entry.start_set
+
+    # Begin on a word start when the first letter opens one.
+    k = entry.start_chars.find(term[0])
+    pos = entry.starts[k] if k >= 0 else find(term[0])
+    if pos < 0:
+        return None
+    score = SCORE_MATCH + (BONUS_BOUNDARY if pos in starts else 0)
+    prev = pos
+    for ch in term[1:]:
+        nxt = find(ch, prev + 1)
+        if nxt < 0:
+            return None
+        score += SCORE_MATCH
+        if nxt == prev + 1:
+            score += BONUS_CONSECUTIVE
+        else:
+            score -= min((nxt - prev - 1) * PENALTY_GAP, MAX_GAP_PENALTY)
+            if nxt in starts:
+                score += BONUS_BOUNDARY
+        prev = nxt
+    return min(score, _TIER_WEIGHT - 1)
+
+
+def score_term(term, entry):
+    """Higher is better; None if `term` does not match the entry."""
+    spaced = " " + term
+    if entry.label_words.startswith(spaced):
+        tier = LABEL_PREFIX
+    elif spaced in entry.label_words:
+        tier = LABEL_WORD
+    elif entry.initials.startswith(term):
+        tier = INITIALS
+    elif spaced in entry.detail_words:
+        tier = DETAIL_WORD
+    elif term in entry.text:
+        tier = SUBSTRING
+    else:
+        fine = fuzzy_score(term, entry)
+        return None if fine is None else fine - FUZZY * _TIER_WEIGHT
+    return -tier * _TIER_WEIGHT
+
+
+def score_entry(terms, entry):
+    """Sum over the terms; None if any one does not match."""
+    total = 0
+    for term in terms:
+        score = score_term(term, entry)
+        if score is None:
+            return None
+        total += score
+    return total
+
+
+_ZERO_BYTES = bytes.maketrans(b"0", b"\0")
+
+
+def _set_bits(bits):
+    """Indices of the set bits of `bits`, ascending."""
+    flags = bin(bits)[:1:-1].encode().translate(_ZERO_BYTES)
+    return list(compress(range(len(flags)), flags))
+
+
+class _Segment:
+    """
+    One kind's entries in rank order, searched with C-level string calls.
+
+    Each field is joined into one blob — a newline before every line —
+    with the offset where each line's text starts. For the fuzzy
+    prefilter there is a line bitset per symbol (bit i set if line i's
+    label holds it) and the pair masks as a flat list.
+    """
+
+    FIELDS = ("label_words", "initials", "detail_words", "text")
+
+    def __init__(self, entries):
+        self.entries = sorted(entries, key=lambda e: e.rank)
+        self.blobs = {}
+        for field in self.FIELDS:
+            lines = [getattr(e, field) for e in self.entries]
+            offsets = []
+            at = 1
+            for line in lines:
+                offsets.append(at)
+                at += len(line) + 1
+            self.blobs[field] = ("\n" + "\n".join(lines) + "\n", offsets)
+        self.pairs = [e.pairs for e in self.entries]
+        labels = [_symbols(e.label) for e in reversed(self.entries)]
+        present = set().union(*labels) if labels else set()
+        self.holding = {ch: int("".join("1" if ch in lab else "0" for lab in labels), 2)
+                        for ch in present}
+
+    def lines(self, field, needle, seen, found, score, limit=None):
+        """Lines holding `needle`, in order, each once; appended to `found`."""
+        blob, offsets = self.blobs[field]
+        # A needle anchored on the newline belongs to the next line.
+        skip = 1 if needle[0] == "\n" else 0
+        pos = blob.find(needle)
+        while pos >= 0:
+            line = bisect_right(offsets, pos + skip) - 1
+            if (self, line) not in seen:
+                seen.add((self, line))
+                found.append((score, self, line))
+                if limit is not None and len(found) >= limit:
+                    return
+            if line + 1 >= len(offsets):
+                return
+            pos = blob.find(needle, offsets[line + 1] - skip)
+
+    def line_set(self, field, needle) -> set:
+        """Every line holding `needle`; the multi-term search intersects these."""
+        blob, offsets = self.blobs[field]
+        skip = 1 if needle[0] == "\n" else 0
+        out = set()
+        last = len(offsets) - 1
+        pos = blob.find(needle)
+        while pos >= 0:
+            line = bisect_right(offsets, pos + skip) - 1
+            out.add(line)
+            if line >= last:
+                break
+            pos = blob.find(needle, offsets[line + 1] - skip)
+        return out
+
+    def narrow(self, term, exact, possible):
+        """`exact` and `possible` cut down to the lines `term` can match."""
+        entries = self.entries
+        hit = {i for i in possible
+               if term in entries[i].text or entries[i].initials.startswith(term)}
+        if len(term) > 1:
+            need = term_pairs(term)
+            pairs = self.pairs
+            hit.update(i for i in possible if not need & ~pairs[i])
+        return exact & hit, hit
+
+    def fuzzy_candidates(self, term, seen=()):
+        """Lines not yet seen whose label can hold `term` in order."""
+        if len(term) < 2 or not self.entries:
+            return []                # one letter: already a substring match
+        bits = -1
+        for ch in set(_symbols(term)):
+            bits &= self.holding.get(ch, 0)
+            if not bits:
+                return []
+        need = term_pairs(term)
+        pairs = self.pairs
+        return [i for i in _set_bits(bits)
+                if not need & ~pairs[i] and (self, i) not in seen]
+
+
+class PaletteIndex:
+    """Prepared entries by (kind, key), searched by `search`."""
+
+    def __init__(self):
+        self._entries = {}           # (kind, key) -> _Entry
+        self._seq = 0
+        self._segments = {}          # kind -> _Segment
+        self._dirty = set()          # kinds whose segment needs rebuilding
+        self._ordered = []           # the segments, best kind first
+        self._last_query = None
+        self._last_matches = None    # every entry that matched _last_query
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _changed(self, kind):
+        # Only that kind's segment: a tab retitled while the palette is
+        # open must not cost a rebuild of thousands of history entries.
+        self._dirty.add(kind)
+        self._last_query = None
+        self._last_matches = None
+
+    def _next_seq(self):
+        self._seq += 1
+        return self._seq
+
+    def set_item(self, item: PaletteItem):
+        """Add or update one entry, keeping its place; unchanged, left alone."""
+        key = (item.kind, item.key)
+        old = self._entries.get(key)
+        if old is not None and old.same_as(item):
+            old.item.target = item.target
+            return
+        seq = old.rank[1] if old is not None else self._next_seq()
+        self._entries[key] = _Entry(item, seq)
+        self._changed(item.kind)
+
+    def remove(self, kind, key):
+        if self._entries.pop((kind, key), None) is not None:
+            self._changed(kind)
+
+    def replace_kind(self, kind, items):
+        """Make `items`, in order, the whole of `kind`."""
+        old_entries = {k: e for k, e in self._entries.items() if k[0] == kind}
+        for key in old_entries:
+            del self._entries[key]
+        for item in items:
+            key = (kind, item.key)
+            if key in self._entries:
+                continue
+            old = old_entries.get(key)
+            seq = self._next_seq()
+            if old is not None and old.same_as(item):
+                old.item.target = item.target
+                old.rank = (old.rank[0], seq)
+                self._entries[key] = old
+            else:
+                self._entries[key] = _Entry(item, seq)
+        self._changed(kind)
+
+    # ── search ───────────────────────────────────────────────────────────
+
+    def _ranked_segments(self):
+        """Non-empty segments, best kind first."""
+        if self._dirty:
+            by_kind = {kind: [] for kind in self._dirty}
+            for (kind, _), entry in self._entries.items():
+                if kind in by_kind:
+                    by_kind[kind].append(entry)
+            for kind, entries in by_kind.items():
+                if entries:
+                    self._segments[kind] = _Segment(entries)
+                else:
+                    self._segments.pop(kind, None)
+            self._dirty.clear()
+            self._ordered = sorted(self._segments.values(),
+                                   key=lambda seg: seg.entries[0].rank)
+        return self._ordered
+
+    def search(self, text, limit=MAX_RESULTS):
+        """[(score, PaletteItem)], best first. Empty query, empty result."""
+        terms = split_query(text)
+        if not terms or limit <= 0:
+            return []
+        if len(terms) == 1:
+            return self._search_term(terms[0], limit)
+        return self._search_terms(terms, limit)
+
+    def _search_term(self, term, limit):
+        """
+        One term: walk the tiers best first, each across the kinds in rank
+        order, and stop at `limit`. Only the fuzzy tier scores entries one
+        by one, and only when the exact tiers came up short.
+        """
+        segments = self._ranked_segments()
+        found = []                   # (score, segment, line)
+        seen = set()
+        spaced = " " + term
+        passes = (
+            (LABEL_PREFIX, "label_words", "\n" + spaced),
+            (LABEL_WORD, "label_words", spaced),
+            (INITIALS, "initials", "\n" + term),
+            (DETAIL_WORD, "detail_words", spaced),
+            (SUBSTRING, "text", term),
+        )
+        for tier, field, needle in passes:
+            for seg in segments:
+                seg.lines(field, needle, seen, found, -tier * _TIER_WEIGHT, limit)
+                if len(found) >= limit:
+                    return [(score, seg.entries[i].item) for score, seg, i in found]
+
+        fuzzy = []
+        budget = FUZZY_SCAN
+        for seg in segments:
+            for i in seg.fuzzy_candidates(term, seen)[:budget]:
+                budget -= 1
+                fine = fuzzy_score(term, seg.entries[i])
+                if fine is not None:
+                    fuzzy.append((fine - FUZZY * _TIER_WEIGHT, seg, i))
+            if budget <= 0:
+                break
+        fuzzy.sort(key=lambda row: -row[0])        # stable: rank order on ties
+        found.extend(fuzzy[:limit - len(found)])
+        return [(score, seg.entries[i].item) for score, seg, i in found]
+
+    def _search_terms(self, terms, limit):
+        """
+        Several terms: every one must match. Per kind, the lines where each
+        term is a substring or an initials prefix are intersected and all
+        scored; lines some term can only match fuzzily are scored up to
+        FUZZY_SCAN, as in the single-term search.
+        """
+        query = " ".join(terms)
+        if self._last_query is not None and query.startswith(self._last_query):
+            candidates = self._last_matches
+        else:
+            candidates = []
+            budget = FUZZY_SCAN
+            for seg in self._ranked_segments():
+                exact = possible = None
+                # Longest term first: it narrows most, and once few lines
+                # are left the rest are checked line by line instead.
+                for term in sorted(terms, key=len, reverse=True):
+                    if possible is not None and len(possible) * 2 < len(seg.entries):
+                        exact, possible = seg.narrow(term, exact, possible)
+                        continue
+                    lines = seg.line_set("text", term)
+                    lines |= seg.line_set("initials", "\n" + term)
+                    exact = set(lines) if exact is None else exact & lines
+                    lines.update(seg.fuzzy_candidates(term))
+                    possible = lines if possible is None else possible & lines
+                loose = sorted(possible - exact)[:max(budget, 0)]
+                budget -= len(loose)
+                candidates.extend(seg.entries[i] for i in sorted(exact.union(loose)))
+
+        matches = []
+        for entry in candidates:
+            score = score_entry(terms, entry)
+            if score is not None:
+                matches.append((score, entry))
+        self._last_query = query
+        self._last_matches = [entry for _, entry in matches]
+        # Stable: equal scores keep rank order.
+        best = heapq.nsmallest(limit, range(len(matches)), key=lambda i: -matches[i][0])
+        return [(matches[i][0], matches[i][1].item) for i in best]
@@ -0,0 +1,315 @@
+"""
+preconnect.py  —  speculative DNS warm-up for the next navigation.
+
+When the top address-bar suggestion or a speed-dial tile sits under the
+cursor, the next navigation is fairly predictable. Resolving the host
+before the click takes that round trip off the critical path.
+
+A warm-up here is a DNS lookup and nothing more. It may leave the answer
+in a local or upstream resolver cache, but Chromium can run its own
+resolver with its own cache, so nothing assumes the lookup is reused:
+what is recorded is how long it took here, reported as lookup time and
+never as time saved. A socket opened in Python could not be handed to
+Chromium's socket pool, so connections are left to Chromium: on the speed
+dial the page adds a <link rel="preconnect"> for the hovered tile.
+
+With a proxy configured there is no warm-up at all: the proxy resolves
+names for Chromium, and a lookup from here would name the host to the
+local resolver instead.
+
+Speculation costs other people's servers and the user's bandwidth, so it is
+bounded: a budget of warm-ups per minute, a cap on how many run at once, a
+host already warm is not warmed again, and a newer prediction from the same
+source cancels the one before it. Hits (a navigation to a host warmed
+shortly before) are counted against warm-ups done, with the lookup time
+of each, so the feature can justify itself or be switched off.
+
+The lookup itself blocks and runs on a worker thread; browser.py owns the
+hover dwell timer and the thread pool.
+"""
+
+import ipaddress
+import os
+import socket
+import sys
+import threading
+import time
+from statistics import median
+from urllib.parse import urlsplit
+from urllib.request import getproxies
+
+# Prediction sources.
+OMNIBOX = "omnibox"
+SPEED_DIAL = "speed-dial"
+SOURCE_LABELS = {OMNIBOX: "Address bar", SPEED_DIAL: "Speed dial"}
+
+DEFAULT_BUDGET = 12                 # warm-ups per budget window
+BUDGET_WINDOW_SECONDS = 60.0
+MAX_IN_FLIGHT = 2
+
+# A warm host counts as a hit if it is navigated to within this long;
+# resolver caches usually hold an answer for longer.
+WARM_TTL_SECONDS = 30.0
+
+# Chromium switches that route its traffic through a proxy.
+_PROXY_FLAGS = ("--proxy-server", "--proxy-pac-url", "--proxy-auto-detect")
+
+
+def target_of(url, https_only=False):
+    """(host, port, tls) for an http(s) URL, else None."""
+    if not isinstance(url, str):
+        return None
+    try:
+        parts = urlsplit(url.strip())
+        scheme = parts.scheme.lower()
+        host = (parts.hostname or "").lower()
+        port = parts.port
+    except ValueError:
+        return None
+    if scheme not in ("http", "https") or not host:
+        return None
+    if scheme == "http" and https_only and port is None:
+        scheme = "https"
+    tls = scheme == "https"
+    return host, port or (443 if tls else 80), tls
+
+
+def proxy_configured(environ=None, argv=None) -> bool:
+    """
+    True if Chromium may be using a proxy: one given in its flags or the
+    environment (by default also the OS proxy settings, via urllib).
+    """
+    if environ is None:
+        environ, proxies = os.environ, getproxies()
+    else:
+        proxies = {k.lower()[:-len("_proxy")]: v for k, v in environ.items()
+                   if k.lower().endswith("_proxy") and v.strip()}
+    proxies.pop("no", None)
+    flags = environ.get("QTWEBENGINE_CHROMIUM_FLAGS", "").split()
+    flags += sys.argv if argv is None else argv
+    return bool(proxies) or any(f.split("=", 1)[0] in _PROXY_FLAGS for f in flags)
+
+
+def _is_ip(host) -> bool:
+    try:
+        ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return True
+
+
+class WarmResult:
+    """Lookup time of one warm-up in ms, or the error it ended with."""
+
+    __slots__ = ("dns_ms", "error")
+
+    def __init__(self):
+        self.dns_ms = None
+        self.error = None
+
+
+def warm_host(host, port):
+    """Resolve `host` and time the lookup; connect nowhere."""
+    result = WarmResult()
+    try:
+        start = time.perf_counter()
+        socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        result.dns_ms = (time.perf_counter() - start) * 1000
+    except (OSError, UnicodeError) as e:
+        result.error = str(e) or type(e).__name__
+    return result
+
+
+class Job:
+    """One warm-up handed to a worker thread."""
+
+    __slots__ = ("host", "port", "source", "cancelled")
+
+    def __init__(self, host, port, source):
+        self.host = host
+        self.port = port
+        self.source = source
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        self.cancelled.set()
+
+
+class _SourceStats:
+    __slots__ = ("predicted", "warmed", "hits", "lookups")
+
+    def __init__(self):
+        self.predicted = 0
+        self.warmed = 0
+        self.hits = 0
+        self.lookups = []          # lookup ms per hit
+
+
+class Preconnector:
+    """
+    Budget, cancellation and hit accounting for warm-ups.
+
+    `predict` decides on the UI thread and returns a Job (or None);
+    `run(job)` does the work on a worker thread. `warm` is warm_host's
+    signature and is replaced in tests.
+    """
+
+    def __init__(self, warm=warm_host, budget=DEFAULT_BUDGET,
+                 window=BUDGET_WINDOW_SECONDS, max_in_flight=MAX_IN_FLIGHT,
+                 ttl=WARM_TTL_SECONDS):
+        self._do_warm = warm
+        self.budget = budget
+        self.window = window
+        self.max_in_flight = max_in_flight
+        self.ttl = ttl
+        self.enabled = True
+        self._lock = threading.Lock()
+        self._starts = []              # monotonic start times within the window
+        self._in_flight = set()
+        self._latest = {}              # source -> Job
+        self._warm = {}                # host -> (finished, lookup ms, source)
+        self._sources = {}
+        self.over_budget = 0
+        self.cancelled = 0
+        self.failed = 0
+        self.navigations = 0
+
+    def _stats(self, source) -> _SourceStats:
+        return self._sources.setdefault(source, _SourceStats())
+
+    def _expire(self, now):
+        cutoff = now - self.window
+        self._starts = [t for t in self._starts if t > cutoff]
+        for host in [h for h, w in self._warm.items() if now - w[0] > self.ttl]:
+            del self._warm[host]
+
+    # ── prediction ───────────────────────────────────────────────────────
+
+    def predict(self, url, source, https_only=False, now=None):
+        """
+        A warm-up for `url` from `source`, or None if it is not worth one.
+
+        Whatever `source` predicted before is cancelled unless it was the
+        same host, which is left to finish.
+        """
+        now = time.monotonic() if now is None else now
+        target = target_of(url, https_only)
+        with self._lock:
+            previous = self._latest.get(source)
+            if previous is not None and target is not None \
+                    and (previous.host, previous.port) == target[:2]:
+                return None
+            self._cancel(source)
+            if not self.enabled or target is None:
+                return None
+            host, port, _tls = target
+            if _is_ip(host):
+                return None                # nothing to resolve
+            self._expire(now)
+            self._stats(source).predicted += 1
+            if host in self._warm:
+                return None
+            if len(self._starts) >= self.budget or len(self._in_flight) >= self.max_in_flight:
+                self.over_budget += 1
+                return None
+            job = Job(host, port, source)
+            self._starts.append(now)
+            self._in_flight.add(job)
+            self._latest[source] = job
+            return job
+
+    def _cancel(self, source):
+        job = self._latest.pop(source, None)
+        if job is not None and not job.cancelled.is_set():
+            job.cancel()
+            self.cancelled += 1
+
+    def cancel(self, source=None):
+        """Cancel what `source` (or every source) has in flight."""
+        with self._lock:
+            for key in [source] if source is not None else list(self._latest):
+                self._cancel(key)
+
+    def run(self, job, now=None) -> WarmResult:
+        """Do the warm-up (worker thread) and record what it reached."""
+        result = None
+        try:
+            if not job.cancelled.is_set():
+                result = self._do_warm(job.host, job.port)
+        finally:
+            with self._lock:
+                self._in_flight.discard(job)
+                if self._latest.get(job.source) is job:
+                    del self._latest[job.source]
+                if result is not None:
+                    if result.error is not None:
+                        self.failed += 1
+                    elif result.dns_ms is not None:
+                        finished = time.monotonic() if now is None else now
+                        self._warm[job.host] = (finished, result.dns_ms, job.source)
+                        self._stats(job.source).warmed += 1
+        return result
+
+    # ── outcome ──────────────────────────────────────────────────────────
+
+    def note_navigation(self, url, now=None) -> bool:
+        """Count a navigation; True if it went to a host warmed in time."""
+        target = target_of(url)
+        if target is None:
+            return False
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._expire(now)
+            self.navigations += 1
+            warm = self._warm.pop(target[0], None)
+            if warm is None:
+                return False
+            stats = self._stats(warm[2])
+            stats.hits += 1
+            stats.lookups.append(warm[1])
+            del stats.lookups[:-500]
+            return True
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._in_flight)
+
+    def summary(self) -> dict:
+        """{source: (predicted, warmed, hits, hit rate, total lookup ms, median ms)}.
+
+        The lookup times are those of the hits' warm-ups, measured here.
+        """
+        with self._lock:
+            out = {}
+            for source, s in self._sources.items():
+                rate = s.hits / s.warmed if s.warmed else None
+                out[source] = (s.predicted, s.warmed, s.hits, rate, sum(s.lookups),
+                               median(s.lookups) if s.lookups else None)
+            return out
+
+
+def preconnect_report(pre: Preconnector) -> str:
+    """Plain-text summary for the Preconnect Statistics box."""
+    lines = []
+    summary = pre.summary()
+    for source in (OMNIBOX, SPEED_DIAL):
+        label = SOURCE_LABELS[source]
+        if source not in summary:
+            lines.append(f"{label}: no predictions yet")
+            continue
+        predicted, warmed, hits, rate, lookups, typical = summary[source]
+        line = f"{label}: {predicted} predicted, {warmed} warmed, {hits} used"
+        if rate is not None:
+            line += f" ({rate:.0%})"
+        if hits:
+            line += f" — their lookups took {lookups:.0f} ms, median {typical:.0f} ms"
+        lines.append(line)
+    lines.append("")
+    lines.append(f"Skipped over budget: {pre.over_budget}   Cancelled: {pre.cancelled}   "
+                 f"Failed: {pre.failed}")
+    lines.append(f"Navigations seen: {pre.navigations}   "
+                 f"Budget: {pre.budget} per {pre.window:.0f} s, {pre.max_in_flight} at once")
+    lines.append("Lookup times are measured here; Chromium may resolve again on its own.")
+    if not pre.enabled:
+        lines.append("Predictive preconnect is off.")
+    return "\n".join(lines)
@@ -14,7 +14,8 @@ current-domain state.
 PRIVATE_PREFIX = "◈ "
 
 # Schemes that are internal to the browser and never worth recording.
-_INTERNAL_SCHEMES = ("file://", "about:", "chrome://", "data:", "blob:", "javascript:")
+_INTERNAL_SCHEMES = ("file://", "about:", "chrome://", "data:", "blob:", "javascript:",
+                     "blackline:", "blackline-icon:")
 
 
 def is_internal_url(url) -> bool:
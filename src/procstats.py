@@ -0,0 +1,204 @@
+"""
+procstats.py  —  process and memory readings for the tab lifecycle and
+the task manager.
+
+A thin layer over psutil. psutil is optional: without it the memory saver
+simply never sees pressure, the task manager says so, and the browser
+behaves as it always did.
+
+Every function takes the psutil module as a parameter (defaulting to the
+real one) so tests can hand in a fake and pin the arithmetic without
+depending on what the test machine happens to be running.
+"""
+
+import os
+
+try:
+    import psutil as _psutil
+except ImportError:                      # optional dependency
+    _psutil = None
+
+
+def available(ps=None) -> bool:
+    return (ps or _psutil) is not None
+
+
+def process_tree(pid=None, ps=None) -> list:
+    """
+    The browser process and every descendant still alive.
+
+    QtWebEngine renderers, the GPU process and utility processes are all
+    children of the browser, so this is the browser's real footprint.
+    """
+    ps = ps or _psutil
+    if ps is None:
+        return []
+    try:
+        root = ps.Process(pid or os.getpid())
+        return [root] + list(root.children(recursive=True))
+    except (ps.NoSuchProcess, ps.AccessDenied):
+        return []
+
+
+def tree_rss(procs, ps=None) -> int:
+    """Total resident memory of `procs`, skipping any that exited meanwhile."""
+    ps = ps or _psutil
+    total = 0
+    for proc in procs:
+        try:
+            total += proc.memory_info().rss
+        except (ps.NoSuchProcess, ps.AccessDenied):
+            continue
+    return total
+
+
+def cpu_seconds(pid, ps=None):
+    """User + system CPU time a process has used so far, or None."""
+    ps = ps or _psutil
+    if ps is None or not pid or pid <= 0:
+        return None
+    try:
+        times = ps.Process(pid).cpu_times()
+        return times.user + times.system
+    except (ps.NoSuchProcess, ps.AccessDenied):
+        return None
+
+
+def memory_snapshot(pid=None, ps=None):
+    """
+    (system_percent, browser_rss_bytes), or (None, 0) without psutil.
+
+    Cheap enough for a periodic check on the UI thread: one sysinfo call
+    plus one memory_info per process in the tree.
+    """
+    ps = ps or _psutil
+    if ps is None:
+        return None, 0
+    try:
+        system_percent = ps.virtual_memory().percent
+    except (OSError, AttributeError):
+        system_percent = None
+    return system_percent, tree_rss(process_tree(pid, ps), ps)
+
+
+# ── task manager ────────────────────────────────────────────────────────
+
+BROWSER = "browser"
+RENDERER = "renderer"
+GPU = "gpu"
+UTILITY = "utility"
+
+# Chromium marks each child process with --type=...; the browser itself
+# carries none.
+_TYPE_FLAGS = (
+    ("--type=renderer", RENDERER),
+    ("--type=gpu-process", GPU),
+)
+
+
+def classify_process(cmdline, is_root=False) -> str:
+    """Which kind of Chromium process a command line belongs to."""
+    if is_root:
+        return BROWSER
+    joined = " ".join(cmdline or ())
+    for flag, kind in _TYPE_FLAGS:
+        if flag in joined:
+            return kind
+    return UTILITY
+
+
+class ProcessSample:
+    """One row of the task manager."""
+
+    __slots__ = ("pid", "kind", "label", "rss", "cpu_percent", "threads")
+
+    def __init__(self, pid, kind, label, rss=0, cpu_percent=0.0, threads=0):
+        self.pid = pid
+        self.kind = kind
+        self.label = label
+        self.rss = rss
+        self.cpu_percent = cpu_percent
+        self.threads = threads
+
+    def __repr__(self):
+        return f"ProcessSample({self.pid}, {self.kind}, {self.label!r})"
+
+
+class ProcessSampler:
+    """
+    Samples the browser's process tree, one call per refresh.
+
+    psutil's cpu_percent() is measured against the previous call on the
+    *same* Process object, so the objects are kept between samples. A
+    process seen for the first time reports 0% until the next refresh.
+
+    Not thread-safe: the task manager runs one sample at a time, off the
+    UI thread.
+    """
+
+    def __init__(self, pid=None, ps=None):
+        self.ps = ps or _psutil
+        self.root_pid = pid or os.getpid()
+        self._procs = {}
+
+    def sample(self, tab_labels=None) -> list:
+        """
+        Current readings for every live process in the tree.
+
+        `tab_labels` maps a renderer pid to the titles of the tabs it hosts
+        (several tabs may share one renderer).
+        """
+        ps = self.ps
+        if ps is None:
+            return []
+        tab_labels = tab_labels or {}
+        seen = {}
+        for proc in process_tree(self.root_pid, ps):
+            seen[proc.pid] = self._procs.get(proc.pid, proc)
+        self._procs = seen
+
+        samples = []
+        for pid, proc in seen.items():
+            try:
+                with proc.oneshot():
+                    is_root = pid == self.root_pid
+                    try:
+                        cmdline = [] if is_root else proc.cmdline()
+                    except ps.AccessDenied:
+                        cmdline = []
+                    kind = classify_process(cmdline, is_root)
+                    samples.append(ProcessSample(
+                        pid, kind, self._label(pid, kind, tab_labels),
+                        rss=proc.memory_info().rss,
+                        cpu_percent=proc.cpu_percent(interval=None),
+                        threads=proc.num_threads(),
+                    ))
+            except (ps.NoSuchProcess, ps.AccessDenied):
+                continue
+        return samples
+
+    @staticmethod
+    def _label(pid, kind, tab_labels):
+        titles = tab_labels.get(pid)
+        if titles:
+            return ", ".join(titles)
+        return {
+            BROWSER: "Browser",
+            GPU: "GPU process",
+            RENDERER: "Renderer (no tab)",
+        }.get(kind, "Utility")
+
+    def end_process(self, pid) -> bool:
+        """
+        Terminate a child process from the last sample.
+
+        Refuses the browser itself and any pid not in its tree — the task
+        manager must never become a way to kill arbitrary processes.
+        """
+        if pid == self.root_pid or pid not in self._procs:
+            return False
+        try:
+            self._procs[pid].terminate()
+            return True
+        except (self.ps.NoSuchProcess, self.ps.AccessDenied):
+            return False
@@ -0,0 +1,86 @@
+"""
+progress.py  —  download progress at a fixed rate, whatever the speed.
+
+Every chunk a worker wrote became a cross-thread chunk_downloaded signal;
+the manager's slot added it up, recomputed the speed, emitted
+progress_updated, and DownloadPanel scanned its list for the row to
+repaint. At 100 MB/s that was thousands of queued signals and row lookups
+a second, all on the UI thread, so the faster a download went the more
+the UI paid for showing it.
+
+Now progress is sampled, not pushed:
+    • workers (threads or the asyncio loop) add written bytes to their
+      manager's ByteCounter — a lock and an addition, no signal;
+    • one QTimer per panel, every TICK_MS, asks each active manager for a
+      snapshot; the manager drains its counter then;
+    • a ProgressBoard keeps what each row last showed, so a tick repaints
+      only the rows whose numbers moved.
+
+The UI's cost is one timer tick per TICK_MS and one repaint per moving
+row, however fast the bytes arrive. Status changes (paused, completed,
+failed) still arrive as signals, at once.
+
+No Qt imports: downloader.py owns the counters, main_gui.py the timer.
+"""
+
+import threading
+from typing import NamedTuple
+
+TICK_MS = 100
+
+
+class ByteCounter:
+    """A running byte count that any thread adds to and one thread drains."""
+
+    __slots__ = ("_pending", "_total", "_lock")
+
+    def __init__(self):
+        self._pending = 0
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def add(self, n):
+        with self._lock:
+            self._pending += n
+            self._total += n
+
+    def drain(self) -> int:
+        """The bytes added since the last drain."""
+        with self._lock:
+            n, self._pending = self._pending, 0
+            return n
+
+    @property
+    def total(self) -> int:
+        with self._lock:
+            return self._total
+
+
+class Snapshot(NamedTuple):
+    download_id: str
+    downloaded: int
+    total: int
+    speed: float
+    status: str
+
+
+class ProgressBoard:
+    """What each row last showed; decides which rows a tick must repaint."""
+
+    def __init__(self):
+        self._shown = {}
+
+    def changed(self, snapshots):
+        """The snapshots that differ from what their row shows, recorded as shown."""
+        out = []
+        for snap in snapshots:
+            if self._shown.get(snap.download_id) != snap:
+                self._shown[snap.download_id] = snap
+                out.append(snap)
+        return out
+
+    def forget(self, download_id):
+        self._shown.pop(download_id, None)
+
+    def __len__(self):
+        return len(self._shown)
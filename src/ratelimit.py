@@ -0,0 +1,326 @@
+"""
+ratelimit.py  —  bandwidth shaping for every download in the process.
+
+Nothing limited downloads: a few parallel downloads of eight segments
+each took the whole link, and pages loading next to them crawled.
+
+Shaper is one set of token buckets every worker of every download draws
+from, whichever engine runs it:
+    • a global rate, which a Schedule may change by time of day
+      ("unlimited at night");
+    • one bucket per priority class, each at the global rate. A class
+      waits only on its own bucket, but what it takes is charged to the
+      buckets of every class below it too: HIGH may use the whole rate,
+      NORMAL what HIGH leaves, LOW what both leave, and LOW backs off the
+      moment HIGH starts. (One shared bucket would queue HIGH behind LOW's
+      reservations.) A class that has been busy in the last second or so
+      keeps MIN_SHARE of the rate: the buckets above it run that much
+      slower, so no class stops outright;
+    • optional per-host and per-download buckets under those.
+
+A worker reads a chunk, reserves its bytes from every bucket above it and
+waits out the longest reservation before reading again. Buckets run into
+debt rather than refusing, so a reservation never blocks anything else.
+What keeps the TCP window open is the size of each read: read_size() is
+what the tightest bucket refills in MAX_WAIT, so a throttled download
+makes many short waits instead of a few long ones, and the socket buffer
+never sits full for seconds with the window shut.
+
+No Qt imports: the workers and the asyncio engine call Throttle.reserve;
+DownloadManager holds a download's Throttle and main_gui.py sets the
+global rate.
+"""
+
+import datetime
+import math
+import os
+import re
+import threading
+import time
+
+HIGH, NORMAL, LOW = 0, 1, 2
+PRIORITIES = {"high": HIGH, "normal": NORMAL, "low": LOW}
+
+BURST = 0.25                # seconds of a bucket's rate it may send at once
+MAX_WAIT = 0.1              # the longest wait one read should cause
+MIN_READ = 4 * 1024
+MAX_READ = 64 * 1024
+MIN_SHARE = 0.05            # of the global rate, kept by every class
+METER_WINDOW = 1.0          # seconds over which class usage is averaged
+
+_UNITS = {"": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+
+
+def parse_rate(text):
+    """
+    Bytes per second from "500K", "2M", "1.5m", "65536"; None for
+    unlimited ("", "0", "none", "unlimited"). Raises ValueError otherwise.
+    """
+    text = (text or "").strip().lower()
+    if text in ("", "0", "none", "unlimited", "off"):
+        return None
+    m = re.fullmatch(r"(\d+(?:\.\d+)?)\s*([kmg]?)(?:i?b)?(?:/s)?", text)
+    if not m:
+        raise ValueError(f"Not a rate: {text!r}")
+    rate = float(m.group(1)) * _UNITS[m.group(2)]
+    return rate if rate > 0 else None
+
+
+def priority_name(priority) -> str:
+    return next(name for name, value in PRIORITIES.items() if value == priority_of(priority))
+
+
+def priority_of(name) -> int:
+    """HIGH, NORMAL or LOW from a name or a number; NORMAL if unknown."""
+    if isinstance(name, int) and name in PRIORITIES.values():
+        return name
+    return PRIORITIES.get(str(name or "").lower(), NORMAL)
+
+
+class TokenBucket:
+    """
+    A bucket of `rate` bytes per second holding up to BURST seconds of it.
+    reserve() always succeeds and returns how long the caller should wait:
+    the bucket goes into debt and later reservations queue behind it.
+    """
+
+    def __init__(self, rate=None, burst=BURST, clock=time.monotonic):
+        self.clock = clock
+        self.burst = burst
+        self._rate = rate
+        self._free_at = clock() - burst     # when the debt is paid off; starts full
+
+    @property
+    def rate(self):
+        return self._rate
+
+    @rate.setter
+    def rate(self, rate):
+        if rate == self._rate:
+            return
+        now = self.clock()
+        if self._rate and rate and self._free_at > now:
+            # The debt is bytes: at the new rate it takes a different time.
+            self._free_at = now + (self._free_at - now) * self._rate / rate
+        else:
+            self._free_at = min(self._free_at, now)
+        self._rate = rate
+
+    def reserve(self, n, now=None) -> float:
+        if not self._rate:
+            return 0.0
+        now = self.clock() if now is None else now
+        # Idle time refills the bucket, up to the burst.
+        self._free_at = max(self._free_at, now - self.burst) + n / self._rate
+        return max(0.0, self._free_at - now)
+
+
+class _Meter:
+    """Bytes per second, decaying over METER_WINDOW."""
+
+    def __init__(self, now):
+        self.value = 0.0
+        self.at = now
+
+    def add(self, n, now):
+        self.value = self.rate(now) + n / METER_WINDOW
+        self.at = now
+
+    def rate(self, now) -> float:
+        return self.value * math.exp(-max(0.0, now - self.at) / METER_WINDOW)
+
+
+class Schedule:
+    """
+    Global rates by time of day: "00:00-07:00=unlimited,09:00-17:30=500K".
+    A range may wrap midnight ("22:00-06:00=..."). The first rule that
+    covers the time wins; outside every rule the configured rate applies.
+    """
+
+    _RULE = re.compile(r"(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})\s*=\s*(.+)")
+
+    def __init__(self, rules=()):
+        self.rules = list(rules)            # (start minute, end minute, rate or None)
+
+    @classmethod
+    def parse(cls, text):
+        """Raises ValueError on a malformed rule."""
+        rules = []
+        for part in (text or "").split(","):
+            part = part.strip()
+            if not part:
+                continue
+            m = cls._RULE.fullmatch(part)
+            if not m:
+                raise ValueError(f"Not a schedule rule: {part!r}")
+            h1, m1, h2, m2 = (int(g) for g in m.groups()[:4])
+            if h1 > 24 or h2 > 24 or m1 > 59 or m2 > 59:
+                raise ValueError(f"Not a time of day in {part!r}")
+            rules.append((h1 * 60 + m1, h2 * 60 + m2, parse_rate(m.group(5))))
+        return cls(rules)
+
+    def __bool__(self):
+        return bool(self.rules)
+
+    def rate_at(self, when, default):
+        minute = when.hour * 60 + when.minute
+        for start, end, rate in self.rules:
+            inside = start <= minute < end if start <= end else (minute >= start or minute < end)
+            if inside:
+                return rate
+        return default
+
+
+class Throttle:
+    """One download's handle on a Shaper, with its own optional limit."""
+
+    def __init__(self, shaper, rate=None, priority=NORMAL):
+        self.shaper = shaper
+        self.priority = priority_of(priority)
+        self.bucket = TokenBucket(rate, clock=shaper.clock)
+
+    @property
+    def rate(self):
+        return self.bucket.rate
+
+    def set_rate(self, rate):
+        with self.shaper._lock:
+            self.bucket.rate = rate
+
+    def set_priority(self, priority):
+        self.priority = priority_of(priority)
+
+    def reserve(self, n, host=None) -> float:
+        """`n` bytes just arrived from `host`: seconds to wait before reading on."""
+        return self.shaper.reserve(self, n, host)
+
+    def read_size(self, host=None) -> int:
+        """How much to read at a time so one wait stays near MAX_WAIT."""
+        return self.shaper.read_size(self, host)
+
+
+class Shaper:
+    """The process's buckets. Thread-safe; reserve() never sleeps."""
+
+    def __init__(self, rate=None, host_rate=None, schedule=None,
+                 clock=time.monotonic, wall_clock=datetime.datetime.now):
+        self.clock = clock
+        self.wall_clock = wall_clock
+        self.configured_rate = rate
+        self.host_rate = host_rate
+        self.schedule = schedule or Schedule()
+        now = clock()
+        self.class_buckets = [TokenBucket(rate, clock=clock) for _ in PRIORITIES]
+        self.class_meters = [_Meter(now) for _ in PRIORITIES]
+        self.host_buckets = {}
+        self.host_rates = {}                # host -> rate set for that host alone
+        self._schedule_checked = None
+        self._rate_now = rate
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self):
+        """The global rate in force now (schedule applied); None if unlimited."""
+        with self._lock:
+            return self._global_rate(self.clock())
+
+    def set_rate(self, rate):
+        with self._lock:
+            self.configured_rate = rate
+            self._schedule_checked = None
+
+    def set_schedule(self, schedule):
+        with self._lock:
+            self.schedule = schedule or Schedule()
+            self._schedule_checked = None
+
+    def set_host_rate(self, host, rate):
+        """Limit `host` alone; None falls back to the default host rate."""
+        with self._lock:
+            self.host_rates[host] = rate
+
+    def throttle(self, rate=None, priority=NORMAL) -> Throttle:
+        return Throttle(self, rate, priority)
+
+    def reserve(self, throttle, n, host=None) -> float:
+        with self._lock:
+            now = self.clock()
+            delay = max(bucket.reserve(n, now) for bucket in self._chain(throttle, host, now))
+            if self._rate_now:
+                # The classes below wait for these bytes; this one does not wait for theirs.
+                for bucket in self.class_buckets[throttle.priority + 1:]:
+                    bucket.reserve(n, now)
+            self.class_meters[throttle.priority].add(n, now)
+            return delay
+
+    def read_size(self, throttle, host=None) -> int:
+        with self._lock:
+            rates = [b.rate for b in self._chain(throttle, host, self.clock()) if b.rate]
+        if not rates:
+            return MAX_READ
+        return int(min(MAX_READ, max(MIN_READ, min(rates) * MAX_WAIT)))
+
+    # ── internals, under the lock ────────────────────────────────────────
+
+    def _global_rate(self, now):
+        # The schedule is looked at once a second, not on every read.
+        if self._schedule_checked is None or now - self._schedule_checked >= 1.0:
+            self._schedule_checked = now
+            self._rate_now = self.schedule.rate_at(self.wall_clock(), self.configured_rate) \
+                if self.schedule else self.configured_rate
+        return self._rate_now
+
+    def _chain(self, throttle, host, now):
+        chain = [throttle.bucket]
+        rate = self._global_rate(now)
+        if rate:
+            # Each class runs below the global rate by the floors of the busy classes under it.
+            floor = MIN_SHARE * rate
+            kept = 0.0
+            for priority in reversed(range(len(self.class_buckets))):
+                if priority < throttle.priority:
+                    break
+                self.class_buckets[priority].rate = rate - kept
+                kept += min(self.class_meters[priority].rate(now), floor)
+            chain.append(self.class_buckets[throttle.priority])
+        if host:
+            host_rate = self.host_rates.get(host) or self.host_rate
+            if host_rate:
+                bucket = self.host_buckets.get(host)
+                if bucket is None:
+                    bucket = self.host_buckets[host] = TokenBucket(host_rate, clock=self.clock)
+                bucket.rate = host_rate
+                chain.append(bucket)
+        return chain
+
+
+def from_environment(environ=None) -> Shaper:
+    """
+    A Shaper configured by BLACKLINE_DOWNLOAD_LIMIT (global rate),
+    BLACKLINE_DOWNLOAD_HOST_LIMIT (default per host) and
+    BLACKLINE_DOWNLOAD_SCHEDULE. A malformed value is ignored.
+    """
+    environ = os.environ if environ is None else environ
+
+    def read(name, parse):
+        try:
+            return parse(environ.get(name, ""))
+        except ValueError:
+            return None
+
+    return Shaper(read("BLACKLINE_DOWNLOAD_LIMIT", parse_rate),
+                  read("BLACKLINE_DOWNLOAD_HOST_LIMIT", parse_rate),
+                  read("BLACKLINE_DOWNLOAD_SCHEDULE", Schedule.parse))
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_shaper() -> Shaper:
+    """The process-wide Shaper every download draws from."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = from_environment()
+        return _shared
@@ -0,0 +1,711 @@
+"""
+reader.py  —  reading-mode extraction, off the UI thread, and the reading list.
+
+Reading mode used to run a script in the page that called innerText on
+every candidate container (a forced layout each), then document.write()
+the winner over the page. Nothing was kept: reading the same article again
+meant fetching, laying out and guessing all over again, and an article
+read once could not be opened offline.
+
+Now the browser fetches the page's HTML once (page.toHtml) and hands it to
+a worker thread, where:
+    • the HTML is parsed with the standard library into a light tree;
+    • a readability-style scorer picks the article. Paragraph-like blocks
+      score by length and commas, and pass their score to their parent
+      and half of it to the grandparent; class and id names that look like
+      content or like clutter (comments, sidebars, share bars) weigh in,
+      and a container's score shrinks with the share of its text that is
+      link text. The best container wins, with any siblings that score
+      close to it or read like prose;
+    • the result is sanitised to an allow-list of tags and attributes.
+      Scripts, styles, frames, forms and event handlers are dropped, links
+      and images are made absolute, and only http(s) and mailto survive;
+    • the article is stored in the reading list.
+
+The reading list is content-addressed: each article's sanitised HTML is
+compressed into a file named by its SHA-256, and an index maps URLs to
+digests with title, site and save time. The same article reached under two
+URLs is stored once. Opening a saved article reads and inflates one file —
+no network, no parse, no scoring — so it is instant and works offline.
+
+A reader page is loaded under its article's URL, so the URL alone cannot
+tell it from the page itself once EXIT navigates back there. ReaderTabs
+remembers which tabs show a reader page: the load the reader page starts
+is expected, and any other load in that tab leaves reading mode.
+
+No Qt imports: browser.py owns the worker thread and the view.
+"""
+
+import hashlib
+import html
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import zlib
+from html.parser import HTMLParser
+from pathlib import Path
+from string import Template
+from urllib.parse import urljoin, urlsplit
+
+from storage import read_json, write_json
+
+MIN_ARTICLE_CHARS = 250       # less than this is not worth a reader view
+MIN_PARAGRAPH_CHARS = 25
+MAX_ARTICLES = 500            # reading-list entries kept, newest first
+
+# Dropped with everything inside them.
+_DROP = frozenset({
+    "script", "style", "noscript", "template", "iframe", "frame", "frameset",
+    "object", "embed", "applet", "form", "input", "button", "select", "textarea",
+    "svg", "math", "canvas", "video", "audio", "nav", "aside", "footer",
+    "link", "meta", "base", "dialog",
+})
+
+# Kept, with the attributes listed; anything else is unwrapped (its
+# children kept, the tag itself dropped).
+_ALLOWED = {
+    "p": (), "br": (), "hr": (), "div": (), "span": (), "section": (), "article": (),
+    "h1": (), "h2": (), "h3": (), "h4": (), "h5": (), "h6": (),
+    "a": ("href", "title"), "img": ("src", "alt", "title"),
+    "figure": (), "figcaption": (), "blockquote": (), "pre": (), "code": (),
+    "em": (), "strong": (), "i": (), "b": (), "u": (), "s": (), "sub": (), "sup": (),
+    "small": (), "mark": (), "abbr": ("title",), "cite": (), "q": (), "time": (),
+    "ul": (), "ol": (), "li": (), "dl": (), "dt": (), "dd": (),
+    "table": (), "caption": (), "thead": (), "tbody": (), "tfoot": (), "tr": (),
+    "th": ("colspan", "rowspan"), "td": ("colspan", "rowspan"),
+}
+
+_VOID = frozenset({"area", "base", "br", "col", "embed", "hr", "img", "input",
+                   "link", "meta", "param", "source", "track", "wbr"})
+
+_BLOCK = frozenset({"address", "article", "aside", "blockquote", "dl", "div", "figure",
+                    "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "header",
+                    "hr", "li", "main", "nav", "ol", "p", "pre", "section", "table",
+                    "ul"})
+
+_PARAGRAPHS = frozenset({"p", "pre", "td", "blockquote"})
+
+_UNLIKELY = re.compile(
+    r"comment|disqus|sidebar|footer|footnote|menu|nav|share|social|promo|related|"
+    r"banner|cookie|consent|popup|modal|sponsor|advert|\bads?\b|breadcrumb|pagination|"
+    r"subscribe|newsletter|masthead|skip", re.I)
+_MAYBE = re.compile(r"and|article|body|column|content|main|shadow|story|post|entry", re.I)
+_POSITIVE = re.compile(r"article|body|content|entry|hentry|main|page|post|text|blog|story",
+                       re.I)
+_NEGATIVE = re.compile(
+    r"comment|com-|contact|foot|footer|footnote|masthead|media|meta|outbrain|promo|"
+    r"related|scroll|share|shoutbox|sidebar|skyscraper|sponsor|shopping|tags|tool|widget",
+    re.I)
+
+_TAG_SCORE = {"div": 5, "article": 8, "section": 2, "pre": 3, "td": 3, "blockquote": 3,
+              "form": -3, "ol": -3, "ul": -3, "dl": -3, "dd": -3, "dt": -3, "li": -3,
+              "address": -3, "h1": -5, "h2": -5, "h3": -5, "h4": -5, "h5": -5, "h6": -5,
+              "th": -5}
+
+_SPACE = re.compile(r"\s+")
+_DIGEST = re.compile(r"[0-9a-f]{64}")       # an index entry names no other file
+_SAFE_SCHEMES = ("http", "https", "mailto")
+
+
+class _Node:
+    __slots__ = ("tag", "attrs", "children", "parent", "text_len", "link_len",
+                 "commas", "score", "scored")
+
+    def __init__(self, tag, attrs, parent):
+        self.tag = tag
+        self.attrs = attrs
+        self.children = []          # _Node or str
+        self.parent = parent
+        self.text_len = 0
+        self.link_len = 0
+        self.commas = 0
+        self.score = 0.0
+        self.scored = False
+
+    def names(self) -> str:
+        return f"{self.attrs.get('class', '')} {self.attrs.get('id', '')}"
+
+    def link_density(self) -> float:
+        return self.link_len / self.text_len if self.text_len else 0.0
+
+    def has_block_child(self) -> bool:
+        return any(isinstance(c, _Node) and c.tag in _BLOCK for c in self.children)
+
+
+class _TreeBuilder(HTMLParser):
+    """Tolerant HTML → _Node tree, with the page's title and metadata."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = _Node("#root", {}, None)
+        self.stack = [self.root]
+        self.skip = 0               # depth inside a dropped element
+        self.title = ""
+        self.meta = {}
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = {k: v or "" for k, v in attrs}
+        if tag == "meta":
+            key = attrs.get("property") or attrs.get("name")
+            if key:
+                self.meta.setdefault(key.lower(), attrs.get("content", ""))
+            return
+        if self.skip:
+            if tag in _DROP and tag not in _VOID:
+                self.skip += 1
+            return
+        if tag == "title":
+            self._in_title = not self.title
+            return
+        if tag in _DROP:
+            if tag not in _VOID:
+                self.skip = 1
+            return
+        # An unclosed <p> ends where the next block starts.
+        if tag in _BLOCK and self.stack[-1].tag == "p":
+            self.stack.pop()
+        node = _Node(tag, attrs, self.stack[-1])
+        self.stack[-1].children.append(node)
+        if tag not in _VOID:
+            self.stack.append(node)
+
+    def handle_startendtag(self, tag, attrs):
+        skip = self.skip
+        self.handle_starttag(tag, attrs)
+        if self.skip > skip:
+            self.skip = skip                  # <svg/> opens nothing to skip
+        elif tag not in _VOID and not self.skip and self.stack[-1].tag == tag:
+            self.stack.pop()
+
+    def handle_endtag(self, tag):
+        if self.skip:
+            if tag in _DROP:
+                self.skip -= 1
+            return
+        if tag == "title":
+            self._in_title = False
+            return
+        for i in range(len(self.stack) - 1, 0, -1):
+            if self.stack[i].tag == tag:
+                del self.stack[i:]
+                return
+        # A stray end tag closes nothing.
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        elif not self.skip:
+            self.stack[-1].children.append(data)
+
+
+class Article:
+    """An extracted article: sanitised HTML plus what the list shows."""
+
+    __slots__ = ("url", "title", "site", "byline", "html", "text_chars", "saved")
+
+    def __init__(self, url, title, html_text, site="", byline="", text_chars=0, saved=None):
+        self.url = url
+        self.title = title
+        self.site = site
+        self.byline = byline
+        self.html = html_text
+        self.text_chars = text_chars
+        self.saved = time.time() if saved is None else saved
+
+    @property
+    def minutes(self) -> int:
+        """Reading time at about 1,200 characters a minute."""
+        return max(1, round(self.text_chars / 1200))
+
+    def __repr__(self):
+        return f"Article({self.title!r}, {self.url!r})"
+
+
+# ── scoring ──────────────────────────────────────────────────────────────
+
+def _measure(node, in_link=False):
+    """Text, link-text and comma counts for every node, bottom up."""
+    in_link = in_link or node.tag == "a"
+    for child in node.children:
+        if isinstance(child, str):
+            n = len(child.strip())
+            node.text_len += n
+            node.commas += child.count(",")
+            if in_link:
+                node.link_len += n
+        else:
+            _measure(child, in_link)
+            node.text_len += child.text_len
+            node.link_len += child.link_len
+            node.commas += child.commas
+
+
+def _class_weight(node) -> int:
+    names = node.names()
+    weight = 0
+    if _NEGATIVE.search(names):
+        weight -= 25
+    if _POSITIVE.search(names):
+        weight += 25
+    return weight
+
+
+def _unlikely(node) -> bool:
+    if node.tag in ("body", "article", "main", "#root"):
+        return False
+    names = node.names()
+    return bool(_UNLIKELY.search(names)) and not _MAYBE.search(names)
+
+
+def _init_score(node):
+    if not node.scored:
+        node.scored = True
+        node.score = _TAG_SCORE.get(node.tag, 0) + _class_weight(node)
+
+
+def _score_tree(root):
+    """Candidates with their final scores, paragraphs credited upwards."""
+    candidates = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        for child in node.children:
+            if isinstance(child, _Node) and not _unlikely(child):
+                stack.append(child)
+        is_paragraph = node.tag in _PARAGRAPHS or (
+            node.tag == "div" and not node.has_block_child())
+        if not is_paragraph or node.text_len < MIN_PARAGRAPH_CHARS:
+            continue
+        parent = node.parent
+        if parent is None or parent.tag == "#root":
+            continue
+        content = 1 + node.commas + min(node.text_len // 100, 3)
+        for ancestor, share in ((parent, 1.0), (parent.parent, 0.5)):
+            if ancestor is None or ancestor.tag == "#root":
+                break
+            if not ancestor.scored:
+                _init_score(ancestor)
+                candidates.append(ancestor)
+            ancestor.score += content * share
+    for node in candidates:
+        node.score *= 1 - node.link_density()
+    return candidates
+
+
+def _article_nodes(top):
+    """The top candidate and any siblings that belong with it."""
+    parent = top.parent
+    if parent is None:
+        return [top]
+    threshold = max(10.0, top.score * 0.2)
+    nodes = []
+    for sibling in parent.children:
+        if not isinstance(sibling, _Node):
+            continue
+        if sibling is top:
+            nodes.append(sibling)
+        elif sibling.scored and sibling.score >= threshold:
+            nodes.append(sibling)
+        elif sibling.tag == "p":
+            density = sibling.link_density()
+            if sibling.text_len > 80 and density < 0.25:
+                nodes.append(sibling)
+            elif 0 < sibling.text_len <= 80 and density == 0 and _ends_sentence(sibling):
+                nodes.append(sibling)
+    return nodes
+
+
+def _ends_sentence(node) -> bool:
+    text = "".join(_text_of(node)).rstrip()
+    return text.endswith((".", "!", "?", "…", "”", '"'))
+
+
+def _text_of(node):
+    for child in node.children:
+        if isinstance(child, str):
+            yield child
+        else:
+            yield from _text_of(child)
+
+
+# ── sanitising ───────────────────────────────────────────────────────────
+
+def _safe_url(value, base) -> str:
+    value = (value or "").strip()
+    if not value or value.startswith("#"):
+        return value if value.startswith("#") else ""
+    absolute = urljoin(base, value)
+    try:
+        scheme = urlsplit(absolute).scheme.lower()
+    except ValueError:
+        return ""
+    return absolute if scheme in _SAFE_SCHEMES else ""
+
+
+def _serialise(node, base, out):
+    for child in node.children:
+        if isinstance(child, str):
+            out.append(html.escape(child, quote=False))
+            continue
+        if _unlikely(child) and child.link_density() > 0.5:
+            continue
+        tag = child.tag
+        allowed = _ALLOWED.get(tag)
+        if allowed is None:
+            _serialise(child, base, out)          # unwrap
+            continue
+        if tag == "h1":
+            tag = "h2"                            # the reader's own <h1> is the title
+        attrs = []
+        for name in allowed:
+            value = child.attrs.get(name)
+            if tag == "img" and name == "src":
+                # Lazy-loaded images keep the real address elsewhere.
+                value = (child.attrs.get("data-src") or child.attrs.get("data-original")
+                         or value)
+            if not value:
+                continue
+            if name in ("href", "src"):
+                value = _safe_url(value, base)
+                if not value:
+                    continue
+            attrs.append(f' {name}="{html.escape(value)}"')
+        if tag == "img" and not any(a.startswith(" src=") for a in attrs):
+            continue
+        if tag == "a" and any(a.startswith(' href="http') for a in attrs):
+            attrs.append(' rel="noopener noreferrer"')
+        out.append(f"<{tag}{''.join(attrs)}>")
+        if tag in _VOID:
+            continue
+        _serialise(child, base, out)
+        out.append(f"</{tag}>")
+
+
+def sanitise(node, base) -> str:
+    out = []
+    _serialise(node, base, out)
+    return "".join(out)
+
+
+# ── extraction ───────────────────────────────────────────────────────────
+
+def _clean(text) -> str:
+    return _SPACE.sub(" ", text or "").strip()
+
+
+def _title_for(builder, top) -> str:
+    for key in ("og:title", "twitter:title"):
+        if builder.meta.get(key):
+            return _clean(builder.meta[key])
+    title = _clean(builder.title)
+    if title:
+        return title
+    node = top
+    while node is not None:
+        for child in node.children:
+            if isinstance(child, _Node) and child.tag == "h1":
+                return _clean("".join(_text_of(child)))
+        node = node.parent
+    return ""
+
+
+def extract_article(page_html, url):
+    """
+    The readable article in `page_html`, or None if there is not one.
+
+    Runs on a worker thread; the tree and everything derived from it are
+    local to the call.
+    """
+    builder = _TreeBuilder()
+    try:
+        builder.feed(page_html or "")
+        builder.close()
+    except (AssertionError, ValueError):       # malformed beyond recovery
+        return None
+    root = builder.root
+    _measure(root)
+    candidates = _score_tree(root)
+    if not candidates:
+        return None
+    top = max(candidates, key=lambda n: n.score)
+    # A lone paragraph container inside a bigger scored block: prefer the
+    # block, so an article split over several <div>s is taken whole.
+    while (top.parent is not None and top.parent.scored
+           and top.parent.score >= top.score * 0.75 and top.parent.tag != "#root"):
+        top = top.parent
+    nodes = _article_nodes(top)
+    text_chars = sum(n.text_len - n.link_len for n in nodes)
+    if text_chars < MIN_ARTICLE_CHARS:
+        return None
+    body = "".join(sanitise(_Wrapper(n), url) for n in nodes)
+    site = builder.meta.get("og:site_name") or (urlsplit(url).hostname or "")
+    byline = builder.meta.get("author", "")
+    return Article(url, _title_for(builder, top) or site, body, _clean(site),
+                   _clean(byline), text_chars)
+
+
+class _Wrapper:
+    """Lets sanitise() serialise a node itself, not just its children."""
+
+    __slots__ = ("children",)
+
+    def __init__(self, node):
+        self.children = [node]
+
+
+# ── rendering ────────────────────────────────────────────────────────────
+
+READER_TEMPLATE = Template("""<!DOCTYPE html><html><head>
+<meta charset="utf-8">
+<meta http-equiv="Content-Security-Policy" content="default-src 'none'; img-src http: https: data:; style-src 'unsafe-inline'; script-src 'unsafe-inline'">
+<title>$title</title>
+<style>
+    body {
+        font-family: Georgia, 'Times New Roman', serif;
+        background: #0b0f14;
+        color: #cdd6df;
+        max-width: 720px;
+        margin: 64px auto;
+        padding: 0 24px 80px;
+        font-size: 19px;
+        line-height: 1.85;
+    }
+    h1,h2,h3,h4 { font-family: 'JetBrains Mono','Cascadia Mono',Consolas,monospace;
+                  color: #e6edf3; letter-spacing: -0.5px; }
+    h1 { font-size: 1.9em; margin-bottom: 0.3em; border-bottom: 1px solid #1c2733; padding-bottom: 0.3em; }
+    a { color: #2fd6c3; text-decoration: none; }
+    a:hover { text-decoration: underline; text-decoration-color: #ffb454; }
+    img { max-width: 100%; height: auto; border: 1px solid #1c2733; }
+    pre, code { background: #0e141b; border: 1px solid #1c2733; padding: 2px 6px;
+                font-family: 'JetBrains Mono','Cascadia Mono',Consolas,monospace; font-size: 0.85em;
+                color: #4be08a; }
+    pre { overflow-x: auto; }
+    blockquote { border-left: 2px solid #2fd6c3; margin-left: 0; padding-left: 20px; color: #7d8b99; }
+    ::selection { background: #2fd6c3; color: #05201c; }
+    .byline { font-family: 'JetBrains Mono','Cascadia Mono',Consolas,monospace;
+              font-size: 12px; color: #7d8b99; letter-spacing: 1px; margin-bottom: 2em; }
+    #reader-bar { position: fixed; top: 0; left: 0; right: 0; padding: 10px 24px;
+                  background: rgba(8,11,15,0.94); backdrop-filter: blur(8px);
+                  display: flex; align-items: center; gap: 14px; z-index: 9999;
+                  border-bottom: 1px solid #1c2733;
+                  font-family: 'JetBrains Mono','Cascadia Mono',Consolas,monospace; }
+    #reader-bar span { font-size: 12px; color: #7d8b99; flex: 1; letter-spacing: 1px;
+                       white-space: nowrap; overflow: hidden; text-overflow: ellipsis; }
+    #reader-bar .rtag { color: #ffb454; }
+    #exit-reader { font-family: inherit; font-size: 12px; padding: 5px 14px;
+                   background: #2fd6c3; color: #05201c; border: none; cursor: pointer; letter-spacing: 1px; }
+    #exit-reader:hover { background: #4be08a; }
+    #font-dec, #font-inc { font-family: inherit; font-size: 13px; padding: 4px 11px;
+                           background: #0e141b; border: 1px solid #253341;
+                           color: #7d8b99; cursor: pointer; }
+    #font-dec:hover, #font-inc:hover { border-color: #2fd6c3; color: #e6edf3; }
+</style>
+</head><body>
+<div id="reader-bar">
+    <span><span class="rtag">// READER</span> &nbsp; $title</span>
+    <button id="font-dec" onclick="document.body.style.fontSize=Math.max(14,parseInt(getComputedStyle(document.body).fontSize)-2)+'px'">A−</button>
+    <button id="font-inc" onclick="document.body.style.fontSize=Math.min(28,parseInt(getComputedStyle(document.body).fontSize)+2)+'px'">A+</button>
+    <button id="exit-reader" onclick="location.href=$exit">EXIT</button>
+</div>
+<div style="margin-top:60px">
+<h1>$title</h1>
+<div class="byline">$byline</div>
+$body
+</div>
+</body></html>""")
+
+
+def render_reader(article: Article) -> str:
+    """The reader page for `article`; EXIT goes back to the original URL."""
+    byline = " · ".join(part for part in (
+        article.site, article.byline, f"{article.minutes} min read") if part)
+    # json.dumps gives a JS string literal; escape it again for the attribute.
+    exit_url = html.escape(json.dumps(_safe_url(article.url, article.url) or "about:blank"))
+    return READER_TEMPLATE.substitute(
+        title=html.escape(article.title), byline=html.escape(byline),
+        exit=exit_url, body=article.html)
+
+
+class ReaderTabs:
+    """
+    The tabs showing a reader page, and the article URL each shows.
+
+    show() is called just before the reader page is loaded and
+    load_started() for every load a tab starts: the first load after show()
+    is the reader page's own, any later one (EXIT, a link, the address
+    bar) leaves reading mode. A load started while another was still
+    running may report no start of its own, so load_finished() also ends
+    the wait. Tabs are any hashable handle.
+    """
+
+    def __init__(self):
+        self._urls = {}
+        self._pending = set()           # tabs whose reader page has not started loading
+
+    def show(self, tab, url):
+        self._urls[tab] = url
+        self._pending.add(tab)
+
+    def load_started(self, tab):
+        if tab in self._pending:
+            self._pending.discard(tab)
+        else:
+            self._urls.pop(tab, None)
+
+    def load_finished(self, tab):
+        self._pending.discard(tab)
+
+    def forget(self, tab):
+        self._urls.pop(tab, None)
+        self._pending.discard(tab)
+
+    def url(self, tab):
+        """The article URL `tab`'s reader page shows, or None."""
+        return self._urls.get(tab)
+
+    def active(self, tab, current_url) -> bool:
+        """True while `tab` shows the reader page for `current_url`."""
+        return tab in self._urls and self._urls[tab] == current_url
+
+
+# ── reading list ─────────────────────────────────────────────────────────
+
+def content_digest(html_text) -> str:
+    return hashlib.sha256(html_text.encode("utf-8")).hexdigest()
+
+
+class ReadingList:
+    """
+    Saved articles under `root`: <digest>.html.z objects and index.json.
+
+    The index maps URL → {digest, title, site, byline, chars, saved} and is
+    written atomically; an object is written before the index points at it
+    and removed only once nothing does. Workers save while the UI thread
+    reads, so every public method holds the lock.
+    """
+
+    INDEX = "index.json"
+    SUFFIX = ".html.z"
+
+    def __init__(self, root, max_articles=MAX_ARTICLES):
+        self.root = Path(root)
+        self.max_articles = max_articles
+        raw = read_json(self.root / self.INDEX, {})
+        self._index = {url: meta for url, meta in raw.items()
+                       if isinstance(meta, dict) and _DIGEST.fullmatch(str(meta.get("digest")))
+                       } if isinstance(raw, dict) else {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._index)
+
+    def __contains__(self, url):
+        with self._lock:
+            return url in self._index
+
+    def _object_path(self, digest) -> Path:
+        return self.root / (digest + self.SUFFIX)
+
+    def _write_object(self, digest, html_text) -> bool:
+        path = self._object_path(digest)
+        if path.exists():
+            return True                        # same content, already stored
+        tmp_name = None
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=str(self.root), suffix=".tmp")
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(zlib.compress(html_text.encode("utf-8"), 6))
+                fh.flush()
+                os.fsync(fh.fileno())
+            os.replace(tmp_name, path)
+            tmp_name = None
+            return True
+        except OSError:
+            return False
+        finally:
+            if tmp_name and os.path.exists(tmp_name):
+                try:
+                    os.unlink(tmp_name)
+                except OSError:
+                    pass
+
+    def put(self, article: Article) -> bool:
+        """Store `article` under its URL, replacing an older copy."""
+        digest = content_digest(article.html)
+        with self._lock:
+            if not self._write_object(digest, article.html):
+                return False
+            old = self._index.get(article.url)
+            self._index[article.url] = {
+                "digest": digest, "title": article.title, "site": article.site,
+                "byline": article.byline, "chars": article.text_chars,
+                "saved": article.saved,
+            }
+            dropped = self._prune()
+            if old is not None:
+                dropped.append(old["digest"])
+            if not self._save_index():
+                return False
+            self._collect(dropped)
+            return True
+
+    def get(self, url):
+        """The saved Article for `url`, or None (not saved, or unreadable)."""
+        with self._lock:
+            meta = self._index.get(url)
+            if meta is None:
+                return None
+            try:
+                data = self._object_path(meta["digest"]).read_bytes()
+            except OSError:
+                return None
+        try:
+            body = zlib.decompress(data).decode("utf-8")
+        except (zlib.error, UnicodeDecodeError):
+            return None
+        if content_digest(body) != meta["digest"]:
+            return None                        # damaged on disk
+        return Article(url, meta.get("title", ""), body, meta.get("site", ""),
+                       meta.get("byline", ""), meta.get("chars", 0), meta.get("saved", 0))
+
+    def remove(self, url) -> bool:
+        with self._lock:
+            meta = self._index.pop(url, None)
+            if meta is None:
+                return False
+            self._save_index()
+            self._collect([meta["digest"]])
+            return True
+
+    def entries(self):
+        """[(url, title, site, saved)], newest first."""
+        with self._lock:
+            rows = [(url, m.get("title", ""), m.get("site", ""), m.get("saved", 0))
+                    for url, m in self._index.items()]
+        rows.sort(key=lambda row: row[3], reverse=True)
+        return rows
+
+    def _prune(self):
+        """Drop the oldest entries past max_articles; their digests."""
+        excess = len(self._index) - self.max_articles
+        if excess <= 0:
+            return []
+        oldest = sorted(self._index, key=lambda u: self._index[u].get("saved", 0))[:excess]
+        return [self._index.pop(url)["digest"] for url in oldest]
+
+    def _collect(self, digests):
+        live = {m["digest"] for m in self._index.values()}
+        for digest in set(digests) - live:
+            try:
+                self._object_path(digest).unlink()
+            except OSError:
+                pass
+
+    def _save_index(self) -> bool:
+        return write_json(self.root / self.INDEX, self._index, keep_backup=False)
@@ -0,0 +1,225 @@
+"""
+scheduler.py  —  which queued download starts next, and with how many connections.
+
+DownloadPanel kept a FIFO deque and started downloads while fewer than
+"Concurrent Downloads" were running, whatever each one opened: ten
+eight-segment downloads from one host were eighty connections to it, and
+servers that count connections per client throttled or refused them all.
+The priority a download had only shaped its bandwidth once it was running.
+
+Scheduler keeps the queue and the connections in use:
+    • queued downloads start in order of pinned first, then priority
+      (ratelimit's HIGH/NORMAL/LOW), then their place in the queue, which
+      move() changes within a download's band;
+    • budgets count connections — a download's segments — not downloads:
+      at most `max_connections` in all and `per_host` to any one host
+      (host_limits overrides that per host). A download is granted what it
+      asked for, trimmed to what is free, but not below MIN_GRANT of what
+      its host's limit allows it: a grant lasts until the download ends,
+      and one connection where eight were asked for would last for hours;
+    • a download that does not fit holds its host for the downloads behind
+      it, so a smaller one cannot keep jumping ahead, while downloads to
+      other hosts may still start;
+    • pinned downloads may start beyond `max_active`; the connection
+      budgets apply to them like any other.
+
+A download with mirrors counts against the host of its first URL.
+
+No Qt imports: DownloadPanel asks ready() what to start, passes each grant
+to DownloadManager.start and calls finished() when a download ends.
+"""
+
+import math
+import os
+from typing import Dict, List, NamedTuple, Optional
+from urllib.parse import urlsplit
+
+from ratelimit import NORMAL, priority_of
+
+MAX_ACTIVE = 3
+MAX_CONNECTIONS = 32
+PER_HOST = 8
+MIN_GRANT = 0.5             # of the connections asked for (or the host limit, if lower)
+
+
+def host_of(url) -> str:
+    """"host:port" of `url`, lower-cased; the URL itself if it has no host."""
+    parts = urlsplit(url or "")
+    if not parts.hostname:
+        return url or ""
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    port = port or {"http": 80, "https": 443}.get(parts.scheme.lower())
+    return f"{parts.hostname}:{port}" if port else parts.hostname
+
+
+class Grant(NamedTuple):
+    key: str
+    connections: int
+
+
+class _Job:
+
+    __slots__ = ("key", "host", "connections", "priority", "pinned", "seq", "granted")
+
+    def __init__(self, key, host, connections, priority, pinned, seq):
+        self.key = key
+        self.host = host
+        self.connections = max(1, int(connections))
+        self.priority = priority_of(priority)
+        self.pinned = bool(pinned)
+        self.seq = seq
+        self.granted = 0
+
+    def order(self):
+        return (not self.pinned, self.priority, self.seq)
+
+    def band(self):
+        return (self.pinned, self.priority)
+
+
+class Scheduler:
+    """The download queue and the connection budgets. Used from the UI thread only."""
+
+    def __init__(self, max_active=MAX_ACTIVE, max_connections=MAX_CONNECTIONS, per_host=PER_HOST,
+                 host_limits=None):
+        self.max_active = max_active
+        self.max_connections = max_connections
+        self.per_host = per_host
+        self.host_limits: Dict[str, int] = dict(host_limits or {})
+        self._queued: Dict[str, _Job] = {}
+        self._running: Dict[str, _Job] = {}
+        self._seq = 0
+
+    # ── the queue ─────────────────────────────────────────────────────────
+
+    def add(self, key, url, connections, priority=NORMAL, pinned=False):
+        """Queue `key` at the back of its band; a key already queued or running is left as it is."""
+        if key in self._queued or key in self._running:
+            return
+        self._seq += 1
+        self._queued[key] = _Job(key, host_of(url), connections, priority, pinned, self._seq)
+
+    def remove(self, key):
+        """Forget `key`, queued or running; a running one frees its connections."""
+        self._queued.pop(key, None)
+        self._running.pop(key, None)
+
+    finished = remove
+
+    def queue(self) -> List[str]:
+        """The queued keys, in the order they would start."""
+        return [job.key for job in sorted(self._queued.values(), key=_Job.order)]
+
+    def position(self, key) -> Optional[int]:
+        """0 for the next to start; None if `key` is not queued."""
+        order = self.queue()
+        return order.index(key) if key in order else None
+
+    def is_queued(self, key) -> bool:
+        return key in self._queued
+
+    def is_running(self, key) -> bool:
+        return key in self._running
+
+    def is_pinned(self, key) -> bool:
+        job = self._queued.get(key) or self._running.get(key)
+        return bool(job and job.pinned)
+
+    def set_priority(self, key, priority):
+        """A queued download moves to the back of its new band."""
+        job = self._queued.get(key) or self._running.get(key)
+        if job is None or job.priority == priority_of(priority):
+            return
+        job.priority = priority_of(priority)
+        self._seq += 1
+        job.seq = self._seq
+
+    def pin(self, key, pinned=True):
+        job = self._queued.get(key) or self._running.get(key)
+        if job is None or job.pinned == bool(pinned):
+            return
+        job.pinned = bool(pinned)
+        self._seq += 1
+        job.seq = self._seq
+
+    def move(self, key, steps) -> bool:
+        """
+        Move a queued download `steps` places (negative is earlier), within
+        the downloads of its own band. False if it could not move at all.
+        """
+        job = self._queued.get(key)
+        if job is None or not steps:
+            return False
+        band = [j for j in sorted(self._queued.values(), key=_Job.order) if j.band() == job.band()]
+        old = band.index(job)
+        new = min(max(old + steps, 0), len(band) - 1)
+        if new == old:
+            return False
+        seqs = [j.seq for j in band]
+        band.insert(new, band.pop(old))
+        for j, seq in zip(band, seqs):
+            j.seq = seq
+        return True
+
+    # ── budgets ───────────────────────────────────────────────────────────
+
+    @property
+    def active(self) -> int:
+        return len(self._running)
+
+    def in_use(self, host=None) -> int:
+        """Connections granted in all, or to `host`."""
+        return sum(j.granted for j in self._running.values() if host is None or j.host == host)
+
+    def host_limit(self, host) -> int:
+        return self.host_limits.get(host) or self.per_host
+
+    def ready(self) -> List[Grant]:
+        """
+        Take every queued download that may start now, best first, with the
+        connections each is granted; they count as running from here on.
+        """
+        grants = []
+        blocked = set()                 # hosts a download ahead is waiting for
+        for job in sorted(self._queued.values(), key=_Job.order):
+            if not job.pinned and len(self._running) >= self.max_active:
+                break                   # pinned ones sort first: none are left
+            if job.host in blocked:
+                continue
+            free = self.max_connections - self.in_use()
+            host_limit = self.host_limit(job.host)
+            needed = max(1, math.ceil(min(job.connections, host_limit, self.max_connections) * MIN_GRANT))
+            if free < needed:
+                break                   # nothing behind it jumps the queue for these
+            granted = min(job.connections, free, host_limit - self.in_use(job.host))
+            if granted < needed:
+                blocked.add(job.host)
+                continue
+            del self._queued[job.key]
+            job.granted = granted
+            self._running[job.key] = job
+            grants.append(Grant(job.key, granted))
+        return grants
+
+
+def from_environment(environ=None, **kwargs) -> Scheduler:
+    """
+    A Scheduler with BLACKLINE_DOWNLOAD_CONNECTIONS (all hosts) and
+    BLACKLINE_DOWNLOAD_HOST_CONNECTIONS (per host) applied over the
+    defaults. A malformed or non-positive value is ignored.
+    """
+    environ = os.environ if environ is None else environ
+
+    def read(name, default):
+        try:
+            value = int(environ.get(name, ""))
+        except ValueError:
+            return default
+        return value if value > 0 else default
+
+    kwargs.setdefault("max_connections", read("BLACKLINE_DOWNLOAD_CONNECTIONS", MAX_CONNECTIONS))
+    kwargs.setdefault("per_host", read("BLACKLINE_DOWNLOAD_HOST_CONNECTIONS", PER_HOST))
+    return Scheduler(**kwargs)
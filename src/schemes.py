@@ -0,0 +1,99 @@
+"""
+schemes.py  —  the browser's own URL schemes.
+
+Chromium has to be told about a custom scheme before the QApplication
+exists, so main() calls register_schemes() first; each profile then
+installs a handler for it (WebBrowser._configure_profile). The handlers
+answer from memory or the local caches and never touch the network.
+
+    blackline://<host>/<path>   internal pages, prepared at startup
+    blackline-icon://<host>     a site's favicon from the FaviconCache
+
+Only the browser and internal pages may use either: a web page that could
+load blackline-icon://bank.example would learn whether it was visited.
+"""
+
+from PyQt6.QtCore import QBuffer, QByteArray, QIODevice
+from PyQt6.QtWebEngineCore import (
+    QWebEngineUrlRequestJob, QWebEngineUrlScheme, QWebEngineUrlSchemeHandler,
+)
+
+from favicons import SCHEME as ICON_SCHEME
+from internal_pages import SCHEME as PAGE_SCHEME, internal_initiator
+
+_registered = False
+
+
+def register_schemes():
+    """Declare the schemes to Chromium. Once, before QApplication."""
+    global _registered
+    if _registered:
+        return
+    for name in (PAGE_SCHEME, ICON_SCHEME):
+        scheme = QWebEngineUrlScheme(name.encode("ascii"))
+        # Host syntax gives each internal page a real origin, with its own
+        # localStorage (the speed dial lives there).
+        scheme.setSyntax(QWebEngineUrlScheme.Syntax.Host)
+        # Secure, so internal pages may load https resources and each
+        # other's without mixed-content blocking.
+        scheme.setFlags(QWebEngineUrlScheme.Flag.SecureScheme |
+                        QWebEngineUrlScheme.Flag.CorsEnabled)
+        QWebEngineUrlScheme.registerScheme(scheme)
+    _registered = True
+
+
+def _refuse(job) -> bool:
+    """Fail `job` unless it is a GET from the browser or an internal page."""
+    if bytes(job.requestMethod()) != b"GET" or not internal_initiator(
+            job.initiator().toString()):
+        job.fail(QWebEngineUrlRequestJob.Error.RequestDenied)
+        return True
+    return False
+
+
+def _reply(job, content_type: bytes, data: bytes, headers=None):
+    if headers:
+        job.setAdditionalResponseHeaders(headers)
+    # The buffer is parented to the job, which outlives the read.
+    buf = QBuffer(job)
+    buf.setData(QByteArray(data))
+    buf.open(QIODevice.OpenModeFlag.ReadOnly)
+    job.reply(content_type, buf)
+
+
+class FaviconSchemeHandler(QWebEngineUrlSchemeHandler):
+    """blackline-icon://<host> → PNG, or a 404 for the page's own fallback."""
+
+    def __init__(self, cache, parent=None):
+        super().__init__(parent)
+        self.cache = cache
+        self.served = 0
+        self.missed = 0
+
+    def requestStarted(self, job):
+        if _refuse(job):
+            return
+        data = self.cache.lookup(job.requestUrl().host())
+        if data is None:
+            self.missed += 1
+            job.fail(QWebEngineUrlRequestJob.Error.UrlNotFound)
+            return
+        self.served += 1
+        _reply(job, b"image/png", data)
+
+
+class InternalPageHandler(QWebEngineUrlSchemeHandler):
+    """blackline://… from the InternalPages prepared at startup."""
+
+    def __init__(self, pages, parent=None):
+        super().__init__(parent)
+        self.pages = pages
+
+    def requestStarted(self, job):
+        if _refuse(job):
+            return
+        page = self.pages.lookup(job.requestUrl().toString())
+        if page is None:
+            job.fail(QWebEngineUrlRequestJob.Error.UrlNotFound)
+            return
+        _reply(job, page.content_type.encode("ascii"), page.body, page.headers())
@@ -0,0 +1,290 @@
+"""
+segments.py  —  which bytes of a download are done, and who fetches the rest.
+
+DownloadManager used to cut a file into num_threads equal ranges once and
+remember, per range start, how many bytes had arrived. A worker that
+finished early then sat idle while the slowest range dragged on alone, so
+a download took as long as its worst connection, not as long as the sum
+of their bandwidth allowed.
+
+Now the work is dynamic, as download accelerators do it:
+    • the file starts as num_threads segments over whatever is missing;
+    • when a worker finishes, split_largest() halves the segment with the
+      most bytes left. Its worker keeps the first half, unaware, and
+      stops at its new end; the free connection takes the second half;
+    • nothing is split below MIN_SEGMENT, where a new request's setup
+      would cost more than the bytes it saves.
+
+Progress is a RangeSet of completed byte ranges rather than offsets into
+a fixed layout, so it survives any pattern of splits, and a progress file
+written by the old layout converts to one (from_chunk_progress). With a
+journal attached (journal.py), every commit is also appended there.
+
+A worker reserves bytes before writing them (claim) and records them
+after (commit), so a split never hands out a byte already being written,
+and a byte is never counted done before it is on disk. One lock covers it
+all; each call is a few comparisons.
+
+No Qt imports: downloader.py owns the workers and the file.
+"""
+
+import bisect
+import functools
+import threading
+
+MIN_SEGMENT = 512 * 1024
+
+
+class RangeSet:
+    """Disjoint, sorted half-open byte ranges [start, end). Not thread-safe."""
+
+    __slots__ = ("_starts", "_ends")
+
+    def __init__(self, ranges=()):
+        self._starts = []
+        self._ends = []
+        for start, end in ranges:
+            self.add(start, end)
+
+    @classmethod
+    def from_chunk_progress(cls, chunk_progress):
+        """The old progress format: {range start: bytes done from it}."""
+        ranges = cls()
+        for start, done in (chunk_progress or {}).items():
+            try:
+                start, done = int(start), int(done)
+            except (TypeError, ValueError):
+                continue
+            if start >= 0 and done > 0:
+                ranges.add(start, start + done)
+        return ranges
+
+    def __iter__(self):
+        return iter(zip(self._starts, self._ends))
+
+    def __len__(self):
+        return len(self._starts)
+
+    def __eq__(self, other):
+        return isinstance(other, RangeSet) and list(self) == list(other)
+
+    def __repr__(self):
+        return f"RangeSet({list(self)!r})"
+
+    def add(self, start, end):
+        """Include [start, end), merging with anything it touches."""
+        if end <= start:
+            return
+        i = bisect.bisect_left(self._ends, start)       # first range ending at/after start
+        j = bisect.bisect_right(self._starts, end)      # first range starting after end
+        if i < j:
+            start = min(start, self._starts[i])
+            end = max(end, self._ends[j - 1])
+        self._starts[i:j] = [start]
+        self._ends[i:j] = [end]
+
+    def remove(self, start, end):
+        """Exclude [start, end), splitting a range that straddles it."""
+        if end <= start:
+            return
+        i = bisect.bisect_right(self._ends, start)      # first range ending after start
+        j = bisect.bisect_left(self._starts, end)       # first range starting at/after end
+        if i >= j:
+            return
+        kept = []
+        if self._starts[i] < start:
+            kept.append((self._starts[i], start))
+        if self._ends[j - 1] > end:
+            kept.append((end, self._ends[j - 1]))
+        self._starts[i:j] = [s for s, _ in kept]
+        self._ends[i:j] = [e for _, e in kept]
+
+    def total(self) -> int:
+        return sum(e - s for s, e in self)
+
+    def covers(self, start, end) -> bool:
+        """True when all of [start, end) is included."""
+        if end <= start:
+            return True
+        i = bisect.bisect_right(self._starts, start) - 1
+        return i >= 0 and self._ends[i] >= end
+
+    def missing(self, size):
+        """The gaps in [0, size), in order."""
+        gaps, pos = [], 0
+        for start, end in self:
+            if start >= size:
+                break
+            if start > pos:
+                gaps.append((pos, start))
+            pos = max(pos, end)
+        if pos < size:
+            gaps.append((pos, size))
+        return gaps
+
+    def to_list(self):
+        return [[s, e] for s, e in self]
+
+    @classmethod
+    def from_list(cls, items):
+        """From to_list() output; malformed items are skipped."""
+        ranges = cls()
+        for item in items or ():
+            try:
+                start, end = int(item[0]), int(item[1])
+            except (TypeError, ValueError, IndexError):
+                continue
+            if 0 <= start < end:
+                ranges.add(start, end)
+        return ranges
+
+
+class Segment:
+    """A byte range one worker is fetching: [pos, end) is still to come."""
+
+    __slots__ = ("start", "pos", "end", "active")
+
+    def __init__(self, start, end):
+        self.start = start
+        self.pos = start
+        self.end = end
+        self.active = True
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.end - self.pos)
+
+    def __repr__(self):
+        return f"Segment({self.start}, pos={self.pos}, end={self.end})"
+
+
+class SegmentPlan:
+    """The completed ranges of one download and the segments fetching the rest."""
+
+    def __init__(self, total_size, done=None, min_segment=MIN_SEGMENT, splittable=True):
+        self.total_size = total_size
+        self.done = done if done is not None else RangeSet()
+        self.min_segment = max(1, min_segment)
+        self.splittable = splittable
+        self.segments = []
+        self.splits = 0
+        self.journal = None                 # journal.SegmentJournal, if attached
+        self._lock = threading.Lock()
+
+    @property
+    def downloaded(self) -> int:
+        with self._lock:
+            return self.done.total()
+
+    def complete(self) -> bool:
+        with self._lock:
+            return self.done.covers(0, self.total_size)
+
+    def initial(self, count):
+        """
+        Segments for what is missing, about `count` of them: each gap is
+        one segment, and the largest are halved until there are `count`.
+        """
+        with self._lock:
+            self.segments = [Segment(s, e) for s, e in self.done.missing(self.total_size)]
+            if not self.splittable:
+                # No ranges: one request for the whole file, from the top.
+                self.done = RangeSet()
+                self.segments = [Segment(0, self.total_size)] if self.total_size else []
+                return list(self.segments)
+            while len(self.segments) < count:
+                if self._split_locked() is None:
+                    break
+            return [s for s in self.segments if s.active]
+
+    def split_largest(self):
+        """A new segment taken from the back half of the busiest one, or None."""
+        with self._lock:
+            return self._split_locked()
+
+    def _split_locked(self):
+        if not self.splittable:
+            return None
+        active = [s for s in self.segments if s.active]
+        if not active:
+            return None
+        largest = max(active, key=lambda s: s.remaining)
+        if largest.remaining < 2 * self.min_segment:
+            return None
+        mid = largest.pos + largest.remaining // 2
+        tail = Segment(mid, largest.end)
+        largest.end = mid
+        self.segments.append(tail)
+        self.splits += 1
+        return tail
+
+    def claim(self, segment, size):
+        """
+        Reserve up to `size` bytes at the front of `segment` for writing.
+        (offset, count): count is 0 once the segment has reached its end,
+        which may have moved since the worker's request went out.
+        """
+        with self._lock:
+            count = max(0, min(size, segment.end - segment.pos))
+            offset = segment.pos
+            segment.pos += count
+            return offset, count
+
+    def commit(self, offset, count):
+        """Record bytes that are now written."""
+        if count > 0:
+            with self._lock:
+                self.done.add(offset, offset + count)
+                if self.journal is not None:
+                    self.journal.append(offset, offset + count)
+
+    def checkpoint_due(self) -> bool:
+        journal = self.journal
+        return journal is not None and journal.due
+
+    def begin_checkpoint(self):
+        """
+        Begin compacting the journal down to the completed ranges and
+        return the call that finishes it, or None if there is no journal
+        or a compaction is already under way. The ranges are taken under
+        the lock; the file is written by the returned call, outside it, so
+        claims and commits carry on meanwhile.
+        """
+        with self._lock:
+            journal = self.journal
+            if journal is None or not journal.snapshot():
+                return None
+            ranges = list(self.done)
+        return functools.partial(journal.compact, ranges)
+
+    def checkpoint(self) -> bool:
+        """Compact the journal on this thread; False if none was begun."""
+        write = self.begin_checkpoint()
+        if write is None:
+            return False
+        write()
+        return True
+
+    def handoff(self, segment):
+        """
+        The unfetched rest of a stopped segment as a new segment, for
+        another worker; None if nothing is left.
+        """
+        with self._lock:
+            segment.active = False
+            if segment.pos >= segment.end:
+                return None
+            rest = Segment(segment.pos, segment.end)
+            segment.end = segment.pos
+            self.segments.append(rest)
+            return rest
+
+    def retire(self, segment):
+        """The segment's worker has stopped; it is no longer split."""
+        with self._lock:
+            segment.active = False
+
+    def snapshot(self):
+        """The completed ranges, as a list, for the progress file."""
+        with self._lock:
+            return self.done.to_list()
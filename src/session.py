@@ -0,0 +1,123 @@
+"""
+session.py  —  what a restored tab is, and when it gets a renderer.
+
+load_tabs() used to call add_new_tab() for every saved URL. Each call built
+a QWebEngineView and QWebEnginePage, injected the channel script and started
+a network load, so a 60-tab session started 60 renderers before the window
+was usable. Startup time and memory grew with the size of the session.
+
+Restored tabs are now placeholders carrying only a title, a URL and a
+favicon. The real view is built the first time the tab is selected, plus an
+optional small budget of background pre-loads for the tabs nearest the
+active one. Everything here is pure so the file format and the pre-load
+order can be pinned by tests.
+
+tabs.json was a bare list of URL strings. It is now a list of objects;
+the old shape is still read so an upgrade never loses a session.
+"""
+
+# Background pre-loads after restore. Small and fixed: the point is that
+# startup cost no longer depends on how many tabs were open.
+DEFAULT_PRELOAD_BUDGET = 2
+MAX_PRELOAD_BUDGET = 8
+
+# A favicon is stored inline as base64 PNG. Anything larger is not a
+# favicon and is dropped rather than bloating tabs.json.
+MAX_ICON_CHARS = 16 * 1024
+
+
+class SessionEntry:
+    """One saved tab: enough to draw it in the tab bar, nothing more."""
+
+    __slots__ = ("url", "title", "icon")
+
+    def __init__(self, url: str, title: str = "", icon: str = ""):
+        self.url = url
+        self.title = title or ""
+        self.icon = icon or ""
+
+    @property
+    def label(self) -> str:
+        """Tab text for the placeholder: the title, else the URL."""
+        return self.title.strip() or self.url[:40]
+
+    def to_dict(self) -> dict:
+        data = {"url": self.url, "title": self.title}
+        if self.icon:
+            data["icon"] = self.icon
+        return data
+
+    def __eq__(self, other):
+        if not isinstance(other, SessionEntry):
+            return NotImplemented
+        return (self.url, self.title, self.icon) == (other.url, other.title, other.icon)
+
+    def __repr__(self):
+        return f"SessionEntry({self.url!r}, title={self.title!r})"
+
+
+def parse_entry(item):
+    """
+    Read one tabs.json item, old or new shape. Returns None for junk.
+
+    Never raises: a single bad entry must not cost the rest of the session.
+    """
+    if isinstance(item, str):
+        url = item.strip()
+        return SessionEntry(url) if url else None
+    if not isinstance(item, dict):
+        return None
+    url = item.get("url")
+    if not isinstance(url, str) or not url.strip():
+        return None
+    title = item.get("title")
+    icon = item.get("icon")
+    return SessionEntry(
+        url.strip(),
+        title if isinstance(title, str) else "",
+        icon if isinstance(icon, str) and len(icon) <= MAX_ICON_CHARS else "",
+    )
+
+
+def parse_session(data) -> list:
+    """All usable entries from a loaded tabs.json, in order."""
+    if not isinstance(data, list):
+        return []
+    entries = []
+    for item in data:
+        entry = parse_entry(item)
+        if entry is not None:
+            entries.append(entry)
+    return entries
+
+
+def serialise_session(entries) -> list:
+    """The JSON-ready form written back to tabs.json."""
+    return [e.to_dict() for e in entries]
+
+
+def clamp_preload_budget(value) -> int:
+    """Settings come from a hand-editable file; keep the budget sane."""
+    try:
+        budget = int(value)
+    except (TypeError, ValueError):
+        return DEFAULT_PRELOAD_BUDGET
+    return max(0, min(budget, MAX_PRELOAD_BUDGET))
+
+
+def preload_order(candidates, active_index: int, budget: int) -> list:
+    """
+    Which placeholder tabs to build in the background, best first.
+
+    `candidates` are the tab indices that are still placeholders. The tabs
+    physically nearest the active one are the likeliest next clicks, so
+    they win; on a tie the tab to the right goes first, matching Ctrl+Tab.
+    """
+    budget = max(0, int(budget))
+    if budget == 0:
+        return []
+    ranked = sorted(
+        (i for i in candidates if i != active_index),
+        key=lambda i: (abs(i - active_index), i < active_index, i),
+    )
+    return ranked[:budget]
@@ -0,0 +1,214 @@
+"""
+thumbnails.py  —  speed-dial thumbnails, captured after load, kept on disk.
+
+The speed-dial grid showed a monogram or favicon per tile and nothing of
+the site itself. A tile now gets a small picture of the page, taken from
+the tab the last time that site was open:
+
+    • only tiles are captured. The new-tab page reports its sites when it
+      loads (set_tiles); any other page is never grabbed;
+    • the grab happens a moment after loadFinished, once the page has
+      painted, and only if the tab still shows that page and is the
+      current one — a background tab has nothing on screen to grab;
+    • capture is throttled: a host is taken at most every REFRESH_AGE,
+      and no capture starts within MIN_INTERVAL of the previous one, so
+      browsing a tiled site does not grab on every click;
+    • private tabs are never captured; the caller says which tabs are;
+    • the UI thread only grabs. Cropping, smooth downscaling to
+      THUMB_SIZE and encoding (WebP where Qt has the plugin, PNG where
+      not) run on a worker, which hands the bytes to finish().
+
+Pictures live in a BlobCache keyed by host, bounded in count, bytes and
+age, and are served to the new-tab page as blackline://thumbs/<host>. A
+tile without one keeps its favicon card.
+
+No Qt imports: browser.py grabs, scales and encodes.
+"""
+
+import json
+import threading
+import time
+
+from blobcache import BlobCache
+from favicons import icon_host
+from internal_pages import DOCUMENT_CACHE, SCHEME, InternalPage
+
+HOST = "thumbs"                   # blackline://thumbs/<site host>
+
+THUMB_SIZE = (320, 200)
+CAPTURE_DELAY_MS = 1500           # after loadFinished, for late paints
+MIN_INTERVAL = 10                 # seconds between any two captures
+REFRESH_AGE = 6 * 3600            # per host
+MAX_THUMB_BYTES = 96 * 1024
+MAX_ENTRIES = 200
+MAX_BYTES = 6 * 1024 * 1024
+MAX_AGE = 14 * 86400
+MEMORY_BYTES = 1024 * 1024
+
+WEBP_QUALITY = 80
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def thumb_url(host_or_url) -> str:
+    """blackline://thumbs/<host> for a site, or "" when it has no host."""
+    host = icon_host(host_or_url)
+    return f"{SCHEME}://{HOST}/{host}" if host else ""
+
+
+def tile_urls(sites) -> list:
+    """
+    The speed dial's site URLs in dial order, one per host. `sites` is the
+    page's list of {name, url} or its JSON; anything unreadable counts as
+    no tiles.
+    """
+    if isinstance(sites, (str, bytes)):
+        try:
+            sites = json.loads(sites)
+        except ValueError:
+            return []
+    if not isinstance(sites, list):
+        return []
+    urls, seen = [], set()
+    for site in sites:
+        if isinstance(site, dict):
+            host = icon_host(site.get("url"))
+            if host and host not in seen:
+                seen.add(host)
+                urls.append(str(site["url"]))
+    return urls
+
+
+def tile_hosts(sites) -> set:
+    """The hosts on the speed dial."""
+    return {icon_host(url) for url in tile_urls(sites)}
+
+
+def crop_for(width, height, size=THUMB_SIZE):
+    """
+    (x, y, w, h): the largest region of a width × height grab with the
+    thumbnail's aspect ratio, centred across and anchored at the top, where
+    a page keeps what identifies it.
+    """
+    tw, th = size
+    if width <= 0 or height <= 0:
+        return (0, 0, 0, 0)
+    if width * th > height * tw:              # too wide: trim the sides
+        w = max(1, height * tw // th)
+        return ((width - w) // 2, 0, w, height)
+    return (0, 0, width, max(1, width * th // tw))
+
+
+def pick_format(supported) -> str:
+    """'webp' when the image plugins can write it, otherwise 'png'."""
+    names = {(f if isinstance(f, str) else bytes(f).decode("ascii", "ignore")).lower()
+             for f in supported}
+    return "webp" if "webp" in names else "png"
+
+
+def sniff_type(data) -> str:
+    """The MIME type of an encoded thumbnail, or "" if it is neither."""
+    head = bytes(data[:12])
+    if head[:8] == _PNG_SIGNATURE:
+        return "image/png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return ""
+
+
+class ThumbnailCache:
+    """Page pictures by host for the speed-dial tiles, and the capture throttle."""
+
+    def __init__(self, root, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES,
+                 max_age=MAX_AGE, memory_bytes=MEMORY_BYTES,
+                 refresh_age=REFRESH_AGE, min_interval=MIN_INTERVAL):
+        self.blobs = BlobCache(root, max_bytes, max_entries, max_age, memory_bytes,
+                               suffix=".img")
+        self.refresh_age = refresh_age
+        self.min_interval = min_interval
+        self._tiles = set()
+        self._pending = set()             # hosts handed to a worker
+        self._last_capture = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.blobs)
+
+    def set_tiles(self, sites):
+        """Replace the set of tiled hosts with what the new-tab page reports."""
+        hosts = tile_hosts(sites)
+        with self._lock:
+            self._tiles = hosts
+
+    @property
+    def tiles(self):
+        with self._lock:
+            return set(self._tiles)
+
+    def wants(self, page_url, private=False, now=None) -> str:
+        """
+        The host to capture for `page_url` now, or "": private, not a
+        tile, already being captured, taken recently, or too soon after
+        the last capture.
+        """
+        if private:
+            return ""
+        host = icon_host(page_url)
+        now = time.time() if now is None else now
+        with self._lock:
+            if not host or host not in self._tiles or host in self._pending:
+                return ""
+            if (self._last_capture is not None
+                    and now - self._last_capture < self.min_interval):
+                return ""
+        stored = self.blobs.stored_at(host)
+        if stored is not None and now - stored < self.refresh_age:
+            return ""
+        return host
+
+    def begin(self, host, now=None) -> bool:
+        """Claim `host` for one capture; False if another already has it."""
+        now = time.time() if now is None else now
+        with self._lock:
+            if host in self._pending:
+                return False
+            self._pending.add(host)
+            self._last_capture = now
+            return True
+
+    def finish(self, host, data, now=None) -> bool:
+        """
+        Store the worker's encoded picture for `host` (None if encoding
+        failed) and release the claim. Worker thread.
+        """
+        try:
+            data = bytes(data or b"")
+            if not sniff_type(data) or len(data) > MAX_THUMB_BYTES:
+                return False
+            return self.blobs.put(host, data, now)
+        finally:
+            with self._lock:
+                self._pending.discard(host)
+
+    def lookup(self, host_or_url, now=None):
+        """The encoded picture for a host or page URL, or None."""
+        host = icon_host(host_or_url)
+        return self.blobs.get(host, now) if host else None
+
+    def page(self, path, now=None):
+        """The InternalPage for blackline://thumbs/<host>, or None."""
+        data = self.lookup(path.strip("/"), now)
+        if data is None:
+            return None
+        # The picture changes under the same URL, so revalidate each time.
+        return InternalPage(path, sniff_type(data), data, DOCUMENT_CACHE)
+
+    def remove(self, host_or_url) -> bool:
+        host = icon_host(host_or_url)
+        return self.blobs.remove(host) if host else False
+
+    def clear(self):
+        self.blobs.clear()
+
+    def flush(self):
+        self.blobs.flush()
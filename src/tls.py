@@ -24,7 +24,8 @@ LOCAL_SUFFIXES = ("localhost", ".local", ".localhost", ".internal", ".test")
 
 # Schemes we never touch.
 NON_WEB_SCHEMES = frozenset({"file", "about", "data", "blob", "chrome",
-                             "javascript", "qrc", "view-source"})
+                             "javascript", "qrc", "view-source",
+                             "blackline", "blackline-icon"})
 
 
 class HttpsDecision(Enum):
@@ -0,0 +1,249 @@
+"""
+userscripts.py  —  the browser's own page scripts, installed once per profile.
+
+Built-in scripts used to reach pages through page.runJavaScript: the
+qwebchannel bootstrap once per new view, page enhancements and more on
+every loadFinished. Each call is a Python → renderer round trip and a fresh
+parse, and the enhancements only ran after the page had finished loading.
+
+Instead every built-in script is registered here and installed once as a
+QWebEngineScript on each profile's script collection, where Chromium
+injects it into every matching document itself. Per navigation, Python
+sends nothing.
+
+Each entry carries:
+    • an injection point and a world — page scripts that only touch the
+      DOM run in the application world, out of reach of the page's own JS;
+    • a version derived from its source, embedded in the installed name,
+      so a changed script replaces the old one instead of running beside it;
+    • an enable flag, persisted as the `disabled_scripts` setting;
+    • timing instrumentation. Each run records when it started and how long
+      it executed in a per-world global that the browser reads only when
+      asked (the Built-in Scripts dialog). Parse time cannot be seen from
+      inside a script without eval, which strict-CSP pages refuse, so a
+      run that never finishes (a throw) is reported rather than guessed.
+
+No Qt imports: browser.py maps the plain names below onto Qt enums.
+"""
+
+import hashlib
+import json
+from statistics import median
+
+# Injection points
+DOCUMENT_CREATION = "document-creation"
+DOCUMENT_READY = "document-ready"
+DEFERRED = "deferred"
+
+# Worlds
+MAIN_WORLD = "main"
+APPLICATION_WORLD = "application"
+
+NAME_PREFIX = "blackline-"
+
+# Where instrumented scripts leave their timings, per document and world.
+TIMINGS_GLOBAL = "__blacklineScripts"
+
+# Read back by the browser; JSON so nothing page-defined crosses as an object.
+REPORT_JS = f"JSON.stringify(window.{TIMINGS_GLOBAL} || {{}})"
+
+
+class UserScript:
+    """One built-in script and how it is injected."""
+
+    __slots__ = ("name", "source", "injection", "world", "subframes",
+                 "description", "enabled", "toggleable")
+
+    def __init__(self, name, source, injection=DOCUMENT_READY,
+                 world=APPLICATION_WORLD, subframes=False, description="",
+                 enabled=True, toggleable=True):
+        if injection not in (DOCUMENT_CREATION, DOCUMENT_READY, DEFERRED):
+            raise ValueError(f"unknown injection point: {injection!r}")
+        if world not in (MAIN_WORLD, APPLICATION_WORLD):
+            raise ValueError(f"unknown world: {world!r}")
+        self.name = name
+        self.source = source
+        self.injection = injection
+        self.world = world
+        self.subframes = subframes
+        self.description = description
+        self.enabled = enabled
+        # Scripts other features depend on (the web channel) stay on.
+        self.toggleable = toggleable
+
+    @property
+    def version(self) -> str:
+        return hashlib.sha256(self.source.encode("utf-8")).hexdigest()[:8]
+
+    @property
+    def installed_name(self) -> str:
+        return f"{NAME_PREFIX}{self.name}-{self.version}"
+
+    def compiled(self) -> str:
+        """
+        The source between a timing prologue and epilogue.
+
+        Top-level statements rather than a wrapping function, so a script
+        that declares globals (the QWebChannel class) keeps doing so.
+        """
+        key = json.dumps(self.name)
+        version = json.dumps(self.version)
+        registry = f"window.{TIMINGS_GLOBAL}"
+        prologue = (
+            f";(function(){{var r={registry}||({registry}={{}});"
+            f"r[{key}]={{v:{version},start:performance.now(),exec:null}};}})();\n"
+        )
+        epilogue = (
+            f"\n;(function(){{var e=({registry}||{{}})[{key}];"
+            f"if(e&&e.exec===null){{e.exec=performance.now()-e.start;}}}})();\n"
+        )
+        return prologue + self.source + epilogue
+
+
+class ScriptRegistry:
+    """Every built-in script, in installation order."""
+
+    def __init__(self):
+        self._scripts = {}
+        # Kept apart from the scripts: settings load before every script is
+        # registered (the cosmetic sheet waits for the filter lists).
+        self._disabled = set()
+
+    def register(self, script: UserScript) -> UserScript:
+        """Add or replace by name, honouring a saved disable flag."""
+        if script.toggleable:
+            script.enabled = script.name not in self._disabled
+        self._scripts[script.name] = script
+        return script
+
+    def get(self, name):
+        return self._scripts.get(name)
+
+    def __iter__(self):
+        return iter(list(self._scripts.values()))
+
+    def __len__(self):
+        return len(self._scripts)
+
+    def set_enabled(self, name, enabled: bool) -> bool:
+        """False for an unknown name or a script that cannot be turned off."""
+        script = self._scripts.get(name)
+        if script is None or (not enabled and not script.toggleable):
+            return False
+        script.enabled = bool(enabled)
+        if script.enabled:
+            self._disabled.discard(name)
+        else:
+            self._disabled.add(name)
+        return True
+
+    def enabled(self) -> list:
+        return [s for s in self._scripts.values() if s.enabled]
+
+    def worlds(self) -> set:
+        """Worlds any enabled script runs in — where timings are to be read."""
+        return {s.world for s in self.enabled()}
+
+    # ── installation ─────────────────────────────────────────────────────
+
+    def plan_install(self, installed_names, skip=()):
+        """
+        (to_remove, to_insert) against what a profile already holds.
+
+        `skip` names scripts to leave out this time without changing their
+        saved flag (the cosmetic sheet while the ad blocker is off). Only
+        names with our prefix are touched; anything else in the collection
+        belongs to someone else.
+        """
+        wanted = {s.installed_name: s for s in self.enabled() if s.name not in skip}
+        ours = {n for n in installed_names if n.startswith(NAME_PREFIX)}
+        to_remove = sorted(ours - set(wanted))
+        to_insert = [s for name, s in wanted.items() if name not in ours]
+        return to_remove, to_insert
+
+    # ── settings ─────────────────────────────────────────────────────────
+
+    def disabled_names(self) -> list:
+        """For the `disabled_scripts` setting: registered scripts only."""
+        return sorted(n for n in self._disabled if n in self._scripts)
+
+    def apply_disabled(self, names):
+        """Restore the `disabled_scripts` setting, before or after registration."""
+        if not isinstance(names, (list, tuple, set)):
+            names = ()
+        self._disabled = {n for n in names if isinstance(n, str)}
+        for script in self._scripts.values():
+            if script.toggleable:
+                script.enabled = script.name not in self._disabled
+            else:
+                self._disabled.discard(script.name)
+
+
+def parse_report(text) -> dict:
+    """
+    REPORT_JS output → {name: (version, start_ms, exec_ms or None)}.
+
+    Pages can write to the main-world global too, so anything malformed
+    is dropped rather than trusted.
+    """
+    try:
+        data = json.loads(text) if isinstance(text, str) else {}
+    except ValueError:
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    out = {}
+    for name, entry in data.items():
+        if not isinstance(entry, dict):
+            continue
+        start = entry.get("start")
+        run = entry.get("exec")
+        if not isinstance(start, (int, float)):
+            continue
+        if run is not None and not isinstance(run, (int, float)):
+            continue
+        out[str(name)] = (str(entry.get("v", "")), float(start),
+                          None if run is None else float(run))
+    return out
+
+
+class ScriptTimings:
+    """Timing reports gathered from pages, summarised per script."""
+
+    def __init__(self, keep=200):
+        self._keep = keep
+        self._runs = {}           # name -> [(version, start, exec)]
+        self._last = {}           # (source, name) -> sample
+
+    def add_report(self, report: dict, source=None):
+        """
+        Fold in one page's report. With a `source` (the tab), a run already
+        seen from that tab is not counted again on the next read.
+        """
+        for name, sample in report.items():
+            if source is not None:
+                if self._last.get((source, name)) == sample:
+                    continue
+                self._last[(source, name)] = sample
+            runs = self._runs.setdefault(name, [])
+            runs.append(sample)
+            del runs[:-self._keep]
+
+    def summary(self, name) -> dict:
+        """runs, failed (never finished), median start and exec in ms."""
+        runs = self._runs.get(name, [])
+        done = [r for r in runs if r[2] is not None]
+        return {
+            "runs": len(runs),
+            "failed": len(runs) - len(done),
+            "start_ms": median(r[1] for r in runs) if runs else None,
+            "exec_ms": median(r[2] for r in done) if done else None,
+        }
+
+    def forget_source(self, source):
+        for key in [k for k in self._last if k[0] == source]:
+            del self._last[key]
+
+    def clear(self):
+        self._runs.clear()
+        self._last.clear()
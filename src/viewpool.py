@@ -0,0 +1,158 @@
+"""
+viewpool.py  —  pre-built web views, handed out when a tab opens.
+
+Building a tab means a QWebEngineView, a QWebEnginePage, eight-odd signal
+connections, setWebChannel and the qwebchannel.js bootstrap, all on the UI
+thread before anything is loaded. Open a burst of tabs (middle-click a
+row of links, a page calling window.open) and the window stalls for each.
+
+The pool keeps a few views per profile built ahead of time and tops them
+back up when the browser is idle. This module is the bookkeeping; the
+factory that builds a view and the idle timer live in browser.py.
+
+It also keeps time-to-first-paint per tab, split by whether the view came
+from the pool, and the largest burst of opens seen — the two numbers that
+say whether the pool is the right size.
+"""
+
+from collections import deque
+
+DEFAULT = "default"
+PRIVATE = "private"
+
+DEFAULT_POOL_SIZE = 2
+
+# Every pooled view is a page with a renderer behind it; a handful is the
+# most that ever pays for itself.
+MAX_POOL_SIZE = 6
+
+# Opens this close together count as one burst.
+BURST_WINDOW_SECONDS = 2.0
+
+
+def clamp_pool_size(raw) -> int:
+    """The view_pool_size setting, forced into 0..MAX_POOL_SIZE."""
+    try:
+        size = int(raw)
+    except (TypeError, ValueError):
+        return DEFAULT_POOL_SIZE
+    return min(max(size, 0), MAX_POOL_SIZE)
+
+
+class ViewPool:
+    """
+    Spare views per profile key.
+
+    `factory(key)` builds one; `dispose(item)` gets rid of one that will
+    never be handed out (pool shrunk, profile going away). The pool never
+    builds on `take` beyond the one view asked for — refilling is the
+    caller's idle-time job, through `top_up`.
+    """
+
+    def __init__(self, factory, size=DEFAULT_POOL_SIZE, dispose=None):
+        self._factory = factory
+        self._dispose = dispose or (lambda item: None)
+        self._spare = {}
+        self._size = clamp_pool_size(size)
+        self._takes = deque(maxlen=256)
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @size.setter
+    def size(self, value):
+        self._size = clamp_pool_size(value)
+        for key, spare in self._spare.items():
+            while len(spare) > self._size:
+                self._dispose(spare.pop())
+
+    def spare(self, key=DEFAULT) -> int:
+        return len(self._spare.get(key, ()))
+
+    def deficit(self, key=DEFAULT) -> int:
+        return max(0, self._size - self.spare(key))
+
+    def take(self, key=DEFAULT, now=None):
+        """(item, pooled) — a spare view if there is one, else a new one."""
+        if now is not None:
+            self._takes.append(now)
+        spare = self._spare.get(key)
+        if spare:
+            self.hits += 1
+            return spare.popleft(), True
+        self.misses += 1
+        return self._factory(key), False
+
+    def top_up(self, key=DEFAULT, limit=1) -> int:
+        """Build up to `limit` views towards the target size. Returns how many."""
+        built = 0
+        while built < limit and self.deficit(key):
+            self._spare.setdefault(key, deque()).append(self._factory(key))
+            built += 1
+        return built
+
+    def drain(self, key) -> int:
+        """Dispose of every spare view for `key`. Returns how many."""
+        spare = self._spare.pop(key, deque())
+        for item in spare:
+            self._dispose(item)
+        return len(spare)
+
+    def peak_burst(self, window=BURST_WINDOW_SECONDS) -> int:
+        """The most opens seen within any `window` seconds."""
+        times = list(self._takes)
+        peak, start = 0, 0
+        for end, t in enumerate(times):
+            while t - times[start] > window:
+                start += 1
+            peak = max(peak, end - start + 1)
+        return peak
+
+    def suggested_size(self) -> int:
+        """Enough spares to absorb the largest burst seen, within limits."""
+        return clamp_pool_size(self.peak_burst())
+
+
+def _percentile(ordered, fraction):
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class PaintTimings:
+    """Recent time-to-first-paint samples (ms), pooled and cold kept apart."""
+
+    def __init__(self, keep=200):
+        self._samples = {True: deque(maxlen=keep), False: deque(maxlen=keep)}
+
+    def record(self, ms, pooled):
+        # A negative or absurd figure means clocks or entries did not line
+        # up (page painted before the request was noted); drop it.
+        if ms is None or not 0 <= ms < 120_000:
+            return
+        self._samples[bool(pooled)].append(float(ms))
+
+    def summary(self, pooled) -> tuple:
+        """(count, median_ms, p95_ms), or (0, None, None) with no samples."""
+        ordered = sorted(self._samples[bool(pooled)])
+        if not ordered:
+            return 0, None, None
+        return len(ordered), _percentile(ordered, 0.5), _percentile(ordered, 0.95)
+
+
+def timing_report(pool, timings) -> str:
+    """Plain-text summary for the New Tab Timing dialog."""
+    lines = []
+    for pooled, name in ((True, "Pre-built views"), (False, "Built on demand")):
+        count, median, p95 = timings.summary(pooled)
+        if count:
+            lines.append(f"{name}: median {median:.0f} ms, p95 {p95:.0f} ms "
+                         f"to first paint ({count} tabs)")
+        else:
+            lines.append(f"{name}: no tabs measured yet")
+    lines.append(f"Pool hits / misses: {pool.hits} / {pool.misses}")
+    lines.append(f"Pool size: {pool.size} · largest burst of opens: "
+                 f"{pool.peak_burst()} (suggested size {pool.suggested_size()})")
+    return "\n".join(lines)
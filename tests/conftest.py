@@ -1,7 +1,11 @@
 """Shared fixtures. Puts src/ on sys.path so modules import as they do at runtime."""
 
+import http.server
 import os
+import re
 import sys
+import threading
+import time
 from pathlib import Path
 
 import pytest
@@ -70,3 +74,92 @@ def qapp():
 @pytest.fixture
 def new_tab_html(src_dir) -> str:
     return (src_dir / "new_tab.html").read_text(encoding="utf-8")
+
+
+class _RangeHandler(http.server.BaseHTTPRequestHandler):
+    """Serves the server's `body` with keep-alive and byte ranges, as a CDN would."""
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send_headers(self):
+        body = self.server.body
+        start, end = 0, len(body) - 1
+        m = re.match(r"bytes=(\d+)-(\d*)$", self.headers.get("Range", ""))
+        if m and self.server.ranges:
+            start = int(m.group(1))
+            end = min(int(m.group(2) or end), end)
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(body)}")
+        else:
+            self.send_response(200)
+        if self.server.ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        return start, end
+
+    def do_HEAD(self):
+        self.server.requests.append(("HEAD", self.headers.get("Range")))
+        self._send_headers()
+
+    def do_GET(self):
+        self.server.requests.append(("GET", self.headers.get("Range")))
+        start, end = self._send_headers()
+        try:
+            for pos in range(start, end + 1, 65536):
+                if self.server.delay:
+                    time.sleep(self.server.delay)
+                self.wfile.write(self.server.body[pos:min(pos + 65536, end + 1)])
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def _start_range_server(body):
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _RangeHandler)
+    server.daemon_threads = True
+    server.body = body
+    server.ranges = True
+    server.delay = 0
+    server.requests = []
+    server.connections = []
+    original = server.get_request
+
+    def get_request():
+        conn = original()
+        server.connections.append(conn)
+        return conn
+
+    server.get_request = get_request
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/file.bin"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _stop_range_server(server):
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def range_server():
+    """
+    A local HTTP/1.1 server for a random 1 MB body. Exposes `.url`, `.body`,
+    `.requests` (method, Range) and `.connections` (accepted sockets); set
+    `.ranges = False` to make it ignore Range like some origins do, and
+    `.delay` to sleep that long before each 64 KB write.
+    """
+    server = _start_range_server(os.urandom(1024 * 1024))
+    yield server
+    _stop_range_server(server)
+
+
+@pytest.fixture
+def mirror_servers():
+    """Three range servers (as range_server) for the same 1 MB body: mirrors of one file."""
+    body = os.urandom(1024 * 1024)
+    servers = [_start_range_server(body) for _ in range(3)]
+    yield servers
+    for server in servers:
+        _stop_range_server(server)
@@ -0,0 +1,224 @@
+"""
+The asyncio download engine against a local range server: whole files with
+splitting, many downloads on one loop, pause and resume, stop, and errors.
+"""
+
+import hashlib
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from aioengine import AsyncEngine, RangeIgnored, available
+from hashing import StreamHasher
+from metalink import MirrorSet
+from ratelimit import Shaper
+from segments import RangeSet, SegmentPlan
+
+KB = 1024
+
+
+@pytest.fixture
+def engine():
+    engine = AsyncEngine(limit_per_host=8)
+    yield engine
+    engine.close()
+
+
+class Outcome:
+    """Collects a job's callbacks, as the manager's signals would."""
+
+    def __init__(self):
+        self.bytes = 0
+        self.done = 0
+        self.errors = []
+        self.ended = threading.Event()
+        self._lock = threading.Lock()
+
+    def on_bytes(self, n):
+        with self._lock:
+            self.bytes += n
+
+    def on_done(self):
+        self.done += 1
+        self.ended.set()
+
+    def on_error(self, e):
+        self.errors.append(e)
+        self.ended.set()
+
+
+def start(engine, server, path, segments=4, min_segment=64 * KB, splittable=True):
+    size = len(server.body)
+    path.write_bytes(bytes(size))
+    plan = SegmentPlan(size, min_segment=min_segment, splittable=splittable)
+    out = Outcome()
+    job = engine.start(server.url, str(path), plan, plan.initial(segments),
+                       on_bytes=out.on_bytes, on_done=out.on_done, on_error=out.on_error)
+    return plan, job, out
+
+
+def test_available():
+    assert available()
+
+
+def test_downloads_the_whole_file_with_splits(engine, range_server, tmp_path):
+    path = tmp_path / "file.bin"
+    plan, _, out = start(engine, range_server, path)
+    assert out.ended.wait(10)
+    assert out.done == 1 and not out.errors
+    assert path.read_bytes() == range_server.body
+    assert plan.complete() and out.bytes == len(range_server.body)
+
+
+def test_a_free_slot_takes_half_of_the_busiest_segment(engine, range_server, tmp_path):
+    range_server.delay = 0.02
+    size = len(range_server.body)
+    path = tmp_path / "file.bin"
+    path.write_bytes(range_server.body[:size // 2] + bytes(size - size // 2))
+    plan = SegmentPlan(size, RangeSet([(64 * KB, size // 2)]), min_segment=64 * KB)
+    out = Outcome()
+    segments = plan.initial(2)                      # 64 KB at the front, 512 KB at the back
+    engine.start(range_server.url, str(path), plan, segments,
+                 on_done=out.on_done, on_error=out.on_error)
+    assert out.ended.wait(10) and out.done == 1
+    assert path.read_bytes() == range_server.body
+    assert plan.splits >= 1
+
+
+def test_many_downloads_share_one_loop_and_its_connections(engine, range_server, tmp_path):
+    outs = [start(engine, range_server, tmp_path / f"{i}.bin")[2] for i in range(6)]
+    assert all(out.ended.wait(20) for out in outs)
+    assert all(out.done == 1 and not out.errors for out in outs)
+    for i in range(6):
+        assert (tmp_path / f"{i}.bin").read_bytes() == range_server.body
+    gets = sum(1 for method, _ in range_server.requests if method == "GET")
+    assert len(range_server.connections) < gets     # kept alive between segments
+    assert sum(1 for t in threading.enumerate() if t.name == "download-loop") == 1
+
+
+def test_without_ranges_one_segment_fetches_from_zero(engine, range_server, tmp_path):
+    range_server.ranges = False
+    path = tmp_path / "file.bin"
+    plan, _, out = start(engine, range_server, path, splittable=False)
+    assert out.ended.wait(10) and out.done == 1
+    assert path.read_bytes() == range_server.body and plan.splits == 0
+
+
+def test_a_server_ignoring_ranges_mid_file_is_an_error(engine, range_server, tmp_path):
+    range_server.ranges = False
+    _, _, out = start(engine, range_server, tmp_path / "file.bin")
+    assert out.ended.wait(10)
+    assert out.done == 0 and isinstance(out.errors[0], RangeIgnored)
+
+
+def start_mirrored(engine, mirrors, size, path, segments=6):
+    path.write_bytes(bytes(size))
+    plan = SegmentPlan(size, min_segment=32 * KB)
+    out = Outcome()
+    engine.start(None, str(path), plan, plan.initial(segments),
+                 on_bytes=out.on_bytes, on_done=out.on_done, on_error=out.on_error, mirrors=mirrors)
+    return plan, out
+
+
+def test_segments_are_spread_over_mirrors(engine, mirror_servers, tmp_path):
+    mirrors = MirrorSet([s.url for s in mirror_servers], min_sample=64 * KB)
+    body = mirror_servers[0].body
+    _, out = start_mirrored(engine, mirrors, len(body), tmp_path / "file.bin")
+    assert out.ended.wait(10) and out.done == 1 and not out.errors
+    assert (tmp_path / "file.bin").read_bytes() == body
+    assert all(any(m == "GET" for m, _ in s.requests) for s in mirror_servers)
+    assert sum(m.served.total() for m in mirrors.mirrors) == len(body)
+
+
+def test_a_dead_or_broken_mirror_is_dropped_and_others_finish(engine, mirror_servers, tmp_path):
+    mirror_servers[1].ranges = False                # answers every range with the whole file
+    urls = ["http://127.0.0.1:9/file.bin"] + [s.url for s in mirror_servers]
+    # slow_ratio=0: only failures drop a mirror here, never timing.
+    mirrors = MirrorSet(urls, slow_ratio=0, max_failures=1, min_sample=64 * KB)
+    body = mirror_servers[0].body
+    _, out = start_mirrored(engine, mirrors, len(body), tmp_path / "file.bin")
+    assert out.ended.wait(10) and out.done == 1 and not out.errors
+    assert (tmp_path / "file.bin").read_bytes() == body
+    assert mirrors.mirrors[0].dropped
+    assert not mirrors.mirrors[1].dropped and not mirrors.mirrors[3].dropped
+
+
+def test_a_slow_mirror_is_dropped_mid_segment(engine, mirror_servers, tmp_path):
+    mirror_servers[0].delay = 0.2
+    mirrors = MirrorSet([s.url for s in mirror_servers], min_sample=16 * KB)
+    body = mirror_servers[0].body
+    _, out = start_mirrored(engine, mirrors, len(body), tmp_path / "file.bin", segments=3)
+    assert out.ended.wait(10) and out.done == 1
+    assert (tmp_path / "file.bin").read_bytes() == body
+    assert mirrors.mirrors[0].dropped and mirrors.mirrors[0].served.total() < len(body) // 3
+
+
+def test_a_throttle_paces_every_segment(engine, range_server, tmp_path):
+    path = tmp_path / "file.bin"
+    size = len(range_server.body)
+    path.write_bytes(bytes(size))
+    plan = SegmentPlan(size, min_segment=64 * KB)
+    out = Outcome()
+    started = time.monotonic()
+    engine.start(range_server.url, str(path), plan, plan.initial(4), on_done=out.on_done,
+                 on_error=out.on_error, throttle=Shaper(rate=2 * size).throttle())
+    assert out.ended.wait(10) and out.done == 1
+    assert path.read_bytes() == range_server.body
+    # 1 MB less a 512 KB burst, at 2 MB/s: 0.25 s, less the wait after each
+    # segment's last read (up to 64 KB each), which nothing sits out.
+    assert 0.1 < time.monotonic() - started < 0.6
+
+
+def test_the_hasher_is_fed_off_the_loop(engine, range_server, tmp_path):
+    path = tmp_path / "file.bin"
+    size = len(range_server.body)
+    path.write_bytes(bytes(size))
+    plan = SegmentPlan(size, min_segment=64 * KB)
+    hasher = StreamHasher(path, size)
+    threads = set()
+
+    def on_data(offset, data):
+        threads.add(threading.current_thread().name)
+        hasher.written(offset, data)
+
+    out = Outcome()
+    engine.start(range_server.url, str(path), plan, plan.initial(4), on_done=out.on_done,
+                 on_error=out.on_error, on_data=on_data)
+    assert out.ended.wait(10) and out.done == 1
+    assert threads and "download-loop" not in threads
+    assert hasher.finish() == hashlib.sha256(range_server.body).hexdigest()
+
+
+def test_a_file_that_cannot_be_opened_is_an_error(engine, range_server, tmp_path):
+    plan = SegmentPlan(len(range_server.body))
+    out = Outcome()
+    engine.start(range_server.url, str(tmp_path / "missing" / "file.bin"), plan, plan.initial(1),
+                 on_done=out.on_done, on_error=out.on_error)
+    assert out.ended.wait(10) and isinstance(out.errors[0], OSError) and out.done == 0
+
+
+def test_pause_holds_and_resume_finishes(engine, range_server, tmp_path):
+    range_server.delay = 0.02
+    path = tmp_path / "file.bin"
+    plan, job, out = start(engine, range_server, path, segments=1, min_segment=len(range_server.body))
+    job.pause()
+    time.sleep(0.3)
+    held = plan.downloaded
+    time.sleep(0.3)
+    assert plan.downloaded == held < len(range_server.body) and not out.ended.is_set()
+    job.resume()
+    assert out.ended.wait(10) and out.done == 1
+    assert path.read_bytes() == range_server.body
+
+
+def test_stop_cancels_without_finishing(engine, range_server, tmp_path):
+    range_server.delay = 0.02
+    plan, job, out = start(engine, range_server, tmp_path / "file.bin", segments=2)
+    job.pause()
+    job.stop()
+    time.sleep(0.3)
+    assert out.done == 0 and not out.errors
+    assert all(not s.active for s in plan.segments)
@@ -0,0 +1,141 @@
+"""
+On-disk LRU blob store: round trips, byte/count/age bounds, the memory
+tier, lazy use-time writes, and damage on disk reading as a miss.
+"""
+
+import threading
+
+import pytest
+
+from blobcache import BlobCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return BlobCache(tmp_path / "blobs", max_bytes=1000, max_entries=5, max_age=100,
+                     memory_bytes=300)
+
+
+def test_round_trip_survives_a_restart(cache):
+    assert cache.put("a.example", b"icon-a", now=0)
+    again = BlobCache(cache.root, max_bytes=1000)
+    assert again.get("a.example", now=1) == b"icon-a"
+    assert "a.example" in again and len(again) == 1
+
+
+def test_keys_never_reach_the_filesystem(cache):
+    key = "../../etc/passwd?x=<y>"
+    cache.put(key, b"data", now=0)
+    path = cache.path_for(key)
+    assert path.parent == cache.root and path.name.isascii() and "/" not in path.name
+    assert cache.get(key, now=0) == b"data"
+
+
+class TestBounds:
+
+    def test_least_recently_used_go_when_over_the_byte_budget(self, cache):
+        for i, key in enumerate("abc"):
+            cache.put(key, bytes(400), now=i)
+        assert cache.get("a", now=5) is None
+        assert cache.total_bytes <= 1000 and cache.evicted == 1
+
+    def test_a_read_keeps_an_entry(self, cache):
+        cache.put("a", bytes(400), now=0)
+        cache.put("b", bytes(400), now=1)
+        cache.get("a", now=2)
+        cache.put("c", bytes(400), now=3)
+        assert "a" in cache and "b" not in cache
+
+    def test_entry_count(self, cache):
+        for i in range(7):
+            cache.put(str(i), b"x", now=i)
+        assert len(cache) == 5 and "0" not in cache and "6" in cache
+
+    def test_oversized_value_is_refused(self, cache):
+        assert cache.put("big", bytes(1001), now=0) is False
+        assert len(cache) == 0
+
+    def test_expired_entry_is_a_miss_and_is_deleted(self, cache):
+        cache.put("a", b"old", now=0)
+        assert cache.get("a", now=100) == b"old"
+        assert cache.get("a", now=101) is None
+        assert not cache.path_for("a").exists()
+
+    def test_use_does_not_extend_age(self, cache):
+        cache.put("a", b"x", now=0)
+        cache.get("a", now=90)
+        assert cache.get("a", now=150) is None
+
+
+class TestMemoryTier:
+
+    def test_hot_values_are_served_without_the_file(self, cache):
+        cache.put("a", b"hot", now=0)
+        cache.path_for("a").write_bytes(b"XYZ")     # same size, different bytes
+        assert cache.get("a", now=1) == b"hot"
+
+    def test_memory_budget_evicts_oldest(self, cache):
+        cache.put("a", bytes(200), now=0)
+        cache.put("b", bytes(200), now=1)
+        assert list(cache._memory) == ["b"]
+        assert cache.get("a", now=2) == bytes(200)  # back from disk
+        assert list(cache._memory) == ["a"]
+
+
+class TestDamage:
+
+    def test_missing_file_reads_as_a_miss(self, cache):
+        cache.put("a", b"data", now=0)
+        cache._memory.clear()
+        cache.path_for("a").unlink()
+        assert cache.get("a", now=1) is None and "a" not in cache
+
+    def test_truncated_file_reads_as_a_miss(self, cache):
+        cache.put("a", b"data", now=0)
+        cache._memory.clear()
+        cache.path_for("a").write_bytes(b"da")
+        assert cache.get("a", now=1) is None
+
+    def test_corrupt_index_starts_empty(self, tmp_path):
+        (tmp_path / BlobCache.INDEX).write_text("{not json")
+        assert len(BlobCache(tmp_path, 100)) == 0
+
+    def test_bad_index_rows_are_skipped(self, tmp_path):
+        (tmp_path / BlobCache.INDEX).write_text(
+            '{"ok": {"size": 1, "stored": 0, "used": 0}, "bad": {"size": "x"}, "worse": 3}')
+        assert list(BlobCache(tmp_path, 100)._index) == ["ok"]
+
+
+def test_reads_only_mark_the_index_dirty(cache):
+    cache.put("a", b"x", now=0)
+    before = (cache.root / BlobCache.INDEX).read_bytes()
+    cache.get("a", now=50)
+    assert (cache.root / BlobCache.INDEX).read_bytes() == before
+    assert cache.flush()
+    again = BlobCache(cache.root, 1000)
+    assert again._index["a"]["used"] == 50
+
+
+def test_remove_and_clear(cache):
+    cache.put("a", b"1", now=0)
+    cache.put("b", b"2", now=0)
+    assert cache.remove("a") and not cache.remove("a")
+    cache.clear()
+    assert len(cache) == 0
+    assert not list(cache.root.glob("*" + cache.suffix))
+
+
+def test_concurrent_puts_and_gets(tmp_path):
+    cache = BlobCache(tmp_path, max_bytes=10_000, max_entries=50, memory_bytes=1000)
+
+    def worker(n):
+        for i in range(50):
+            cache.put(f"{n}-{i}", bytes([n]) * 50)
+            cache.get(f"{n}-{i // 2}")
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(cache) == 50 and cache.total_bytes <= 10_000
@@ -0,0 +1,189 @@
+"""
+The segment write path: the buffer pool, positioned writes, preallocation,
+coalescing into whole buffers, flushing by time and gap, and fsync policy.
+"""
+
+import os
+import threading
+
+import pytest
+
+import diskio
+from diskio import BufferPool, SegmentWriter, fsync_policy, preallocate, pwrite
+
+KB = 1024
+
+
+@pytest.fixture
+def target(tmp_path):
+    path = tmp_path / "file.bin"
+    preallocate(str(path), 256 * KB)
+    return path
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def writer(path, pool=None, clock=None, **kw):
+    written = []
+    out = SegmentWriter(str(path), lambda o, c: written.append((o, c)),
+                        pool=pool or BufferPool(size=64 * KB, count=4),
+                        clock=clock or Clock(), **kw)
+    return out, written
+
+
+class TestBufferPool:
+
+    def test_buffers_are_made_once_and_reused(self):
+        pool = BufferPool(size=16, count=2)
+        a = pool.acquire()
+        pool.release(a)
+        assert pool.acquire() is a and pool.made == 1
+
+    def test_an_empty_pool_makes_callers_wait(self):
+        pool = BufferPool(size=16, count=1)
+        held = pool.acquire()
+        assert pool.acquire(timeout=0.05) is None and pool.waits == 1
+        threading.Timer(0.05, pool.release, args=(held,)).start()
+        assert pool.acquire(timeout=5) is held
+        assert pool.in_use == 1
+
+
+@pytest.mark.parametrize("value,policy", [
+    ("none", "none"), ("INTERVAL", "interval"), ("close", "close"),
+    ("", "close"), (None, "close"), ("always", "close"),
+])
+def test_fsync_policy(value, policy):
+    assert fsync_policy(value) == policy
+
+
+def test_preallocate_sizes_and_truncates(tmp_path):
+    path = tmp_path / "f"
+    path.write_bytes(b"x" * 10)
+    preallocate(str(path), 100 * KB)
+    assert path.stat().st_size == 100 * KB and path.read_bytes()[:10] == bytes(10)
+    preallocate(str(path), 0)
+    assert path.stat().st_size == 0
+
+
+def test_pwrite_lands_at_its_offset_whatever_the_order(target):
+    fd = diskio.open_for_write(str(target))
+    try:
+        pwrite(fd, b"world", 5)
+        pwrite(fd, bytearray(b"hello"), 0)
+        pwrite(fd, memoryview(b"--!--")[2:3], 10)
+    finally:
+        os.close(fd)
+    assert target.read_bytes()[:11] == b"helloworld!"
+
+
+class TestSegmentWriter:
+
+    def test_reads_are_written_a_buffer_at_a_time(self, target):
+        out, written = writer(target)
+        data = os.urandom(160 * KB)
+        for i in range(0, len(data), 8 * KB):
+            out.write(i, data[i:i + 8 * KB])
+        assert written == [(0, 64 * KB), (64 * KB, 64 * KB)]    # only whole buffers so far
+        out.close()
+        assert written[-1] == (128 * KB, 32 * KB) and out.writes == 3
+        assert target.read_bytes()[:len(data)] == data
+
+    def test_a_gap_writes_what_came_before(self, target):
+        out, written = writer(target)
+        out.write(0, b"a" * 100)
+        out.write(1000, b"b" * 100)                  # not contiguous
+        assert written == [(0, 100)]
+        out.close()
+        assert written == [(0, 100), (1000, 100)]
+        body = target.read_bytes()
+        assert body[:100] == b"a" * 100 and body[1000:1100] == b"b" * 100
+
+    def test_a_slow_link_still_reports_progress(self, target):
+        clock = Clock()
+        out, written = writer(target, clock=clock, flush_after=0.5)
+        out.write(0, b"x" * 10)
+        clock.now = 0.4
+        out.write(10, b"x" * 10)
+        assert written == []
+        clock.now = 0.6
+        out.write(20, b"x" * 10)
+        assert written == [(0, 30)]
+        out.close()
+
+    def test_buffers_go_back_to_the_pool(self, target):
+        pool = BufferPool(size=64 * KB, count=1)
+        out, _ = writer(target, pool=pool)
+        out.write(0, b"x" * 10)
+        assert pool.in_use == 1
+        out.flush()
+        assert pool.in_use == 0
+        out.write(10, b"y")
+        out.close()
+        out.close()
+        assert pool.in_use == 0 and out.fd is None
+
+    def test_a_stopped_worker_does_not_wait_for_the_pool(self, target, monkeypatch):
+        monkeypatch.setattr(diskio, "ACQUIRE_WAIT", 0.01)
+        pool = BufferPool(size=64 * KB, count=1)
+        held = pool.acquire()                        # another worker has the only buffer
+        stop = threading.Event()
+        out, written = writer(target, pool=pool, stopped=stop.is_set)
+        worker = threading.Thread(target=lambda: (out.write(0, b"x" * 10), out.close()))
+        worker.start()
+        worker.join(timeout=0.1)
+        assert worker.is_alive()                     # still waiting for a buffer
+        stop.set()
+        worker.join(timeout=5)
+        assert not worker.is_alive() and written == [(0, 10)]
+        assert out.unpooled == 1 and pool.in_use == 1 and pool.made == 1
+        pool.release(held)
+
+    def test_discard_writes_nothing(self, target):
+        out, written = writer(target)
+        out.write(0, b"z" * 10)
+        out.discard()
+        assert written == [] and target.read_bytes()[:10] == bytes(10)
+
+    def test_interval_policy_syncs_as_it_goes(self, target, monkeypatch):
+        syncs = []
+        monkeypatch.setattr(diskio.os, "fsync", syncs.append)
+        out, _ = writer(target, fsync="interval", fsync_interval=128 * KB)
+        out.write(0, bytes(256 * KB))
+        out.close()
+        assert len(syncs) == 2
+
+    def test_close_policy_leaves_syncing_to_the_manager(self, target, monkeypatch):
+        syncs = []
+        monkeypatch.setattr(diskio.os, "fsync", syncs.append)
+        out, _ = writer(target)
+        out.write(0, bytes(256 * KB))
+        out.close()
+        assert syncs == []
+
+
+def test_many_workers_share_a_small_pool(target):
+    """More writers than buffers: they take turns, and every byte lands once."""
+    pool = BufferPool(size=16 * KB, count=2)
+    data = os.urandom(256 * KB)
+    ranges = [(i * 32 * KB, (i + 1) * 32 * KB) for i in range(8)]
+    done = []
+
+    def work(start, end):
+        out = SegmentWriter(str(target), lambda o, c: done.append(c), pool=pool)
+        for pos in range(start, end, 4 * KB):
+            out.write(pos, data[pos:pos + 4 * KB])
+        out.close()
+
+    threads = [threading.Thread(target=work, args=r) for r in ranges]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(10)
+    assert sum(done) == len(data) and pool.made <= 2
+    assert target.read_bytes() == data
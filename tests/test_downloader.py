@@ -0,0 +1,221 @@
+"""
+DownloadManager end to end, with the thread engine, against local range
+servers: splitting as workers finish, what SegmentWriter commits and what
+a failed write leaves, resuming from the journal, refetching pieces that
+fail their hash, and moving a failed mirror's segment to another.
+"""
+
+import functools
+import hashlib
+import os
+import re
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("PyQt6.QtWidgets")
+
+from PyQt6.QtCore import QThreadPool
+
+import diskio
+import downloader
+from downloader import DownloadManager, Status
+from journal import SegmentJournal, read_journal
+from segments import RangeSet, SegmentPlan
+
+KB = 1024
+
+
+@pytest.fixture
+def pool(qapp):
+    pool = QThreadPool()
+    pool.setMaxThreadCount(8)
+    yield pool
+    pool.waitForDone(10_000)
+
+
+class Events:
+    """What the manager signalled, as DownloadPanel would see it."""
+
+    def __init__(self, manager):
+        self.finished = []
+        self.errors = []
+        manager.download_finished.connect(lambda _id, name: self.finished.append(name))
+        manager.error_occurred.connect(lambda _id, message: self.errors.append(message))
+
+
+def run_until(qapp, predicate, timeout=15.0):
+    """Deliver the workers' queued signals until `predicate()` holds."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        qapp.processEvents()
+        if predicate():
+            return True
+        time.sleep(0.005)
+    return predicate()
+
+
+def settled(manager):
+    return lambda: manager.status in (Status.COMPLETED, Status.ERROR, Status.STOPPED)
+
+
+def fetched(server):
+    """(start, end) of each GET the server answered with a range."""
+    spans = []
+    for method, header in server.requests:
+        m = re.match(r"bytes=(\d+)-(\d+)$", header or "")
+        if method == "GET" and m:
+            spans.append((int(m.group(1)), int(m.group(2)) + 1))
+    return spans
+
+
+def make(server, pool, path, **kwargs):
+    kwargs.setdefault("num_threads", 4)
+    manager = DownloadManager("d1", server.url, str(path), pool, engine="threads",
+                              fsync="none", **kwargs)
+    return manager, Events(manager)
+
+
+def test_a_download_completes_and_cleans_up(qapp, pool, range_server, tmp_path):
+    path = tmp_path / "file.bin"
+    manager, events = make(range_server, pool, path)
+    manager.start()
+    assert run_until(qapp, settled(manager))
+    assert manager.status == Status.COMPLETED and events.finished == ["file.bin"]
+    assert path.read_bytes() == range_server.body
+    # Every byte SegmentWriter wrote was committed to the plan and counted.
+    assert manager.plan.done == RangeSet([(0, len(range_server.body))])
+    assert manager.downloaded_size == len(range_server.body)
+    pool.waitForDone(10_000)
+    assert not os.path.exists(manager.journal_file)
+
+
+def test_resumes_from_the_journal_and_splits_as_workers_finish(
+        qapp, pool, range_server, tmp_path, monkeypatch):
+    monkeypatch.setattr(downloader, "SegmentPlan", functools.partial(SegmentPlan, min_segment=16 * KB))
+    range_server.delay = 0.02
+    body, size = range_server.body, len(range_server.body)
+    path = tmp_path / "file.bin"
+    # An earlier run got [16 KB, 512 KB) onto disk and into the journal.
+    path.write_bytes(bytes(16 * KB) + body[16 * KB:512 * KB] + bytes(size - 512 * KB))
+    journal = SegmentJournal(f"{path}.journal", size, {"url": range_server.url, "save_path": str(path)})
+    journal.open(RangeSet([(16 * KB, 512 * KB)]))
+    journal.close()
+
+    manager, events = make(range_server, pool, path, num_threads=2)
+    manager.start()
+    assert run_until(qapp, settled(manager))
+    assert manager.status == Status.COMPLETED and not events.errors
+    assert path.read_bytes() == body
+    spans = fetched(range_server)
+    assert not any(start < 512 * KB and end > 16 * KB for start, end in spans)
+    # The 16 KB gap finished first and its worker took half of the other;
+    # the split-off half is a request of its own, past the other's start.
+    assert manager.plan.splits >= 1 and len(spans) >= 3
+    assert any(start > 512 * KB for start, _ in spans)
+
+
+def test_a_failed_write_keeps_what_landed_and_a_retry_finishes(
+        qapp, pool, range_server, tmp_path, monkeypatch):
+    size = len(range_server.body)
+    path = tmp_path / "file.bin"
+    real_pwrite = diskio.pwrite
+    disk_full = [True]
+
+    def pwrite(fd, data, offset):
+        if disk_full[0] and offset + len(data) > size // 2:
+            raise OSError(28, "No space left on device")
+        real_pwrite(fd, data, offset)
+
+    monkeypatch.setattr(diskio, "pwrite", pwrite)
+    manager, events = make(range_server, pool, path)
+    manager.start()
+    assert run_until(qapp, settled(manager))
+    assert manager.status == Status.ERROR and "No space left" in events.errors[0]
+    pool.waitForDone(10_000)
+    # Only writes that landed were committed, and the journal kept them;
+    # the other workers were stopped with whatever they had by then.
+    landed = read_journal(manager.journal_file).ranges
+    assert landed == manager.plan.done
+    assert all(end <= size // 2 for _, end in landed)
+    data = path.read_bytes()
+    assert all(data[start:end] == range_server.body[start:end] for start, end in landed)
+
+    disk_full[0] = False
+    before = len(fetched(range_server))
+    manager.retry()
+    assert run_until(qapp, settled(manager))
+    assert manager.status == Status.COMPLETED
+    assert path.read_bytes() == range_server.body
+    # The retry resumed from the journal: nothing that landed came again.
+    assert not any(start < done_end and done_start < end
+                   for start, end in fetched(range_server)[before:]
+                   for done_start, done_end in landed)
+
+
+def test_pausing_compacts_the_journal_on_the_pool(qapp, pool, range_server, tmp_path, monkeypatch):
+    manager, events = make(range_server, pool, tmp_path / "file.bin", rate_limit=256 * KB)
+    manager.start()
+    assert run_until(qapp, lambda: manager.plan is not None and manager.plan.downloaded > 0)
+    assert manager.status == Status.DOWNLOADING
+    write = SegmentJournal._write_compacted
+    threads = []
+
+    def recording_write(journal, ranges):
+        threads.append(threading.current_thread())
+        return write(journal, ranges)
+
+    monkeypatch.setattr(SegmentJournal, "_write_compacted", recording_write)
+    manager.pause()
+    assert run_until(qapp, lambda: threads and not manager.checkpointing)
+    assert threading.main_thread() not in threads
+    assert manager.journal is not None and manager.journal.is_open    # paused, not closed
+    manager.stop()
+
+
+def test_a_piece_that_fails_its_hash_is_fetched_again(qapp, pool, range_server, tmp_path, monkeypatch):
+    body, size = range_server.body, len(range_server.body)
+    piece = 256 * KB
+    pieces = (piece, [hashlib.sha256(body[i:i + piece]).hexdigest() for i in range(0, size, piece)])
+    real_pwrite = diskio.pwrite
+    corrupt = [300 * KB]
+
+    def pwrite(fd, data, offset):
+        target = corrupt[0]
+        if target is not None and offset <= target < offset + len(data):
+            data = memoryview(data)
+            data[target - offset] ^= 0xFF      # in the buffer, so the hasher sees it too
+            corrupt[0] = None
+        real_pwrite(fd, data, offset)
+
+    monkeypatch.setattr(diskio, "pwrite", pwrite)
+    path = tmp_path / "file.bin"
+    manager, events = make(range_server, pool, path, pieces=pieces,
+                           checksum=hashlib.sha256(body).hexdigest())
+    manager.start()
+    assert run_until(qapp, settled(manager))
+    assert manager.status == Status.COMPLETED and not events.errors
+    assert manager.refetches == 1
+    assert path.read_bytes() == body
+    # The whole file once, then only the piece holding the bad byte.
+    assert sum(end - start for start, end in fetched(range_server)) == size + piece
+    assert fetched(range_server)[-1] == (piece, 2 * piece)
+
+
+def test_a_failed_mirror_hands_its_segment_to_another(qapp, pool, mirror_servers, tmp_path):
+    good, dead, no_ranges = mirror_servers
+    dead.shutdown()
+    dead.server_close()                     # connection refused
+    no_ranges.ranges = False                # answers a ranged request with the whole file
+    path = tmp_path / "file.bin"
+    manager = DownloadManager("d1", good.url, str(path), pool, num_threads=3, engine="threads",
+                              fsync="none", mirrors=[dead.url, no_ranges.url])
+    events = Events(manager)
+    manager.start()
+    assert run_until(qapp, settled(manager))
+    assert manager.status == Status.COMPLETED and not events.errors
+    assert path.read_bytes() == good.body
+    by_url = {m.url: m for m in manager.mirrors.mirrors}
+    assert by_url[dead.url].served.total() == 0
+    assert by_url[good.url].served.total() > len(good.body) // 3
@@ -0,0 +1,97 @@
+"""
+Favicon cache: host keys, the blackline-icon URL form, what is accepted
+as an icon, and skipping writes for an unchanged icon.
+"""
+
+import pytest
+
+from favicons import (
+    MAX_ICON_BYTES,
+    REFRESH_AGE,
+    FaviconCache,
+    icon_host,
+    icon_url,
+)
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 40
+OTHER_PNG = b"\x89PNG\r\n\x1a\n" + b"\x01" * 40
+
+
+@pytest.mark.parametrize("url,host", [
+    ("https://www.GitHub.com/python/cpython", "github.com"),
+    ("http://example.com:8080/", "example.com"),
+    ("blackline-icon://news.example", "news.example"),
+    ("news.example", "news.example"),
+    ("xn--bcher-kva.example", "xn--bcher-kva.example"),
+    ("file:///tmp/new_tab.html", ""),
+    ("about:blank", ""),
+    ("javascript:alert(1)", ""),
+    ("https://", ""),
+    ("http://[::1", ""),
+    ("bad host.example", ""),
+    ("bücher.example", ""),
+    (None, ""),
+])
+def test_icon_host(url, host):
+    assert icon_host(url) == host
+
+
+def test_icon_url():
+    assert icon_url("https://www.example.com/a?b") == "blackline-icon://example.com"
+    assert icon_url("about:blank") == ""
+
+
+@pytest.fixture
+def icons(tmp_path):
+    return FaviconCache(tmp_path / "favicons")
+
+
+def test_an_icon_seen_on_a_page_serves_its_host(icons):
+    assert icons.store("https://www.example.com/page", PNG, now=0)
+    assert icons.lookup("example.com", now=1) == PNG
+    assert icons.lookup("blackline-icon://example.com", now=1) == PNG
+    assert icons.lookup("https://example.com/other", now=1) == PNG
+
+
+@pytest.mark.parametrize("data", [b"", b"GIF89a" + b"\x00" * 40,
+                                  PNG + b"\x00" * MAX_ICON_BYTES])
+def test_only_small_pngs_are_icons(icons, data):
+    assert icons.store("https://example.com/", data, now=0) is False
+    assert len(icons) == 0
+
+
+def test_internal_pages_have_no_icon(icons):
+    assert icons.store("file:///tmp/new_tab.html", PNG) is False
+    assert icons.lookup("about:blank") is None
+
+
+def test_unchanged_icon_is_not_rewritten(icons):
+    icons.store("https://example.com/", PNG, now=0)
+    path = icons.blobs.path_for("example.com")
+    stamp = path.stat().st_mtime_ns
+    path.touch()
+    touched = path.stat().st_mtime_ns
+    assert icons.store("https://example.com/a", PNG, now=10)
+    assert path.stat().st_mtime_ns == touched and touched >= stamp
+
+
+def test_changed_icon_replaces_the_old(icons):
+    icons.store("https://example.com/", PNG, now=0)
+    icons.store("https://example.com/", OTHER_PNG, now=10)
+    assert icons.lookup("example.com", now=11) == OTHER_PNG
+
+
+def test_storing_again_later_renews_the_age(tmp_path):
+    icons = FaviconCache(tmp_path, max_age=2 * REFRESH_AGE)
+    icons.store("https://example.com/", PNG, now=0)
+    icons.store("https://example.com/", PNG, now=REFRESH_AGE + 1)
+    assert icons.lookup("example.com", now=2 * REFRESH_AGE + 10) == PNG
+
+
+def test_remove_and_clear(icons):
+    icons.store("https://a.example/", PNG, now=0)
+    icons.store("https://b.example/", PNG, now=0)
+    assert icons.remove("https://a.example/x")
+    assert icons.remove("about:blank") is False
+    icons.clear()
+    assert len(icons) == 0
@@ -0,0 +1,224 @@
+"""
+Full-text index of visited pages: tokenising, query parsing with time
+words, ranking, content-hash deduplication, the byte budget, and recovery
+from a damaged database file.
+"""
+
+import random
+import threading
+import time
+
+import pytest
+
+from fulltext import (
+    DAY,
+    FullTextIndex,
+    parse_query,
+    snippet,
+    terms_of,
+)
+
+NOW = 1_700_000_000.0
+
+TIDAL = ("Tidal power converts the energy of tides into electricity. Barrages "
+         "across estuaries and turbines in tidal streams are the two main designs.")
+KERNEL = "The Linux kernel release notes list every driver and scheduler change."
+BAKING = "Sourdough bread needs a starter, flour, water, salt and a lot of patience."
+
+
+@pytest.fixture
+def index(tmp_path):
+    idx = FullTextIndex(tmp_path / "fulltext.db")
+    yield idx
+    idx.close()
+
+
+def _urls(hits):
+    return [h.url for h in hits]
+
+
+def test_terms_are_folded_and_stopwords_dropped():
+    assert terms_of("The ＴＩＤＡＬ Power of a Tide!") == ["tidal", "power", "tide"]
+    assert terms_of("x " + "y" * 41) == []
+
+
+class TestParseQuery:
+
+    def test_time_words_become_a_bound(self):
+        terms, since, prefix = parse_query("that article about tidal last month", NOW)
+        assert terms == ["article", "tidal"]
+        assert since == NOW - 31 * DAY
+        assert prefix is None                  # the last word typed was a time word
+
+    def test_today_and_yesterday_start_at_midnight(self):
+        _, today, _ = parse_query("kernel today", NOW)
+        _, yesterday, _ = parse_query("yesterday kernel", NOW)
+        assert today <= NOW < today + DAY
+        assert yesterday == pytest.approx(today - DAY, abs=3600)   # DST
+
+    def test_a_word_still_being_typed_is_a_prefix(self):
+        assert parse_query("tidal pow", NOW)[2] == "pow"
+        assert parse_query("tidal pow ", NOW)[2] is None
+
+    def test_last_alone_is_a_term(self):
+        assert parse_query("last supper", NOW)[0] == ["last", "supper"]
+
+    @pytest.mark.parametrize("text", ["", "   ", None, "the of a"])
+    def test_nothing_to_search(self, text):
+        assert parse_query(text, NOW)[0] == []
+
+
+def test_snippet_centres_on_the_first_match():
+    text = "filler " * 60 + "the tidal barrage" + " more" * 60
+    piece = snippet(text, ["tidal"])
+    assert "tidal barrage" in piece and piece.startswith("…") and piece.endswith("…")
+    assert snippet("short text", ["absent"]) == "short text"
+
+
+class TestSearch:
+
+    @pytest.fixture
+    def filled(self, index):
+        index.add("https://energy.example/tidal", "Tidal power explained", TIDAL, NOW - 20 * DAY)
+        index.add("https://lkml.example/notes", "Kernel notes", KERNEL, NOW - 2 * DAY)
+        index.add("https://bake.example/bread", "Bread", BAKING, NOW - 90 * DAY)
+        return index
+
+    def test_finds_by_body_text(self, filled):
+        assert _urls(filled.search("estuaries turbines", now=NOW)) == [
+            "https://energy.example/tidal"]
+
+    def test_vague_recall_still_finds_the_page(self, filled):
+        hits = filled.search("that article about tidal last month", now=NOW)
+        assert _urls(hits) == ["https://energy.example/tidal"]
+        assert "Tidal" in hits[0].snippet and hits[0].title == "Tidal power explained"
+
+    def test_time_bound_excludes_older_visits(self, filled):
+        assert filled.search("sourdough last month", now=NOW) == []
+        assert _urls(filled.search("sourdough last year", now=NOW)) == [
+            "https://bake.example/bread"]
+
+    def test_more_terms_matched_ranks_first(self, filled):
+        filled.add("https://other.example/", "Power cuts", "Power cuts hit the city again.",
+                   NOW)
+        assert _urls(filled.search("tidal power", now=NOW))[0] == "https://energy.example/tidal"
+
+    def test_prefix_of_the_last_word(self, filled):
+        assert _urls(filled.search("sched", now=NOW)) == ["https://lkml.example/notes"]
+        assert filled.search("sched ", now=NOW) == []
+
+    def test_title_words_count(self, filled):
+        assert _urls(filled.search("explained", now=NOW)) == ["https://energy.example/tidal"]
+
+    def test_limit(self, index):
+        for i in range(30):
+            index.add(f"https://p.example/{i}", f"Page {i}", f"common words page number {i}",
+                      NOW - i)
+        assert len(index.search("common", now=NOW)) == 20
+        assert len(index.search("common", limit=5, now=NOW)) == 5
+
+    def test_empty_index(self, index):
+        assert index.search("anything") == []
+
+
+class TestDeduplication:
+
+    def test_same_text_under_two_urls_is_stored_once(self, index):
+        index.add("https://a.example/story", "Story", TIDAL, NOW - 10)
+        size = index.size_bytes()
+        index.add("https://a.example/story?utm_source=x", "Story", TIDAL, NOW)
+        assert index.size_bytes() == size and len(index) == 2
+        hits = index.search("barrages", now=NOW)
+        assert _urls(hits) == ["https://a.example/story?utm_source=x"]   # newest visit
+
+    def test_changed_page_replaces_its_old_text(self, index, tmp_path):
+        index.add("https://a.example/", "A", TIDAL, NOW)
+        index.add("https://a.example/", "A", KERNEL, NOW)
+        assert index.search("barrages", now=NOW) == []
+        fresh = FullTextIndex(tmp_path / "fresh.db")
+        fresh.add("https://a.example/", "A", KERNEL, NOW)
+        assert index.size_bytes() == fresh.size_bytes()
+        fresh.close()
+
+    def test_remove_keeps_text_another_url_shows(self, index):
+        index.add("https://a.example/1", "A", TIDAL, NOW)
+        index.add("https://a.example/2", "A", TIDAL, NOW)
+        assert index.remove("https://a.example/1")
+        assert _urls(index.search("barrages", now=NOW)) == ["https://a.example/2"]
+        assert index.remove("https://a.example/2")
+        assert index.size_bytes() == 0
+        assert index.remove("https://a.example/2") is False
+
+    def test_page_without_words_is_not_stored(self, index):
+        assert index.add("https://a.example/", "", "  ... !!! ") is False
+        assert len(index) == 0
+
+
+class TestBudget:
+
+    def test_least_recently_visited_go_first(self, tmp_path):
+        rng = random.Random(4)
+        idx = FullTextIndex(tmp_path / "ft.db", budget=20_000)
+        for i in range(40):
+            text = " ".join("".join(rng.choice("abcdefghij") for _ in range(8))
+                            for _ in range(120)) + f" marker{i}"
+            idx.add(f"https://p.example/{i}", "", text, NOW + i)
+        assert idx.size_bytes() <= 20_000
+        assert idx.evicted > 0
+        assert idx.search("marker39 ", now=NOW) and not idx.search("marker0 ", now=NOW)
+        idx.close()
+
+
+class TestPersistence:
+
+    def test_survives_a_restart(self, tmp_path):
+        idx = FullTextIndex(tmp_path / "ft.db")
+        idx.add("https://a.example/", "A", TIDAL, NOW)
+        idx.close()
+        again = FullTextIndex(tmp_path / "ft.db")
+        assert _urls(again.search("barrages", now=NOW)) == ["https://a.example/"]
+        again.close()
+
+    def test_damaged_file_starts_empty(self, tmp_path):
+        path = tmp_path / "ft.db"
+        path.write_bytes(b"this is not a database" * 100)
+        idx = FullTextIndex(path)
+        assert len(idx) == 0
+        assert idx.add("https://a.example/", "A", TIDAL, NOW)
+        idx.close()
+
+    def test_clear(self, index):
+        index.add("https://a.example/", "A", TIDAL, NOW)
+        assert index.clear()
+        assert len(index) == 0 and index.search("tidal", now=NOW) == []
+
+
+def test_adds_from_worker_threads_while_searching(index):
+    def worker(n):
+        for i in range(20):
+            index.add(f"https://w{n}.example/{i}", "", f"{TIDAL} thread{n} item{i}", NOW)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    while any(t.is_alive() for t in threads):
+        index.search("tidal", now=NOW)
+    for t in threads:
+        t.join()
+    assert len(index) == 80
+    assert len(index.search("thread3 ", now=NOW, limit=100)) == 20
+
+
+def test_searches_stay_fast_on_thousands_of_pages(tmp_path):
+    """Not a benchmark; a guard against a query that scans every posting."""
+    rng = random.Random(2)
+    vocab = ["w%04d" % i for i in range(5000)]
+    idx = FullTextIndex(tmp_path / "ft.db")
+    for i in range(1000):
+        idx.add(f"https://p.example/{i}", f"Page {i}",
+                " ".join(rng.choice(vocab) for _ in range(200)), NOW - i * 600)
+    for text in ("w0001", "w0001 w0002", "w00", "w4999 last week"):
+        start = time.perf_counter()
+        idx.search(text, now=NOW)
+        assert time.perf_counter() - start < 0.25, text
+    idx.close()
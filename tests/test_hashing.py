@@ -0,0 +1,132 @@
+"""
+Hashing while downloading: in-order writes hashed from their buffers,
+out-of-order ones read back within the look-behind, resumed files, and
+per-piece digests that name what to fetch again.
+"""
+
+import hashlib
+import os
+import random
+import threading
+
+import pytest
+
+from hashing import StreamHasher
+from segments import RangeSet
+
+SIZE = 256 * 1024
+
+
+@pytest.fixture
+def data():
+    return random.Random(3).randbytes(SIZE)
+
+
+@pytest.fixture
+def path(tmp_path):
+    p = tmp_path / "f.bin"
+    p.write_bytes(b"\0" * SIZE)
+    return p
+
+
+def land(path, hasher, offset, data):
+    """What a SegmentWriter does: write the bytes, then show them to the hasher."""
+    fd = os.open(path, os.O_WRONLY)
+    try:
+        os.pwrite(fd, data, offset)
+    finally:
+        os.close(fd)
+    hasher.written(offset, data)
+
+
+def pieces_of(data, size):
+    return [hashlib.sha256(data[i:i + size]).hexdigest() for i in range(0, len(data), size)]
+
+
+def test_in_order_writes_are_never_read_back(path, data):
+    hasher = StreamHasher(path, SIZE)
+    for offset in range(0, SIZE, 10_000):
+        land(path, hasher, offset, data[offset:offset + 10_000])
+    assert hasher.position == SIZE
+    assert hasher.finish() == hashlib.sha256(data).hexdigest()
+    assert hasher.fed_bytes == SIZE and hasher.reread_bytes == 0
+
+
+def test_out_of_order_writes_are_read_back_when_the_hash_reaches_them(path, data):
+    hasher = StreamHasher(path, SIZE)
+    half = SIZE // 2
+    land(path, hasher, half, data[half:])
+    assert hasher.position == 0
+    land(path, hasher, 0, data[:half])
+    assert hasher.position == SIZE
+    assert hasher.fed_bytes == half and hasher.reread_bytes == half
+    assert hasher.finish() == hashlib.sha256(data).hexdigest()
+
+
+def test_one_call_reads_back_at_most_the_look_behind(path, data):
+    hasher = StreamHasher(path, SIZE, lookbehind=1000)
+    land(path, hasher, 100, data[100:])
+    land(path, hasher, 0, data[:100])
+    assert hasher.position == 1100
+    assert hasher.finish() == hashlib.sha256(data).hexdigest()
+    assert hasher.reread_bytes == SIZE - 100
+
+
+def test_a_resumed_download_reads_back_what_was_already_there(path, data):
+    path.write_bytes(data[:SIZE // 2] + b"\0" * (SIZE - SIZE // 2))
+    hasher = StreamHasher(path, SIZE, done=RangeSet([(0, SIZE // 2)]))
+    land(path, hasher, SIZE // 2, data[SIZE // 2:])
+    assert hasher.finish() == hashlib.sha256(data).hexdigest()
+    assert hasher.reread_bytes == SIZE // 2
+
+
+def test_finish_reads_gaps_it_was_never_told_about(path, data):
+    path.write_bytes(data)
+    hasher = StreamHasher(path, SIZE)
+    assert hasher.finish() == hashlib.sha256(data).hexdigest()
+
+
+def test_bad_pieces_are_named(path, data):
+    piece = 64 * 1024
+    expected = pieces_of(data, piece)
+    corrupt = bytearray(data)
+    corrupt[piece + 5] ^= 1
+    corrupt[SIZE - 1] ^= 1
+    hasher = StreamHasher(path, SIZE, piece_size=piece, expected_pieces=expected)
+    land(path, hasher, 0, bytes(corrupt))
+    hasher.finish()
+    assert hasher.bad_ranges() == [(piece, 2 * piece), (3 * piece, SIZE)]
+
+
+def test_a_short_last_piece(path, data):
+    piece = 100_000
+    hasher = StreamHasher(path, SIZE, piece_size=piece, expected_pieces=pieces_of(data, piece))
+    land(path, hasher, 0, data)
+    assert hasher.finish() == hashlib.sha256(data).hexdigest()
+    assert len(hasher.piece_digests) == 3 and hasher.bad_ranges() == []
+
+
+def test_without_expected_pieces_no_piece_digests_are_kept(path, data):
+    hasher = StreamHasher(path, SIZE, piece_size=1024)
+    land(path, hasher, 0, data)
+    hasher.finish()
+    assert hasher.piece_digests == [] and hasher.bad_ranges() == []
+
+
+def test_concurrent_writers(path, data):
+    piece = 32 * 1024
+    hasher = StreamHasher(path, SIZE, piece_size=piece, expected_pieces=pieces_of(data, piece),
+                          lookbehind=16 * 1024)
+    bounds = [(i, i + SIZE // 4) for i in range(0, SIZE, SIZE // 4)]
+
+    def worker(start, end):
+        for offset in range(start, end, 4096):
+            land(path, hasher, offset, data[offset:offset + 4096])
+
+    threads = [threading.Thread(target=worker, args=b) for b in bounds]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert hasher.finish() == hashlib.sha256(data).hexdigest()
+    assert hasher.bad_ranges() == []
@@ -0,0 +1,183 @@
+"""
+HTTP cache management: the settings, reading Chromium's simple-cache entry
+keys, per-site usage and eviction, and which speed-dial sites to prewarm.
+"""
+
+import struct
+
+import pytest
+
+from httpcache import (
+    MAX_MB,
+    MIN_MB,
+    PREWARM_EVERY,
+    CachePolicy,
+    Prewarmer,
+    evict_site,
+    read_entry_key,
+    scan_cache,
+    site_of_key,
+)
+
+MAGIC = 0xfcfb6d1ba7725c30
+
+
+def write_entry(directory, entry_hash, key, body=b"", stream1=None):
+    """A simple-cache entry as Chromium lays it out: header, key, data."""
+    raw = key.encode()
+    path = directory / f"{entry_hash}_0"
+    path.write_bytes(struct.pack("<QIII4x", MAGIC, 5, len(raw), 0) + raw + body)
+    if stream1 is not None:
+        (directory / f"{entry_hash}_1").write_bytes(stream1)
+    return path
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    data = tmp_path / "Cache" / "Cache_Data"
+    data.mkdir(parents=True)
+    write_entry(data, "0000000000000001",
+                "1/0/_dk_https://github.com https://github.com https://github.com/",
+                bytes(1000))
+    write_entry(data, "0000000000000002",
+                "1/0/_dk_https://github.com https://github.com "
+                "https://avatars.githubusercontent.com/u/1", bytes(500), stream1=bytes(200))
+    write_entry(data, "0000000000000003", "https://www.news.example/today", bytes(300))
+    (data / "index").write_bytes(bytes(24))
+    (data / "0000000000000004_0").write_bytes(b"not an entry")
+    return tmp_path / "Cache"
+
+
+class TestPolicy:
+
+    def test_defaults(self):
+        policy = CachePolicy.from_settings({})
+        assert (policy.cache_type, policy.size_mb, policy.prewarm) == ("disk", 512, False)
+        assert policy.max_bytes == 512 * 1024 * 1024
+
+    def test_round_trip(self):
+        policy = CachePolicy(cache_type="memory", size_mb=64, prewarm=True)
+        again = CachePolicy.from_settings(policy.to_settings())
+        assert (again.cache_type, again.size_mb, again.prewarm) == ("memory", 64, True)
+
+    @pytest.mark.parametrize("raw,mb", [(1, MIN_MB), (10**9, MAX_MB), ("x", 512),
+                                        (None, 512), ("256", 256)])
+    def test_size_is_clamped(self, raw, mb):
+        assert CachePolicy.from_settings({"http_cache_mb": raw}).size_mb == mb
+
+    def test_unknown_type_falls_back(self):
+        assert CachePolicy.from_settings({"http_cache_type": "tape"}).cache_type == "disk"
+        assert CachePolicy.from_settings(None).cache_type == "disk"
+
+
+@pytest.mark.parametrize("key,site", [
+    ("1/0/_dk_https://github.com https://github.com https://cdn.example/x.js", "github.com"),
+    ("https://www.News.example/a?b", "news.example"),
+    ("1/0/https://example.com/", "example.com"),
+    ("chrome://blank", ""),
+    ("", ""),
+])
+def test_site_of_key(key, site):
+    assert site_of_key(key) == site
+
+
+class TestEntryKey:
+
+    def test_reads_the_key(self, tmp_path):
+        path = write_entry(tmp_path, "00000000000000aa", "https://example.com/", b"body")
+        assert read_entry_key(path) == "https://example.com/"
+
+    @pytest.mark.parametrize("data", [b"", b"short",
+                                      struct.pack("<QIII4x", 1, 5, 3, 0) + b"abc",
+                                      struct.pack("<QIII4x", MAGIC, 5, 99, 0) + b"abc",
+                                      struct.pack("<QIII4x", MAGIC, 5, 0, 0)])
+    def test_anything_else_is_none(self, tmp_path, data):
+        path = tmp_path / "00000000000000bb_0"
+        path.write_bytes(data)
+        assert read_entry_key(path) is None
+
+    def test_missing_file(self, tmp_path):
+        assert read_entry_key(tmp_path / "nope_0") is None
+
+
+class TestScan:
+
+    def test_usage_by_site(self, cache_dir):
+        usage = scan_cache(cache_dir)
+        github = usage.get("github.com")
+        assert github.entries == 2 and len(github.paths) == 3
+        assert github.bytes == sum(p.stat().st_size for p in
+                                   (cache_dir / "Cache_Data").glob("000000000000000[12]_*"))
+        assert [u.site for u in usage.sites()] == ["github.com", "news.example"]
+        assert usage.get("https://www.news.example/").entries == 1
+
+    def test_what_cannot_be_read_is_unattributed(self, cache_dir):
+        usage = scan_cache(cache_dir)
+        assert usage.unattributed_bytes == 24 + len(b"not an entry")
+        assert usage.total_bytes == sum(u.bytes for u in usage.by_site.values())
+
+    def test_empty_or_missing_directory(self, tmp_path):
+        assert scan_cache(tmp_path / "absent").total_bytes == 0
+        assert scan_cache(tmp_path).sites() == []
+
+
+class TestEvict:
+
+    def test_removes_only_that_site(self, cache_dir):
+        usage = scan_cache(cache_dir)
+        before = usage.total_bytes
+        github = usage.get("github.com").bytes
+        assert evict_site(usage, "github.com") == (github, 0)
+        assert usage.total_bytes == before - github
+        again = scan_cache(cache_dir)
+        assert again.get("github.com") is None and again.get("news.example")
+
+    def test_unknown_and_unattributed_are_left(self, cache_dir):
+        usage = scan_cache(cache_dir)
+        assert evict_site(usage, "elsewhere.example") == (0, 0)
+        assert evict_site(usage, "") == (0, 0)
+        assert scan_cache(cache_dir).total_bytes == usage.total_bytes
+
+    def test_files_already_gone_are_skipped(self, cache_dir):
+        usage = scan_cache(cache_dir)
+        for path in usage.get("news.example").paths:
+            (cache_dir / path).unlink()
+        assert evict_site(usage, "news.example") == (0, 0)
+
+
+class TestPrewarm:
+
+    TILES = ["https://github.com", "https://www.news.example/", "https://a.example",
+             "https://b.example", "https://c.example"]
+
+    def test_top_tiles_in_order(self):
+        assert Prewarmer(limit=3).plan(self.TILES, now=0) == self.TILES[:3]
+
+    def test_a_site_is_warmed_once_a_day(self):
+        warm = Prewarmer(limit=2)
+        warm.mark("https://github.com/", now=0)
+        assert warm.plan(self.TILES, now=10) == ["https://www.news.example/"]
+        assert warm.plan(self.TILES, now=PREWARM_EVERY) == self.TILES[:2]
+
+    def test_a_visit_counts_as_warm(self):
+        warm = Prewarmer(limit=1)
+        warm.mark("https://www.github.com/python", now=0)
+        assert warm.warmed("https://github.com") and warm.plan(self.TILES, now=1) == []
+
+    def test_the_day_survives_a_restart(self):
+        warm = Prewarmer(limit=2)
+        warm.mark("https://github.com/", now=0)
+        warm.mark("https://old.example/", now=-PREWARM_EVERY)
+        saved = warm.to_settings(now=10)
+        assert saved == {Prewarmer.SETTINGS_KEY: {"github.com": 0}}
+        again = Prewarmer.from_settings(saved, limit=2)
+        assert again.plan(self.TILES, now=10) == ["https://www.news.example/"]
+
+    @pytest.mark.parametrize("settings", [None, {}, {Prewarmer.SETTINGS_KEY: [1]},
+                                          {Prewarmer.SETTINGS_KEY: {"a.example": "x"}}])
+    def test_bad_settings_mean_nothing_warmed(self, settings):
+        assert not Prewarmer.from_settings(settings).warmed("https://a.example")
+
+    def test_only_web_pages(self):
+        tiles = ["javascript:alert(1)", "blackline://newtab/", "https://ok.example"]
+        assert Prewarmer(limit=1).plan(tiles, now=0) == ["https://ok.example"]
@@ -0,0 +1,107 @@
+"""
+Shared connection pool: per-host keys, connection reuse across sessions and
+threads against a local keep-alive server, host limits, and closing.
+"""
+
+import threading
+import time
+
+import pytest
+import requests
+
+from httppool import ConnectionPool, failover_pool, pool_key, shared_pool
+
+
+@pytest.mark.parametrize("url,key", [
+    ("https://Example.com/a", ("https", "example.com", 443)),
+    ("http://example.com:8080/", ("http", "example.com", 8080)),
+    ("http://127.0.0.1/x", ("http", "127.0.0.1", 80)),
+    ("ftp://example.com/", None),
+    ("http://[::1", None),
+    ("", None),
+])
+def test_pool_key(url, key):
+    assert pool_key(url) == key
+
+
+def test_sessions_share_one_warm_connection(range_server):
+    pool = ConnectionPool()
+    for _ in range(10):
+        session = pool.session()
+        with session.get(range_server.url, headers={"Range": "bytes=0-99"}) as r:
+            assert r.content == range_server.body[:100]
+        session.close()                      # closes nothing shared
+    assert len(range_server.connections) == 1
+    (opened, sent), = pool.stats().values()
+    assert (opened, sent) == (1, 10)
+
+
+def test_probe_and_segments_reuse_each_other(range_server):
+    pool = ConnectionPool()
+    pool.session().head(range_server.url).close()
+    with pool.session().get(range_server.url, stream=True) as r:
+        assert r.raw.read() == range_server.body
+    assert len(range_server.connections) == 1
+
+
+def test_threads_open_at_most_one_connection_each(range_server):
+    pool = ConnectionPool(per_host=4)
+    barrier = threading.Barrier(4)
+    failures = []
+
+    def fetch():
+        session = pool.session()
+        barrier.wait()
+        for i in range(5):
+            r = session.get(range_server.url, headers={"Range": f"bytes={i}-{i + 9}"})
+            if r.content != range_server.body[i:i + 10]:
+                failures.append(i)
+
+    threads = [threading.Thread(target=fetch) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not failures and len(range_server.connections) <= 4
+    assert len(range_server.requests) == 20
+
+
+def test_least_recently_used_host_is_dropped():
+    pool = ConnectionPool(max_hosts=2)
+    a = pool.adapter_for("http://a.example/")
+    pool.adapter_for("http://b.example/")
+    assert pool.adapter_for("http://a.example/x") is a       # a is now most recent
+    pool.adapter_for("http://c.example/")
+    assert len(pool) == 2
+    assert set(pool.stats()) == {("http", "a.example", 80), ("http", "c.example", 80)}
+
+
+def test_non_http_urls_are_refused():
+    with pytest.raises(requests.exceptions.InvalidSchema):
+        ConnectionPool().adapter_for("file:///etc/passwd")
+
+
+def test_close_forgets_every_host(range_server):
+    pool = ConnectionPool()
+    pool.session().get(range_server.url).close()
+    pool.close()
+    assert len(pool) == 0
+    assert pool.session().get(range_server.url).content == range_server.body
+
+
+def test_session_headers():
+    session = ConnectionPool().session({"User-Agent": "test"})
+    assert session.headers["User-Agent"] == "test"
+
+
+def test_shared_pool_is_one_instance():
+    assert shared_pool() is shared_pool()
+
+
+def test_the_failover_pool_does_not_retry():
+    pool = failover_pool()
+    assert pool is failover_pool() and pool is not shared_pool()
+    started = time.monotonic()
+    with pytest.raises(requests.ConnectionError):
+        pool.session().get("http://127.0.0.1:9/file.bin", timeout=5)
+    assert time.monotonic() - started < 1
@@ -0,0 +1,133 @@
+"""
+Internal pages: the new tab page prepared for blackline://, inline images
+split into cacheable assets, lookups, headers, and who may load them.
+"""
+
+import base64
+
+import pytest
+
+from internal_pages import (
+    ASSET_CACHE,
+    DOCUMENT_CACHE,
+    NEWTAB_HOST,
+    NEWTAB_URL,
+    InternalPage,
+    InternalPages,
+    internal_initiator,
+    is_newtab_url,
+    split_inline_images,
+)
+
+PNG = b"\x89PNG\r\n\x1a\n" + bytes(range(64))
+B64 = base64.b64encode(PNG).decode("ascii")
+
+
+def test_inline_images_become_hashed_assets():
+    html, assets = split_inline_images(
+        f'<img src="data:image/png;base64,{B64}"><img src=\'data:image/png;base64,{B64}\'>',
+        "newtab")
+    assert len(assets) == 1                       # same bytes, one asset
+    path, ctype, data = assets[0]
+    assert (ctype, data) == ("image/png", PNG)
+    assert path.startswith("/img-") and path.endswith(".png")
+    assert html.count(f"blackline://newtab{path}") == 2 and "base64" not in html
+
+
+def test_undecodable_image_is_left_alone():
+    html = '<img src="data:image/png;base64,abc">'
+    assert split_inline_images(html, "newtab") == (html, [])
+
+
+def test_non_image_data_urls_are_left_alone():
+    html = '<a href="data:text/html;base64,PGgxPg==">x</a>'
+    assert split_inline_images(html, "newtab")[0] == html
+
+
+class TestPages:
+
+    @pytest.fixture
+    def pages(self):
+        pages = InternalPages()
+        pages.add_document(NEWTAB_HOST, f'<h1>Hi</h1><img src="data:image/png;base64,{B64}">')
+        return pages
+
+    def test_document_and_asset_are_served(self, pages):
+        doc = pages.lookup(NEWTAB_URL)
+        assert doc.content_type == "text/html" and b"<h1>Hi</h1>" in doc.body
+        asset_url = doc.body.decode().split('src="')[1].split('"')[0]
+        asset = pages.lookup(asset_url)
+        assert asset.body == PNG and asset.content_type == "image/png"
+
+    def test_caching_headers(self, pages):
+        doc = pages.lookup(NEWTAB_URL)
+        asset = pages.lookup(doc.body.decode().split('src="')[1].split('"')[0])
+        assert doc.headers()[b"Cache-Control"] == DOCUMENT_CACHE.encode()
+        assert asset.headers()[b"Cache-Control"] == ASSET_CACHE.encode()
+        assert doc.headers()[b"ETag"] != asset.headers()[b"ETag"]
+        assert doc.headers()[b"ETag"].startswith(b'"')
+
+    def test_changed_document_changes_its_etag(self, pages):
+        before = pages.lookup(NEWTAB_URL).etag
+        pages.add_document(NEWTAB_HOST, "<h1>Changed</h1>")
+        assert pages.lookup(NEWTAB_URL).etag != before
+
+    @pytest.mark.parametrize("url", ["blackline://newtab", "blackline://newtab/?q=1",
+                                     "blackline://newtab/#top"])
+    def test_root_forms(self, pages, url):
+        assert pages.lookup(url) is pages.lookup(NEWTAB_URL)
+
+    @pytest.mark.parametrize("url", ["blackline://other/", "blackline://newtab/missing",
+                                     "https://newtab/", "blackline:///", "", None])
+    def test_misses(self, pages, url):
+        assert pages.lookup(url) is None
+
+    def test_membership(self, pages):
+        assert NEWTAB_HOST in pages and "reader" not in pages
+        assert len(pages) == 2 and pages.total_bytes() > len(PNG)
+
+
+def test_mounted_host_answers_every_path():
+    pages = InternalPages()
+    seen = []
+
+    def source(path):
+        seen.append(path)
+        return None if path == "/gone" else InternalPage(path, "text/plain", path.encode())
+
+    pages.mount("live", source)
+    assert pages.lookup("blackline://live/a/b").body == b"/a/b"
+    assert pages.lookup("blackline://live/gone") is None
+    assert "live" in pages and seen == ["/a/b", "/gone"]
+
+
+def test_load_document_reads_the_real_page(src_dir):
+    pages = InternalPages()
+    assert pages.load_document(NEWTAB_HOST, src_dir / "new_tab.html")
+    doc = pages.lookup(NEWTAB_URL)
+    assert b"data:image/png;base64" not in doc.body
+    assert len(pages) >= 2                                 # the logo became an asset
+    assert doc.body.startswith(b"<!DOCTYPE html>")
+
+
+def test_load_document_missing_file(tmp_path):
+    assert InternalPages().load_document(NEWTAB_HOST, tmp_path / "nope.html") is False
+
+
+@pytest.mark.parametrize("origin,allowed", [
+    ("", True),
+    (None, True),
+    ("blackline://newtab", True),
+    ("file:///home/u/page.html", False),
+    ("file://", False),
+    ("https://evil.example", False),
+    ("null", False),
+    ("blackline-icon://x", False),
+])
+def test_internal_initiator(origin, allowed):
+    assert internal_initiator(origin) is allowed
+
+
+def test_is_newtab_url():
+    assert is_newtab_url(NEWTAB_URL) and is_newtab_url("blackline://newtab")
+    assert not is_newtab_url("https://newtab/") and not is_newtab_url(None)
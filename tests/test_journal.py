@@ -0,0 +1,213 @@
+"""
+The download journal: round trips, torn and corrupt tails, compaction,
+failures that must not break a download, and a writer killed mid-stream.
+"""
+
+import os
+import signal
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from journal import RECORD_SIZE, SegmentJournal, pack_header, pack_record, read_journal
+from segments import RangeSet, SegmentPlan
+
+META = {"url": "https://example.com/f.iso", "save_path": "/tmp/f.iso", "etag": '"abc"'}
+
+
+@pytest.fixture
+def path(tmp_path):
+    return tmp_path / "f.iso.journal"
+
+
+def test_round_trip(path):
+    journal = SegmentJournal(path, 1000, META)
+    journal.open(RangeSet([(0, 100)]))
+    journal.append(100, 200)
+    journal.append(500, 600)
+    journal.close()
+    state = read_journal(path)
+    assert state.total_size == 1000 and state.meta == META
+    assert list(state.ranges) == [(0, 200), (500, 600)]
+    assert state.records == 3 and not state.torn
+
+
+def test_a_torn_last_record_loses_only_that_record(path):
+    journal = SegmentJournal(path, 1000, META)
+    journal.open()
+    for start in range(0, 500, 100):
+        journal.append(start, start + 100)
+    journal.close()
+    os.truncate(path, os.path.getsize(path) - 7)
+    state = read_journal(path)
+    assert list(state.ranges) == [(0, 400)] and state.torn
+
+
+def test_reading_stops_at_a_corrupt_record(path):
+    path.write_bytes(pack_header(1000, META) + pack_record(0, 10)
+                     + pack_record(10, 20)[:-1] + b"\xff" + pack_record(50, 60))
+    state = read_journal(path)
+    assert list(state.ranges) == [(0, 10)] and state.torn
+
+
+def test_records_outside_the_file_are_corrupt(path):
+    path.write_bytes(pack_header(100, META) + pack_record(0, 10) + pack_record(90, 101))
+    assert list(read_journal(path).ranges) == [(0, 10)]
+
+
+@pytest.mark.parametrize("damage", [
+    lambda b: b[:10],
+    lambda b: b"XXXX" + b[4:],
+    lambda b: b[:20] + bytes([b[20] ^ 1]) + b[21:],     # inside the meta, under the CRC
+])
+def test_a_bad_header_means_no_journal(path, damage):
+    path.write_bytes(damage(pack_header(1000, META)))
+    assert read_journal(path) is None
+
+
+def test_missing_file(tmp_path):
+    assert read_journal(tmp_path / "nope.journal") is None
+
+
+def test_compaction_folds_records_into_ranges(path):
+    journal = SegmentJournal(path, 10_000, META, compact_after=4)
+    journal.open()
+    done = RangeSet()
+    for start in range(0, 1000, 100):
+        done.add(start, start + 100)
+        journal.append(start, start + 100)
+    # Appending never compacts; it only says a compaction is due.
+    assert journal.compactions == 1 and journal.due
+    assert journal.snapshot()
+    assert not journal.due and not journal.snapshot()   # one at a time
+    journal.compact(done)
+    assert journal.compactions == 2 and not journal.due
+    size = os.path.getsize(path)
+    journal.close()
+    assert size == len(pack_header(10_000, META)) + RECORD_SIZE      # one range left
+    assert list(read_journal(path).ranges) == [(0, 1000)]
+
+
+def test_records_appended_during_a_compaction_are_carried_over(path):
+    journal = SegmentJournal(path, 10_000, META)
+    journal.open()
+    journal.append(0, 100)
+    assert journal.snapshot()                       # the ranges below are taken here
+    journal.append(500, 600)                        # lands while the file is written
+    journal.compact(RangeSet([(0, 100)]))
+    journal.append(600, 700)
+    journal.close()
+    state = read_journal(path)
+    assert list(state.ranges) == [(0, 100), (500, 700)] and state.records == 3
+
+
+def test_the_plan_commits_while_its_journal_compacts(path):
+    plan = SegmentPlan(4096, min_segment=256)
+    journal = SegmentJournal(path, 4096, META)
+    journal.open(plan.done)
+    plan.journal = journal
+    seg = plan.initial(1)[0]
+    plan.commit(*plan.claim(seg, 100))
+    write = journal._write_compacted
+    committed = []
+
+    def slow_write(ranges):
+        # Another worker commits mid-compaction; it must not wait for it.
+        worker = threading.Thread(
+            target=lambda: committed.append(plan.commit(*plan.claim(seg, 100))))
+        worker.start()
+        worker.join(timeout=5)
+        assert committed, "commit blocked behind the compaction"
+        return write(ranges)
+
+    journal._write_compacted = slow_write
+    plan.checkpoint()
+    journal.close()
+    assert read_journal(path).ranges == plan.done == RangeSet([(0, 200)])
+
+
+def test_overlapping_checkpoints_run_one_at_a_time(path):
+    plan = SegmentPlan(4096, min_segment=256)
+    journal = SegmentJournal(path, 4096, META)
+    journal.open(plan.done)
+    plan.journal = journal
+    seg = plan.initial(1)[0]
+    plan.commit(*plan.claim(seg, 100))
+    write = journal._write_compacted
+    overlapped = []
+
+    def slow_write(ranges):
+        # A commit lands mid-compaction, then a second checkpoint is asked
+        # for; it must not restart the carry-over and lose that record.
+        plan.commit(*plan.claim(seg, 100))
+        overlapped.append(plan.checkpoint())
+        plan.commit(*plan.claim(seg, 100))
+        return write(ranges)
+
+    journal._write_compacted = slow_write
+    assert plan.checkpoint()
+    assert overlapped == [False] and journal.compactions == 2
+    journal._write_compacted = write
+    assert plan.checkpoint()                        # the next one goes ahead
+    journal.close()
+    assert read_journal(path).ranges == plan.done == RangeSet([(0, 300)])
+
+
+def test_a_failed_write_stops_the_journal_quietly(path):
+    journal = SegmentJournal(path, 1000, META)
+    journal.open()
+    os.close(journal._fd)                           # the disk goes away
+    journal.append(0, 10)
+    assert journal.error is not None and not journal.is_open
+    journal.append(10, 20)
+    assert not journal.snapshot()
+    journal.compact(RangeSet())
+    journal.close()
+
+
+def test_appends_after_close_are_ignored(path):
+    journal = SegmentJournal(path, 1000, META)
+    journal.open()
+    journal.close()
+    journal.append(0, 10)
+    assert list(read_journal(path).ranges) == [] and journal.error is None
+
+
+def test_the_plan_journals_every_commit(path):
+    plan = SegmentPlan(4096, min_segment=256)
+    journal = SegmentJournal(path, 4096, META, compact_after=10_000)
+    journal.open(plan.done)
+    plan.journal = journal
+    segs = plan.initial(4)
+    for seg in segs:
+        while True:
+            offset, count = plan.claim(seg, 100)
+            if not count:
+                break
+            plan.commit(offset, count)
+    journal.close()
+    state = read_journal(path)
+    assert state.ranges == plan.done and state.records == 44
+
+
+def test_resume_state_survives_the_writer_being_killed(path, src_dir):
+    """A process appending records is SIGKILLed; everything it appended is readable."""
+    if not hasattr(signal, "SIGKILL"):
+        pytest.skip("no SIGKILL here")
+    script = f"""
+import os, signal, sys
+sys.path.insert(0, {str(src_dir)!r})
+from journal import SegmentJournal
+j = SegmentJournal({str(path)!r}, 10**9, {{"url": "u"}})
+j.open()
+for i in range(5000):
+    j.append(i * 1000, i * 1000 + 1000)
+print("appended", flush=True)
+os.kill(os.getpid(), signal.SIGKILL)
+"""
+    proc = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, timeout=60)
+    assert "appended" in proc.stdout and proc.returncode == -signal.SIGKILL
+    state = read_journal(path)
+    assert list(state.ranges) == [(0, 5_000_000)] and not state.torn
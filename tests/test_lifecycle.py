@@ -0,0 +1,254 @@
+"""
+Memory-pressure tab lifecycle policy, background throttling and the
+CPU-savings estimate.
+
+Discarding the wrong tab loses what the user was doing — audio stops,
+unsent input is gone — so protection and ordering are pinned here.
+"""
+
+import pytest
+
+from lifecycle import (
+    DISCARDED,
+    FROZEN,
+    MIN_GRACE_SECONDS,
+    CpuSavingsLedger,
+    MemoryThresholds,
+    Pressure,
+    TabActivity,
+    TabCandidate,
+    ThrottlePolicy,
+    memory_pressure,
+    plan_throttle,
+    plan_transitions,
+)
+
+MB = 1024 * 1024
+NOW = 10_000.0
+
+
+def _activity(**ages):
+    """TabActivity where each key was last active `age` seconds before NOW."""
+    a = TabActivity()
+    for key, age in ages.items():
+        a.touch(key, NOW - age)
+    return a
+
+
+# ── thresholds ───────────────────────────────────────────────────────────
+
+class TestPressure:
+
+    def test_below_both_limits(self):
+        assert memory_pressure(50, 100 * MB, MemoryThresholds()) is Pressure.NONE
+
+    def test_soft_system_limit(self):
+        assert memory_pressure(82, 0, MemoryThresholds()) is Pressure.ELEVATED
+
+    def test_hard_system_limit(self):
+        assert memory_pressure(95, 0, MemoryThresholds()) is Pressure.CRITICAL
+
+    def test_browser_rss_trips_independently(self):
+        t = MemoryThresholds(browser_soft_mb=1000, browser_hard_mb=2000)
+        assert memory_pressure(10, 1500 * MB, t) is Pressure.ELEVATED
+        assert memory_pressure(10, 2500 * MB, t) is Pressure.CRITICAL
+
+    def test_zero_limit_disables_that_check(self):
+        t = MemoryThresholds(system_soft_percent=0, system_hard_percent=0)
+        assert memory_pressure(99, 0, t) is Pressure.NONE
+
+    def test_disabled_saver_never_reports_pressure(self):
+        t = MemoryThresholds(enabled=False)
+        assert memory_pressure(99, 10_000 * MB, t) is Pressure.NONE
+
+    def test_missing_system_reading_is_not_pressure(self):
+        assert memory_pressure(None, 0, MemoryThresholds()) is Pressure.NONE
+
+
+class TestThresholdSettings:
+
+    def test_round_trip(self):
+        t = MemoryThresholds(system_soft_percent=70, browser_hard_mb=4096)
+        back = MemoryThresholds.from_settings(t.to_settings())
+        assert back.to_settings() == t.to_settings()
+
+    def test_defaults_when_absent(self):
+        assert (MemoryThresholds.from_settings({}).to_settings()
+                == MemoryThresholds().to_settings())
+
+    @pytest.mark.parametrize("raw,expected", [("abc", 80), (-5, 0), (250, 100)])
+    def test_bad_percent_values(self, raw, expected):
+        t = MemoryThresholds.from_settings({"memory_soft_percent": raw})
+        assert t.system_soft_percent == expected
+
+    def test_keys_are_flat_settings_keys(self):
+        assert all(isinstance(v, (int, float, bool))
+                   for v in MemoryThresholds().to_settings().values())
+
+
+# ── LRU bookkeeping ──────────────────────────────────────────────────────
+
+def test_lru_orders_oldest_first():
+    a = _activity(x=10, y=300, z=50)
+    assert a.lru(["x", "y", "z"]) == ["y", "z", "x"]
+
+
+def test_never_seen_tab_counts_as_oldest():
+    a = _activity(x=10)
+    assert a.lru(["x", "new"]) == ["new", "x"]
+
+
+def test_forget_drops_history():
+    a = _activity(x=10)
+    a.forget("x")
+    assert len(a) == 0
+    a.forget("x")                   # idempotent
+
+
+# ── transitions ──────────────────────────────────────────────────────────
+
+class TestPlan:
+
+    def test_no_pressure_no_moves(self):
+        c = [TabCandidate("a")]
+        assert plan_transitions(c, _activity(a=9999), Pressure.NONE, NOW) == []
+
+    def test_elevated_freezes_lru_first(self):
+        c = [TabCandidate(k) for k in "abc"]
+        plan = plan_transitions(c, _activity(a=500, b=900, c=700),
+                                Pressure.ELEVATED, NOW, batch=2)
+        assert plan == [("b", FROZEN), ("c", FROZEN)]
+
+    def test_elevated_leaves_frozen_tabs_alone(self):
+        c = [TabCandidate("a", state=FROZEN), TabCandidate("b")]
+        plan = plan_transitions(c, _activity(a=900, b=500), Pressure.ELEVATED, NOW)
+        assert plan == [("b", FROZEN)]
+
+    def test_critical_discards_frozen_before_active(self):
+        c = [TabCandidate("old_active"), TabCandidate("newer_frozen", state=FROZEN)]
+        plan = plan_transitions(c, _activity(old_active=900, newer_frozen=300),
+                                Pressure.CRITICAL, NOW, batch=1)
+        assert plan == [("newer_frozen", DISCARDED)]
+
+    def test_already_discarded_is_skipped(self):
+        c = [TabCandidate("a", state=DISCARDED)]
+        assert plan_transitions(c, _activity(a=900), Pressure.CRITICAL, NOW) == []
+
+    def test_recently_used_tab_is_spared(self):
+        c = [TabCandidate("a"), TabCandidate("b")]
+        plan = plan_transitions(c, _activity(a=30, b=900), Pressure.CRITICAL,
+                                NOW, min_idle=120)
+        assert plan == [("b", DISCARDED)]
+
+    def test_batch_limits_moves_per_check(self):
+        c = [TabCandidate(str(i)) for i in range(50)]
+        act = _activity(**{str(i): 1000 + i for i in range(50)})
+        assert len(plan_transitions(c, act, Pressure.CRITICAL, NOW, batch=3)) == 3
+
+
+class TestProtection:
+    """A protected tab is never moved, however old and however bad the pressure."""
+
+    @pytest.mark.parametrize("flag", ["visible", "audible", "pinned", "has_form_input",
+                                      "devtools_open"])
+    def test_protected_flags(self, flag):
+        c = [TabCandidate("a", **{flag: True})]
+        for pressure in (Pressure.ELEVATED, Pressure.CRITICAL):
+            assert plan_transitions(c, _activity(a=99_999), pressure, NOW) == []
+
+    def test_unprotected_neighbour_still_moves(self):
+        c = [TabCandidate("music", audible=True), TabCandidate("idle")]
+        plan = plan_transitions(c, _activity(music=9999, idle=500), Pressure.CRITICAL, NOW)
+        assert plan == [("idle", DISCARDED)]
+
+
+# ── background throttling ────────────────────────────────────────────────
+
+class TestThrottle:
+
+    def test_freezes_only_past_grace(self):
+        c = [TabCandidate("old"), TabCandidate("recent")]
+        plan = plan_throttle(c, _activity(old=400, recent=60), ThrottlePolicy(True, 300), NOW)
+        assert plan == ["old"]
+
+    def test_oldest_first(self):
+        c = [TabCandidate("a"), TabCandidate("b")]
+        assert plan_throttle(c, _activity(a=400, b=900), ThrottlePolicy(), NOW) == ["b", "a"]
+
+    @pytest.mark.parametrize("flag", ["visible", "audible", "pinned"])
+    def test_whitelisted_tabs_keep_running(self, flag):
+        c = [TabCandidate("a", **{flag: True})]
+        assert plan_throttle(c, _activity(a=99_999), ThrottlePolicy(), NOW) == []
+
+    def test_frozen_and_discarded_are_left_alone(self):
+        c = [TabCandidate("f", state=FROZEN), TabCandidate("d", state=DISCARDED)]
+        assert plan_throttle(c, _activity(f=9999, d=9999), ThrottlePolicy(), NOW) == []
+
+    def test_disabled(self):
+        c = [TabCandidate("a")]
+        assert plan_throttle(c, _activity(a=9999), ThrottlePolicy(enabled=False), NOW) == []
+
+
+class TestThrottleSettings:
+
+    def test_round_trip(self):
+        p = ThrottlePolicy(False, 600)
+        back = ThrottlePolicy.from_settings(p.to_settings())
+        assert (back.enabled, back.grace_seconds) == (False, 600)
+
+    @pytest.mark.parametrize("raw", [0, -10, 5])
+    def test_grace_has_a_floor(self, raw):
+        p = ThrottlePolicy.from_settings({"background_freeze_grace_seconds": raw})
+        assert p.grace_seconds == MIN_GRACE_SECONDS
+
+    def test_junk_grace_falls_back(self):
+        p = ThrottlePolicy.from_settings({"background_freeze_grace_seconds": "soon"})
+        assert p.grace_seconds == ThrottlePolicy().grace_seconds
+
+
+class TestCpuSavings:
+
+    def test_rate_while_hidden_is_credited_while_frozen(self):
+        ledger = CpuSavingsLedger()
+        ledger.mark_hidden("a", cpu_seconds=10.0, now=0)
+        ledger.mark_frozen("a", cpu_seconds=13.0, now=300)     # 1% of a core
+        ledger.mark_active("a", now=1300)
+        [(key, freezes, seconds, saved)] = ledger.report(now=2000)
+        assert (key, freezes, seconds) == ("a", 1, 1000)
+        assert saved == pytest.approx(10.0)
+
+    def test_open_interval_counts_up_to_now(self):
+        ledger = CpuSavingsLedger()
+        ledger.mark_hidden("a", 0.0, 0)
+        ledger.mark_frozen("a", 1.0, 100)
+        assert ledger.report(now=200)[0][3] == pytest.approx(1.0)
+
+    def test_no_reading_means_no_claimed_saving(self):
+        ledger = CpuSavingsLedger()
+        ledger.mark_hidden("a", None, 0)
+        ledger.mark_frozen("a", None, 100)
+        ledger.mark_active("a", 500)
+        assert ledger.report(600)[0][2:] == (400, 0.0)
+
+    def test_refreezing_a_frozen_tab_is_not_double_counted(self):
+        ledger = CpuSavingsLedger()
+        ledger.mark_frozen("a", None, 0)
+        ledger.mark_frozen("a", None, 50)       # frozen → discarded
+        ledger.mark_active("a", 100)
+        assert ledger.report(100)[0][1:3] == (1, 100)
+
+    def test_counter_going_backwards_is_not_negative(self):
+        """A renderer restarted between readings starts again from zero."""
+        ledger = CpuSavingsLedger()
+        ledger.mark_hidden("a", 50.0, 0)
+        ledger.mark_frozen("a", 1.0, 10)
+        ledger.mark_active("a", 20)
+        assert ledger.report(20)[0][3] == 0.0
+
+    def test_closed_tabs_fold_into_total(self):
+        ledger = CpuSavingsLedger()
+        ledger.mark_hidden("a", 0.0, 0)
+        ledger.mark_frozen("a", 1.0, 100)
+        ledger.forget("a", 200)
+        assert ledger.report(300) == []
+        assert ledger.total_saved(300) == pytest.approx(1.0)
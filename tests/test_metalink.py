@@ -0,0 +1,151 @@
+"""
+Metalink parsing (4.0 and 3.0) and the mirror set: exploring, weighting by
+throughput, dropping slow and failing mirrors, and blame for bad pieces.
+"""
+
+import pytest
+
+from metalink import MirrorSet, is_metalink, load, parse
+
+META4 = b"""<?xml version="1.0" encoding="UTF-8"?>
+<metalink xmlns="urn:ietf:params:xml:ns:metalink">
+  <file name="../../etc/distro.iso">
+    <size>1048576</size>
+    <hash type="md5">d41d8cd98f00b204e9800998ecf8427e</hash>
+    <hash type="sha-256">ABCDEF</hash>
+    <pieces length="524288" type="sha-256">
+      <hash>AA11</hash>
+      <hash>bb22</hash>
+    </pieces>
+    <url priority="2">https://b.example.org/distro.iso</url>
+    <url>http://unranked.example.org/distro.iso</url>
+    <url priority="1" location="de">https://a.example.org/distro.iso</url>
+    <url priority="1">ftp://ftp.example.org/distro.iso</url>
+    <metaurl mediatype="torrent">https://a.example.org/distro.torrent</metaurl>
+  </file>
+  <file name="notes.txt">
+    <url>https://a.example.org/notes.txt</url>
+  </file>
+</metalink>
+"""
+
+META3 = b"""<?xml version="1.0" encoding="UTF-8"?>
+<metalink version="3.0" xmlns="http://www.metalinker.org/">
+  <files>
+    <file name="data.tar">
+      <size>2048</size>
+      <verification>
+        <hash type="sha256">feed</hash>
+        <pieces length="1024" type="sha1"><hash piece="0">01</hash></pieces>
+      </verification>
+      <resources>
+        <url type="http" preference="10">http://slow.example.org/data.tar</url>
+        <url type="http" preference="100">http://fast.example.org/data.tar</url>
+      </resources>
+    </file>
+  </files>
+</metalink>
+"""
+
+
+class TestParse:
+
+    def test_metalink4(self):
+        iso, notes = parse(META4)
+        assert iso.name == "distro.iso" and iso.size == 1048576
+        assert iso.urls == ["https://a.example.org/distro.iso", "https://b.example.org/distro.iso",
+                            "http://unranked.example.org/distro.iso"]
+        assert iso.sha256 == "abcdef"
+        assert iso.piece_size == 524288 and iso.pieces == ["aa11", "bb22"]
+        assert notes.sha256 is None and notes.pieces == [] and notes.size is None
+
+    def test_metalink3(self):
+        (f,) = parse(META3)
+        assert f.urls == ["http://fast.example.org/data.tar", "http://slow.example.org/data.tar"]
+        assert f.sha256 == "feed"
+        assert f.piece_size is None and f.pieces == []     # SHA-1 pieces are not used
+
+    @pytest.mark.parametrize("data", [b"not xml", b"<rss/>", b""])
+    def test_other_documents_are_rejected(self, data):
+        with pytest.raises(ValueError):
+            parse(data)
+
+    def test_load_and_extension(self, tmp_path):
+        path = tmp_path / "distro.META4"
+        path.write_bytes(META4)
+        assert is_metalink(path) and not is_metalink("distro.iso")
+        assert len(load(path)) == 2
+
+
+def measure(mirrors, mirror, rate, count=1 << 20, offset=0):
+    return mirrors.report(mirror, offset, count, count / rate)
+
+
+class TestMirrorSet:
+
+    def test_duplicates_and_empties_are_dropped(self):
+        mirrors = MirrorSet(["a", "b", "a", "", None])
+        assert [m.url for m in mirrors.mirrors] == ["a", "b"]
+
+    def test_untried_mirrors_go_first_in_published_order(self):
+        mirrors = MirrorSet(["a", "b", "c"])
+        assert [mirrors.pick().url for _ in range(3)] == ["a", "b", "c"]
+
+    def test_segments_follow_throughput(self):
+        mirrors = MirrorSet(["fast", "slow"], min_sample=1)
+        fast, slow = mirrors.mirrors
+        measure(mirrors, fast, 30e6)
+        measure(mirrors, slow, 10e6)
+        picks = [mirrors.pick().url for _ in range(8)]
+        assert picks.count("fast") == 6 and picks.count("slow") == 2
+
+    def test_a_mirror_far_below_the_best_is_dropped(self):
+        mirrors = MirrorSet(["a", "b"], min_sample=1)
+        a, b = mirrors.mirrors
+        assert measure(mirrors, a, 10e6)
+        assert not measure(mirrors, b, 1e6)
+        assert b.dropped and mirrors.live == [a]
+        assert all(mirrors.pick() is a for _ in range(3))
+
+    def test_the_last_mirror_is_never_dropped_for_speed(self):
+        mirrors = MirrorSet(["a", "b"], min_sample=1)
+        a, b = mirrors.mirrors
+        measure(mirrors, a, 10e6)
+        measure(mirrors, b, 1e6)
+        assert measure(mirrors, a, 10.0)               # now slow, but alone
+        assert not a.dropped
+
+    def test_nothing_is_judged_before_the_sample(self):
+        mirrors = MirrorSet(["a", "b"], min_sample=4 << 20)
+        a, b = mirrors.mirrors
+        measure(mirrors, a, 10e6)
+        measure(mirrors, b, 1e3)
+        assert not b.dropped and a.throughput is None
+
+    def test_failures_in_a_row_drop_a_mirror(self):
+        mirrors = MirrorSet(["a", "b"], max_failures=2)
+        a, b = mirrors.mirrors
+        assert mirrors.fail(a)
+        measure(mirrors, a, 1e6)                       # a success resets the count
+        assert mirrors.fail(a) and not a.dropped
+        assert mirrors.fail(a) and a.dropped
+        mirrors.fail(b)
+        assert not mirrors.fail(b) and mirrors.pick() is None
+
+    def test_release_frees_a_slot(self):
+        mirrors = MirrorSet(["a"])
+        m = mirrors.pick()
+        assert m.active == 1
+        mirrors.release(m)
+        mirrors.release(m)
+        assert m.active == 0
+
+    def test_bad_pieces_are_blamed_on_the_mirrors_that_sent_them(self):
+        mirrors = MirrorSet(["a", "b", "c"], max_failures=1, min_sample=1 << 40)
+        a, b, c = mirrors.mirrors
+        mirrors.report(a, 0, 100, 1)
+        mirrors.report(b, 100, 100, 1)
+        mirrors.report(c, 200, 100, 1)
+        assert mirrors.blame([(150, 250)]) == [b, c]
+        assert b.dropped and c.dropped and not a.dropped
+        assert b.served.total() == 50 and c.served.total() == 50
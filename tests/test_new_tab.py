@@ -73,6 +73,10 @@ class TestFaviconFallback:
         assert "google.com/s2/favicons" in new_tab_html
         assert "/favicon.ico" in new_tab_html
 
+    def test_local_cache_is_tried_first(self, new_tab_html):
+        block = new_tab_html[new_tab_html.index("function faviconSources("):]
+        assert block.index("blackline-icon://") < block.index("icons.duckduckgo.com")
+
     def test_monogram_fallback_exists(self, new_tab_html):
         assert "function monogramIcon(" in new_tab_html
         assert "data:image/svg+xml" in new_tab_html
@@ -104,6 +108,19 @@ def test_speed_dial_defaults_are_well_formed(new_tab_html):
         assert url.startswith("https://")
 
 
+def test_tiles_ask_chromium_to_preconnect_on_hover(new_tab_html):
+    assert "function preconnectHint(" in new_tab_html
+    assert "link.rel = 'preconnect'" in new_tab_html
+    assert "addEventListener('mouseenter'" in new_tab_html
+
+
+def test_tiles_show_a_local_thumbnail_when_there_is_one(new_tab_html):
+    block = new_tab_html.split("function attachThumbnail(", 1)[1].split("\n}", 1)[0]
+    assert "blackline://thumbs/" in block
+    assert "thumb.remove()" in block                  # a miss leaves the card as it was
+    assert "attachThumbnail(a, site)" in new_tab_html
+
+
 def test_no_unclosed_style_or_script(new_tab_html):
     assert new_tab_html.count("<style>") == new_tab_html.count("</style>")
     assert new_tab_html.count("<script>") == new_tab_html.count("</script>")
@@ -0,0 +1,227 @@
+"""
+Omnibox suggestion index: frecency order, prefix and substring matching,
+incremental updates, and the bulk load used at startup.
+"""
+
+import gc
+import time
+
+import pytest
+
+from omnibox import (
+    MAX_SUGGESTIONS,
+    OmniboxIndex,
+    history_records,
+    parse_history_time,
+    strip_url,
+    tokens_for,
+)
+
+DAY = 86400.0
+NOW = 1_700_000_000.0
+
+
+def _urls(results):
+    return [s.url for s in results]
+
+
+@pytest.mark.parametrize("url,bare", [
+    ("https://www.example.com/a/", "example.com/a"),
+    ("http://Example.com", "example.com"),
+    ("file:///tmp/x", "file:///tmp/x"),
+    ("", ""),
+])
+def test_strip_url(url, bare):
+    assert strip_url(url) == bare
+
+
+def test_tokens_cover_url_host_path_and_title():
+    t = tokens_for("https://docs.python.org/3/library/bisect.html", "bisect — Array bisection")
+    assert {"docs.python.org/3/library/bisect.html", "docs", "python", "library",
+            "bisect", "array", "bisection"} <= t
+
+
+def test_history_time_parses_the_file_format():
+    assert parse_history_time("2024-01-02 03:04") > 0
+    assert parse_history_time("Unknown") == 0.0
+
+
+def test_history_records_count_visits_per_url():
+    records = history_records([
+        ("2024-01-01 10:00", "https://a.example/"),
+        ("2024-01-03 10:00", "https://a.example/"),
+        ("Unknown", "https://b.example/"),
+        ("2024-01-01 10:00", None),
+        "junk",
+    ])
+    by_url = {r[0]: r for r in records}
+    assert by_url["https://a.example/"][2] == 2
+    assert by_url["https://a.example/"][3] == parse_history_time("2024-01-03 10:00")
+    assert by_url["https://b.example/"][2:] == (1, 0.0)
+    assert len(records) == 2
+
+
+class TestFrecency:
+
+    def test_more_visits_rank_higher(self):
+        idx = OmniboxIndex()
+        idx.record_visit("https://a.example/one", when=NOW, count=1)
+        idx.record_visit("https://a.example/two", when=NOW, count=5)
+        assert _urls(idx.query("a.example"))[0] == "https://a.example/two"
+
+    def test_recency_decays(self):
+        idx = OmniboxIndex(half_life_days=14)
+        idx.record_visit("https://old.example/x", when=NOW - 60 * DAY, count=10)
+        idx.record_visit("https://new.example/x", when=NOW, count=1)
+        assert _urls(idx.query("example"))[0] == "https://new.example/x"
+
+    def test_one_half_life_equals_double_the_visits(self):
+        idx = OmniboxIndex(half_life_days=10)
+        idx.record_visit("https://a.example/", when=NOW, count=1)
+        idx.record_visit("https://b.example/", when=NOW - 10 * DAY, count=2)
+        a, b = idx.query("example")
+        assert a.score == pytest.approx(b.score)
+
+    def test_bookmark_lifts_a_page(self):
+        idx = OmniboxIndex()
+        idx.record_visit("https://a.example/", when=NOW, count=3)
+        idx.set_bookmarked("https://b.example/", "B", when=NOW)
+        assert _urls(idx.query("example"))[0] == "https://b.example/"
+
+    def test_open_tab_counts_until_closed(self):
+        idx = OmniboxIndex()
+        idx.record_visit("https://a.example/", when=NOW, count=2)
+        idx.record_visit("https://b.example/", when=NOW, count=1)
+        idx.tab_opened("https://b.example/")
+        assert _urls(idx.query("example"))[0] == "https://b.example/"
+        idx.tab_closed("https://b.example/")
+        assert _urls(idx.query("example"))[0] == "https://a.example/"
+
+    def test_never_visited_never_bookmarked_is_not_suggested(self):
+        idx = OmniboxIndex()
+        idx.tab_opened("https://a.example/")
+        idx.tab_closed("https://a.example/")
+        assert idx.query("a.example") == []
+
+
+class TestMatching:
+
+    @pytest.fixture
+    def idx(self):
+        idx = OmniboxIndex()
+        idx.record_visit("https://github.com/python/cpython", "python/cpython: The Python "
+                         "programming language", when=NOW)
+        idx.record_visit("https://www.example.com/", "Example Domain", when=NOW)
+        idx.record_visit("https://news.ycombinator.com/", "Hacker News", when=NOW)
+        return idx
+
+    def test_url_prefix(self, idx):
+        assert _urls(idx.query("git")) == ["https://github.com/python/cpython"]
+
+    def test_typed_scheme_and_www_are_ignored(self, idx):
+        assert _urls(idx.query("https://www.exa")) == ["https://www.example.com/"]
+
+    def test_title_word_prefix(self, idx):
+        assert _urls(idx.query("hack")) == ["https://news.ycombinator.com/"]
+
+    def test_substring_inside_the_host(self, idx):
+        assert _urls(idx.query("combinator")) == ["https://news.ycombinator.com/"]
+
+    def test_every_term_must_match(self, idx):
+        assert _urls(idx.query("python language")) == ["https://github.com/python/cpython"]
+        assert idx.query("python hacker") == []
+
+    def test_single_letters_do_not_match_mid_word(self, idx):
+        assert "https://www.example.com/" not in _urls(idx.query("x"))
+
+    def test_case_insensitive(self, idx):
+        assert _urls(idx.query("HACKER")) == ["https://news.ycombinator.com/"]
+
+    def test_url_prefix_beats_an_equal_title_match(self):
+        idx = OmniboxIndex()
+        idx.record_visit("https://news.example/", "Daily", when=NOW)
+        idx.record_visit("https://other.example/", "News today", when=NOW)
+        assert _urls(idx.query("news"))[0] == "https://news.example/"
+
+    @pytest.mark.parametrize("text", ["", "   ", None])
+    def test_empty_query(self, idx, text):
+        assert idx.query(text) == []
+
+    def test_limit(self):
+        idx = OmniboxIndex()
+        for i in range(30):
+            idx.record_visit(f"https://site{i}.example/", when=NOW)
+        assert len(idx.query("site")) == MAX_SUGGESTIONS
+        assert len(idx.query("s", limit=3)) == 3
+
+
+class TestIncremental:
+
+    def test_new_visit_is_searchable_immediately(self):
+        idx = OmniboxIndex()
+        idx.record_visit("https://a.example/", when=NOW)
+        idx.record_visit("https://zebra.example/", "Zebras", when=NOW)
+        assert _urls(idx.query("zeb")) == ["https://zebra.example/"]
+
+    def test_retitled_page_matches_new_title_only(self):
+        idx = OmniboxIndex()
+        idx.record_visit("https://a.example/", "Loading", when=NOW)
+        idx.record_visit("https://a.example/", "Inbox", when=NOW)
+        assert _urls(idx.query("inbox")) == ["https://a.example/"]
+        assert idx.query("loading") == []
+
+    def test_revisit_moves_a_page_up(self):
+        idx = OmniboxIndex()
+        idx.record_visit("https://a.example/", when=NOW, count=3)
+        idx.record_visit("https://b.example/", when=NOW, count=1)
+        idx.record_visit("https://b.example/", when=NOW + DAY, count=5)
+        assert _urls(idx.query("e"))[0] == "https://b.example/"
+
+    def test_replace_bookmarks_drops_removed_ones(self):
+        idx = OmniboxIndex()
+        idx.replace_bookmarks([("https://a.example/", "A"), ("https://b.example/", "B")],
+                              when=NOW)
+        idx.replace_bookmarks([("https://b.example/", "B")], when=NOW)
+        assert _urls(idx.query("example")) == ["https://b.example/"]
+
+
+class TestBulkLoad:
+
+    def test_loaded_records_are_searchable(self):
+        idx = OmniboxIndex()
+        idx.bulk_load([
+            ("https://a.example/", "Alpha", 3, NOW),
+            ("https://b.example/", "Beta", 1, NOW),
+            ("", "skipped", 1, NOW),
+        ])
+        assert len(idx) == 2
+        assert _urls(idx.query("example")) == ["https://a.example/", "https://b.example/"]
+
+    def test_visits_recorded_before_the_load_survive_it(self):
+        idx = OmniboxIndex()
+        idx.record_visit("https://a.example/", "Alpha", when=NOW, count=10)
+        idx.tab_opened("https://c.example/", "Gamma")
+        idx.bulk_load([("https://a.example/", "", 1, NOW - DAY),
+                       ("https://b.example/", "Beta", 5, NOW)])
+        assert _urls(idx.query("example"))[0] == "https://a.example/"
+        assert _urls(idx.query("gamma")) == ["https://c.example/"]
+
+    def test_updates_after_a_load_keep_the_index_sorted(self):
+        idx = OmniboxIndex()
+        idx.bulk_load([(f"https://m{i}.example/", "", 1, NOW) for i in range(50)])
+        idx.record_visit("https://aardvark.example/", when=NOW)
+        assert _urls(idx.query("aard")) == ["https://aardvark.example/"]
+
+
+def test_queries_stay_fast_on_a_large_index():
+    """Not a benchmark; a guard against an accidental full scan."""
+    idx = OmniboxIndex()
+    idx.bulk_load((f"https://host{i % 997}.example/page/{i}", f"Title {i}", 1 + i % 7,
+                   NOW - (i % 90) * DAY) for i in range(40_000))
+    # A full collection over the 40k fresh pages takes ~100 ms by itself;
+    # have it now rather than inside whichever query happens to trip it.
+    gc.collect()
+    for text in ("h", "ho", "host12", "page", "title 39"):
+        start = time.perf_counter()
+        idx.query(text)
+        assert time.perf_counter() - start < 0.1, text
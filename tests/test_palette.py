@@ -0,0 +1,274 @@
+"""
+Command palette index: match tiers, fuzzy scoring, kind order, the bitmask
+prefilters, incremental updates, and the loaders for bookmarks and history.
+"""
+
+import gc
+import random
+import time
+
+import pytest
+
+from palette import (
+    ACTION,
+    BOOKMARK,
+    HISTORY,
+    MAX_RESULTS,
+    TAB,
+    PaletteIndex,
+    PaletteItem,
+    bookmark_items,
+    char_mask,
+    fuzzy_score,
+    history_items,
+    pair_mask,
+    term_pairs,
+    word_starts,
+    words_of,
+    _Entry,
+)
+
+
+def _labels(results):
+    return [item.label for _, item in results]
+
+
+def _index(*items):
+    idx = PaletteIndex()
+    by_kind = {}
+    for item in items:
+        by_kind.setdefault(item.kind, []).append(item)
+    for kind, group in by_kind.items():
+        idx.replace_kind(kind, group)
+    return idx
+
+
+def test_words_split_on_separators_and_inner_capitals():
+    assert words_of("GitHub Issues — python/cpython") == " git hub issues python cpython"
+    assert words_of("") == " "
+
+
+def test_word_starts():
+    assert word_starts("GitHub Issues") == [0, 3, 7]
+    assert word_starts("a/b-c") == [0, 2, 4]
+
+
+def test_pair_mask_holds_every_ordered_pair():
+    mask = pair_mask("abc")
+    for pair in ("ab", "ac", "bc"):
+        assert term_pairs(pair) & ~mask == 0, pair
+    for pair in ("ba", "cb", "aa"):
+        assert term_pairs(pair) & ~mask, pair
+    assert term_pairs("aa") & ~pair_mask("aba") == 0
+
+
+def test_pair_mask_agrees_with_a_brute_force():
+    rng = random.Random(3)
+    for _ in range(200):
+        text = "".join(rng.choice("abcxyz19-") for _ in range(rng.randint(0, 12)))
+        for a in "abcxyz19-":
+            for b in "abcxyz19-":
+                possible = any(a == text[i] and b in text[i + 1:] for i in range(len(text)))
+                assert (term_pairs(a + b) & ~pair_mask(text) == 0) == possible, (text, a, b)
+
+
+def test_char_mask():
+    assert char_mask("ab") == char_mask("BA") != char_mask("abc")
+
+
+class TestTiers:
+
+    @pytest.fixture
+    def idx(self):
+        return _index(
+            PaletteItem(HISTORY, 1, "Pull requests", "https://github.com/pulls"),
+            PaletteItem(HISTORY, 2, "GitHub Issues", "https://github.com/issues"),
+            PaletteItem(HISTORY, 3, "Digital garden", "https://example.org/notes"),
+            PaletteItem(HISTORY, 4, "Weather and git", "https://example.org/weather"),
+        )
+
+    def test_label_prefix_then_label_word_then_url_word_then_substring(self, idx):
+        assert _labels(idx.search("git")) == ["GitHub Issues", "Weather and git",
+                                              "Pull requests", "Digital garden"]
+
+    def test_inner_capital_starts_a_word(self, idx):
+        assert _labels(idx.search("hub"))[0] == "GitHub Issues"
+
+    def test_initials(self, idx):
+        assert _labels(idx.search("ghi"))[0] == "GitHub Issues"
+
+    def test_url_word(self, idx):
+        assert _labels(idx.search("pulls")) == ["Pull requests"]
+
+    def test_fuzzy_last(self, idx):
+        assert _labels(idx.search("prq")) == ["Pull requests"]
+
+    def test_fuzzy_stays_out_of_urls(self, idx):
+        assert idx.search("ntes") == []
+
+    def test_every_term_must_match(self, idx):
+        assert _labels(idx.search("git iss")) == ["GitHub Issues"]
+        assert _labels(idx.search("iss git")) == ["GitHub Issues"]
+        assert idx.search("git weather garden") == []
+
+    @pytest.mark.parametrize("text", ["", "   ", None])
+    def test_empty_query(self, idx, text):
+        assert idx.search(text) == []
+
+    def test_case_insensitive(self, idx):
+        assert _labels(idx.search("WEATHER")) == ["Weather and git"]
+
+
+class TestFuzzyScore:
+
+    def _score(self, term, label):
+        return fuzzy_score(term, _Entry(PaletteItem(TAB, 0, label), 0))
+
+    def test_runs_beat_scattered_letters(self):
+        assert self._score("set", "Settings") > self._score("set", "Scattered entry text")
+
+    def test_word_starts_beat_inner_letters(self):
+        assert self._score("ds", "Dark Settings") > self._score("ds", "Odds")
+
+    def test_prefers_a_word_start_for_the_first_letter(self):
+        assert self._score("mo", "Zoom Out Mode") > self._score("mo", "Zoomo")
+
+    def test_no_match(self):
+        assert self._score("zq", "Settings") is None
+
+
+class TestOrder:
+
+    def test_tabs_then_actions_then_bookmarks_then_history(self):
+        idx = _index(
+            PaletteItem(HISTORY, "h", "Docs history"),
+            PaletteItem(BOOKMARK, "b", "Docs bookmark"),
+            PaletteItem(ACTION, "a", "Docs action"),
+            PaletteItem(TAB, "t", "Docs tab"),
+        )
+        assert _labels(idx.search("docs")) == ["Docs tab", "Docs action", "Docs bookmark",
+                                              "Docs history"]
+
+    def test_a_better_tier_beats_a_better_kind(self):
+        idx = _index(PaletteItem(TAB, "t", "Read the docs"),
+                     PaletteItem(HISTORY, "h", "Docs"))
+        assert _labels(idx.search("docs")) == ["Docs", "Read the docs"]
+
+    def test_caller_order_within_a_kind(self):
+        idx = _index(*(PaletteItem(HISTORY, i, f"Page {i}") for i in (3, 1, 2)))
+        assert _labels(idx.search("page")) == ["Page 3", "Page 1", "Page 2"]
+
+    def test_limit(self):
+        idx = _index(*(PaletteItem(HISTORY, i, f"Page {i}") for i in range(50)))
+        assert len(idx.search("page")) == MAX_RESULTS
+        assert len(idx.search("page", limit=3)) == 3
+        assert len(idx.search("pg")) == MAX_RESULTS
+
+
+class TestUpdates:
+
+    def test_retitled_tab_matches_its_new_title_only(self):
+        idx = PaletteIndex()
+        idx.set_item(PaletteItem(TAB, "v1", "Loading…"))
+        assert _labels(idx.search("load")) == ["Loading…"]
+        idx.set_item(PaletteItem(TAB, "v1", "Inbox (3)"))
+        assert _labels(idx.search("inbox")) == ["Inbox (3)"]
+        assert idx.search("load") == []
+
+    def test_retitle_keeps_the_tab_in_place(self):
+        idx = PaletteIndex()
+        for key in "abc":
+            idx.set_item(PaletteItem(TAB, key, f"Tab {key}"))
+        idx.set_item(PaletteItem(TAB, "a", "Tab z"))
+        assert _labels(idx.search("tab")) == ["Tab z", "Tab b", "Tab c"]
+
+    def test_remove(self):
+        idx = _index(PaletteItem(TAB, 1, "One"), PaletteItem(TAB, 2, "Two"))
+        idx.remove(TAB, 1)
+        idx.remove(TAB, 99)
+        assert _labels(idx.search("o")) == ["Two"]
+        assert len(idx) == 1
+
+    def test_replace_kind_drops_the_missing_and_follows_the_new_order(self):
+        idx = _index(PaletteItem(BOOKMARK, 1, "Alpha"), PaletteItem(BOOKMARK, 2, "Beta"),
+                     PaletteItem(TAB, 1, "Alpha tab"))
+        idx.replace_kind(BOOKMARK, [PaletteItem(BOOKMARK, 3, "Gamma"),
+                                    PaletteItem(BOOKMARK, 2, "Beta")])
+        assert _labels(idx.search("a")) == ["Alpha tab", "Gamma", "Beta"]
+
+    def test_replace_kind_reuses_unchanged_entries(self):
+        idx = _index(PaletteItem(HISTORY, 1, "Alpha"), PaletteItem(HISTORY, 2, "Beta"))
+        before = idx._entries[(HISTORY, 1)]
+        idx.replace_kind(HISTORY, [PaletteItem(HISTORY, 1, "Alpha", target="new")])
+        assert idx._entries[(HISTORY, 1)] is before
+        assert idx.search("alpha")[0][1].target == "new"
+
+    def test_only_the_changed_kind_is_rebuilt(self):
+        idx = _index(PaletteItem(TAB, 1, "Tab"), PaletteItem(HISTORY, 1, "Page"))
+        idx.search("x")
+        history = idx._segments[HISTORY]
+        idx.set_item(PaletteItem(TAB, 1, "Renamed"))
+        idx.search("x")
+        assert idx._segments[HISTORY] is history
+
+    def test_extended_query_after_an_update_sees_the_update(self):
+        idx = _index(PaletteItem(TAB, 1, "Alpha one"), PaletteItem(TAB, 2, "Beta"))
+        assert _labels(idx.search("alpha o")) == ["Alpha one"]
+        idx.set_item(PaletteItem(TAB, 2, "Alpha other"))
+        assert _labels(idx.search("alpha ot")) == ["Alpha other"]
+
+    def test_narrowing_matches_a_fresh_search(self):
+        rng = random.Random(5)
+        words = "alpha beta gamma delta settings github issues notes".split()
+        idx = _index(*(PaletteItem(HISTORY, i, " ".join(rng.sample(words, 3)))
+                       for i in range(300)))
+        fresh = PaletteIndex()
+        fresh.replace_kind(HISTORY, [e.item for e in idx._ranked_segments()[0].entries])
+        for text in ("s", "se", "set", "set g", "set gi", "set git"):
+            assert _labels(idx.search(text)) == _labels(fresh.search(text)), text
+            fresh._last_query = None
+
+
+def test_bookmark_items():
+    items = bookmark_items([
+        {"title": "Docs", "url": "https://docs.example/", "folder": "Work"},
+        {"title": "", "url": "https://www.example.com/a"},
+        {"title": "no url"},
+        "junk",
+    ])
+    assert [(i.kind, i.label, i.target) for i in items] == [
+        (BOOKMARK, "Docs", "https://docs.example/"),
+        (BOOKMARK, "example.com/a", "https://www.example.com/a"),
+    ]
+
+
+def test_history_items_are_recent_first_and_distinct():
+    history = [("2024-01-01 10:00", "https://a.example/"),
+               ("2024-01-02 10:00", "https://b.example/"),
+               ("2024-01-03 10:00", "https://a.example/"),
+               ("Unknown", None),
+               "junk"]
+    assert [i.key for i in history_items(history)] == ["https://a.example/",
+                                                       "https://b.example/"]
+    assert len(history_items(history, limit=1)) == 1
+
+
+def test_searches_stay_fast_on_ten_thousand_items():
+    """Not a benchmark; a guard against an accidental full scan per keystroke."""
+    rng = random.Random(1)
+    words = ("github issues python docs news weather mail calendar reddit stack "
+             "overflow video music shop settings account profile search maps "
+             "translate drive photos wiki linux kernel rust release notes").split()
+    idx = PaletteIndex()
+    for kind, count in ((TAB, 500), (ACTION, 60), (BOOKMARK, 1500), (HISTORY, 7940)):
+        idx.replace_kind(kind, [
+            PaletteItem(kind, i, " ".join(rng.choice(words).capitalize()
+                                          for _ in range(rng.randint(2, 6))),
+                        f"https://{rng.choice(words)}.example/{rng.choice(words)}/{i}")
+            for i in range(count)])
+    idx.search("warm up")
+    gc.collect()
+    for text in ("g", "gi", "git", "github", "ghi", "zz", "rel notes", "set acc"):
+        start = time.perf_counter()
+        idx.search(text)
+        assert time.perf_counter() - start < 0.1, text
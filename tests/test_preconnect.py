@@ -0,0 +1,241 @@
+"""
+Speculative warm-up: targets, budget, cancellation and hit accounting, plus
+a real lookup that opens no connection.
+"""
+
+import http.server
+import threading
+
+import pytest
+
+from preconnect import (
+    OMNIBOX,
+    SPEED_DIAL,
+    Preconnector,
+    WarmResult,
+    preconnect_report,
+    proxy_configured,
+    target_of,
+    warm_host,
+)
+
+
+def _fake_warm(dns=5.0, error=None):
+    calls = []
+
+    def warm(host, port):
+        calls.append((host, port))
+        r = WarmResult()
+        r.error = error
+        if error is None:
+            r.dns_ms = dns
+        return r
+
+    warm.calls = calls
+    return warm
+
+
+@pytest.mark.parametrize("url,target", [
+    ("https://Example.com/a", ("example.com", 443, True)),
+    ("http://example.com:8080/", ("example.com", 8080, False)),
+    ("http://example.com/", ("example.com", 80, False)),
+    ("file:///tmp/x", None),
+    ("about:blank", None),
+    ("https://", None),
+    ("http://[::1", None),
+    (None, None),
+])
+def test_target_of(url, target):
+    assert target_of(url) == target
+
+
+def test_https_only_warms_the_upgraded_port():
+    assert target_of("http://example.com/", https_only=True) == ("example.com", 443, True)
+
+
+@pytest.mark.parametrize("environ,argv,expected", [
+    ({}, [], False),
+    ({"NO_PROXY": "localhost"}, [], False),
+    ({"https_proxy": "http://proxy:3128"}, [], True),
+    ({"ALL_PROXY": "socks5://127.0.0.1:9050"}, [], True),
+    ({"QTWEBENGINE_CHROMIUM_FLAGS": "--proxy-server=socks5://127.0.0.1:9050"}, [], True),
+    ({}, ["blackline", "--proxy-pac-url=http://wpad/wpad.dat"], True),
+    ({}, ["blackline", "--no-proxy-server"], False),
+])
+def test_proxy_configured(environ, argv, expected):
+    assert proxy_configured(environ, argv) is expected
+
+
+class TestPrediction:
+
+    def test_predict_then_run_marks_the_host_warm(self):
+        warm = _fake_warm()
+        pre = Preconnector(warm)
+        job = pre.predict("https://a.example/x", OMNIBOX, now=0)
+        result = pre.run(job, now=0)
+        assert warm.calls == [("a.example", 443)]
+        assert result.dns_ms == 5.0
+        assert pre.predict("https://a.example/y", SPEED_DIAL, now=1) is None
+
+    def test_same_host_again_is_left_to_finish(self):
+        pre = Preconnector(_fake_warm())
+        job = pre.predict("https://a.example/1", OMNIBOX, now=0)
+        assert pre.predict("https://a.example/2", OMNIBOX, now=0) is None
+        assert not job.cancelled.is_set()
+
+    def test_newer_prediction_cancels_the_older(self):
+        warm = _fake_warm()
+        pre = Preconnector(warm)
+        first = pre.predict("https://a.example/", SPEED_DIAL, now=0)
+        second = pre.predict("https://b.example/", SPEED_DIAL, now=0)
+        assert first.cancelled.is_set() and not second.cancelled.is_set()
+        assert pre.run(first) is None and warm.calls == []
+        assert pre.cancelled == 1
+
+    def test_sources_do_not_cancel_each_other(self):
+        pre = Preconnector(_fake_warm())
+        a = pre.predict("https://a.example/", SPEED_DIAL, now=0)
+        pre.predict("https://b.example/", OMNIBOX, now=0)
+        assert not a.cancelled.is_set()
+
+    def test_cancel_everything(self):
+        pre = Preconnector(_fake_warm())
+        a = pre.predict("https://a.example/", SPEED_DIAL, now=0)
+        b = pre.predict("https://b.example/", OMNIBOX, now=0)
+        pre.cancel()
+        assert a.cancelled.is_set() and b.cancelled.is_set()
+
+    def test_disabled_predicts_nothing_but_still_cancels(self):
+        pre = Preconnector(_fake_warm())
+        a = pre.predict("https://a.example/", OMNIBOX, now=0)
+        pre.enabled = False
+        assert pre.predict("https://b.example/", OMNIBOX, now=0) is None
+        assert a.cancelled.is_set()
+
+    def test_ip_literal_has_nothing_to_resolve(self):
+        pre = Preconnector(_fake_warm())
+        assert pre.predict("http://127.0.0.1:8000/", OMNIBOX) is None
+        assert pre.predict("http://[::1]:8000/", SPEED_DIAL) is None
+
+
+class TestBudget:
+
+    def test_per_window_budget(self):
+        pre = Preconnector(_fake_warm(), budget=2, window=60, max_in_flight=10)
+        for i in range(2):
+            pre.run(pre.predict(f"https://h{i}.example/", OMNIBOX, now=i), now=i)
+        assert pre.predict("https://h9.example/", OMNIBOX, now=10) is None
+        assert pre.over_budget == 1
+        assert pre.predict("https://h9.example/", OMNIBOX, now=61) is not None
+
+    def test_in_flight_cap(self):
+        pre = Preconnector(_fake_warm(), budget=10, max_in_flight=1)
+        job = pre.predict("https://a.example/", SPEED_DIAL, now=0)
+        assert pre.predict("https://b.example/", OMNIBOX, now=0) is None
+        pre.run(job, now=0)
+        assert pre.predict("https://b.example/", OMNIBOX, now=0) is not None
+
+    def test_warm_host_expires(self):
+        pre = Preconnector(_fake_warm(), ttl=30)
+        pre.run(pre.predict("https://a.example/", OMNIBOX, now=0), now=0)
+        assert pre.predict("https://a.example/", SPEED_DIAL, now=10) is None
+        assert pre.predict("https://a.example/", SPEED_DIAL, now=31) is not None
+
+
+class TestHits:
+
+    def test_navigation_to_a_warm_host_is_a_hit(self):
+        pre = Preconnector(_fake_warm(dns=34.0))
+        pre.run(pre.predict("https://a.example/", SPEED_DIAL, now=0), now=0)
+        assert pre.note_navigation("https://a.example/page", now=2) is True
+        predicted, warmed, hits, rate, lookups, typical = pre.summary()[SPEED_DIAL]
+        assert (predicted, warmed, hits, rate, lookups, typical) == (1, 1, 1, 1.0, 34.0, 34.0)
+
+    def test_a_hit_is_counted_once(self):
+        pre = Preconnector(_fake_warm())
+        pre.run(pre.predict("https://a.example/", OMNIBOX, now=0), now=0)
+        assert pre.note_navigation("https://a.example/", now=1)
+        assert not pre.note_navigation("https://a.example/", now=2)
+
+    def test_late_navigation_is_no_hit(self):
+        pre = Preconnector(_fake_warm(), ttl=30)
+        pre.run(pre.predict("https://a.example/", OMNIBOX, now=0), now=0)
+        assert pre.note_navigation("https://a.example/", now=40) is False
+        assert pre.summary()[OMNIBOX][2] == 0
+
+    def test_failed_warm_up_is_not_warm(self):
+        pre = Preconnector(_fake_warm(error="refused"))
+        pre.run(pre.predict("https://a.example/", OMNIBOX, now=0), now=0)
+        assert pre.failed == 1
+        assert pre.note_navigation("https://a.example/", now=1) is False
+
+    def test_non_http_navigation_ignored(self):
+        pre = Preconnector(_fake_warm())
+        pre.note_navigation("file:///tmp/new_tab.html")
+        assert pre.navigations == 0
+
+    def test_report(self):
+        pre = Preconnector(_fake_warm(dns=12.0))
+        pre.run(pre.predict("https://a.example/", OMNIBOX, now=0), now=0)
+        pre.note_navigation("https://a.example/", now=1)
+        text = preconnect_report(pre)
+        assert "Address bar: 1 predicted, 1 warmed, 1 used (100%)" in text
+        assert "their lookups took 12 ms" in text and "saved" not in text
+        assert "Speed dial: no predictions yet" in text
+
+
+# ── real lookups ─────────────────────────────────────────────────────────
+
+class _Quiet(http.server.BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def http_fixture():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Quiet)
+    accepted = []
+    original = server.get_request
+
+    def get_request():
+        conn = original()
+        accepted.append(conn)
+        return conn
+
+    server.get_request = get_request
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.server_address[1], accepted
+    server.shutdown()
+    server.server_close()
+
+
+def _wait_for(predicate, timeout=2.0):
+    event = threading.Event()
+    for _ in range(int(timeout / 0.01)):
+        if predicate():
+            return True
+        event.wait(0.01)
+    return predicate()
+
+
+class TestWarmHost:
+
+    def test_a_lookup_opens_no_connection(self, http_fixture):
+        port, accepted = http_fixture
+        result = warm_host("localhost", port)
+        assert result.error is None and result.dns_ms is not None
+        assert not _wait_for(lambda: accepted, timeout=0.2)
+
+    def test_an_unresolvable_host_is_an_error(self):
+        result = warm_host("no-such-host.invalid", 80)
+        assert result.error and result.dns_ms is None
+
+    def test_full_cycle_through_the_preconnector(self, http_fixture):
+        port, accepted = http_fixture
+        pre = Preconnector()
+        url = f"http://localhost:{port}/"
+        assert pre.run(pre.predict(url, SPEED_DIAL)).error is None
+        assert pre.note_navigation(url)
+        assert pre.summary()[SPEED_DIAL][2] == 1
+        assert not accepted
@@ -34,6 +34,8 @@ INTERNAL_URLS = [
     "data:text/html,<h1>hi</h1>",
     "blob:https://example.com/1234",
     "javascript:void(0)",
+    "blackline://newtab/",
+    "blackline-icon://example.com",
 ]
 
 
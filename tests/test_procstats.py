@@ -0,0 +1,205 @@
+"""
+Process and memory readings, and the task manager sampler.
+
+psutil is optional, so the readings are tested against a fake module: the
+arithmetic (whole process tree, processes vanishing mid-read) is what
+matters, not what this machine is running.
+"""
+
+import contextlib
+from types import SimpleNamespace
+
+import pytest
+
+import procstats
+from procstats import (
+    BROWSER, GPU, RENDERER, UTILITY, ProcessSampler, classify_process,
+)
+
+
+class NoSuchProcess(Exception):
+    pass
+
+
+class AccessDenied(Exception):
+    pass
+
+
+class FakeProcess:
+    def __init__(self, pid, rss, children=(), gone=False, cmdline=(), cpu=(0.0,),
+                 threads=1):
+        self.pid = pid
+        self._rss = rss
+        self._children = list(children)
+        self._gone = gone
+        self._cmdline = list(cmdline)
+        self._cpu = list(cpu)
+        self._threads = threads
+        self.terminated = False
+
+    def oneshot(self):
+        return contextlib.nullcontext()
+
+    def cmdline(self):
+        return self._cmdline
+
+    def cpu_percent(self, interval=None):
+        return self._cpu.pop(0) if len(self._cpu) > 1 else self._cpu[0]
+
+    def num_threads(self):
+        return self._threads
+
+    def terminate(self):
+        self.terminated = True
+
+    def cpu_times(self):
+        if self._gone:
+            raise NoSuchProcess(self.pid)
+        return SimpleNamespace(user=2.5, system=0.5)
+
+    def memory_info(self):
+        if self._gone:
+            raise NoSuchProcess(self.pid)
+        return SimpleNamespace(rss=self._rss)
+
+    def children(self, recursive=False):
+        out = []
+        for child in self._children:
+            out.append(child)
+            if recursive:
+                out.extend(child.children(recursive=True))
+        return out
+
+
+def fake_psutil(root, percent=42.0):
+    table = {}
+
+    def index(proc):
+        table[proc.pid] = proc
+        for child in proc._children:
+            index(child)
+
+    index(root)
+
+    def process(pid):
+        if pid not in table:
+            raise NoSuchProcess(pid)
+        return table[pid]
+
+    return SimpleNamespace(
+        Process=process,
+        NoSuchProcess=NoSuchProcess,
+        AccessDenied=AccessDenied,
+        virtual_memory=lambda: SimpleNamespace(percent=percent),
+    )
+
+
+def _tree():
+    renderer_a = FakeProcess(11, 300)
+    renderer_b = FakeProcess(12, 200, children=[FakeProcess(13, 50)])
+    return FakeProcess(1, 1000, children=[renderer_a, renderer_b])
+
+
+def test_tree_includes_grandchildren():
+    ps = fake_psutil(_tree())
+    assert {p.pid for p in procstats.process_tree(1, ps)} == {1, 11, 12, 13}
+
+
+def test_snapshot_sums_the_whole_tree():
+    ps = fake_psutil(_tree(), percent=63.5)
+    assert procstats.memory_snapshot(1, ps) == (63.5, 1550)
+
+
+def test_process_exiting_mid_read_is_skipped():
+    root = FakeProcess(1, 1000, children=[FakeProcess(2, 500, gone=True)])
+    assert procstats.memory_snapshot(1, fake_psutil(root))[1] == 1000
+
+
+def test_unknown_root_pid_yields_empty_tree():
+    assert procstats.process_tree(999, fake_psutil(_tree())) == []
+
+
+def test_without_psutil_there_is_no_reading(monkeypatch):
+    monkeypatch.setattr(procstats, "_psutil", None)
+    assert procstats.available() is False
+    assert procstats.memory_snapshot() == (None, 0)
+    assert procstats.process_tree() == []
+
+
+def test_cpu_seconds_adds_user_and_system():
+    assert procstats.cpu_seconds(1, fake_psutil(_tree())) == 3.0
+
+
+@pytest.mark.parametrize("pid", [None, 0, -1, 999])
+def test_cpu_seconds_without_a_live_process(pid):
+    assert procstats.cpu_seconds(pid, fake_psutil(_tree())) is None
+
+
+# ── task manager ─────────────────────────────────────────────────────────
+
+@pytest.mark.parametrize("cmdline,root,kind", [
+    (["QtWebEngineProcess", "--type=renderer", "--lang=en"], False, RENDERER),
+    (["QtWebEngineProcess", "--type=gpu-process"], False, GPU),
+    (["QtWebEngineProcess", "--type=utility"], False, UTILITY),
+    ([], False, UTILITY),
+    (None, False, UTILITY),
+    (["python", "main.py"], True, BROWSER),
+])
+def test_classify_process(cmdline, root, kind):
+    assert classify_process(cmdline, root) == kind
+
+
+def _browser_tree():
+    r1 = FakeProcess(11, 300, cmdline=["x", "--type=renderer"], cpu=(0.0, 55.0), threads=20)
+    r2 = FakeProcess(12, 200, cmdline=["x", "--type=renderer"], cpu=(0.0, 1.0))
+    gpu = FakeProcess(13, 150, cmdline=["x", "--type=gpu-process"])
+    return FakeProcess(1, 1000, children=[r1, r2, gpu])
+
+
+class TestSampler:
+
+    def test_rows_are_labelled_by_tab(self):
+        sampler = ProcessSampler(1, fake_psutil(_browser_tree()))
+        rows = {s.pid: s for s in sampler.sample({11: ["Inbox", "Docs"]})}
+        assert rows[1].label == "Browser"
+        assert rows[11].label == "Inbox, Docs"
+        assert rows[12].label == "Renderer (no tab)"
+        assert rows[13].kind == GPU
+
+    def test_process_objects_are_kept_between_samples(self):
+        """cpu_percent() is relative to the previous call on the same object."""
+        sampler = ProcessSampler(1, fake_psutil(_browser_tree()))
+        sampler.sample()
+        second = {s.pid: s for s in sampler.sample()}
+        assert second[11].cpu_percent == 55.0
+
+    def test_exited_process_is_dropped(self):
+        root = FakeProcess(1, 10, children=[FakeProcess(2, 5, gone=True)])
+        sampler = ProcessSampler(1, fake_psutil(root))
+        assert [s.pid for s in sampler.sample()] == [1]
+
+    def test_without_psutil_samples_nothing(self, monkeypatch):
+        monkeypatch.setattr(procstats, "_psutil", None)
+        assert ProcessSampler(1).sample() == []
+
+
+class TestEndProcess:
+
+    def test_ends_a_sampled_child(self):
+        tree = _browser_tree()
+        sampler = ProcessSampler(1, fake_psutil(tree))
+        sampler.sample()
+        assert sampler.end_process(11) is True
+        assert tree._children[0].terminated
+
+    def test_never_ends_the_browser(self):
+        tree = _browser_tree()
+        sampler = ProcessSampler(1, fake_psutil(tree))
+        sampler.sample()
+        assert sampler.end_process(1) is False
+        assert not tree.terminated
+
+    def test_refuses_pids_outside_the_tree(self):
+        sampler = ProcessSampler(1, fake_psutil(_browser_tree()))
+        sampler.sample()
+        assert sampler.end_process(4242) is False
@@ -0,0 +1,69 @@
+"""
+Sampled download progress: the byte counter workers add to, and the board
+that decides which panel rows a tick repaints.
+"""
+
+import threading
+
+from progress import ByteCounter, ProgressBoard, Snapshot
+
+
+class TestByteCounter:
+
+    def test_drain_returns_what_was_added_since(self):
+        counter = ByteCounter()
+        counter.add(100)
+        counter.add(23)
+        assert counter.drain() == 123
+        assert counter.drain() == 0
+        counter.add(7)
+        assert counter.drain() == 7 and counter.total == 130
+
+    def test_concurrent_adds_are_not_lost(self):
+        counter = ByteCounter()
+        drained = []
+        stop = threading.Event()
+
+        def add():
+            for _ in range(20000):
+                counter.add(3)
+
+        def drain():
+            while not stop.is_set():
+                drained.append(counter.drain())
+
+        reader = threading.Thread(target=drain)
+        reader.start()
+        writers = [threading.Thread(target=add) for _ in range(4)]
+        for t in writers:
+            t.start()
+        for t in writers:
+            t.join()
+        stop.set()
+        reader.join()
+        assert sum(drained) + counter.drain() == 4 * 20000 * 3 == counter.total
+
+
+class TestProgressBoard:
+
+    def snap(self, download_id="a", done=10, speed=1.0, status="Downloading"):
+        return Snapshot(download_id, done, 100, speed, status)
+
+    def test_only_rows_that_moved_are_repainted(self):
+        board = ProgressBoard()
+        first = [self.snap("a"), self.snap("b")]
+        assert board.changed(first) == first
+        assert board.changed([self.snap("a"), self.snap("b", done=20)]) == [self.snap("b", done=20)]
+        assert board.changed([self.snap("a"), self.snap("b", done=20)]) == []
+
+    def test_a_status_change_alone_is_a_change(self):
+        board = ProgressBoard()
+        board.changed([self.snap()])
+        assert board.changed([self.snap(status="Paused")]) == [self.snap(status="Paused")]
+
+    def test_forgotten_rows_are_painted_again(self):
+        board = ProgressBoard()
+        board.changed([self.snap()])
+        board.forget("a")
+        board.forget("missing")
+        assert len(board) == 0 and board.changed([self.snap()]) == [self.snap()]
@@ -0,0 +1,182 @@
+"""
+Bandwidth shaping: rates and schedules, token buckets on a fake clock,
+priority classes sharing a limit, host and download buckets, and the
+achieved rate against a local server.
+"""
+
+import datetime
+import heapq
+import time
+
+import pytest
+import requests
+
+from ratelimit import (HIGH, LOW, MAX_READ, MIN_READ, NORMAL, Schedule, Shaper, TokenBucket,
+                       from_environment, parse_rate, priority_name, priority_of)
+
+MB = 1024 * 1024
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.parametrize("text, rate", [
+    ("500K", 500 * 1024), ("2M", 2 * MB), ("1.5mb/s", 1.5 * MB), ("65536", 65536),
+    ("", None), ("0", None), ("Unlimited", None),
+])
+def test_parse_rate(text, rate):
+    assert parse_rate(text) == rate
+
+
+def test_parse_rate_rejects_junk():
+    with pytest.raises(ValueError):
+        parse_rate("fast")
+
+
+def test_priorities():
+    assert priority_of("HIGH") == HIGH and priority_of(LOW) == LOW and priority_of("?") == NORMAL
+    assert priority_name(HIGH) == "high"
+
+
+class TestSchedule:
+
+    def at(self, hour, minute=0):
+        return datetime.datetime(2026, 1, 1, hour, minute)
+
+    def test_rules_and_default(self):
+        schedule = Schedule.parse("09:00-17:30=500K, 22:00-06:00=unlimited")
+        assert schedule.rate_at(self.at(12), 1) == 500 * 1024
+        assert schedule.rate_at(self.at(17, 30), 1) == 1
+        assert schedule.rate_at(self.at(23), 1) is None and schedule.rate_at(self.at(3), 1) is None
+        assert schedule.rate_at(self.at(7), 1) == 1
+
+    @pytest.mark.parametrize("text", ["9-17=1M", "09:00-17:00", "25:00-26:00=1M", "09:00-10:00=quick"])
+    def test_malformed_rules(self, text):
+        with pytest.raises(ValueError):
+            Schedule.parse(text)
+
+    def test_the_shaper_follows_the_schedule(self):
+        wall = [self.at(12)]
+        clock = Clock()
+        shaper = Shaper(rate=MB, schedule=Schedule.parse("00:00-07:00=unlimited"),
+                        clock=clock, wall_clock=lambda: wall[0])
+        assert shaper.rate == MB
+        wall[0] = self.at(2)
+        assert shaper.rate == MB                        # looked at once a second
+        clock.now += 1
+        assert shaper.rate is None
+        assert shaper.throttle().reserve(100 * MB) == 0
+
+
+class TestTokenBucket:
+
+    def test_a_burst_then_the_rate(self):
+        clock = Clock()
+        bucket = TokenBucket(MB, burst=0.25, clock=clock)
+        assert bucket.reserve(MB // 4) == 0            # the burst is free
+        assert bucket.reserve(MB // 2) == pytest.approx(0.5)
+        assert bucket.reserve(MB // 2) == pytest.approx(1.0)   # queued behind the first
+        clock.now += 10                                 # idle: refilled, but only to the burst
+        assert bucket.reserve(MB // 2) == pytest.approx(0.25)
+
+    def test_unlimited_never_waits(self):
+        assert TokenBucket(None).reserve(10 ** 12) == 0
+
+    def test_a_new_rate_rescales_the_debt(self):
+        clock = Clock()
+        bucket = TokenBucket(MB, burst=0, clock=clock)
+        bucket.reserve(MB)
+        bucket.rate = 2 * MB
+        assert bucket.reserve(0) == pytest.approx(0.5)
+        bucket.rate = None
+        bucket.rate = MB
+        assert bucket.reserve(0) == 0
+
+
+def simulate(shaper, clock, throttles, seconds=20, host=None):
+    """Each throttle reads as fast as allowed; bytes each got in the second half."""
+    events = [(clock.now, i) for i in range(len(throttles))]
+    got = [0] * len(throttles)
+    start = clock.now
+    while True:
+        t, i = heapq.heappop(events)
+        if t > start + seconds:
+            return [g / (seconds / 2) for g in got]
+        clock.now = t
+        n = throttles[i].read_size(host)
+        delay = throttles[i].reserve(n, host)
+        if t > start + seconds / 2:
+            got[i] += n
+        heapq.heappush(events, (t + delay + 0.001, i))
+
+
+class TestShaper:
+
+    def test_one_download_gets_the_global_rate(self):
+        clock = Clock()
+        shaper = Shaper(rate=MB, clock=clock)
+        (rate,) = simulate(shaper, clock, [shaper.throttle()])
+        assert rate == pytest.approx(MB, rel=0.05)
+
+    def test_equal_priorities_share_evenly(self):
+        clock = Clock()
+        shaper = Shaper(rate=MB, clock=clock)
+        a, b = simulate(shaper, clock, [shaper.throttle(), shaper.throttle()])
+        assert a + b == pytest.approx(MB, rel=0.05) and a == pytest.approx(b, rel=0.1)
+
+    def test_higher_priority_comes_first_and_lower_keeps_a_share(self):
+        clock = Clock()
+        shaper = Shaper(rate=MB, clock=clock)
+        high, normal, low = simulate(shaper, clock, [shaper.throttle(priority=p) for p in (HIGH, NORMAL, LOW)])
+        assert high + normal + low == pytest.approx(MB, rel=0.1)
+        assert high > 0.8 * MB
+        assert 0.02 * MB < normal < 0.1 * MB and 0.02 * MB < low < 0.1 * MB
+
+    def test_a_download_limit_below_the_global_one(self):
+        clock = Clock()
+        shaper = Shaper(rate=MB, clock=clock)
+        capped, free = simulate(shaper, clock, [shaper.throttle(rate=MB / 4), shaper.throttle()])
+        assert capped == pytest.approx(MB / 4, rel=0.05)
+        assert free == pytest.approx(3 * MB / 4, rel=0.1)
+
+    def test_host_limits(self):
+        clock = Clock()
+        shaper = Shaper(host_rate=MB, clock=clock)
+        shaper.set_host_rate("slow.example", MB / 2)
+        (slow,) = simulate(shaper, clock, [shaper.throttle()], host="slow.example")
+        (other,) = simulate(shaper, clock, [shaper.throttle()], host="other.example")
+        assert slow == pytest.approx(MB / 2, rel=0.05) and other == pytest.approx(MB, rel=0.05)
+
+    def test_read_size_follows_the_tightest_bucket(self):
+        shaper = Shaper()
+        assert shaper.throttle().read_size() == MAX_READ
+        assert shaper.throttle(rate=1024).read_size() == MIN_READ
+        assert shaper.throttle(rate=200 * 1024).read_size() == 20 * 1024
+
+    def test_from_environment(self):
+        shaper = from_environment({"BLACKLINE_DOWNLOAD_LIMIT": "2M", "BLACKLINE_DOWNLOAD_SCHEDULE": "bad"})
+        assert shaper.configured_rate == 2 * MB and not shaper.schedule
+        assert from_environment({}).rate is None
+
+
+def test_the_achieved_rate_against_a_local_server(range_server):
+    """Reading as DownloadWorker does, 1 MB at 2 MB/s takes what the bucket says."""
+    shaper = Shaper(rate=2 * MB)
+    throttle = shaper.throttle()
+    started = time.monotonic()
+    received = 0
+    with requests.get(range_server.url, stream=True, timeout=10) as r:
+        for chunk in r.iter_content(chunk_size=throttle.read_size()):
+            received += len(chunk)
+            delay = throttle.reserve(len(chunk))
+            if delay:
+                time.sleep(delay)
+    elapsed = time.monotonic() - started
+    assert received == MB
+    # 1 MB less the 0.25 s burst (512 KB), at 2 MB/s.
+    assert 0.2 < elapsed < 0.4
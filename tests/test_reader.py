@@ -0,0 +1,238 @@
+"""
+Reading mode: article extraction and sanitising from raw HTML, the reader
+page, and the content-addressed reading list on disk.
+"""
+
+import zlib
+
+import pytest
+
+from reader import (
+    Article,
+    ReaderTabs,
+    ReadingList,
+    content_digest,
+    extract_article,
+    render_reader,
+)
+
+URL = "https://news.example/2024/story"
+
+PROSE = ("The committee met on Tuesday, after weeks of delay, to weigh a proposal "
+         "that would reshape how the city pays for its parks, pools and libraries.")
+
+
+def _page(body, head="<title>Story | News</title>"):
+    return f"<!DOCTYPE html><html><head>{head}</head><body>{body}</body></html>"
+
+
+def _article(body=None):
+    return _page(body or f"""
+        <nav><a href="/">Home</a> <a href="/world">World</a></nav>
+        <div class="sidebar"><p>Subscribe now, today, for less, with more, and more.</p></div>
+        <article>
+          <h1>Story</h1>
+          <p>{PROSE}</p>
+          <p>{PROSE} <a href="/related">Related</a></p>
+          <p>{PROSE}</p>
+        </article>
+        <div id="comments"><p>First! Great piece, loved it, thanks, more please.</p></div>
+        <footer><p>© News, all rights, reserved, forever, and ever.</p></footer>""")
+
+
+class TestExtraction:
+
+    def test_picks_the_article_not_the_clutter(self):
+        article = extract_article(_article(), URL)
+        assert article.html.count(PROSE) == 3
+        for clutter in ("Subscribe", "First!", "rights", "World"):
+            assert clutter not in article.html
+
+    def test_title_prefers_open_graph_then_title_then_h1(self):
+        head = '<title>Story | News</title><meta property="og:title" content="Story">'
+        assert extract_article(_page(f"<article><p>{PROSE * 3}</p></article>", head),
+                               URL).title == "Story"
+        assert extract_article(_article(), URL).title == "Story | News"
+        no_title = _page(f"<div><h1>Headline</h1><p>{PROSE * 3}</p></div>", head="")
+        assert extract_article(no_title, URL).title == "Headline"
+
+    def test_too_little_text_is_no_article(self):
+        assert extract_article(_page("<p>Just a line, nothing more.</p>"), URL) is None
+        assert extract_article("", URL) is None
+
+    def test_link_farm_loses_to_prose(self):
+        links = "".join(f'<p><a href="/{i}">Another headline, with commas, here</a></p>'
+                        for i in range(30))
+        page = _page(f'<div class="list">{links}</div><div class="text"><p>{PROSE}</p>'
+                     f"<p>{PROSE}</p><p>{PROSE}</p></div>")
+        article = extract_article(page, URL)
+        assert PROSE in article.html and "Another headline" not in article.html
+
+    def test_prose_siblings_are_kept(self):
+        page = _page(f'<div><div class="post-body"><p>{PROSE}</p><p>{PROSE}</p></div>'
+                     f"<p>{PROSE}</p></div>")
+        assert extract_article(page, URL).html.count(PROSE) == 3
+
+    def test_unclosed_paragraphs_and_stray_tags(self):
+        page = _page(f"<div><p>{PROSE}<p>{PROSE}</span><p>{PROSE}</div></div>")
+        assert extract_article(page, URL).html.count("<p>") == 3
+
+    def test_metadata(self):
+        head = ('<meta property="og:site_name" content="The News">'
+                '<meta name="author" content="A. Writer">')
+        article = extract_article(_page(f"<article><p>{PROSE * 3}</p></article>", head), URL)
+        assert (article.site, article.byline) == ("The News", "A. Writer")
+        assert article.text_chars >= len(PROSE) * 3
+
+
+class TestSanitising:
+
+    def _html(self, inner):
+        return extract_article(_page(f"<article><p>{PROSE}</p><p>{PROSE}</p>{inner}</article>"),
+                               URL).html
+
+    def test_scripts_styles_and_handlers_are_gone(self):
+        out = self._html('<p onclick="steal()" style="x">Hi, there, friend.</p>'
+                         "<script>steal()</script><style>p{}</style>"
+                         '<iframe src="https://ads.example/"></iframe><svg/><p>after</p>')
+        assert "steal" not in out and "style" not in out and "iframe" not in out
+        assert "<p>Hi, there, friend.</p>" in out and "after" in out
+
+    def test_links_are_absolute_and_unsafe_schemes_dropped(self):
+        out = self._html('<p><a href="../x">rel</a> <a href="javascript:alert(1)">js</a> '
+                         '<a href="mailto:a@b.example">mail</a> <a href="#fn1">fn</a></p>')
+        assert 'href="https://news.example/x"' in out
+        assert "javascript" not in out and "<a>js</a>" in out
+        assert 'href="mailto:a@b.example"' in out and 'href="#fn1"' in out
+
+    def test_lazy_images_use_the_real_source(self):
+        out = self._html('<img data-src="/img/a.png" src="data:," alt="A">'
+                         '<img src="javascript:x">')
+        assert '<img src="https://news.example/img/a.png" alt="A">' in out
+        assert out.count("<img") == 1
+
+    def test_text_is_escaped(self):
+        out = self._html("<p>1 &lt; 2 &amp; &lt;b&gt;</p>")
+        assert "1 &lt; 2 &amp; &lt;b&gt;" in out
+
+    def test_unknown_tags_are_unwrapped(self):
+        out = self._html("<p><font color=red>kept</font></p>")
+        assert "<p>kept</p>" in out
+
+
+class TestRender:
+
+    def test_title_is_escaped_and_exit_returns_to_the_page(self):
+        page = render_reader(Article(URL, "<Bad> & title", "<p>x</p>", site="News"))
+        assert "&lt;Bad&gt; &amp; title" in page and "<Bad>" not in page
+        assert f'location.href=&quot;{URL}&quot;' in page
+        assert "News · 1 min read" in page
+
+    def test_unsafe_original_url_exits_nowhere(self):
+        page = render_reader(Article("javascript:alert(1)", "t", ""))
+        assert "alert" not in page
+
+    def test_reading_time(self):
+        assert Article(URL, "t", "", text_chars=6000).minutes == 5
+
+
+class TestReaderTabs:
+
+    def test_the_reader_page_load_keeps_reading_mode(self):
+        tabs = ReaderTabs()
+        tabs.show("tab", URL)
+        tabs.load_started("tab")
+        assert tabs.active("tab", URL) and tabs.url("tab") == URL
+        assert not tabs.active("other", URL)
+
+    def test_exit_then_revisit(self):
+        tabs = ReaderTabs()
+        tabs.show("tab", URL)
+        tabs.load_started("tab")            # the reader page
+        tabs.load_started("tab")            # EXIT: back to the same URL
+        assert not tabs.active("tab", URL) and tabs.url("tab") is None
+        tabs.show("tab", URL)               # and into reading mode again
+        tabs.load_started("tab")
+        assert tabs.active("tab", URL)
+
+    def test_a_reader_page_loaded_over_a_running_load(self):
+        tabs = ReaderTabs()
+        tabs.show("tab", URL)               # no start of its own is reported
+        tabs.load_finished("tab")
+        assert tabs.active("tab", URL)
+        tabs.load_started("tab")            # EXIT
+        assert not tabs.active("tab", URL)
+
+    def test_another_url_is_not_the_reader_page(self):
+        tabs = ReaderTabs()
+        tabs.show("tab", URL)
+        assert not tabs.active("tab", URL + "/other")
+
+    def test_forget(self):
+        tabs = ReaderTabs()
+        tabs.show("tab", URL)
+        tabs.forget("tab")
+        tabs.load_started("tab")
+        assert tabs.url("tab") is None
+
+
+class TestReadingList:
+
+    @pytest.fixture
+    def store(self, tmp_path):
+        return ReadingList(tmp_path / "reading_list")
+
+    def test_round_trip_survives_a_restart(self, store):
+        assert store.put(Article(URL, "Story", "<p>body</p>", site="News", text_chars=4,
+                                 saved=100))
+        again = ReadingList(store.root)
+        article = again.get(URL)
+        assert (article.title, article.html, article.site, article.saved) == (
+            "Story", "<p>body</p>", "News", 100)
+        assert URL in again and len(again) == 1
+
+    def test_objects_are_compressed_and_named_by_content(self, store):
+        body = "<p>" + PROSE * 20 + "</p>"
+        store.put(Article(URL, "Story", body))
+        path = store.root / (content_digest(body) + ReadingList.SUFFIX)
+        data = path.read_bytes()
+        assert len(data) < len(body) / 4
+        assert zlib.decompress(data).decode() == body
+
+    def test_same_content_under_two_urls_is_stored_once(self, store):
+        store.put(Article(URL, "Story", "<p>same</p>"))
+        store.put(Article(URL + "?utm=x", "Story", "<p>same</p>"))
+        assert len(list(store.root.glob("*" + ReadingList.SUFFIX))) == 1
+        store.remove(URL)
+        assert store.get(URL + "?utm=x").html == "<p>same</p>"
+        store.remove(URL + "?utm=x")
+        assert not list(store.root.glob("*" + ReadingList.SUFFIX))
+
+    def test_resaving_replaces_and_collects_the_old_copy(self, store):
+        store.put(Article(URL, "Story", "<p>v1</p>"))
+        store.put(Article(URL, "Story", "<p>v2</p>"))
+        assert store.get(URL).html == "<p>v2</p>"
+        assert len(list(store.root.glob("*" + ReadingList.SUFFIX))) == 1
+
+    def test_oldest_are_pruned(self, tmp_path):
+        store = ReadingList(tmp_path, max_articles=2)
+        for i in range(3):
+            store.put(Article(f"{URL}/{i}", str(i), f"<p>{i}</p>", saved=i))
+        assert [row[0] for row in store.entries()] == [f"{URL}/2", f"{URL}/1"]
+        assert store.get(f"{URL}/0") is None
+
+    def test_damaged_object_reads_as_missing(self, store):
+        store.put(Article(URL, "Story", "<p>body</p>"))
+        path = store.root / (content_digest("<p>body</p>") + ReadingList.SUFFIX)
+        path.write_bytes(zlib.compress(b"<p>tampered</p>"))
+        assert store.get(URL) is None
+        path.write_bytes(b"not zlib")
+        assert store.get(URL) is None
+
+    def test_missing_or_corrupt_index_is_an_empty_list(self, tmp_path):
+        (tmp_path / ReadingList.INDEX).write_text("[1, 2")
+        assert len(ReadingList(tmp_path)) == 0
+        assert ReadingList(tmp_path / "nowhere").get(URL) is None
+
+    def test_remove_unknown(self, store):
+        assert store.remove(URL) is False
@@ -0,0 +1,140 @@
+"""
+The download scheduler: queue order by pin, priority and position, moving
+within a band, and connection budgets per host and in all that count
+segments rather than downloads.
+"""
+
+import pytest
+
+from ratelimit import HIGH, LOW
+from scheduler import Grant, Scheduler, from_environment, host_of
+
+
+def queue(sched, *jobs):
+    """jobs: (key, url, connections[, priority])."""
+    for job in jobs:
+        sched.add(*job)
+
+
+@pytest.mark.parametrize("url, host", [
+    ("https://Example.org/a.iso", "example.org:443"),
+    ("http://example.org:8080/a", "example.org:8080"),
+    ("http://example.org/a", "example.org:80"),
+    ("not a url", "not a url"),
+])
+def test_host_of(url, host):
+    assert host_of(url) == host
+
+
+class TestOrder:
+
+    def test_fifo_within_a_priority(self):
+        sched = Scheduler()
+        queue(sched, ("a", "http://h/a", 1), ("b", "http://h/b", 1), ("c", "http://h/c", 1))
+        assert sched.queue() == ["a", "b", "c"]
+
+    def test_higher_priority_first_and_pinned_before_all(self):
+        sched = Scheduler()
+        queue(sched, ("low", "http://h/1", 1, LOW), ("normal", "http://h/2", 1),
+              ("high", "http://h/3", 1, HIGH), ("pinned", "http://h/4", 1, LOW))
+        sched.pin("pinned")
+        assert sched.queue() == ["pinned", "high", "normal", "low"]
+
+    def test_a_new_priority_goes_to_the_back_of_its_band(self):
+        sched = Scheduler()
+        queue(sched, ("a", "http://h/a", 1, HIGH), ("b", "http://h/b", 1), ("c", "http://h/c", 1, HIGH))
+        sched.set_priority("b", "high")
+        assert sched.queue() == ["a", "c", "b"]
+
+    def test_moves_stay_within_the_band(self):
+        sched = Scheduler()
+        queue(sched, ("h", "http://h/0", 1, HIGH), ("a", "http://h/a", 1), ("b", "http://h/b", 1),
+              ("c", "http://h/c", 1))
+        assert sched.move("c", -1) and sched.queue() == ["h", "a", "c", "b"]
+        assert sched.move("c", -5) and sched.queue() == ["h", "c", "a", "b"]
+        assert not sched.move("c", -1)                  # not past the HIGH one
+        assert sched.move("c", 2) and sched.queue() == ["h", "a", "b", "c"]
+        assert sched.position("b") == 2 and sched.position("nope") is None
+
+    def test_adding_twice_keeps_the_place(self):
+        sched = Scheduler()
+        queue(sched, ("a", "http://h/a", 1), ("b", "http://h/b", 1), ("a", "http://h/a", 1))
+        assert sched.queue() == ["a", "b"]
+
+
+class TestBudgets:
+
+    def test_ten_downloads_of_eight_segments_to_one_host(self):
+        sched = Scheduler(max_active=10, per_host=8)
+        queue(sched, *[(str(i), "http://busy.example/f%d" % i, 8) for i in range(10)])
+        assert sched.ready() == [Grant("0", 8)]
+        assert sched.in_use("busy.example:80") == 8
+        sched.finished("0")
+        assert sched.ready() == [Grant("1", 8)]
+
+    def test_other_hosts_are_not_held_up(self):
+        sched = Scheduler(max_active=10, per_host=8)
+        queue(sched, ("a1", "http://a/1", 8), ("a2", "http://a/2", 8), ("b1", "http://b/1", 8))
+        assert [g.key for g in sched.ready()] == ["a1", "b1"]
+        assert sched.queue() == ["a2"]
+
+    def test_grants_are_trimmed_but_not_below_half(self):
+        sched = Scheduler(max_active=10, per_host=8)
+        queue(sched, ("a", "http://h/a", 5), ("b", "http://h/b", 4), ("c", "http://h/c", 8))
+        # 3 left after "a": enough for half of "b", not half of "c".
+        assert sched.ready() == [Grant("a", 5), Grant("b", 3)]
+        sched.finished("a")
+        assert sched.ready() == [Grant("c", 5)]
+
+    def test_an_idle_host_takes_what_it_can_get(self):
+        sched = Scheduler(per_host=4)
+        sched.add("big", "http://h/big", 16)
+        assert sched.ready() == [Grant("big", 4)]
+
+    def test_a_blocked_download_holds_its_host_for_smaller_ones_behind_it(self):
+        sched = Scheduler(max_active=10, per_host=8)
+        queue(sched, ("a", "http://h/a", 6), ("big", "http://h/big", 8), ("small", "http://h/small", 1))
+        assert sched.ready() == [Grant("a", 6)]
+        assert sched.queue() == ["big", "small"]
+
+    def test_the_global_budget(self):
+        sched = Scheduler(max_active=10, max_connections=10, per_host=8)
+        queue(sched, ("a", "http://a/", 8), ("b", "http://b/", 8), ("c", "http://c/", 1))
+        # "b" needs 4 of the 2 left; "c" would fit but waits behind it.
+        assert sched.ready() == [Grant("a", 8)]
+        sched.finished("a")
+        assert sched.ready() == [Grant("b", 8), Grant("c", 1)]
+        assert sched.in_use() == 9
+
+    def test_a_budget_below_the_ask_still_starts(self):
+        sched = Scheduler(max_connections=2, per_host=8)
+        sched.add("a", "http://h/a", 8)
+        assert sched.ready() == [Grant("a", 2)]
+
+    def test_host_limits_override_the_default(self):
+        sched = Scheduler(per_host=8, host_limits={"strict.example:443": 2})
+        queue(sched, ("a", "https://strict.example/a", 8), ("b", "https://other.example/b", 8))
+        assert sched.ready() == [Grant("a", 2), Grant("b", 8)]
+
+    def test_max_active_and_pinned_downloads(self):
+        sched = Scheduler(max_active=1)
+        queue(sched, ("a", "http://a/", 1), ("b", "http://b/", 1), ("c", "http://c/", 1))
+        assert [g.key for g in sched.ready()] == ["a"]
+        assert sched.ready() == []
+        sched.pin("c")
+        assert [g.key for g in sched.ready()] == ["c"]
+        assert sched.active == 2 and sched.queue() == ["b"]
+
+    def test_removing_a_running_download_frees_its_connections(self):
+        sched = Scheduler(per_host=4)
+        queue(sched, ("a", "http://h/a", 4), ("b", "http://h/b", 4))
+        sched.ready()
+        sched.remove("a")
+        assert sched.in_use() == 0 and not sched.is_running("a")
+        assert sched.ready() == [Grant("b", 4)]
+
+
+def test_from_environment():
+    sched = from_environment({"BLACKLINE_DOWNLOAD_CONNECTIONS": "12",
+                              "BLACKLINE_DOWNLOAD_HOST_CONNECTIONS": "lots"}, max_active=2)
+    assert sched.max_connections == 12 and sched.per_host == 8 and sched.max_active == 2
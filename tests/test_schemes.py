@@ -0,0 +1,101 @@
+"""
+Scheme handlers: who may load blackline:// and blackline-icon://, and what
+they get back.
+
+The handlers are driven with a stand-in for QWebEngineUrlRequestJob, so no
+profile or page is needed.
+"""
+
+import pytest
+
+# ImportError too: the module is there but its system libraries may not be.
+pytest.importorskip("PyQt6.QtWebEngineCore", exc_type=ImportError)
+
+from PyQt6.QtCore import QByteArray, QObject, QUrl
+from PyQt6.QtWebEngineCore import QWebEngineUrlRequestJob
+
+from internal_pages import InternalPages
+from schemes import FaviconSchemeHandler, InternalPageHandler
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\0" * 16
+
+
+class FakeJob(QObject):
+
+    def __init__(self, url, initiator="", method=b"GET"):
+        super().__init__()
+        self._url = QUrl(url)
+        self._initiator = QUrl(initiator)
+        self._method = method
+        self.error = None
+        self.replied = None
+
+    def requestUrl(self):
+        return self._url
+
+    def initiator(self):
+        return self._initiator
+
+    def requestMethod(self):
+        return QByteArray(self._method)
+
+    def fail(self, error):
+        self.error = error
+
+    def reply(self, content_type, device):
+        self.replied = (bytes(content_type), bytes(device.readAll()))
+
+    def setAdditionalResponseHeaders(self, headers):
+        pass
+
+
+class FakeIcons:
+
+    def lookup(self, host):
+        return PNG if host == "bank.example" else None
+
+
+class TestFavicons:
+
+    @pytest.mark.parametrize("initiator", ["", "blackline://newtab"])
+    def test_the_browser_and_internal_pages_get_the_icon(self, initiator):
+        handler = FaviconSchemeHandler(FakeIcons())
+        job = FakeJob("blackline-icon://bank.example", initiator)
+        handler.requestStarted(job)
+        assert job.error is None and job.replied == (b"image/png", PNG)
+        assert handler.served == 1
+
+    def test_a_web_page_cannot_ask_which_sites_were_visited(self):
+        handler = FaviconSchemeHandler(FakeIcons())
+        job = FakeJob("blackline-icon://bank.example", "https://evil.example")
+        handler.requestStarted(job)
+        assert job.error == QWebEngineUrlRequestJob.Error.RequestDenied
+        assert job.replied is None and handler.served == handler.missed == 0
+
+    def test_a_page_opened_from_disk_is_refused(self):
+        job = FakeJob("blackline-icon://bank.example", "file:///home/u/saved.html")
+        FaviconSchemeHandler(FakeIcons()).requestStarted(job)
+        assert job.error == QWebEngineUrlRequestJob.Error.RequestDenied
+
+    def test_only_get(self):
+        job = FakeJob("blackline-icon://bank.example", method=b"POST")
+        FaviconSchemeHandler(FakeIcons()).requestStarted(job)
+        assert job.error == QWebEngineUrlRequestJob.Error.RequestDenied
+
+    def test_unknown_host_is_not_found(self):
+        handler = FaviconSchemeHandler(FakeIcons())
+        job = FakeJob("blackline-icon://never.example")
+        handler.requestStarted(job)
+        assert job.error == QWebEngineUrlRequestJob.Error.UrlNotFound
+        assert handler.missed == 1
+
+
+@pytest.mark.parametrize("initiator,error", [
+    ("blackline://newtab", QWebEngineUrlRequestJob.Error.UrlNotFound),
+    ("file:///home/u/saved.html", QWebEngineUrlRequestJob.Error.RequestDenied),
+    ("https://evil.example", QWebEngineUrlRequestJob.Error.RequestDenied),
+])
+def test_internal_pages_only_for_internal_initiators(initiator, error):
+    job = FakeJob("blackline://newtab/nothing-here", initiator)
+    InternalPageHandler(InternalPages()).requestStarted(job)
+    assert job.error == error
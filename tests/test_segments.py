@@ -0,0 +1,203 @@
+"""
+Dynamic segmentation: the completed-range set, the first cut, splitting the
+busiest segment for a free worker, and claim/commit under concurrency.
+"""
+
+import random
+import threading
+
+import pytest
+
+from segments import RangeSet, Segment, SegmentPlan
+
+MB = 1024 * 1024
+
+
+class TestRangeSet:
+
+    def test_adjacent_and_overlapping_ranges_merge(self):
+        ranges = RangeSet([(0, 10), (20, 30)])
+        ranges.add(10, 20)
+        assert list(ranges) == [(0, 30)]
+        ranges.add(25, 40)
+        ranges.add(50, 60)
+        assert list(ranges) == [(0, 40), (50, 60)] and ranges.total() == 50
+
+    def test_a_range_spanning_several_swallows_them(self):
+        ranges = RangeSet([(0, 5), (10, 15), (20, 25), (40, 45)])
+        ranges.add(3, 22)
+        assert list(ranges) == [(0, 25), (40, 45)]
+
+    def test_empty_ranges_are_ignored(self):
+        ranges = RangeSet([(5, 5), (9, 3)])
+        assert len(ranges) == 0 and ranges.missing(10) == [(0, 10)]
+
+    def test_remove_cuts_ranges(self):
+        ranges = RangeSet([(0, 10), (20, 30), (40, 50)])
+        ranges.remove(5, 25)
+        assert list(ranges) == [(0, 5), (25, 30), (40, 50)]
+        ranges.remove(30, 40)                          # a gap: nothing changes
+        ranges.remove(42, 44)
+        assert list(ranges) == [(0, 5), (25, 30), (40, 42), (44, 50)]
+        ranges.remove(0, 100)
+        assert len(ranges) == 0
+
+    def test_missing_and_covers(self):
+        ranges = RangeSet([(10, 20), (30, 100)])
+        assert ranges.missing(50) == [(0, 10), (20, 30)]
+        assert ranges.covers(12, 18) and ranges.covers(30, 100)
+        assert not ranges.covers(15, 25) and not ranges.covers(0, 1)
+
+    def test_matches_a_naive_model(self):
+        rng = random.Random(7)
+        ranges, model = RangeSet(), set()
+        for _ in range(300):
+            start = rng.randrange(0, 500)
+            end = start + rng.randrange(0, 40)
+            ranges.add(start, end)
+            model.update(range(start, end))
+        for _ in range(100):
+            start = rng.randrange(0, 500)
+            end = start + rng.randrange(0, 40)
+            ranges.remove(start, end)
+            model.difference_update(range(start, end))
+        assert ranges.total() == len(model)
+        assert all(s < e for s, e in ranges)
+        flat = [(s, e) for s, e in ranges]
+        assert all(a[1] < b[0] for a, b in zip(flat, flat[1:]))       # disjoint, not touching
+
+    def test_list_round_trip_skips_junk(self):
+        ranges = RangeSet([(0, 4), (8, 9)])
+        assert RangeSet.from_list(ranges.to_list()) == ranges
+        assert list(RangeSet.from_list([[0, 4], ["x", 2], [5], [7, 3], None])) == [(0, 4)]
+
+    def test_old_chunk_progress_format(self):
+        ranges = RangeSet.from_chunk_progress({"0": 100, "250": 50, 500: 0, "bad": 3})
+        assert list(ranges) == [(0, 100), (250, 300)]
+
+
+class TestInitialCut:
+
+    def test_a_fresh_file_is_cut_evenly(self):
+        plan = SegmentPlan(8 * MB, min_segment=MB)
+        segs = plan.initial(4)
+        assert sorted((s.start, s.end) for s in segs) == [
+            (0, 2 * MB), (2 * MB, 4 * MB), (4 * MB, 6 * MB), (6 * MB, 8 * MB)]
+
+    def test_only_what_is_missing_is_fetched(self):
+        done = RangeSet([(0, 3 * MB), (5 * MB, 8 * MB)])
+        plan = SegmentPlan(8 * MB, done, min_segment=MB)
+        segs = plan.initial(1)
+        assert [(s.start, s.end) for s in segs] == [(3 * MB, 5 * MB)]
+        assert plan.downloaded == 6 * MB
+
+    def test_small_files_are_not_over_split(self):
+        plan = SegmentPlan(3 * MB, min_segment=MB)
+        assert len(plan.initial(8)) == 2
+
+    def test_without_range_support_there_is_one_segment_from_zero(self):
+        plan = SegmentPlan(10 * MB, RangeSet([(0, 4 * MB)]), splittable=False)
+        segs = plan.initial(4)
+        assert [(s.start, s.end) for s in segs] == [(0, 10 * MB)]
+        assert plan.downloaded == 0 and plan.split_largest() is None
+
+
+class TestSplitting:
+
+    def test_the_busiest_segment_gives_up_its_back_half(self):
+        plan = SegmentPlan(8 * MB, min_segment=MB)
+        fast, slow = plan.initial(2)
+        plan.claim(slow, 2 * MB)                     # 6 MB … 8 MB still to come
+        plan.retire(fast)
+        tail = plan.split_largest()
+        assert (tail.start, tail.end) == (7 * MB, 8 * MB)
+        assert slow.end == 7 * MB and plan.splits == 2
+
+    def test_nothing_below_the_minimum(self):
+        plan = SegmentPlan(3 * MB, min_segment=MB)
+        (seg,) = plan.initial(1)
+        plan.claim(seg, 2 * MB)
+        assert plan.split_largest() is None
+
+    def test_a_shrunk_segment_stops_at_its_new_end(self):
+        plan = SegmentPlan(4 * MB, min_segment=MB)
+        (seg,) = plan.initial(1)
+        plan.split_largest()
+        assert plan.claim(seg, 3 * MB) == (0, 2 * MB)
+        assert plan.claim(seg, 10) == (2 * MB, 0)
+
+    def test_retired_segments_are_not_split(self):
+        plan = SegmentPlan(8 * MB, min_segment=MB)
+        for seg in plan.initial(2):
+            plan.retire(seg)
+        assert plan.split_largest() is None
+
+    def test_a_stopped_segment_hands_off_its_rest(self):
+        plan = SegmentPlan(4 * MB, min_segment=MB)
+        (seg,) = plan.initial(1)
+        plan.claim(seg, MB)
+        rest = plan.handoff(seg)
+        assert (rest.start, rest.end) == (MB, 4 * MB) and not seg.active
+        assert plan.claim(seg, 10) == (MB, 0)
+        plan.claim(rest, 3 * MB)
+        assert plan.handoff(rest) is None
+
+
+def test_bytes_count_only_once_written():
+    plan = SegmentPlan(100, min_segment=10)
+    (seg,) = plan.initial(1)
+    offset, count = plan.claim(seg, 40)
+    assert plan.downloaded == 0
+    plan.commit(offset, count)
+    assert plan.downloaded == 40 and plan.snapshot() == [[0, 40]]
+    assert not plan.complete()
+
+
+def test_remaining():
+    seg = Segment(10, 50)
+    seg.pos = 45
+    assert seg.remaining == 5
+    seg.pos = 60
+    assert seg.remaining == 0
+
+
+def test_concurrent_workers_with_splitting_cover_the_file_exactly_once():
+    """Workers of different speeds; each free one takes a split, as the manager does."""
+    size = 4 * MB
+    plan = SegmentPlan(size, min_segment=64 * 1024)
+    written = bytearray(size)
+    overlaps = []
+    guard = threading.Lock()
+
+    def work(seg, chunk):
+        while True:
+            offset, count = plan.claim(seg, chunk)
+            if not count:
+                break
+            with guard:
+                if any(written[offset:offset + count]):
+                    overlaps.append(offset)
+                written[offset:offset + count] = b"\x01" * count
+            plan.commit(offset, count)
+        plan.retire(seg)
+        nxt = plan.split_largest()
+        if nxt is not None:
+            work(nxt, chunk)
+
+    threads = [threading.Thread(target=work, args=(seg, chunk))
+               for seg, chunk in zip(plan.initial(4), (4096, 8192, 16384, 65536))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert plan.complete() and plan.downloaded == size
+    assert written.count(0) == 0 and not overlaps
+    assert plan.splits > 3
+
+
+@pytest.mark.parametrize("count", [1, 3, 16])
+def test_initial_segments_tile_the_gap(count):
+    plan = SegmentPlan(10 * MB + 123, min_segment=MB)
+    segs = sorted(plan.initial(count), key=lambda s: s.start)
+    assert segs[0].start == 0 and segs[-1].end == 10 * MB + 123
+    assert all(a.end == b.start for a, b in zip(segs, segs[1:]))
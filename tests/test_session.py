@@ -0,0 +1,118 @@
+"""
+Session restore format and lazy pre-load order.
+
+Restored tabs are placeholders until selected, so the only decisions left
+are what tabs.json holds and which few placeholders get built early.
+"""
+
+import pytest
+
+from session import (
+    DEFAULT_PRELOAD_BUDGET,
+    MAX_ICON_CHARS,
+    MAX_PRELOAD_BUDGET,
+    SessionEntry,
+    clamp_preload_budget,
+    parse_entry,
+    parse_session,
+    preload_order,
+    serialise_session,
+)
+
+
+# ── file format ──────────────────────────────────────────────────────────
+
+class TestLegacyFormat:
+    """tabs.json was a bare list of URLs. An upgrade must not lose it."""
+
+    def test_plain_strings_still_load(self):
+        entries = parse_session(["https://a.example", "https://b.example"])
+        assert [e.url for e in entries] == ["https://a.example", "https://b.example"]
+        assert all(e.title == "" and e.icon == "" for e in entries)
+
+    def test_mixed_old_and_new_entries(self):
+        entries = parse_session([
+            "https://a.example",
+            {"url": "https://b.example", "title": "B"},
+        ])
+        assert [e.title for e in entries] == ["", "B"]
+
+
+def test_round_trip():
+    original = [
+        SessionEntry("https://a.example", "Alpha", "iVBORw0KGgo="),
+        SessionEntry("https://b.example", "Beta"),
+    ]
+    assert parse_session(serialise_session(original)) == original
+
+
+def test_empty_icon_is_not_written():
+    assert "icon" not in SessionEntry("https://a.example").to_dict()
+
+
+@pytest.mark.parametrize("junk", [
+    None, 42, "", "   ", {}, {"url": ""}, {"url": None}, {"title": "no url"}, [],
+])
+def test_junk_entries_are_skipped(junk):
+    assert parse_entry(junk) is None
+
+
+def test_one_bad_entry_does_not_cost_the_session():
+    entries = parse_session(["https://a.example", 7, {"url": 3}, "https://b.example"])
+    assert [e.url for e in entries] == ["https://a.example", "https://b.example"]
+
+
+@pytest.mark.parametrize("data", [None, {}, "https://a.example", 3])
+def test_non_list_file_yields_nothing(data):
+    assert parse_session(data) == []
+
+
+def test_wrong_typed_fields_are_blanked_not_fatal():
+    e = parse_entry({"url": "https://a.example", "title": 5, "icon": ["x"]})
+    assert (e.url, e.title, e.icon) == ("https://a.example", "", "")
+
+
+def test_oversized_icon_dropped():
+    e = parse_entry({"url": "https://a.example", "icon": "A" * (MAX_ICON_CHARS + 1)})
+    assert e.icon == ""
+
+
+def test_label_prefers_title_then_truncated_url():
+    assert SessionEntry("https://a.example", "Alpha").label == "Alpha"
+    long_url = "https://example.com/" + "x" * 100
+    assert SessionEntry(long_url, "  ").label == long_url[:40]
+
+
+# ── pre-load budget ──────────────────────────────────────────────────────
+
+class TestPreloadOrder:
+
+    def test_zero_budget_preloads_nothing(self):
+        assert preload_order(range(1, 60), 0, 0) == []
+
+    def test_budget_caps_work_regardless_of_session_size(self):
+        assert len(preload_order(range(1, 500), 0, 2)) == 2
+
+    def test_nearest_neighbours_first(self):
+        assert preload_order([1, 2, 3, 4, 6, 7, 8], 5, 4) == [6, 4, 7, 3]
+
+    def test_right_neighbour_wins_a_tie(self):
+        assert preload_order([4, 6], 5, 1) == [6]
+
+    def test_active_tab_is_never_a_candidate(self):
+        assert 3 not in preload_order([2, 3, 4], 3, 5)
+
+    def test_budget_larger_than_candidates(self):
+        assert preload_order([1, 2], 0, 10) == [1, 2]
+
+
+@pytest.mark.parametrize("raw,expected", [
+    (3, 3),
+    ("4", 4),
+    (-1, 0),
+    (10_000, MAX_PRELOAD_BUDGET),
+    (None, DEFAULT_PRELOAD_BUDGET),
+    ("lots", DEFAULT_PRELOAD_BUDGET),
+])
+def test_budget_from_settings_is_clamped(raw, expected):
+    assert clamp_preload_budget(raw) == expected
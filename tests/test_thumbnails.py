@@ -0,0 +1,140 @@
+"""
+Speed-dial thumbnails: which pages are captured and when, the crop, the
+encoded formats accepted, and serving them as blackline://thumbs/<host>.
+"""
+
+import json
+
+import pytest
+
+from thumbnails import (
+    MAX_THUMB_BYTES,
+    ThumbnailCache,
+    crop_for,
+    pick_format,
+    sniff_type,
+    thumb_url,
+    tile_hosts,
+    tile_urls,
+)
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 40
+WEBP = b"RIFF\x20\x00\x00\x00WEBPVP8 " + b"\x00" * 20
+SITES = [{"name": "GitHub", "url": "https://github.com"},
+         {"name": "News", "url": "https://www.news.example/today"}]
+
+
+@pytest.fixture
+def thumbs(tmp_path):
+    cache = ThumbnailCache(tmp_path / "thumbs", refresh_age=100, min_interval=10)
+    cache.set_tiles(SITES)
+    return cache
+
+
+def test_tile_hosts_from_the_page():
+    assert tile_hosts(json.dumps(SITES)) == {"github.com", "news.example"}
+    assert tile_hosts([{"url": "javascript:alert(1)"}, "junk", {"name": "x"}]) == set()
+    assert tile_hosts("{not json") == set() and tile_hosts(None) == set()
+
+
+def test_tile_urls_keep_dial_order_once_per_host():
+    sites = SITES + [{"url": "https://github.com/other"}]
+    assert tile_urls(sites) == ["https://github.com", "https://www.news.example/today"]
+
+
+def test_thumb_url():
+    assert thumb_url("https://www.github.com/python") == "blackline://thumbs/github.com"
+    assert thumb_url("about:blank") == ""
+
+
+@pytest.mark.parametrize("w,h,crop", [
+    (1600, 1000, (0, 0, 1600, 1000)),           # already 16:10
+    (1920, 1000, (160, 0, 1600, 1000)),         # wide: sides trimmed
+    (800, 1200, (0, 0, 800, 500)),              # tall: the top is kept
+    (0, 600, (0, 0, 0, 0)),
+])
+def test_crop_for(w, h, crop):
+    assert crop_for(w, h) == crop
+
+
+def test_pick_format():
+    assert pick_format([b"png", b"WEBP", b"jpg"]) == "webp"
+    assert pick_format(["png", "jpg"]) == "png"
+
+
+def test_sniff_type():
+    assert sniff_type(PNG) == "image/png" and sniff_type(WEBP) == "image/webp"
+    assert sniff_type(b"GIF89a") == "" and sniff_type(b"") == ""
+
+
+class TestWants:
+
+    def test_a_tile_is_wanted(self, thumbs):
+        assert thumbs.wants("https://github.com/python/cpython", now=0) == "github.com"
+        assert thumbs.wants("https://news.example/", now=0) == "news.example"
+
+    def test_other_pages_and_private_tabs_are_not(self, thumbs):
+        assert thumbs.wants("https://elsewhere.example/", now=0) == ""
+        assert thumbs.wants("https://github.com/", private=True, now=0) == ""
+        assert thumbs.wants("blackline://newtab/", now=0) == ""
+
+    def test_a_host_in_flight_is_not_wanted_twice(self, thumbs):
+        assert thumbs.begin("github.com", now=0)
+        assert not thumbs.begin("github.com", now=20)
+        assert thumbs.wants("https://github.com/", now=20) == ""
+
+    def test_captures_are_spaced(self, thumbs):
+        thumbs.begin("github.com", now=0)
+        thumbs.finish("github.com", PNG, now=1)
+        assert thumbs.wants("https://news.example/", now=5) == ""
+        assert thumbs.wants("https://news.example/", now=11) == "news.example"
+
+    def test_a_recent_picture_is_not_retaken(self, thumbs):
+        thumbs.begin("github.com", now=0)
+        thumbs.finish("github.com", PNG, now=0)
+        assert thumbs.wants("https://github.com/", now=50) == ""
+        assert thumbs.wants("https://github.com/", now=101) == "github.com"
+
+    def test_new_tiles_replace_the_old(self, thumbs):
+        thumbs.set_tiles('[{"url": "https://other.example"}]')
+        assert thumbs.tiles == {"other.example"}
+        assert thumbs.wants("https://github.com/", now=0) == ""
+
+
+class TestFinish:
+
+    @pytest.mark.parametrize("data", [PNG, WEBP])
+    def test_encoded_pictures_are_kept(self, thumbs, data):
+        thumbs.begin("github.com", now=0)
+        assert thumbs.finish("github.com", data, now=0)
+        assert thumbs.lookup("https://www.github.com/x", now=1) == data
+
+    @pytest.mark.parametrize("data", [None, b"", b"GIF89a" + bytes(20),
+                                      PNG + bytes(MAX_THUMB_BYTES)])
+    def test_failed_or_odd_encodings_are_dropped(self, thumbs, data):
+        thumbs.begin("github.com", now=0)
+        assert thumbs.finish("github.com", data, now=0) is False
+        assert len(thumbs) == 0
+
+    def test_finish_always_releases_the_claim(self, thumbs):
+        thumbs.begin("github.com", now=0)
+        thumbs.finish("github.com", None, now=0)
+        assert thumbs.begin("github.com", now=20)
+
+
+def test_pages_for_the_scheme(thumbs):
+    thumbs.begin("news.example", now=0)
+    thumbs.finish("news.example", WEBP, now=0)
+    page = thumbs.page("/news.example", now=1)
+    assert page.content_type == "image/webp" and page.body == WEBP
+    assert page.headers()[b"Cache-Control"] == b"no-cache"
+    assert thumbs.page("/github.com", now=1) is None and thumbs.page("/", now=1) is None
+
+
+def test_remove_and_clear(thumbs):
+    for host in ("github.com", "news.example"):
+        thumbs.begin(host, now=0)
+        thumbs.finish(host, PNG, now=0)
+    assert thumbs.remove("https://github.com/") and not thumbs.remove("about:blank")
+    thumbs.clear()
+    assert len(thumbs) == 0
@@ -0,0 +1,185 @@
+"""
+Built-in script registry: versioning, installation diffs, enable flags and
+the timing reports read back from pages.
+"""
+
+import json
+
+import pytest
+
+from userscripts import (
+    APPLICATION_WORLD,
+    DOCUMENT_CREATION,
+    MAIN_WORLD,
+    NAME_PREFIX,
+    TIMINGS_GLOBAL,
+    ScriptRegistry,
+    ScriptTimings,
+    UserScript,
+    parse_report,
+)
+
+
+def _registry():
+    reg = ScriptRegistry()
+    reg.register(UserScript("channel", "var a = 1;", DOCUMENT_CREATION, MAIN_WORLD,
+                            toggleable=False))
+    reg.register(UserScript("enhance", "var b = 2;"))
+    return reg
+
+
+class TestScript:
+
+    def test_version_follows_source(self):
+        a = UserScript("x", "one")
+        assert a.version == UserScript("x", "one").version
+        assert a.version != UserScript("x", "two").version
+
+    def test_installed_name_is_prefixed_and_versioned(self):
+        s = UserScript("enhance", "src")
+        assert s.installed_name == f"{NAME_PREFIX}enhance-{s.version}"
+
+    def test_compiled_keeps_top_level_declarations(self):
+        """No wrapping function: a declared class must stay global."""
+        code = UserScript("c", "class Foo {}").compiled()
+        assert "\nclass Foo {}\n" in code
+        assert TIMINGS_GLOBAL in code
+
+    def test_compiled_escapes_the_name(self):
+        code = UserScript('we"ird', "1").compiled()
+        assert json.dumps('we"ird') in code
+
+    @pytest.mark.parametrize("kw", [{"injection": "sometime"}, {"world": "isolated"}])
+    def test_unknown_enum_values_rejected(self, kw):
+        with pytest.raises(ValueError):
+            UserScript("x", "1", **kw)
+
+
+class TestInstallPlan:
+
+    def test_fresh_profile_gets_everything(self):
+        reg = _registry()
+        remove, insert = reg.plan_install([])
+        assert remove == [] and {s.name for s in insert} == {"channel", "enhance"}
+
+    def test_installed_and_current_is_left_alone(self):
+        reg = _registry()
+        names = [s.installed_name for s in reg]
+        assert reg.plan_install(names) == ([], [])
+
+    def test_old_version_is_replaced(self):
+        reg = _registry()
+        stale = f"{NAME_PREFIX}enhance-00000000"
+        remove, insert = reg.plan_install([reg.get("channel").installed_name, stale])
+        assert remove == [stale] and [s.name for s in insert] == ["enhance"]
+
+    def test_disabled_script_is_removed(self):
+        reg = _registry()
+        installed = [s.installed_name for s in reg]
+        reg.set_enabled("enhance", False)
+        remove, insert = reg.plan_install(installed)
+        assert remove == [reg.get("enhance").installed_name] and insert == []
+
+    def test_skipped_script_is_removed_but_stays_enabled(self):
+        reg = _registry()
+        installed = [s.installed_name for s in reg]
+        remove, insert = reg.plan_install(installed, skip=("enhance",))
+        assert remove == [reg.get("enhance").installed_name] and insert == []
+        assert reg.get("enhance").enabled
+
+    def test_foreign_scripts_are_never_touched(self):
+        reg = _registry()
+        remove, _ = reg.plan_install(["someone-elses-script"])
+        assert remove == []
+
+
+class TestEnableFlags:
+
+    def test_required_script_cannot_be_disabled(self):
+        reg = _registry()
+        assert reg.set_enabled("channel", False) is False
+        assert reg.get("channel").enabled
+
+    def test_unknown_name(self):
+        assert _registry().set_enabled("nope", False) is False
+
+    def test_settings_round_trip(self):
+        reg = _registry()
+        reg.set_enabled("enhance", False)
+        saved = reg.disabled_names()
+        fresh = _registry()
+        fresh.apply_disabled(saved + ["gone-since"])
+        assert fresh.disabled_names() == ["enhance"]
+
+    @pytest.mark.parametrize("junk", [None, "enhance", 3, {"enhance": True}])
+    def test_junk_setting_enables_everything(self, junk):
+        reg = _registry()
+        reg.apply_disabled(junk)
+        assert reg.disabled_names() == []
+
+    def test_setting_applies_to_scripts_registered_later(self):
+        reg = _registry()
+        reg.apply_disabled(["cosmetic"])
+        reg.register(UserScript("cosmetic", "x"))
+        assert reg.get("cosmetic").enabled is False
+        assert reg.disabled_names() == ["cosmetic"]
+
+    def test_required_script_ignores_the_setting(self):
+        reg = _registry()
+        reg.apply_disabled(["channel"])
+        assert reg.get("channel").enabled and reg.disabled_names() == []
+
+    def test_reregistering_keeps_the_flag(self):
+        reg = _registry()
+        reg.set_enabled("enhance", False)
+        reg.register(UserScript("enhance", "var b = 3;"))
+        assert reg.get("enhance").enabled is False
+
+    def test_worlds_of_enabled_scripts(self):
+        reg = _registry()
+        assert reg.worlds() == {MAIN_WORLD, APPLICATION_WORLD}
+        reg.set_enabled("enhance", False)
+        assert reg.worlds() == {MAIN_WORLD}
+
+
+class TestReports:
+
+    def test_parse(self):
+        text = json.dumps({"enhance": {"v": "abc", "start": 12.5, "exec": 0.75}})
+        assert parse_report(text) == {"enhance": ("abc", 12.5, 0.75)}
+
+    def test_unfinished_run(self):
+        text = json.dumps({"enhance": {"v": "abc", "start": 3, "exec": None}})
+        assert parse_report(text)["enhance"][2] is None
+
+    @pytest.mark.parametrize("text", [
+        None, "", "not json", "[]", json.dumps({"x": 5}),
+        json.dumps({"x": {"start": "soon"}}), json.dumps({"x": {"start": 1, "exec": "fast"}}),
+    ])
+    def test_malformed_reports_are_dropped(self, text):
+        assert parse_report(text) == {}
+
+    def test_summary(self):
+        t = ScriptTimings()
+        t.add_report({"enhance": ("v", 10.0, 1.0)})
+        t.add_report({"enhance": ("v", 20.0, 3.0)})
+        t.add_report({"enhance": ("v", 30.0, None)})
+        assert t.summary("enhance") == {"runs": 3, "failed": 1,
+                                        "start_ms": 20.0, "exec_ms": 2.0}
+
+    def test_same_run_read_twice_from_a_tab_counts_once(self):
+        t = ScriptTimings()
+        t.add_report({"x": ("v", 5.0, 1.0)}, source="tab")
+        t.add_report({"x": ("v", 5.0, 1.0)}, source="tab")
+        t.add_report({"x": ("v", 5.0, 1.0)}, source="other")
+        assert t.summary("x")["runs"] == 2
+
+    def test_summary_of_unseen_script(self):
+        assert ScriptTimings().summary("x") == {"runs": 0, "failed": 0,
+                                                "start_ms": None, "exec_ms": None}
+
+    def test_keeps_only_recent_runs(self):
+        t = ScriptTimings(keep=2)
+        for ms in (100.0, 1.0, 1.0):
+            t.add_report({"x": ("v", 0.0, ms)})
+        assert t.summary("x")["exec_ms"] == 1.0
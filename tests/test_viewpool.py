@@ -0,0 +1,155 @@
+"""
+Pre-built view pool and first-paint timings.
+
+The pool stands in for QWebEngineViews with plain objects: what matters is
+that spares are handed out before anything is built, that refilling stays
+bounded, and that a profile's spares can all be let go at once.
+"""
+
+import pytest
+
+from viewpool import (
+    DEFAULT,
+    DEFAULT_POOL_SIZE,
+    MAX_POOL_SIZE,
+    PRIVATE,
+    PaintTimings,
+    ViewPool,
+    clamp_pool_size,
+    timing_report,
+)
+
+
+class Factory:
+    def __init__(self):
+        self.built = []
+        self.disposed = []
+
+    def __call__(self, key):
+        item = (key, len(self.built))
+        self.built.append(item)
+        return item
+
+    def dispose(self, item):
+        self.disposed.append(item)
+
+
+def _pool(size=2):
+    f = Factory()
+    return ViewPool(f, size, dispose=f.dispose), f
+
+
+class TestPool:
+
+    def test_empty_pool_builds_on_demand(self):
+        pool, f = _pool()
+        item, pooled = pool.take()
+        assert pooled is False and item == f.built[0]
+        assert pool.misses == 1
+
+    def test_spare_is_handed_out_without_building(self):
+        pool, f = _pool()
+        pool.top_up(limit=2)
+        built = len(f.built)
+        item, pooled = pool.take()
+        assert pooled is True and len(f.built) == built
+        assert pool.hits == 1
+
+    def test_spares_go_out_oldest_first(self):
+        pool, f = _pool()
+        pool.top_up(limit=2)
+        assert pool.take()[0] == f.built[0]
+
+    def test_top_up_is_bounded_per_call_and_by_size(self):
+        pool, _ = _pool(size=3)
+        assert pool.top_up(limit=1) == 1
+        assert pool.top_up(limit=10) == 2
+        assert pool.top_up(limit=10) == 0
+        assert pool.deficit() == 0
+
+    def test_profiles_are_kept_apart(self):
+        pool, _ = _pool()
+        pool.top_up(PRIVATE, limit=2)
+        assert pool.spare(DEFAULT) == 0
+        item, pooled = pool.take(DEFAULT)
+        assert pooled is False and item[0] == DEFAULT
+
+    def test_drain_disposes_every_spare(self):
+        pool, f = _pool()
+        pool.top_up(PRIVATE, limit=2)
+        assert pool.drain(PRIVATE) == 2
+        assert len(f.disposed) == 2 and pool.spare(PRIVATE) == 0
+        assert pool.drain(PRIVATE) == 0
+
+    def test_shrinking_disposes_extras(self):
+        pool, f = _pool(size=3)
+        pool.top_up(limit=3)
+        pool.size = 1
+        assert pool.spare() == 1 and len(f.disposed) == 2
+
+    def test_size_zero_disables(self):
+        pool, _ = _pool(size=0)
+        assert pool.top_up(limit=5) == 0
+        assert pool.take()[1] is False
+
+
+@pytest.mark.parametrize("raw,expected", [
+    (3, 3), ("1", 1), (-2, 0), (99, MAX_POOL_SIZE), (None, DEFAULT_POOL_SIZE),
+    ("many", DEFAULT_POOL_SIZE),
+])
+def test_pool_size_setting_is_clamped(raw, expected):
+    assert clamp_pool_size(raw) == expected
+
+
+class TestBursts:
+
+    def test_peak_counts_opens_within_the_window(self):
+        pool, _ = _pool()
+        for t in (0.0, 0.3, 0.6, 0.9, 10.0, 10.1):
+            pool.take(now=t)
+        assert pool.peak_burst(window=2.0) == 4
+
+    def test_suggestion_is_capped(self):
+        pool, _ = _pool()
+        for i in range(20):
+            pool.take(now=i * 0.01)
+        assert pool.suggested_size() == MAX_POOL_SIZE
+
+    def test_no_opens_no_burst(self):
+        assert _pool()[0].peak_burst() == 0
+
+
+class TestPaintTimings:
+
+    def test_pooled_and_cold_are_separate(self):
+        t = PaintTimings()
+        for ms in (100, 120, 140):
+            t.record(ms, pooled=True)
+        t.record(400, pooled=False)
+        assert t.summary(True) == (3, 120, 140)
+        assert t.summary(False) == (1, 400, 400)
+
+    def test_no_samples(self):
+        assert PaintTimings().summary(True) == (0, None, None)
+
+    @pytest.mark.parametrize("junk", [None, -5, 10_000_000])
+    def test_implausible_samples_dropped(self, junk):
+        t = PaintTimings()
+        t.record(junk, pooled=True)
+        assert t.summary(True)[0] == 0
+
+    def test_keeps_only_recent(self):
+        t = PaintTimings(keep=3)
+        for ms in (1, 2, 3, 1000):
+            t.record(ms, pooled=True)
+        assert t.summary(True)[0] == 3
+
+
+def test_report_mentions_both_paths_and_the_suggestion():
+    pool, _ = _pool()
+    t = PaintTimings()
+    t.record(90, pooled=True)
+    text = timing_report(pool, t)
+    assert "median 90 ms" in text
+    assert "Built on demand: no tabs measured yet" in text
+    assert "suggested size" in text